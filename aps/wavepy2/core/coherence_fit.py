@@ -0,0 +1,339 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import numpy as np
+from scipy.optimize import curve_fit
+
+from aps.wavepy2.util.common.executors import create_executor, SERIAL
+
+epsilon = 1e-9
+
+def get_coherence_length(wavelength, source_sigma, source_distance):
+    return wavelength * source_distance / (2 * np.pi * source_sigma)
+
+def get_pattern_period(z, p0, source_distance, z0):
+    return p0 * (1 + (z - z0) / source_distance)
+
+def visibility_envelope(z, wavelength, Amp, p0, source_sigma, source_distance, z0):
+    csi = get_coherence_length(wavelength, source_sigma, source_distance)
+    pz  = get_pattern_period(z, p0, source_distance, z0)
+
+    return Amp * np.exp(-((wavelength * (z - z0)) ** 2) / (2*(csi * pz) ** 2))
+
+def visibility_model(z, wavelength, Amp, p0, source_sigma, source_distance, z0):
+    """
+    Visibility of the first harmonic vs detector distance: gaussian envelope, given by the coherence length,
+    times the Talbot oscillation.
+    """
+    pz = get_pattern_period(z, p0, source_distance, z0)
+
+    return visibility_envelope(z, wavelength, Amp, p0, source_sigma, source_distance, z0) * \
+           np.abs(np.sin(np.pi * wavelength * (z - z0) / (p0 * pz)))
+
+def fit_period_vs_z(zvec, pattern_period_z, contrast, threshold=0.005):
+    """
+    Linear fit of the pattern period vs detector distance, excluding points with low contrast or with period
+    out of 3 sigmas.
+
+    Returns
+    -------
+    (float, float, ndarray, ndarray)
+        source distance, pattern period at z=0, indexes of the points used and not used for the fit
+    """
+    limit_up   = np.average(pattern_period_z) + 3*np.std(pattern_period_z)
+    limit_down = np.average(pattern_period_z) - 3*np.std(pattern_period_z)
+
+    args_for_NOfit = np.argwhere(np.logical_or(contrast < threshold, pattern_period_z > limit_up, pattern_period_z < limit_down)).flatten()
+    args_for_fit   = np.argwhere(np.logical_and(contrast >= threshold, pattern_period_z <= limit_up, pattern_period_z >= limit_down)).flatten()
+
+    fit1d = np.polyfit(zvec[args_for_fit], pattern_period_z[args_for_fit], 1)
+
+    return fit1d[1]/fit1d[0], fit1d[1], args_for_fit, args_for_NOfit
+
+def visibility_model_jacobian(z, wavelength, Amp, p0, source_sigma, source_distance, z0):
+    """
+    Analytic partial derivatives of the visibility model with respect to [Amp, p0, source_sigma, source_distance, z0].
+
+    With u = z - z0 the model is Amp * exp(-g) * |sin(phi)|, where:
+        g   = 2 pi^2 source_sigma^2 u^2 / (p0^2 (source_distance + u)^2)
+        phi = pi wavelength source_distance u / (p0^2 (source_distance + u))
+
+    The parameters can be arrays broadcastable with z, to evaluate several sets of parameters at once.
+
+    Returns
+    -------
+    ndarray
+        shape z.shape + (5,), or the broadcast shape of z and of the parameters + (5,)
+    """
+    u  = np.asarray(z) - z0
+    du = source_distance + u
+    r  = u / du
+
+    g       = 2 * (np.pi * source_sigma * r / p0) ** 2
+    phi     = np.pi * wavelength * source_distance * r / p0 ** 2
+    exp_g   = np.exp(-g)
+    sin_phi = np.sin(phi)
+
+    abs_sin  = np.abs(sin_phi)
+    model    = Amp * exp_g * abs_sin
+    dM_dphi  = Amp * exp_g * np.sign(sin_phi) * np.cos(phi)
+    dg_dr    = 4 * (np.pi * source_sigma / p0) ** 2 * r
+
+    jacobian = np.empty(np.shape(model) + (5,))
+    jacobian[..., 0] = exp_g * abs_sin
+    jacobian[..., 1] = model * 2 * g / p0 - dM_dphi * 2 * phi / p0
+    jacobian[..., 2] = -model * 2 * g / source_sigma
+    jacobian[..., 3] = model * dg_dr * u / du ** 2 + dM_dphi * np.pi * wavelength * (u / (p0 * du)) ** 2
+    jacobian[..., 4] = (model * dg_dr - dM_dphi * np.pi * wavelength * source_distance / p0 ** 2) * source_distance / du ** 2
+
+    return jacobian
+
+def fit_visibility_vs_z(zvec, contrast, wavelength, pattern_period, source_distance,
+                        pattern_period_bounds=None, source_distance_bounds=None, initial_guess=None,
+                        n_starts=1, executor=None):
+    """
+    Fit of the visibility model vs detector distance, with analytic jacobian.
+
+    Parameters
+    ----------
+    pattern_period_bounds, source_distance_bounds : [float, float]
+        fit limits of pattern period and source distance: if None the parameter is fixed
+
+    initial_guess : list of floats
+        [Amp, p0, source_sigma, source_distance, z0], e.g. the result of a previous fit (warm start)
+
+    n_starts : int
+        if > 1, the initial guess plus the best n_starts - 1 seeds of a grid of pattern periods, source distances and
+        source sizes are fitted, and the fit with the lowest residual is returned
+
+    executor : ExecutorFacade
+        executor of the multi-start fits (default: serial)
+
+    Returns
+    -------
+    (ndarray, float, float)
+        fitted parameters [Amp, p0, source_sigma, source_distance, z0], coherence length and source size
+    """
+    zvec     = np.asarray(zvec)
+    contrast = np.asarray(contrast)
+
+    shift_limit = 0.05 * (np.max(zvec) - np.min(zvec))
+
+    if pattern_period_bounds is None: pattern_period_bounds = [pattern_period * (1-epsilon), pattern_period * (1+epsilon)]
+    if source_distance_bounds is None:
+        source_distance_bounds = [source_distance * ((1-epsilon) if source_distance > 0 else (1+epsilon)),
+                                  source_distance * ((1+epsilon) if source_distance > 0 else (1-epsilon))]
+
+    bounds_low = [1e-3, pattern_period_bounds[0], 1e-7, source_distance_bounds[0], -shift_limit]
+    bounds_up  = [2.0,  pattern_period_bounds[1], 1e-3, source_distance_bounds[1],  shift_limit]
+
+    if initial_guess is None: initial_guess = [1.0, pattern_period, 1e-5, source_distance, 1e-6]
+
+    # the initial guess must be inside the bounds
+    initial_guesses = [np.clip(initial_guess, bounds_low, bounds_up)]
+
+    if n_starts > 1: initial_guesses += [np.clip(seed, bounds_low, bounds_up) for seed in __get_multi_start_seeds(zvec, contrast, wavelength, bounds_low, bounds_up, n_starts - 1)]
+
+    fit_parameters = [[zvec, contrast, wavelength, initial_guess_i, bounds_low, bounds_up] for initial_guess_i in initial_guesses]
+
+    if executor is None or len(fit_parameters) == 1: executor = create_executor(SERIAL)
+
+    results = list(executor.map(_fit_visibility_single_start, fit_parameters))
+    fits    = [result for result in results if not isinstance(result, Exception)]
+
+    if len(fits) == 0: raise results[0]
+
+    popt, _ = min(fits, key=lambda fit: fit[1])
+
+    return popt, get_coherence_length(wavelength, source_sigma=popt[2], source_distance=popt[3]), popt[2]
+
+def _fit_visibility_single_start(parameters):
+    zvec, contrast, wavelength, initial_guess, bounds_low, bounds_up = parameters
+
+    def _fitting_function(z, Amp, p0, source_sigma, source_distance, z0):
+        return visibility_model(z, wavelength, Amp, p0, source_sigma, source_distance, z0)
+
+    def _fitting_jacobian(z, Amp, p0, source_sigma, source_distance, z0):
+        return visibility_model_jacobian(z, wavelength, Amp, p0, source_sigma, source_distance, z0)
+
+    try:
+        popt, _ = curve_fit(_fitting_function, zvec, contrast, p0=initial_guess, bounds=(bounds_low, bounds_up), jac=_fitting_jacobian)
+    except Exception as e:
+        return e
+
+    return popt, np.sum((_fitting_function(zvec, *popt) - contrast) ** 2)
+
+def __get_multi_start_seeds(zvec, contrast, wavelength, bounds_low, bounds_up, n_seeds, grid_size=8):
+    """
+    Grid of pattern periods, source distances (within the bounds) and source sizes, evaluated at once by
+    broadcasting the model, with the optimal amplitude of each point: the best n_seeds points are returned.
+    """
+    p0              = np.linspace(bounds_low[1], bounds_up[1], grid_size if bounds_up[1] - bounds_low[1] > 2*epsilon*abs(bounds_up[1]) else 1)
+    source_distance = np.linspace(bounds_low[3], bounds_up[3], grid_size if bounds_up[3] - bounds_low[3] > 2*epsilon*abs(bounds_up[3]) else 1)
+    source_sigma    = np.logspace(np.log10(bounds_low[2]), np.log10(bounds_up[2]), 2*grid_size)
+
+    p0, source_distance, source_sigma = [grid.flatten()[:, np.newaxis] for grid in np.meshgrid(p0, source_distance, source_sigma, indexing="ij")]
+
+    shape = visibility_model(zvec[np.newaxis, :], wavelength, 1.0, p0, source_sigma, source_distance, 0.0)
+    Amp   = np.clip(np.sum(shape*contrast, axis=1, keepdims=True) / np.maximum(np.sum(shape**2, axis=1, keepdims=True), epsilon), bounds_low[0], bounds_up[0])
+    cost  = np.sum((Amp*shape - contrast) ** 2, axis=1)
+
+    best = np.argsort(cost)[:n_seeds]
+
+    return [[Amp[i, 0], p0[i, 0], source_sigma[i, 0], source_distance[i, 0], 0.0] for i in best]
+
+def fit_visibility_vs_z_maps(zvec, contrast_maps, wavelength, initial_guess, max_iterations=100, tolerance=1e-8):
+    """
+    Fit of the visibility model vs detector distance of every sub-window of a coherence map, vectorized across the
+    sub-windows: a Levenberg-Marquardt iteration with analytic jacobian, with an independent damping for each window.
+    Pattern period and source distance are fixed (from the fit of the whole image), amplitude, source size and z shift
+    are fitted, within the same bounds of fit_visibility_vs_z.
+
+    Parameters
+    ----------
+    contrast_maps : ndarray
+        visibility of the sub-windows, with shape (len(zvec), nTilesVert, nTilesHor)
+
+    initial_guess : list of floats
+        [Amp, p0, source_sigma, source_distance, z0], usually the fit of the whole image
+
+    Returns
+    -------
+    (ndarray, ndarray, ndarray)
+        fitted parameters, with shape (nTilesVert, nTilesHor, 5), coherence length and source size maps. Windows with
+        not finite visibilities are NaN
+    """
+    zvec          = np.asarray(zvec)
+    contrast_maps = np.asarray(contrast_maps)
+    maps_shape    = contrast_maps.shape[1:]
+
+    contrast = contrast_maps.reshape(len(zvec), -1).T
+    valid    = np.all(np.isfinite(contrast), axis=1)
+    contrast = np.where(np.isfinite(contrast), contrast, 0.0)
+
+    shift_limit = 0.05 * (np.max(zvec) - np.min(zvec))
+    free        = [0, 2, 4]
+    bounds_low  = np.array([1e-3, 1e-7, -shift_limit])
+    bounds_up   = np.array([2.0,  1e-3,  shift_limit])
+
+    params = np.tile(np.asarray(initial_guess, dtype=float), (contrast.shape[0], 1))
+    params[:, free] = np.clip(params[:, free], bounds_low, bounds_up)
+
+    def _residuals(params):
+        return visibility_model(zvec[np.newaxis, :], wavelength, *[params[:, [k]] for k in range(5)]) - contrast
+
+    residuals = _residuals(params)
+    cost      = np.sum(residuals ** 2, axis=1)
+    damping   = np.full(contrast.shape[0], 1e-3)
+
+    for _ in range(max_iterations):
+        jacobian = visibility_model_jacobian(zvec[np.newaxis, :], wavelength, *[params[:, [k]] for k in range(5)])[..., free]
+
+        JTJ = np.einsum('wki,wkj->wij', jacobian, jacobian)
+        JTr = np.einsum('wki,wk->wi', jacobian, residuals)
+
+        diagonal = np.diagonal(JTJ, axis1=1, axis2=2)
+        diagonal = diagonal + epsilon * np.max(diagonal, axis=1, keepdims=True) + np.finfo(float).tiny
+
+        step = np.linalg.solve(JTJ + (damping[:, np.newaxis] * diagonal)[:, :, np.newaxis] * np.eye(len(free)), -JTr[..., np.newaxis])[..., 0]
+
+        trial_params = params.copy()
+        trial_params[:, free] = np.clip(params[:, free] + step, bounds_low, bounds_up)
+
+        trial_residuals = _residuals(trial_params)
+        trial_cost      = np.sum(trial_residuals ** 2, axis=1)
+
+        improved   = trial_cost < cost
+        converged  = np.all(np.abs(cost - trial_cost) <= tolerance * np.maximum(cost, epsilon))
+
+        params[improved]    = trial_params[improved]
+        residuals[improved] = trial_residuals[improved]
+        cost[improved]      = trial_cost[improved]
+        damping             = np.where(improved, damping * 0.1, damping * 10.0).clip(1e-12, 1e12)
+
+        if converged: break
+
+    params[~valid] = np.nan
+
+    coherence_length = get_coherence_length(wavelength, source_sigma=params[:, 2], source_distance=params[:, 3])
+
+    return params.reshape(maps_shape + (5,)), coherence_length.reshape(maps_shape), params[:, 2].reshape(maps_shape)
+
+def get_refinement_indexes(zvec, calculated_indexes, contrast, model, threshold=0.25):
+    """
+    Coarse-to-fine sampling: indexes of the z positions not yet calculated where a fit on the calculated ones is not
+    reliable, i.e. where the curvature of the fitted model is high (visibility minima and revivals) or where the
+    residuals of the neighbouring calculated points are high, both relative to their maximum value.
+
+    Parameters
+    ----------
+    zvec : ndarray
+        all the z positions of the scan
+
+    calculated_indexes : list of int
+        indexes of the z positions already calculated
+
+    contrast : ndarray
+        visibility of the calculated z positions
+
+    model : ndarray
+        fitted visibility model at all the z positions
+    """
+    zvec       = np.asarray(zvec)
+    model      = np.asarray(model)
+    calculated = np.asarray(calculated_indexes)
+    order      = np.argsort(zvec)
+
+    curvature = np.zeros(len(zvec))
+    curvature[order[1:-1]] = np.abs(model[order[:-2]] - 2*model[order[1:-1]] + model[order[2:]])
+    if np.max(curvature) > 0: curvature /= np.max(curvature)
+
+    calculated_order = np.argsort(zvec[calculated])
+    residual = np.interp(zvec,
+                         zvec[calculated][calculated_order],
+                         np.abs(contrast - model[calculated])[calculated_order]) / max(np.max(np.abs(model)), epsilon)
+
+    candidates = np.setdiff1d(np.arange(len(zvec)), calculated)
+
+    return candidates[np.logical_or(curvature[candidates] > threshold, residual[candidates] > threshold)].tolist()
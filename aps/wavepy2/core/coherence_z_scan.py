@@ -0,0 +1,241 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+"""
+Coherence Z Scan
+-------------------------------------------------
+
+Visibility of the frames of a z-scan, as calculated by the workers of the
+executors (no Qt/matplotlib): a spawned worker process imports only this module.
+
+The parameters of a frame are the list: [index, data files (the repeated
+exposures), z, dark value, crop indexes, harmonic periods, search region,
+uniform filter size, averaging mode, spread of the exposures, tiles, show fourier].
+"""
+import numpy as np
+import time
+import os
+import threading
+
+from aps.wavepy2.util.common import common_tools
+from aps.wavepy2.util.common.common_tools import FourierTransform
+from aps.wavepy2.util.common.progress import add_timing
+from aps.common.logger import get_registered_logger_instance
+from aps.common.io.tiff_file import read_tiff
+
+from aps.wavepy2.core import harmonic_analysis
+
+APPLICATION_NAME = "Single Grating Z Scan"
+
+NO_AVERAGE                = 0
+REAL_SPACE_AVERAGE        = 1
+FOURIER_MAGNITUDE_AVERAGE = 2
+
+def get_image_name(zvec_i):
+    return 'FFT_{:.0f}mm'.format(zvec_i * 1e3)
+
+def read_image(data_file_i, darkMeanValue, idx4crop, timings=None):
+    tzero = time.perf_counter()
+
+    img = read_tiff(data_file_i)
+
+    tzero = add_timing(timings, "read", tzero)
+
+    img = img - darkMeanValue  # calculate and remove dark
+    img = common_tools.crop_matrix_at_indexes(img, idx4crop)
+
+    add_timing(timings, "dark_crop", tzero)
+
+    return img
+
+def read_average_image(data_files, darkMeanValue, idx4crop, timings=None):
+    img = read_image(data_files[0], darkMeanValue, idx4crop, timings)
+    for data_file in data_files[1:]: img = img + read_image(data_file, darkMeanValue, idx4crop, timings)
+
+    return img / len(data_files)
+
+def get_exposure_groups(zvec, averaging_mode):
+    if averaging_mode == NO_AVERAGE: return [[i] for i in range(len(zvec))]
+
+    # the repeated exposures of the same z position are consecutive
+    exposure_groups = [[0]]
+    for i in range(1, len(zvec)):
+        if np.isclose(zvec[i], zvec[exposure_groups[-1][0]]): exposure_groups[-1].append(i)
+        else: exposure_groups.append([i])
+
+    return exposure_groups
+
+def run_calculation(parameters):
+        i, \
+        data_files_i, \
+        zvec_i, \
+        darkMeanValue, \
+        idx4crop, \
+        harmonicPeriod, \
+        searchRegion, \
+        unFilterSize, \
+        averaging_mode, \
+        exposure_std, \
+        tiles, \
+        show_fourier = parameters
+
+        # python3.8 do not share the same environment, so the Singleton is not active
+        try: get_registered_logger_instance(application_name=APPLICATION_NAME).print_message("loop " + str(i) + ": " + ", ".join(data_files_i))
+        except: print("loop " + str(i) + ": " + ", ".join(data_files_i))
+
+        timings = {}
+
+        result = {}
+        result["harmonicPeriod"] = harmonicPeriod
+        result["image_name"] = get_image_name(zvec_i)
+
+        if averaging_mode == NO_AVERAGE:
+            img = read_image(data_files_i[0], darkMeanValue, idx4crop, timings)
+
+            result["visib_1st_harmonics"] = harmonic_analysis.visib_1st_harmonics(img, harmonicPeriod, searchRegion=searchRegion, unFilterSize=unFilterSize, timings=timings)
+            result["visibility_std"]      = None
+        else:
+            img                  = None
+            arg_imgFFT           = None
+            exposures_visibility = []
+
+            # the exposures are streamed: only the running sums are kept in memory
+            for data_file in data_files_i:
+                img_exposure = read_image(data_file, darkMeanValue, idx4crop, timings)
+
+                if averaging_mode == FOURIER_MAGNITUDE_AVERAGE:
+                    tzero               = time.perf_counter()
+                    arg_imgFFT_exposure = np.abs(FourierTransform.fft2d(img_exposure))
+                    arg_imgFFT          = arg_imgFFT_exposure if arg_imgFFT is None else arg_imgFFT + arg_imgFFT_exposure
+                    add_timing(timings, "fft", tzero)
+
+                    # the spectrum of the exposure is already there: its peaks are cheap
+                    if exposure_std: exposures_visibility.append(harmonic_analysis.visib_1st_harmonics_fft(arg_imgFFT_exposure, harmonicPeriod, searchRegion=searchRegion, unFilterSize=unFilterSize, timings=timings)[:2])
+                elif exposure_std:
+                    exposures_visibility.append(harmonic_analysis.visib_1st_harmonics(img_exposure, harmonicPeriod, searchRegion=searchRegion, unFilterSize=unFilterSize, timings=timings)[:2])
+
+                img = img_exposure if img is None else img + img_exposure
+
+            img = img / len(data_files_i)
+
+            if averaging_mode == FOURIER_MAGNITUDE_AVERAGE: result["visib_1st_harmonics"] = harmonic_analysis.visib_1st_harmonics_fft(arg_imgFFT / len(data_files_i), harmonicPeriod, searchRegion=searchRegion, unFilterSize=unFilterSize, timings=timings)
+            else:                                           result["visib_1st_harmonics"] = harmonic_analysis.visib_1st_harmonics(img, harmonicPeriod, searchRegion=searchRegion, unFilterSize=unFilterSize, timings=timings)
+
+            result["visibility_std"] = list(np.std(np.array(exposures_visibility), axis=0)) if exposure_std else None
+
+        if not tiles is None: result["visibility_tiles"] = harmonic_analysis.visib_1st_harmonics_tiles(img, harmonicPeriod, tiles, searchRegion=searchRegion, unFilterSize=unFilterSize, timings=timings)
+
+        # only the thumbnail of the spectrum travels back from the worker, not the image
+        if show_fourier: result["spectrum"] = harmonic_analysis.SpectrumThumbnail(FourierTransform.fft2d(img), harmonicPeriod)
+
+        result["timings"] = timings
+        result["worker"]  = _get_worker_id()
+
+        return result
+
+def _get_worker_id():
+    return str(os.getpid()) + ":" + str(threading.get_ident())
+
+def is_failed(result):
+    return "error" in result
+
+def run_calculation_with_retries(parameters, max_retries=0, retry_delay=1.0):
+    # errors are captured, so a bad file never stops the other frames of the scan
+    for attempt in range(max_retries + 1):
+        try:
+            return run_calculation(parameters)
+        except Exception as e:
+            error = type(e).__name__ + ": " + str(e)
+
+            try: get_registered_logger_instance(application_name=APPLICATION_NAME).print_warning("loop " + str(parameters[0]) + ", attempt " + str(attempt + 1) + " failed: " + error)
+            except: print("loop " + str(parameters[0]) + ", attempt " + str(attempt + 1) + " failed: " + error)
+
+            if attempt < max_retries: time.sleep(retry_delay)
+
+    return {"frame" : parameters[0],
+            "z" : parameters[2],
+            "data_files" : parameters[1],
+            "harmonicPeriod" : parameters[5],
+            "image_name" : get_image_name(parameters[2]),
+            "error" : error}
+
+def run_batch_calculation_with_retries(batch_parameters, max_retries=0, retry_delay=1.0):
+    try:
+        return run_batch_calculation(batch_parameters)
+    except Exception:
+        # the frames of the failed batch are calculated one by one, to isolate the bad ones
+        return [run_calculation_with_retries(parameters, max_retries, retry_delay) for parameters in batch_parameters]
+
+def run_batch_calculation(batch_parameters):
+    data_files     = [parameters[1][0] for parameters in batch_parameters]
+    darkMeanValue  = batch_parameters[0][3]
+    idx4crop       = batch_parameters[0][4]
+    searchRegion   = batch_parameters[0][6]
+    unFilterSize   = batch_parameters[0][7]
+    show_fourier   = batch_parameters[0][11]
+
+    try: get_registered_logger_instance(application_name=APPLICATION_NAME).print_message("batch " + str(batch_parameters[0][0]) + "-" + str(batch_parameters[-1][0]))
+    except: print("batch " + str(batch_parameters[0][0]) + "-" + str(batch_parameters[-1][0]))
+
+    timings = {}
+
+    imgs            = np.array([read_image(data_file, darkMeanValue, idx4crop, timings) for data_file in data_files])
+    harmonicPeriods = np.array([parameters[5] for parameters in batch_parameters])
+
+    contrastV, contrastH, p0, pv, ph = harmonic_analysis.visib_1st_harmonics_stack(imgs, harmonicPeriods, searchRegion=searchRegion, unFilterSize=unFilterSize, timings=timings)
+
+    batch_result = []
+    for k, parameters in enumerate(batch_parameters):
+        result = {}
+        result["harmonicPeriod"] = parameters[5]
+        result["image_name"] = get_image_name(parameters[2])
+        result["visib_1st_harmonics"] = (contrastV[k], contrastH[k], list(p0[k]), list(pv[k]), list(ph[k]))
+        result["visibility_std"] = None
+        if show_fourier: result["spectrum"] = harmonic_analysis.SpectrumThumbnail(FourierTransform.fft2d(imgs[k]), parameters[5])
+        result["timings"] = {stage : stage_time / len(batch_parameters) for stage, stage_time in timings.items()}
+        result["worker"] = _get_worker_id()
+
+        batch_result.append(result)
+
+    return batch_result
@@ -0,0 +1,807 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+"""
+Harmonic analysis of single grating images
+-------------------------------------------------
+
+Compute kernels of the single grating interferometry (harmonic periods,
+harmonic images, differential phase, dark field and visibility), with
+numpy/scipy/scikit-image only. The plots are delegated to a hook, the Qt
+implementation is in aps.wavepy2.tools.common.bl.grating_interferometry.
+"""
+
+import numpy as np
+import time
+from scipy.ndimage.filters import uniform_filter
+from skimage.restoration import unwrap_phase
+
+from aps.wavepy2.core import MockLogger
+from aps.wavepy2.util.common.common_tools import FourierTransform, get_idxPeak_ij, get_idxPeak_ij_exp, downsample_image, DISPLAY_SIZE
+from aps.wavepy2.util.common.progress import add_timing
+
+
+# plots requested to the plotting hook, with the data of the plot as keyword arguments
+HARMONIC_GRID_PLOT    = "Harmonic Grid"
+EXTRACT_HARMONIC_PLOT = "Extract Harmonic"
+HARMONIC_IMAGES_PLOT  = "Harmonic Images"
+HARMONIC_PROFILE_PLOT = "Harmonic Profile"
+
+def no_plot(plot_name, context_key, unique_id=None, **kwargs): pass
+
+class SpectrumThumbnail():
+    """
+    What the Fourier plots show of the spectrum of an image, calculated once
+    in the analysis: the decimated log-magnitude and the full resolution
+    profiles around the 01 and 10 harmonic peaks. It is small enough to be
+    passed to all the plots (and between processes) in place of the spectrum.
+    """
+    def __init__(self, imgFFT, harmonicPeriod, display_size=DISPLAY_SIZE):
+        self.__shape         = imgFFT.shape
+        self.__log_magnitude = np.log10(downsample_image(np.abs(imgFFT), display_size)).astype(np.float32)
+        self.__peak_profiles = self.__get_peak_profiles(imgFFT, harmonicPeriod)
+
+    def get_shape(self): return self.__shape
+    def get_extent(self): return np.array((-self.__shape[1] // 2, self.__shape[1] - self.__shape[1] // 2, -self.__shape[0] // 2, self.__shape[0] - self.__shape[0] // 2)) # as extent_func of the spectrum
+    def get_log_magnitude(self): return self.__log_magnitude
+    def get_peak_profiles(self): return self.__peak_profiles
+
+    # as a list of arrays, to be stored (i.e. in a StageCache)
+    def to_arrays(self): return [np.array(self.__shape), self.__log_magnitude] + list(self.__peak_profiles)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        spectrum = cls.__new__(cls)
+        spectrum.__shape         = tuple([int(n) for n in arrays[0]])
+        spectrum.__log_magnitude = arrays[1]
+        spectrum.__peak_profiles = (arrays[2], arrays[3])
+
+        return spectrum
+
+    @classmethod
+    def __get_peak_profiles(cls, imgFFT, harmonicPeriod):
+        (nRows, nColumns) = imgFFT.shape
+
+        periodVert = harmonicPeriod[0]
+        periodHor  = harmonicPeriod[1]
+
+        # adjusts for 1D grating
+        if periodVert is None or periodVert <= 0: periodVert = nRows
+        if periodHor is None or periodHor <= 0: periodHor = nColumns
+
+        # 10 columns across the 01 peak and 10 rows across the 10 peak, 200 pixels long
+        idxPeak_01 = get_idxPeak_ij(0, 1, nRows, nColumns, periodVert, periodHor)
+        idxPeak_10 = get_idxPeak_ij(1, 0, nRows, nColumns, periodVert, periodHor)
+
+        columns_01 = [idxPeak_01[1] - i for i in range(-5, 5)]
+        rows_10    = [idxPeak_10[0] - i for i in range(-5, 5)]
+
+        # a peak out of the image (1D grating) has empty profiles
+        if max(columns_01) < nColumns: profiles_01 = np.abs(imgFFT[idxPeak_01[0] - 100 : idxPeak_01[0] + 100][:, columns_01]).T
+        else:                          profiles_01 = np.empty((10, 0))
+
+        if max(rows_10) < nRows: profiles_10 = np.abs(imgFFT[rows_10][:, idxPeak_10[1] - 100 : idxPeak_10[1] + 100])
+        else:                    profiles_10 = np.empty((10, 0))
+
+        return profiles_01, profiles_10
+
+def exp_harm_period(img, harmonicPeriod, harmonic_ij='00', searchRegion=10, isFFT=False, logger=MockLogger()):
+    """
+    Function to obtain the position (in pixels) in the reciprocal space
+    of the first harmonic ().
+    """
+
+    (nRows, nColumns) = img.shape # this is important in the case of FFT = false it takes the direct space
+
+    harV = int(harmonic_ij[0])
+    harH = int(harmonic_ij[1])
+
+    periodVert = harmonicPeriod[0]
+    periodHor = harmonicPeriod[1]
+
+    # adjusts for 1D grating
+    if periodVert <= 0 or periodVert is None:
+        periodVert = nRows
+        logger.print_message("Assuming Horizontal 1D Grating")
+
+    if periodHor <= 0 or periodHor is None:
+        periodHor = nColumns
+        logger.print_message("Assuming Vertical 1D Grating")
+
+    if isFFT: imgFFT = img
+    else: imgFFT = FourierTransform.fft2d(img)
+
+    del_i, del_j = __error_harmonic_peak(imgFFT, harV, harH,
+                                         periodVert, periodHor,
+                                         searchRegion)
+
+    logger.print_message("Error experimental harmonics vertical: {:d}".format(del_i))
+    logger.print_message("Error experimental harmonics horizontal: {:d}".format(del_j))
+
+    return periodVert + del_i, periodHor + del_j
+
+def single_2Dgrating_analyses(img, img_ref=None, harmonicPeriod=None, unwrapFlag=True, context_key="single_2Dgrating_analyses", unique_id=None, logger=MockLogger(), plot_hook=no_plot, h_img_ref=None, **kwargs):
+    """
+    Function to process the data of single 2D grating Talbot imaging. It
+    wraps other functions in order to make all the process transparent
+
+    The intermediate results (harmonic grid, extracted harmonics, harmonic
+    images) are passed to plot_hook(plot_name, context_key, unique_id, **data),
+    with the keyword arguments of this function: by default nothing is plotted.
+
+    The harmonic images of the reference can be given as h_img_ref (see
+    single_grating_harmonic_images), when many images share the same reference:
+    img_ref is not analysed again.
+
+    """
+
+    # Obtain Harmonic images
+    h_img = __single_grating_harmonic_images(img, harmonicPeriod, context_key=context_key, unique_id=unique_id, logger=logger, plot_hook=plot_hook, **kwargs)
+
+    if h_img_ref is None and img_ref is not None:
+        h_img_ref = __single_grating_harmonic_images(img_ref, harmonicPeriod, context_key=context_key, image_name="Ref", unique_id=unique_id, logger=logger, plot_hook=plot_hook, **kwargs)
+
+    if h_img_ref is not None:  # relative wavefront
+
+        int00 = np.abs(h_img[0])/np.abs(h_img_ref[0])
+        int01 = np.abs(h_img[1])/np.abs(h_img_ref[1])
+        int10 = np.abs(h_img[2])/np.abs(h_img_ref[2])
+
+        if unwrapFlag is True:
+            arg01 = (unwrap_phase(np.angle(h_img[1])) -
+                     unwrap_phase(np.angle(h_img_ref[1])))
+            arg10 = (unwrap_phase(np.angle(h_img[2])) -
+                     unwrap_phase(np.angle(h_img_ref[2])))
+        else:
+            arg01 = np.angle(h_img[1]) - np.angle(h_img_ref[1])
+            arg10 = np.angle(h_img[2]) - np.angle(h_img_ref[2])
+
+    else:  # absolute wavefront
+        int00 = np.abs(h_img[0])
+        int01 = np.abs(h_img[1])
+        int10 = np.abs(h_img[2])
+
+        if unwrapFlag is True:
+            arg01 = unwrap_phase(np.angle(h_img[1]))
+            arg10 = unwrap_phase(np.angle(h_img[2]))
+        else:
+            arg01 = np.angle(h_img[1])
+            arg10 = np.angle(h_img[2])
+
+    if unwrapFlag is True:  # remove pi jump
+        arg01 -= int(np.round(np.mean(arg01/np.pi)))*np.pi
+        arg10 -= int(np.round(np.mean(arg10/np.pi)))*np.pi
+
+    darkField01 = int01/int00
+    darkField10 = int10/int00
+
+    return [int00, int01, int10,
+            darkField01, darkField10,
+            arg01, arg10]
+
+def single_grating_harmonic_images(img, harmonicPeriod, searchRegion=10, context_key="single_grating_harmonic", image_name="", unique_id=None, logger=MockLogger(), plot_hook=no_plot, **kwargs):
+    """
+    Harmonic images 00, 01 and 10 of a single 2D grating Talbot image (see
+    single_2Dgrating_analyses).
+    """
+    return __single_grating_harmonic_images(img, harmonicPeriod, searchRegion=searchRegion, context_key=context_key, image_name=image_name,
+                                            unique_id=unique_id, logger=logger, plot_hook=plot_hook, **kwargs)
+
+def exp_harm_period_1d(img, harmonicPeriod, searchRegion=10, logger=MockLogger()):
+    """
+    1D grating version of exp_harm_period: harmonicPeriod is [periodVert, 0]
+    or [0, periodHor] (see single_1Dgrating_analyses) and the returned period
+    is in the same format.
+
+    The peak of the harmonic 1 is searched in the average modulus of the 1D
+    spectra of the columns (or of the rows).
+    """
+    axis, period = __get_1d_grating_axis(harmonicPeriod)
+
+    spectrum_profile = __spectrum_profile_1d(FourierTransform.fft_2d1d(img, axis=axis), axis)
+
+    del_period = __error_harmonic_peak_1d(spectrum_profile, period, searchRegion)
+
+    logger.print_message("Error experimental harmonic " + ("vertical" if axis == 0 else "horizontal") + ": {:d}".format(del_period))
+
+    return [period + del_period, 0] if axis == 0 else [0, period + del_period]
+
+def single_1Dgrating_analyses(img, img_ref=None, harmonicPeriod=None, unwrapFlag=True, context_key="single_1Dgrating_analyses", unique_id=None, logger=MockLogger(), plot_hook=no_plot, h_img_ref=None, **kwargs):
+    """
+    Function to process the data of single 1D grating Talbot imaging, the
+    1D version of single_2Dgrating_analyses.
+
+    The grating modulates the image along one direction only, given by the
+    non-zero harmonic period: harmonicPeriod is [periodVert, 0] for a
+    vertical DPC (harmonic 10) or [0, periodHor] for a horizontal DPC
+    (harmonic 01). The harmonics are extracted from the 1D spectra of all the
+    columns (or rows) at once, so the harmonic images keep the full resolution
+    along the grating lines.
+
+    Returns
+    -------
+    four 2D ndarray data
+        intensity from the harmonics 00 and 1, dark field and phase (rad) of
+        the harmonic 1.
+
+    """
+    h_img = __single_1Dgrating_harmonic_images(img, harmonicPeriod, context_key=context_key, unique_id=unique_id, logger=logger, plot_hook=plot_hook, **kwargs)
+
+    if h_img_ref is None and img_ref is not None:
+        h_img_ref = __single_1Dgrating_harmonic_images(img_ref, harmonicPeriod, context_key=context_key, image_name="Ref", unique_id=unique_id, logger=logger, plot_hook=plot_hook, **kwargs)
+
+    if h_img_ref is not None:  # relative wavefront
+        int00 = np.abs(h_img[0])/np.abs(h_img_ref[0])
+        int1  = np.abs(h_img[1])/np.abs(h_img_ref[1])
+
+        if unwrapFlag is True: arg1 = unwrap_phase(np.angle(h_img[1])) - unwrap_phase(np.angle(h_img_ref[1]))
+        else:                  arg1 = np.angle(h_img[1]) - np.angle(h_img_ref[1])
+    else:  # absolute wavefront
+        int00 = np.abs(h_img[0])
+        int1  = np.abs(h_img[1])
+
+        if unwrapFlag is True: arg1 = unwrap_phase(np.angle(h_img[1]))
+        else:                  arg1 = np.angle(h_img[1])
+
+    if unwrapFlag is True: arg1 -= int(np.round(np.mean(arg1/np.pi)))*np.pi # remove pi jump
+
+    darkField1 = int1/int00
+
+    return [int00, int1, darkField1, arg1]
+
+def single_1Dgrating_harmonic_images(img, harmonicPeriod, searchRegion=10, context_key="single_grating_harmonic", image_name="", unique_id=None, logger=MockLogger(), plot_hook=no_plot, **kwargs):
+    """
+    Harmonic images 00 and 1 of a single 1D grating Talbot image (see
+    single_1Dgrating_analyses).
+    """
+    return __single_1Dgrating_harmonic_images(img, harmonicPeriod, searchRegion=searchRegion, context_key=context_key, image_name=image_name,
+                                              unique_id=unique_id, logger=logger, plot_hook=plot_hook, **kwargs)
+
+def visib_1st_harmonics(img, harmonicPeriod, searchRegion=20, unFilterSize=1, local_dft=True, timings=None):
+    """
+    This function obtain the visibility in a grating imaging experiment by the
+    ratio of the amplitudes of the first and zero harmonics. See
+    https://doi.org/10.1364/OE.22.014041 .
+
+    Note
+    ----
+    Note that the absolute visibility also depends on the higher harmonics, and
+    for a absolute value of visibility all of them must be considered.
+
+
+    Parameters
+    ----------
+    img : 	ndarray – Data (data_exchange format)
+        Experimental image, whith proper blank image, crop and rotation already
+        applied.
+
+    harmonicPeriod : list of integers in the format [periodVert, periodHor]
+        ``periodVert`` and ``periodVert`` are the period of the harmonics in
+        the reciprocal space in pixels. For the checked board grating,
+        periodVert = sqrt(2) * pixel Size / grating Period * number of
+        rows in the image. For 1D grating, set one of the values to negative or
+        zero (it will set the period to number of rows or colunms).
+
+    searchRegion: int
+        search for the peak will be in a region of harmonicPeriod/searchRegion
+        around the theoretical peak position. See also
+        `:py:func:`wavepy.grating_interferometry.plot_harmonic_grid`
+
+    unFilterSize: int
+        size of the uniform filter applied to the modulus of the spectrum
+        before reading the peak values.
+
+    local_dft: Boolean
+        evaluate the spectrum only in the search windows around the harmonics
+        with a matrix DFT, instead of calculating the full FFT. The full FFT is
+        used anyway when the windows are too large for the matrix DFT to be
+        convenient, or too close to the border of the spectrum.
+
+    timings: dict
+        if not None, the time spent in the Fourier transform ('fft') and in
+        the search of the peaks ('peak_search') are added to it.
+
+
+    Returns
+    -------
+    (float, float)
+        horizontal and vertical visibilities respectivelly from
+        harmonics 01 and 10
+
+
+    """
+    if local_dft and __is_local_dft_convenient(img.shape, harmonicPeriod, searchRegion, unFilterSize):
+        return __visib_1st_harmonics_local_dft(img, harmonicPeriod, searchRegion, unFilterSize, timings)
+    else:
+        tzero  = time.perf_counter()
+        imgFFT = FourierTransform.fft2d(img)
+        add_timing(timings, "fft", tzero)
+
+        return visib_1st_harmonics_fft(imgFFT, harmonicPeriod, searchRegion, unFilterSize, timings)
+
+def visib_1st_harmonics_fft(imgFFT, harmonicPeriod, searchRegion=20, unFilterSize=1, timings=None):
+    """
+    Same as visib_1st_harmonics, but starting from the (fftshift-ed) spectrum
+    of the image. Only the modulus of imgFFT is used, so it can also be the
+    average of the modulus of the spectra of several images.
+    """
+    tzero = time.perf_counter()
+
+    _idxPeak_ij_exp00 = get_idxPeak_ij_exp(imgFFT, 0, 0, harmonicPeriod[0], harmonicPeriod[1], searchRegion)
+    _idxPeak_ij_exp10 = get_idxPeak_ij_exp(imgFFT, 1, 0, harmonicPeriod[0], harmonicPeriod[1], searchRegion)
+    _idxPeak_ij_exp01 = get_idxPeak_ij_exp(imgFFT, 0, 1, harmonicPeriod[0], harmonicPeriod[1], searchRegion)
+
+    arg_imgFFT = np.abs(imgFFT)
+
+    if unFilterSize > 1: arg_imgFFT = uniform_filter(arg_imgFFT, unFilterSize)
+
+    peak00 = arg_imgFFT[_idxPeak_ij_exp00[0], _idxPeak_ij_exp00[1]]
+    peak10 = arg_imgFFT[_idxPeak_ij_exp10[0], _idxPeak_ij_exp10[1]]
+    peak01 = arg_imgFFT[_idxPeak_ij_exp01[0], _idxPeak_ij_exp01[1]]
+
+    add_timing(timings, "peak_search", tzero)
+
+    return 2*peak10/peak00, 2*peak01/peak00, _idxPeak_ij_exp00, _idxPeak_ij_exp10, _idxPeak_ij_exp01
+
+def visib_1st_harmonics_stack(imgs, harmonicPeriods, searchRegion=20, unFilterSize=1, timings=None):
+    """
+    Vectorized version of visib_1st_harmonics for a stack of images, with the
+    same results of calling it on each image.
+
+    Parameters
+    ----------
+    imgs : ndarray
+        stack of images, with shape (K, nRows, nColumns).
+
+    harmonicPeriods : ndarray
+        harmonic periods [periodVert, periodHor] of each image, with shape (K, 2).
+
+    searchRegion: int
+        see visib_1st_harmonics
+
+    unFilterSize: int
+        see visib_1st_harmonics
+
+    timings: dict
+        see visib_1st_harmonics
+
+
+    Returns
+    -------
+    (ndarray, ndarray, ndarray, ndarray, ndarray)
+        vertical and horizontal visibilities, with shape (K,), and the indexes
+        of the harmonics 00, 10 and 01, with shape (K, 2)
+
+    """
+    (nImages, nRows, nColumns) = imgs.shape
+
+    harmonicPeriods = np.asarray(harmonicPeriods, dtype=int).reshape(nImages, 2)
+
+    tzero = time.perf_counter()
+
+    arg_imgFFT = np.abs(FourierTransform.fft2d_stack(imgs))
+
+    tzero = add_timing(timings, "fft", tzero)
+
+    zeros = np.zeros(nImages, dtype=int)
+
+    _idxPeak_ij_exp00 = __stack_peak_indexes(arg_imgFFT, zeros,                  zeros,                  searchRegion)
+    _idxPeak_ij_exp10 = __stack_peak_indexes(arg_imgFFT, harmonicPeriods[:, 0], zeros,                  searchRegion)
+    _idxPeak_ij_exp01 = __stack_peak_indexes(arg_imgFFT, zeros,                  harmonicPeriods[:, 1], searchRegion)
+
+    peak00 = __stack_peak_values(arg_imgFFT, _idxPeak_ij_exp00, unFilterSize)
+    peak10 = __stack_peak_values(arg_imgFFT, _idxPeak_ij_exp10, unFilterSize)
+    peak01 = __stack_peak_values(arg_imgFFT, _idxPeak_ij_exp01, unFilterSize)
+
+    add_timing(timings, "peak_search", tzero)
+
+    return 2*peak10/peak00, 2*peak01/peak00, _idxPeak_ij_exp00, _idxPeak_ij_exp10, _idxPeak_ij_exp01
+
+def visib_1st_harmonics_tiles(img, harmonicPeriod, tiles, searchRegion=20, unFilterSize=1, timings=None):
+    """
+    Spatially resolved version of visib_1st_harmonics: the image is divided in
+    a grid of sub-windows, and the visibilities of each sub-window are
+    calculated together with visib_1st_harmonics_stack (one batched FFT).
+    The rows and columns exceeding a multiple of the grid are discarded.
+
+    Parameters
+    ----------
+    img : ndarray
+        see visib_1st_harmonics
+
+    harmonicPeriod : list of integers in the format [periodVert, periodHor]
+        harmonic periods of the whole image, they are scaled to the size
+        of the sub-windows, as the search region.
+
+    tiles : list of integers in the format [nTilesVert, nTilesHor]
+        nr. of sub-windows along the rows and the columns.
+
+    searchRegion: int
+        see visib_1st_harmonics
+
+    unFilterSize: int
+        see visib_1st_harmonics
+
+    timings: dict
+        see visib_1st_harmonics
+
+
+    Returns
+    -------
+    (ndarray, ndarray)
+        vertical and horizontal visibilities of the sub-windows, with shape
+        (nTilesVert, nTilesHor)
+
+    """
+    (nRows, nColumns)       = img.shape
+    (nTilesV, nTilesH)      = tiles
+    (tileRows, tileColumns) = (nRows // nTilesV, nColumns // nTilesH)
+
+    imgs = img[:nTilesV*tileRows, :nTilesH*tileColumns].reshape(nTilesV, tileRows, nTilesH, tileColumns).swapaxes(1, 2).reshape(-1, tileRows, tileColumns)
+
+    tileHarmonicPeriod = [int(np.round(harmonicPeriod[0]*tileRows/nRows)), int(np.round(harmonicPeriod[1]*tileColumns/nColumns))]
+    tileSearchRegion   = max(1, min(int(np.round(searchRegion*min(tileRows/nRows, tileColumns/nColumns))), min(tileHarmonicPeriod)//2))
+
+    contrastV, contrastH, _, _, _ = visib_1st_harmonics_stack(imgs,
+                                                              np.tile(tileHarmonicPeriod, (len(imgs), 1)),
+                                                              searchRegion=tileSearchRegion,
+                                                              unFilterSize=unFilterSize,
+                                                              timings=timings)
+
+    return contrastV.reshape(nTilesV, nTilesH), contrastH.reshape(nTilesV, nTilesH)
+
+####################################
+# PRIVATE METHODS
+
+def __stack_peak_indexes(arg_imgFFT, shiftVert, shiftHor, searchRegion):
+    (nImages, nRows, nColumns) = arg_imgFFT.shape
+
+    offsets = np.arange(-searchRegion, searchRegion)
+
+    rows    = np.clip(nRows//2 + shiftVert[:, np.newaxis] + offsets, 0, nRows - 1)       # (K, 2*searchRegion)
+    columns = np.clip(nColumns//2 + shiftHor[:, np.newaxis] + offsets, 0, nColumns - 1)  # (K, 2*searchRegion)
+
+    search_regions = arg_imgFFT[np.arange(nImages)[:, np.newaxis, np.newaxis], rows[:, :, np.newaxis], columns[:, np.newaxis, :]]
+
+    # same result of get_idxPeak_ij_exp: the first maximum in row-major order
+    (i, j) = np.unravel_index(np.argmax(search_regions.reshape(nImages, -1), axis=1), search_regions.shape[1:])
+
+    return np.c_[rows[np.arange(nImages), i], columns[np.arange(nImages), j]]
+
+def __stack_peak_values(arg_imgFFT, idxPeaks, unFilterSize):
+    (nImages, nRows, nColumns) = arg_imgFFT.shape
+
+    if unFilterSize > 1:
+        # same footprint and boundary mode ('reflect') of uniform_filter
+        offsets = np.arange(unFilterSize) - unFilterSize//2
+
+        rows    = __reflect_indexes(idxPeaks[:, 0, np.newaxis] + offsets, nRows)
+        columns = __reflect_indexes(idxPeaks[:, 1, np.newaxis] + offsets, nColumns)
+
+        return np.mean(arg_imgFFT[np.arange(nImages)[:, np.newaxis, np.newaxis], rows[:, :, np.newaxis], columns[:, np.newaxis, :]], axis=(1, 2))
+    else:
+        return arg_imgFFT[np.arange(nImages), idxPeaks[:, 0], idxPeaks[:, 1]]
+
+def __reflect_indexes(indexes, n):
+    indexes = np.where(indexes < 0, -indexes - 1, indexes)
+
+    return np.where(indexes >= n, 2*n - indexes - 1, indexes)
+
+def __is_local_dft_convenient(shape, harmonicPeriod, searchRegion, unFilterSize):
+    (nRows, nColumns) = shape
+
+    window_size = 2*(searchRegion + unFilterSize)
+
+    # the two row (column) windows together must be a small fraction of the rows (columns)
+    if searchRegion < 1 or 2*window_size > min(nRows, nColumns)//8: return False
+
+    # the filtered windows must be fully inside the spectrum to give the same result of the full FFT
+    for n, period in [(nRows, harmonicPeriod[0]), (nColumns, harmonicPeriod[1])]:
+        for center in [n//2, n//2 + period]:
+            if center - window_size//2 < 0 or center + window_size//2 > n: return False
+
+    return True
+
+def __visib_1st_harmonics_local_dft(img, harmonicPeriod, searchRegion, unFilterSize, timings=None):
+    tzero = time.perf_counter()
+
+    (nRows, nColumns) = img.shape
+
+    margin = unFilterSize # enough to contain the uniform filter around any point of the search region
+
+    rows00    = np.arange(nRows//2 - searchRegion - margin, nRows//2 + searchRegion + margin)
+    rows10    = rows00 + harmonicPeriod[0]
+    columns00 = np.arange(nColumns//2 - searchRegion - margin, nColumns//2 + searchRegion + margin)
+    columns01 = columns00 + harmonicPeriod[1]
+
+    img_rows00 = FourierTransform.dft_matrix(nRows, rows00) @ img
+    img_rows10 = FourierTransform.dft_matrix(nRows, rows10) @ img
+    dft_columns00 = FourierTransform.dft_matrix(nColumns, columns00).T
+    dft_columns01 = FourierTransform.dft_matrix(nColumns, columns01).T
+
+    normalization = np.sqrt(nRows*nColumns)
+
+    arg_windowFFT00 = np.abs(img_rows00 @ dft_columns00)/normalization
+    arg_windowFFT10 = np.abs(img_rows10 @ dft_columns00)/normalization
+    arg_windowFFT01 = np.abs(img_rows00 @ dft_columns01)/normalization
+
+    tzero = add_timing(timings, "fft", tzero)
+
+    peak00, _idxPeak_ij_exp00 = __local_peak(arg_windowFFT00, rows00[0], columns00[0], searchRegion, margin, unFilterSize)
+    peak10, _idxPeak_ij_exp10 = __local_peak(arg_windowFFT10, rows10[0], columns00[0], searchRegion, margin, unFilterSize)
+    peak01, _idxPeak_ij_exp01 = __local_peak(arg_windowFFT01, rows00[0], columns01[0], searchRegion, margin, unFilterSize)
+
+    add_timing(timings, "peak_search", tzero)
+
+    return 2*peak10/peak00, 2*peak01/peak00, _idxPeak_ij_exp00, _idxPeak_ij_exp10, _idxPeak_ij_exp01
+
+def __local_peak(arg_windowFFT, first_row, first_column, searchRegion, margin, unFilterSize):
+    search_region = arg_windowFFT[margin:arg_windowFFT.shape[0] - margin, margin:arg_windowFFT.shape[1] - margin] # margin can be 0
+
+    # same result of get_idxPeak_ij_exp: the first maximum in row-major order
+    (i, j) = np.unravel_index(np.argmax(search_region), search_region.shape)
+    (i, j) = (i + margin, j + margin)
+
+    if unFilterSize > 1:
+        # same footprint of uniform_filter
+        start = unFilterSize//2
+        peak  = np.mean(arg_windowFFT[i - start : i - start + unFilterSize, j - start : j - start + unFilterSize])
+    else:
+        peak = arg_windowFFT[i, j]
+
+    return peak, [first_row + i, first_column + j]
+
+def __check_harmonic_inside_image(harV, harH, nRows, nColumns, periodVert, periodHor, logger):
+    """
+    Check if full harmonic image is within the main image
+    """
+    errFlag = False
+
+    if (harV + .5)*periodVert > nRows / 2:
+        logger.print_error("Harmonic Peak {:d}{:d}".format(harV, harH) + " is out of image vertical range.")
+        errFlag = True
+
+    if (harH + .5)*periodHor > nColumns / 2:
+        logger.print_error("Harmonic Peak {:d}{:d}".format(harV, harH) + " is out of image horizontal range.")
+        errFlag = True
+
+    if errFlag:
+        raise ValueError("ERROR: Harmonic Peak " +
+                         "{:d}{:d} is ".format(harV, harH) +
+                         "out of image frequency range.")
+
+def __error_harmonic_peak(imgFFT, harV, harH, periodVert, periodHor, searchRegion=10):
+    """
+    Error in pixels (in the reciprocal space) between the harmonic peak and
+    the provided theoretical value
+    """
+
+    #  Estimate harmonic positions
+
+    idxPeak_ij     = get_idxPeak_ij(harV, harH, imgFFT.shape[0], imgFFT.shape[1], periodVert, periodHor)
+    idxPeak_ij_exp = get_idxPeak_ij_exp(imgFFT, harV, harH, periodVert, periodHor, searchRegion)
+
+    del_i = idxPeak_ij_exp[0] - idxPeak_ij[0]
+    del_j = idxPeak_ij_exp[1] - idxPeak_ij[1]
+
+    return del_i, del_j
+
+def __extract_harmonic(imgFFT, harmonicPeriod, harmonic_ij='00', searchRegion=10, context_key="extract_harmonic", image_name="Image", unique_id=None, logger=MockLogger(), plot_hook=no_plot, spectrum=None, **kwargs):
+    (nRows, nColumns) = imgFFT.shape
+
+    harV = int(harmonic_ij[0])
+    harH = int(harmonic_ij[1])
+
+    periodVert = harmonicPeriod[0]
+    periodHor = harmonicPeriod[1]
+
+    logger.print_message("Extracting harmonic " + harmonic_ij[0] + harmonic_ij[1])
+    logger.print_message("Harmonic period Horizontal: {:d} pixels".format(periodHor))
+    logger.print_message("Harmonic period Vertical: {:d} pixels".format(periodVert))
+
+    # adjusts for 1D grating
+    if periodVert <= 0 or periodVert is None:
+        periodVert = nRows
+        logger.print_message("Assuming Horizontal 1D Grating")
+
+    if periodHor <= 0 or periodHor is None:
+        periodHor = nColumns
+        logger.print_message("Assuming Vertical 1D Grating")
+
+    __check_harmonic_inside_image(harV, harH, nRows, nColumns, periodVert, periodHor, logger)
+
+    #  Estimate harmonic positions
+    idxPeak_ij   = get_idxPeak_ij(harV, harH, nRows, nColumns, periodVert, periodHor)
+    del_i, del_j = __error_harmonic_peak(imgFFT, harV, harH, periodVert, periodHor, searchRegion)
+
+    logger.print_message("extract_harmonic: harmonic peak " + harmonic_ij[0] + harmonic_ij[1] + " is misplaced by:")
+    logger.print_message("{:d} pixels in vertical, {:d} pixels in hor".format(del_i, del_j))
+    logger.print_message("Theoretical peak index: {:d},{:d} [VxH]".format(idxPeak_ij[0], idxPeak_ij[1]))
+
+    if ((np.abs(del_i) > searchRegion // 2) or (np.abs(del_j) > searchRegion // 2)):
+        logger.print_warning("Harmonic Peak " + harmonic_ij[0] + harmonic_ij[1] + " is too far from theoretical value.")
+        logger.print_warning("{:d} pixels in vertical, {:d} pixels in hor".format(del_i, del_j))
+
+    plot_hook(EXTRACT_HARMONIC_PLOT, context_key, unique_id,
+              spectrum=spectrum,
+              idxPeak_ij=idxPeak_ij,
+              harmonic_ij=harmonic_ij,
+              nColumns=nColumns,
+              nRows=nRows,
+              periodVert=periodVert,
+              periodHor=periodHor,
+              image_name=image_name, **kwargs)
+
+    return imgFFT[idxPeak_ij[0] - periodVert // 2:
+                  idxPeak_ij[0] + periodVert//2,
+                  idxPeak_ij[1] - periodHor//2:
+                  idxPeak_ij[1] + periodHor//2]
+
+def __single_grating_harmonic_images(img, harmonicPeriod, searchRegion=10, context_key="single_grating_harmonic", image_name="", unique_id=None, logger=MockLogger(), plot_hook=no_plot, **kwargs):
+    """
+    Auxiliary function to process the data of single 2D grating Talbot imaging.
+    It obtain the (real space) harmonic images  00, 01 and 10.
+
+    Parameters
+    ----------
+    img : 	ndarray – Data (data_exchange format)
+        Experimental image, whith proper blank image, crop and rotation already
+        applied.
+
+    harmonicPeriod : list of integers in the format [periodVert, periodHor]
+        ``periodVert`` and ``periodVert`` are the period of the harmonics in
+        the reciprocal space in pixels. For the checked board grating,
+        periodVert = sqrt(2) * pixel Size / grating Period * number of
+        rows in the image. For 1D grating, set one of the values to negative or
+        zero (it will set the period to number of rows or colunms).
+
+    searchRegion: int
+        search for the peak will be in a region of harmonicPeriod/searchRegion
+        around the theoretical peak position. See also
+        `:py:func:`wavepy.grating_interferometry.plot_harmonic_grid`
+
+    Returns
+    -------
+    three 2D ndarray data
+        Images obtained from the harmonics 00, 01 and 10.
+
+    """
+
+    imgFFT = FourierTransform.fft2d(img)
+
+    # one thumbnail of the spectrum for all the Fourier plots
+    spectrum = None if plot_hook is no_plot else SpectrumThumbnail(imgFFT, harmonicPeriod)
+
+    plot_hook(HARMONIC_GRID_PLOT, context_key, unique_id, spectrum=spectrum, harmonicPeriod=harmonicPeriod, image_name=image_name, **kwargs)
+
+    imgFFT00 = __extract_harmonic(imgFFT,
+                                  harmonicPeriod=harmonicPeriod,
+                                  harmonic_ij='00',
+                                  searchRegion=searchRegion,
+                                  context_key=context_key,
+                                  image_name=image_name, unique_id=unique_id,
+                                  logger=logger, plot_hook=plot_hook,
+                                  spectrum=spectrum, **kwargs)
+
+    imgFFT01 = __extract_harmonic(imgFFT,
+                                  harmonicPeriod=harmonicPeriod,
+                                  harmonic_ij=['0', '1'],
+                                  searchRegion=searchRegion,
+                                  context_key=context_key,
+                                  image_name=image_name, unique_id=unique_id,
+                                  logger=logger, plot_hook=plot_hook,
+                                  spectrum=spectrum, **kwargs)
+
+    imgFFT10 = __extract_harmonic(imgFFT,
+                                  harmonicPeriod=harmonicPeriod,
+                                  harmonic_ij=['1', '0'],
+                                  searchRegion=searchRegion,
+                                  context_key=context_key,
+                                  image_name=image_name, unique_id=unique_id,
+                                  logger=logger, plot_hook=plot_hook,
+                                  spectrum=spectrum, **kwargs)
+
+    plot_hook(HARMONIC_IMAGES_PLOT, context_key, unique_id,
+              imgFFT00=imgFFT00, imgFFT01=imgFFT01, imgFFT10=imgFFT10,
+              image_name=image_name, **kwargs)
+
+    img00 = FourierTransform.ifft2d(imgFFT00)
+
+    # non existing harmonics will return NAN, so here we check NAN
+    if np.all(np.isfinite(imgFFT01)): img01 = FourierTransform.ifft2d(imgFFT01)
+    else: img01 = imgFFT01
+
+    if np.all(np.isfinite(imgFFT10)): img10 = FourierTransform.ifft2d(imgFFT10)
+    else: img10 = imgFFT10
+
+    return (img00, img01, img10)
+
+def __get_1d_grating_axis(harmonicPeriod):
+    periodVert, periodHor = harmonicPeriod
+
+    if   (periodVert is None or periodVert <= 0) and not (periodHor is None or periodHor <= 0): return 1, periodHor
+    elif (periodHor is None or periodHor <= 0) and not (periodVert is None or periodVert <= 0): return 0, periodVert
+    else: raise ValueError("1D grating: one (and only one) harmonic period must be 0, " + str(harmonicPeriod))
+
+def __spectrum_profile_1d(imgFFT, axis):
+    return np.mean(np.abs(imgFFT), axis=1 - axis)
+
+def __error_harmonic_peak_1d(spectrum_profile, period, searchRegion=10):
+    n = spectrum_profile.shape[0]
+
+    idxPeak = n//2 + period
+    first   = max(idxPeak - searchRegion, 0)
+
+    return first + int(np.argmax(spectrum_profile[first:idxPeak + searchRegion])) - idxPeak
+
+def __single_1Dgrating_harmonic_images(img, harmonicPeriod, searchRegion=10, context_key="single_grating_harmonic", image_name="", unique_id=None, logger=MockLogger(), plot_hook=no_plot, **kwargs):
+    axis, period = __get_1d_grating_axis(harmonicPeriod)
+
+    n = img.shape[axis]
+
+    if 1.5*period > n/2:
+        logger.print_error("Harmonic Peak 1 is out of image " + ("vertical" if axis == 0 else "horizontal") + " range.")
+        raise ValueError("ERROR: Harmonic Peak 1 is out of image frequency range.")
+
+    # one batched transform of all the columns (axis 0) or rows (axis 1)
+    imgFFT = FourierTransform.fft_2d1d(img, axis=axis)
+
+    spectrum_profile = __spectrum_profile_1d(imgFFT, axis)
+    del_period       = __error_harmonic_peak_1d(spectrum_profile, period, searchRegion)
+
+    logger.print_message("Extracting harmonics 0 and 1, harmonic period: {:d} pixels".format(period))
+
+    if np.abs(del_period) > searchRegion // 2:
+        logger.print_warning("Harmonic Peak 1 is too far from theoretical value: {:d} pixels".format(del_period))
+
+    idxPeaks = [n//2, n//2 + period]
+
+    plot_hook(HARMONIC_PROFILE_PLOT, context_key, unique_id,
+              spectrum_profile=spectrum_profile,
+              idxPeaks=idxPeaks,
+              period=period,
+              direction="Vertical" if axis == 0 else "Horizontal",
+              image_name=image_name, **kwargs)
+
+    return tuple([FourierTransform.ifft_2d1d(np.take(imgFFT, np.arange(idxPeak - period//2, idxPeak + period//2), axis=axis), axis=axis) for idxPeak in idxPeaks])
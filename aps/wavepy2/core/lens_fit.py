@@ -0,0 +1,251 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+"""
+Fit of parabolic lenses
+-------------------------------------------------
+
+Least square and nominal radius fits of the thickness of parabolic lenses,
+with numpy/scipy only.
+"""
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+from aps.wavepy2.util.common import common_tools
+from aps.wavepy2.core import MockLogger
+
+def center_lens_array_max_fit(thickness, pixelsize, radius4fit=100e-6, logger=MockLogger()):
+    """
+    crop the array in order to have the max at the center of the array. It uses
+    a fitting procedure of a 2D parabolic function to determine the center
+
+    """
+
+    radius4fit = biggest_radius(thickness, pixelsize, radius4fit * 0.8, logger)
+
+    thickness = np.copy(thickness)
+
+    xx, yy = common_tools.grid_coord(thickness, pixelsize)
+
+    (_, _, fitParameters) = fit_parabolic_lens_2d(thickness, pixelsize, radius4fit=radius4fit, logger=logger)
+
+    center_i = np.argmin(np.abs(yy[:, 0]-fitParameters[2]))
+    center_j = np.argmin(np.abs(xx[0, :]-fitParameters[1]))
+
+    if 2*center_i > thickness.shape[0]: thickness = thickness[2 * center_i - thickness.shape[0]:, :]
+    else: thickness = thickness[0:2 * center_i, :]
+
+    if 2*center_j > thickness.shape[1]: thickness = thickness[:, 2 * center_j - thickness.shape[1]:]
+    else: thickness = thickness[:, 0:2 * center_j]
+
+    return thickness
+
+# =============================================================================
+
+def biggest_radius(thickness, pixelsize, radius4fit, logger=MockLogger()):
+    bool_x = (thickness.shape[0] // 2 < radius4fit // pixelsize[0])
+    bool_y = (thickness.shape[1] // 2 < radius4fit // pixelsize[1])
+
+    if bool_x or bool_y:
+        radius4fit = 0.9*np.min((thickness.shape[0] * pixelsize[0] / 2, thickness.shape[1] * pixelsize[1] / 2))
+
+        logger.print_warning("WARNING: Image size smaller than the region for fit")
+        logger.print_warning("New Radius: {:.3f}um".format(radius4fit*1e6))
+
+    return radius4fit
+
+
+# =============================================================================
+
+def fit_parabolic_lens_2d(thickness, pixelsize, radius4fit, mode="2D", logger=MockLogger()):
+
+    # FIT
+    xx, yy = common_tools.grid_coord(thickness, pixelsize)
+    mask = xx*np.nan
+
+    lim_x = np.argwhere(xx[0, :] <= -radius4fit*1.01)[-1, 0]
+    lim_y = np.argwhere(yy[:, 0] <= -radius4fit*1.01)[-1, 0]
+
+    if "2D" in mode:
+
+        r2 = np.sqrt(xx**2 + yy**2)
+        mask[np.where(r2 < radius4fit)] = 1.0
+
+    elif "1Dx" in mode:
+        mask[np.where(xx**2 < radius4fit)] = 1.0
+        lim_y = 2
+
+    elif "1Dy" in mode:
+        mask[np.where(yy**2 < radius4fit)] = 1.0
+        lim_x = 2
+
+    fitted, popt = lsq_fit_parabola(thickness*mask, pixelsize, mode=mode)
+
+    logger.print_message("Parabolic 2D Fit")
+    logger.print_message("Curv Radius, xo, yo, offset")
+    logger.print_message(popt)
+
+    logger.print_message("Parabolic 2D Fit: Radius of 1 face  / nfaces, x direction: {:.4g} um".format(popt[0]*1e6))
+
+    if (lim_x <= 1 or lim_y <= 1):
+        thickness_cropped = thickness*mask
+        fitted_cropped = fitted*mask
+    else:
+        thickness_cropped = (thickness[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
+        fitted_cropped = (fitted[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
+
+    return (thickness_cropped, fitted_cropped, popt)
+
+# =============================================================================
+
+def lsq_fit_parabola(zz, pixelsize, mode="2D"):
+    xx, yy = common_tools.grid_coord(zz, pixelsize)
+
+    if np.all(np.isfinite(zz)):  # if there is no nan
+        f = zz.flatten()
+        x = xx.flatten()
+        y = yy.flatten()
+    else:
+        argNotNAN = np.isfinite(zz)
+        f = zz[argNotNAN].flatten()
+        x = xx[argNotNAN].flatten()
+        y = yy[argNotNAN].flatten()
+
+    if "2D" in mode:
+        X_matrix = np.vstack([x**2 + y**2, x, y, x*0.0 + 1]).T
+
+        beta_matrix = np.linalg.lstsq(X_matrix, f)[0]
+
+        fit = (beta_matrix[0]*(xx**2 + yy**2) +
+               beta_matrix[1]*xx +
+               beta_matrix[2]*yy +
+               beta_matrix[3])
+
+    elif "1Dx" in mode:
+        X_matrix = np.vstack([x**2, x, y, x*0.0 + 1]).T
+
+        beta_matrix = np.linalg.lstsq(X_matrix, f)[0]
+
+        fit = (beta_matrix[0]*(xx**2) +
+               beta_matrix[1]*xx +
+               beta_matrix[2]*yy +
+               beta_matrix[3])
+
+    elif "1Dy" in mode:
+        X_matrix = np.vstack([y**2, x, y, x*0.0 + 1]).T
+
+        beta_matrix = np.linalg.lstsq(X_matrix, f)[0]
+
+        fit = (beta_matrix[0]*(yy**2) +
+               beta_matrix[1]*xx +
+               beta_matrix[2]*yy +
+               beta_matrix[3])
+
+    if np.all(np.isfinite(zz)):
+        mask = zz*0.0 + 1.0
+    else:
+        mask = zz*0.0 + 1.0
+        mask[~argNotNAN] = np.nan
+
+    R_o = 1/2/beta_matrix[0]
+    x_o = -beta_matrix[1]/beta_matrix[0]/2
+    y_o = -beta_matrix[2]/beta_matrix[0]/2
+    offset = beta_matrix[3]
+
+    popt = [R_o, x_o, y_o, offset]
+
+    return fit*mask, popt
+
+# =============================================================================
+
+def fit_nominal_lens_2d(thickness, pixelsize, radius4fit,
+                        p0=[20e-6, 1.005e-6, -.005e-6, -.005e-6],
+                        bounds=([10e-6, -2.05e-6, -2.05e-6, -2.05e-6],
+                                [50e-6, 2.05e-6, 2.05e-6, 2.05e-6]),
+                        kwargs4fit={}, logger=MockLogger()):
+
+    xmatrix, ymatrix = common_tools.grid_coord(thickness, pixelsize)
+    r2 = np.sqrt(xmatrix**2 + ymatrix**2)
+    args4fit = np.where(r2.flatten() < radius4fit)
+
+    mask = xmatrix*np.nan
+    mask[np.where(r2 < radius4fit)] = 1.0
+
+    data2fit = thickness.flatten()[args4fit]
+
+    xxfit = xmatrix.flatten()[args4fit]
+    yyfit = ymatrix.flatten()[args4fit]
+
+    xyfit = [xxfit, yyfit]
+
+    # FIT
+
+    def _2Dparabol_4_fit(xy, Radius, xo, yo, offset):
+        x, y = xy
+        return (x - xo) ** 2 / 2 / Radius + (y - yo) ** 2 / 2 / Radius + offset
+
+    popt, pcov = curve_fit(_2Dparabol_4_fit, xyfit, data2fit,
+                           p0=p0, bounds=bounds, method="trf",
+                           **kwargs4fit)
+
+    logger.print_message("Nominal Parabolic 2D Fit")
+    logger.print_message("Curv Radius, xo, yo, offset")
+    logger.print_message(popt)
+
+    logger.print_message("Nominal Parabolic 2D Fit: Radius of 1 face  / nfaces, x direction: {:.4g} um".format(popt[0]*1e6))
+
+    lim_x = np.argwhere(xmatrix[0, :] <= -radius4fit*1.01)[-1, 0]
+    lim_y = np.argwhere(ymatrix[:, 0] <= -radius4fit*1.01)[-1, 0]
+
+    fitted = _2Dparabol_4_fit([xmatrix, ymatrix], popt[0], popt[1], popt[2], popt[3])
+
+    if (lim_x <= 1 or lim_y <= 1):
+        thickness_cropped = thickness*mask
+        fitted_cropped = fitted*mask
+    else:
+        thickness_cropped = (thickness[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
+        fitted_cropped = (fitted[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
+
+    return (thickness_cropped, fitted_cropped, popt)
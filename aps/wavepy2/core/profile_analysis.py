@@ -0,0 +1,164 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+"""
+Profile analysis
+-------------------------------------------------
+
+Kernels of the analysis of the profiles of differential phase maps: all the
+profiles are processed at once, as the columns of a 2D array sharing the same
+coordinates.
+"""
+
+import numpy as np
+
+from aps.wavepy2.util.common import common_tools
+
+def band_profiles(array, positions, filter_width=0, axis=0):
+    """
+    Profiles of a 2D array at the given rows (axis=0) or columns (axis=1),
+    each one averaged over a band of filter_width rows/columns around its
+    position.
+
+    Same result as uniform_filter1d(array, filter_width, axis) (mode 'reflect')
+    sampled at positions, but only the lines inside the bands are read, so the
+    cost scales with len(positions)*filter_width instead of the image size.
+
+    Parameters
+    ----------
+    array : ndarray
+        2D array
+
+    positions : list or ndarray
+        rows (axis=0) or columns (axis=1) of the profiles
+
+    filter_width : int
+        width of the bands in pixels, 0 or 1 for no averaging
+
+    axis : int
+        axis along which the bands are averaged
+
+    Returns
+    -------
+    ndarray
+        profiles as columns, shape (array.shape[1 - axis], len(positions))
+
+    """
+    positions = np.asarray(positions, dtype=int)
+
+    if filter_width > 1:
+        # window of uniform_filter1d: [position - filter_width//2, position + (filter_width - 1)//2]
+        indexes = positions[:, np.newaxis] - filter_width//2 + np.arange(filter_width)
+
+        # 'reflect' boundary, as in scipy.ndimage: d c b a | a b c d | d c b a
+        size    = array.shape[axis]
+        indexes = np.mod(indexes, 2*size)
+        indexes = np.where(indexes < size, indexes, 2*size - 1 - indexes)
+
+        profiles = np.take(array, indexes, axis=axis).sum(axis=axis + 1, dtype=float)/filter_width
+    else:
+        profiles = np.array(np.take(array, positions, axis=axis), dtype=float)
+
+    return profiles.T if axis == 0 else profiles
+
+def fit_profiles(xvec, profiles, degree=1):
+    """
+    Least squares polynomial fit of all the profiles at once, with a single
+    lstsq against the Vandermonde matrix of the shared coordinates (columns
+    scaled as in np.polyfit).
+
+    Parameters
+    ----------
+    xvec : ndarray
+        coordinates of the profiles, shape (n,)
+
+    profiles : ndarray
+        profiles as columns, shape (n, m)
+
+    degree : int
+        degree of the polynomial
+
+    Returns
+    -------
+    two ndarray
+        coefficients of each profile, highest power first as in np.polyfit,
+        shape (degree + 1, m), and the fitted profiles, shape (n, m)
+
+    """
+    vandermonde = np.vander(xvec, degree + 1)
+    scale       = np.sqrt((vandermonde*vandermonde).sum(axis=0))
+
+    coefficients = np.linalg.lstsq(vandermonde/scale, profiles, rcond=None)[0]/scale[:, np.newaxis]
+
+    return coefficients, vandermonde @ coefficients
+
+def integrate_profiles_cumsum(xvec, profiles, wavelength, projection=1.0):
+    """
+    Height from the DPC profiles (columns of profiles), by cumulative sum of
+    each profile after the removal of its mean.
+
+    Returns
+    -------
+    ndarray
+        integrated profiles, shape (n, m)
+
+    """
+    integrated = np.cumsum(profiles - np.mean(profiles, axis=0), axis=0)*(xvec[1] - xvec[0])
+    integrated *= -1/2/np.pi*wavelength*np.abs(projection)
+
+    return integrated
+
+def curvature_from_height(height, pixelsize):
+    """
+    Curvature of the height profiles (columns of height), by second order
+    finite differences.
+
+    Returns
+    -------
+    two ndarray
+        coordinates, shape (n - 2,), and curvatures of the profiles,
+        shape (n - 2, m)
+
+    """
+    return common_tools.realcoordvec(height.shape[0] - 2, pixelsize), np.diff(height, n=2, axis=0)/pixelsize**2
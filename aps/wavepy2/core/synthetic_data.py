@@ -0,0 +1,149 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+"""
+Synthetic data with known ground truth
+-------------------------------------------------
+
+Vectorized generators of Talbot images of a 2D (mesh) grating with known
+differential phase, dark field and noise, of z-scan stacks with known
+visibility (i.e. known coherence), and of thickness maps of parabolic lenses.
+They are used to benchmark the analysis kernels and to check their accuracy.
+"""
+
+import numpy as np
+
+def get_harmonic_period(shape, period):
+    """
+    Position of the first harmonics in the reciprocal space, in pixels, of a mesh pattern with the given period
+    (real space, in pixels), in the format [periodVert, periodHor].
+    """
+    return [int(round(shape[0] / period)), int(round(shape[1] / period))]
+
+def pixel_grid(shape):
+    """
+    Open (broadcastable) grids of pixel coordinates, in the format (yy, xx) with shapes (ny, 1) and (1, nx).
+    """
+    return np.ogrid[0:shape[0], 0:shape[1]]
+
+def parabolic_surface(shape, curvature=1e-4, center=(0.0, 0.0)):
+    """
+    Surface c * ((x - xo)^2 + (y - yo)^2) in pixel coordinates centered in the image, with its analytic gradients.
+
+    Returns
+    -------
+    (surface, gradient_x, gradient_y)
+    """
+    yy, xx = pixel_grid(shape)
+    xx     = xx - shape[1] // 2 - center[1]
+    yy     = yy - shape[0] // 2 - center[0]
+
+    return curvature * (xx ** 2 + yy ** 2), 2 * curvature * xx + 0 * yy, 2 * curvature * yy + 0 * xx
+
+def talbot_image(shape, period, visibility=0.5, dpc_V=0.0, dpc_H=0.0, dark_field_V=1.0, dark_field_H=1.0,
+                 transmission=1.0, counts=1000.0, noise=True, seed=None, dtype=np.float64):
+    """
+    Talbot image of a 2D grating: a mesh pattern with the given period (in pixels) along both directions,
+
+    I = counts * T * (1 + v * DF_V * cos(2 pi y / p + dpc_V)) * (1 + v * DF_H * cos(2 pi x / p + dpc_H))
+
+    where the differential phases (harmonics 10 and 01), the dark fields and the transmission can be scalars
+    or 2D maps. With scalars the image is computed as an outer product of the two profiles.
+
+    Parameters
+    ----------
+    noise : Boolean
+        if True, the counts are replaced with a poisson random variate.
+
+    seed : int
+        seed of the random generator, for reproducible noise.
+    """
+    yy, xx = pixel_grid(shape)
+
+    profile_V = 1 + visibility * np.asarray(dark_field_V) * np.cos(2 * np.pi * yy / period + np.asarray(dpc_V))
+    profile_H = 1 + visibility * np.asarray(dark_field_H) * np.cos(2 * np.pi * xx / period + np.asarray(dpc_H))
+
+    img = (counts * np.asarray(transmission)) * profile_V * profile_H
+    img = np.broadcast_to(img, shape)
+
+    if noise: img = np.random.default_rng(seed).poisson(img)
+
+    return np.array(img, dtype=dtype)
+
+def talbot_z_scan(shape, zvec, period, visibilities, source_distance=None, counts=1000.0, noise=True, seed=None, dtype=np.float64):
+    """
+    Stack of Talbot images vs detector distance, with shape (len(zvec), ny, nx): frame k has visibility
+    visibilities[k] and period period * (1 + z/source_distance) (magnification of a point source, constant
+    period if source_distance is None). The frames are computed at once as outer products of the profiles.
+    """
+    zvec          = np.asarray(zvec, dtype=float)
+    visibilities  = np.asarray(visibilities, dtype=float)
+    periods       = period * (1 + zvec / source_distance) if not source_distance is None else np.full(len(zvec), float(period))
+
+    profile_V = 1 + visibilities[:, None] * np.cos(2 * np.pi * np.arange(shape[0])[None, :] / periods[:, None])
+    profile_H = 1 + visibilities[:, None] * np.cos(2 * np.pi * np.arange(shape[1])[None, :] / periods[:, None])
+
+    imgs = counts * profile_V[:, :, None] * profile_H[:, None, :]
+
+    if noise: imgs = np.random.default_rng(seed).poisson(imgs)
+
+    return np.array(imgs, dtype=dtype)
+
+def parabolic_lens_thickness(shape, pixelsize, radius, aperture, center=(0.0, 0.0), offset=0.0, noise=0.0, seed=None):
+    """
+    Thickness map of a parabolic lens, t = r^2 / (2 R) + offset inside the aperture and constant outside, where
+    R is the (effective) radius of curvature. Pixel size, radius, aperture, center [y, x] and noise (standard
+    deviation of a gaussian noise) are in meters.
+    """
+    if isinstance(pixelsize, float): pixelsize = [pixelsize, pixelsize]
+
+    yy, xx = pixel_grid(shape)
+    xx     = (xx - shape[1] // 2) * pixelsize[1] - center[1]
+    yy     = (yy - shape[0] // 2) * pixelsize[0] - center[0]
+
+    thickness = np.minimum(xx ** 2 + yy ** 2, (aperture / 2) ** 2) / (2 * radius) + offset
+
+    if noise > 0: thickness = thickness + np.random.default_rng(seed).normal(0.0, noise, shape)
+
+    return thickness
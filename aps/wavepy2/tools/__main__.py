@@ -43,10 +43,19 @@
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
 import sys
+import importlib
 
-from aps.wavepy2.tools.imaging.single_grating.scripts.main_single_grating_talbot import MainSingleGratingTalbot
-from aps.wavepy2.tools.diagnostic.coherence.scripts.main_single_grating_coherence_z_scan import MainSingleGratingCoherenceZScan
-from aps.wavepy2.tools.metrology.lenses.scripts.main_fit_residual_lenses import MainFitResidualLenses
+# script id: (module, class, description). The script modules import Qt, matplotlib and the analysis libraries,
+# so only the selected one is imported.
+SCRIPT_REGISTRY = {"img-sgt"       : ("aps.wavepy2.tools.imaging.single_grating.scripts.main_single_grating_talbot",         "MainSingleGratingTalbot",         "Imaging   - Single Grating Talbot"),
+                   "img-sgt-batch" : ("aps.wavepy2.tools.imaging.single_grating.scripts.main_single_grating_talbot_batch",   "MainSingleGratingTalbotBatch",    "Imaging   - Single Grating Talbot Batch"),
+                   "coh-sgz"       : ("aps.wavepy2.tools.diagnostic.coherence.scripts.main_single_grating_coherence_z_scan", "MainSingleGratingCoherenceZScan", "Coherence - Single Grating Z Scan"),
+                   "met-frl"       : ("aps.wavepy2.tools.metrology.lenses.scripts.main_fit_residual_lenses",                 "MainFitResidualLenses",           "Metrology - Fit Residual Lenses")}
+
+def get_script_class(script_id):
+    module_name, class_name, _ = SCRIPT_REGISTRY[script_id]
+
+    return getattr(importlib.import_module(module_name), class_name)
 
 if __name__ == "__main__":
     def show_help(error=False):
@@ -63,14 +72,10 @@ if __name__ == "__main__":
         print("To show help of a script: python -m aps.wavepy2.tools <script id> --h\n")
         print("To show this help:        python -m aps.wavepy2.tools --h\n")
         print("* Available scripts:\n" +
-              "    1) Imaging   - Single Grating Talbot, id: " + MainSingleGratingTalbot.SCRIPT_ID + "\n" +
-              "    2) Coherence - Single Grating Z Scan, id: " + MainSingleGratingCoherenceZScan.SCRIPT_ID + "\n" +
-              "    3) Metrology - Fit Residual Lenses,   id: " + MainFitResidualLenses.SCRIPT_ID + "\n")
+              "".join(["    " + str(i + 1) + ") " + (description + ",").ljust(40) + " id: " + script_id + "\n" for i, (script_id, (_, _, description)) in enumerate(SCRIPT_REGISTRY.items())]))
 
     if len(sys.argv) == 1 or sys.argv[1] == "--h":
         show_help()
     else:
-        if sys.argv[1]   == MainSingleGratingTalbot.SCRIPT_ID:         MainSingleGratingTalbot(sys_argv=sys.argv).run_script()
-        elif sys.argv[1] == MainSingleGratingCoherenceZScan.SCRIPT_ID: MainSingleGratingCoherenceZScan(sys_argv=sys.argv).run_script()
-        elif sys.argv[1] == MainFitResidualLenses.SCRIPT_ID:           MainFitResidualLenses(sys_argv=sys.argv).run_script()
+        if sys.argv[1] in SCRIPT_REGISTRY: get_script_class(sys.argv[1])(sys_argv=sys.argv).run_script()
         else: show_help(error=True)
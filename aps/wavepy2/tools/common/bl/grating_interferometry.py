@@ -42,334 +42,123 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
-import numpy as np
-from scipy.ndimage.filters import uniform_filter
-from skimage.restoration import unwrap_phase
-
-from aps.wavepy2.tools.common.widgets.extract_harmonic_plot_widget import ExtractHarmonicPlot
-from aps.wavepy2.tools.common.widgets.harmonic_grid_plot_widget import HarmonicGridPlot
-from aps.wavepy2.tools.common.widgets.single_grating_harmonic_images_widget import SingleGratingHarmonicImages
-from aps.common.logger   import LoggerFacade
 from aps.wavepy2.util.plot.plotter import PlotterFacade
-from aps.wavepy2.util.common.common_tools import FourierTransform, get_idxPeak_ij, get_idxPeak_ij_exp
 
+from aps.wavepy2.core import harmonic_analysis
+from aps.wavepy2.core.harmonic_analysis import MockLogger, exp_harm_period, exp_harm_period_1d, visib_1st_harmonics, visib_1st_harmonics_fft, \
+    visib_1st_harmonics_stack, visib_1st_harmonics_tiles, single_grating_harmonic_images, single_1Dgrating_harmonic_images, \
+    HARMONIC_GRID_PLOT, EXTRACT_HARMONIC_PLOT, HARMONIC_IMAGES_PLOT, HARMONIC_PROFILE_PLOT
 
-class MockLogger(LoggerFacade):
-    def print(self, message): pass
-    def print_message(self, message): pass
-    def print_warning(self, message): pass
-    def print_error(self, message): pass
-    def print_other(self, message, prefix, color): pass
+# parameters of the plots recorded by PlotRecorder
+_PLOT_PREFIX     = "plot:"
+_PLOT_NAME       = "__plot_name__"
+_SPECTRUM_PREFIX = "spectrum:"
 
 class MockPlotter(PlotterFacade):
     def push_plot_on_context(self, context_key, widget_class, unique_id=None, **kwargs): pass
 
-def exp_harm_period(img, harmonicPeriod, harmonic_ij='00', searchRegion=10, isFFT=False, logger=MockLogger()):
+def single_2Dgrating_analyses(img, img_ref=None, harmonicPeriod=None, unwrapFlag=True, context_key="single_2Dgrating_analyses", unique_id=None, logger=MockLogger(), plotter=MockPlotter(), plot_recorder=None, **kwargs):
     """
-    Function to obtain the position (in pixels) in the reciprocal space
-    of the first harmonic ().
+    See aps.wavepy2.core.harmonic_analysis.single_2Dgrating_analyses: the
+    intermediate results are pushed on the plotter, in the given context
+    (and recorded by plot_recorder, if any).
     """
+    return harmonic_analysis.single_2Dgrating_analyses(img, img_ref=img_ref, harmonicPeriod=harmonicPeriod, unwrapFlag=unwrapFlag,
+                                                       context_key=context_key, unique_id=unique_id, logger=logger,
+                                                       plot_hook=get_plot_hook(plotter, plot_recorder), **kwargs)
 
-    (nRows, nColumns) = img.shape # this is important in the case of FFT = false it takes the direct space
-
-    harV = int(harmonic_ij[0])
-    harH = int(harmonic_ij[1])
-
-    periodVert = harmonicPeriod[0]
-    periodHor = harmonicPeriod[1]
-
-    # adjusts for 1D grating
-    if periodVert <= 0 or periodVert is None:
-        periodVert = nRows
-        logger.print_message("Assuming Horizontal 1D Grating")
-
-    if periodHor <= 0 or periodHor is None:
-        periodHor = nColumns
-        logger.print_message("Assuming Vertical 1D Grating")
-
-    if isFFT: imgFFT = img
-    else: imgFFT = FourierTransform.fft2d(img)
-
-    del_i, del_j = __error_harmonic_peak(imgFFT, harV, harH,
-                                         periodVert, periodHor,
-                                         searchRegion)
-
-    logger.print_message("Error experimental harmonics vertical: {:d}".format(del_i))
-    logger.print_message("Error experimental harmonics horizontal: {:d}".format(del_j))
-
-    return periodVert + del_i, periodHor + del_j
-
-def single_2Dgrating_analyses(img, img_ref=None, harmonicPeriod=None, unwrapFlag=True, context_key="single_2Dgrating_analyses", unique_id=None, logger=MockLogger(), plotter=MockPlotter(), **kwargs):
+def single_1Dgrating_analyses(img, img_ref=None, harmonicPeriod=None, unwrapFlag=True, context_key="single_1Dgrating_analyses", unique_id=None, logger=MockLogger(), plotter=MockPlotter(), plot_recorder=None, **kwargs):
     """
-    Function to process the data of single 2D grating Talbot imaging. It
-    wraps other functions in order to make all the process transparent
-
+    See aps.wavepy2.core.harmonic_analysis.single_1Dgrating_analyses: the
+    intermediate results are pushed on the plotter, in the given context
+    (and recorded by plot_recorder, if any).
     """
+    return harmonic_analysis.single_1Dgrating_analyses(img, img_ref=img_ref, harmonicPeriod=harmonicPeriod, unwrapFlag=unwrapFlag,
+                                                       context_key=context_key, unique_id=unique_id, logger=logger,
+                                                       plot_hook=get_plot_hook(plotter, plot_recorder), **kwargs)
 
-    # Obtain Harmonic images
-    h_img = __single_grating_harmonic_images(img, harmonicPeriod, context_key=context_key, unique_id=unique_id, logger=logger, plotter=plotter, **kwargs)
-
-    if img_ref is not None:  # relative wavefront
-        h_img_ref = __single_grating_harmonic_images(img_ref, harmonicPeriod, context_key=context_key, image_name="Ref", unique_id=unique_id, logger=logger, plotter=plotter, **kwargs)
-
-        int00 = np.abs(h_img[0])/np.abs(h_img_ref[0])
-        int01 = np.abs(h_img[1])/np.abs(h_img_ref[1])
-        int10 = np.abs(h_img[2])/np.abs(h_img_ref[2])
-
-        if unwrapFlag is True:
-            arg01 = (unwrap_phase(np.angle(h_img[1])) -
-                     unwrap_phase(np.angle(h_img_ref[1])))
-            arg10 = (unwrap_phase(np.angle(h_img[2])) -
-                     unwrap_phase(np.angle(h_img_ref[2])))
-        else:
-            arg01 = np.angle(h_img[1]) - np.angle(h_img_ref[1])
-            arg10 = np.angle(h_img[2]) - np.angle(h_img_ref[2])
-
-    else:  # absolute wavefront
-        int00 = np.abs(h_img[0])
-        int01 = np.abs(h_img[1])
-        int10 = np.abs(h_img[2])
-
-        if unwrapFlag is True:
-            arg01 = unwrap_phase(np.angle(h_img[1]))
-            arg10 = unwrap_phase(np.angle(h_img[2]))
-        else:
-            arg01 = np.angle(h_img[1])
-            arg10 = np.angle(h_img[2])
-
-    if unwrapFlag is True:  # remove pi jump
-        arg01 -= int(np.round(np.mean(arg01/np.pi)))*np.pi
-        arg10 -= int(np.round(np.mean(arg10/np.pi)))*np.pi
-
-    darkField01 = int01/int00
-    darkField10 = int10/int00
-
-    return [int00, int01, int10,
-            darkField01, darkField10,
-            arg01, arg10]
-
-def visib_1st_harmonics(img, harmonicPeriod, searchRegion=20, unFilterSize=1):
+def get_plot_hook(plotter, plot_recorder=None):
     """
-    This function obtain the visibility in a grating imaging experiment by the
-    ratio of the amplitudes of the first and zero harmonics. See
-    https://doi.org/10.1364/OE.22.014041 .
-
-    Note
-    ----
-    Note that the absolute visibility also depends on the higher harmonics, and
-    for a absolute value of visibility all of them must be considered.
-
-
-    Parameters
-    ----------
-    img : 	ndarray – Data (data_exchange format)
-        Experimental image, whith proper blank image, crop and rotation already
-        applied.
-
-    harmonicPeriod : list of integers in the format [periodVert, periodHor]
-        ``periodVert`` and ``periodVert`` are the period of the harmonics in
-        the reciprocal space in pixels. For the checked board grating,
-        periodVert = sqrt(2) * pixel Size / grating Period * number of
-        rows in the image. For 1D grating, set one of the values to negative or
-        zero (it will set the period to number of rows or colunms).
-
-    searchRegion: int
-        search for the peak will be in a region of harmonicPeriod/searchRegion
-        around the theoretical peak position. See also
-        `:py:func:`wavepy.grating_interferometry.plot_harmonic_grid`
-
-    verbose: Boolean
-        verbose flag.
-
-
-    Returns
-    -------
-    (float, float)
-        horizontal and vertical visibilities respectivelly from
-        harmonics 01 and 10
-
-
+    Plotting hook of the compute core pushing the plots on the plotter: the
+    widgets are imported only when the first plot is pushed, and the data of
+    the plots are not even calculated when the plotter neither displays nor saves.
     """
+    if not is_plotting(plotter): return harmonic_analysis.no_plot
 
-    imgFFT = FourierTransform.fft2d(img)
-
-    _idxPeak_ij_exp00 = get_idxPeak_ij_exp(imgFFT, 0, 0, harmonicPeriod[0], harmonicPeriod[1], searchRegion)
-    _idxPeak_ij_exp10 = get_idxPeak_ij_exp(imgFFT, 1, 0, harmonicPeriod[0], harmonicPeriod[1], searchRegion)
-    _idxPeak_ij_exp01 = get_idxPeak_ij_exp(imgFFT, 0, 1, harmonicPeriod[0], harmonicPeriod[1], searchRegion)
-
-    arg_imgFFT = np.abs(imgFFT)
+    def plot_hook(plot_name, context_key, unique_id=None, **kwargs):
+        if not plot_recorder is None: plot_recorder.record(plot_name, **kwargs)
 
-    if unFilterSize > 1: arg_imgFFT = uniform_filter(arg_imgFFT, unFilterSize)
+        plotter.push_plot_on_context(context_key, __get_widget_class(plot_name), unique_id, **kwargs)
 
-    peak00 = arg_imgFFT[_idxPeak_ij_exp00[0], _idxPeak_ij_exp00[1]]
-    peak10 = arg_imgFFT[_idxPeak_ij_exp10[0], _idxPeak_ij_exp10[1]]
-    peak01 = arg_imgFFT[_idxPeak_ij_exp01[0], _idxPeak_ij_exp01[1]]
+    return plot_hook
 
-    return 2*peak10/peak00, 2*peak01/peak00, _idxPeak_ij_exp00, _idxPeak_ij_exp10, _idxPeak_ij_exp01
+def is_plotting(plotter):
+    return not isinstance(plotter, MockPlotter) and (plotter.is_active() or plotter.is_saving())
 
-####################################
-# PRIVATE METHODS
-
-def __check_harmonic_inside_image(harV, harH, nRows, nColumns, periodVert, periodHor, logger):
-    """
-    Check if full harmonic image is within the main image
-    """
-    errFlag = False
-
-    if (harV + .5)*periodVert > nRows / 2:
-        logger.print_error("Harmonic Peak {:d}{:d}".format(harV, harH) + " is out of image vertical range.")
-        errFlag = True
-
-    if (harH + .5)*periodHor > nColumns / 2:
-        logger.print_error("Harmonic Peak {:d}{:d}".format(harV, harH) + " is out of image horizontal range.")
-        errFlag = True
-
-    if errFlag:
-        raise ValueError("ERROR: Harmonic Peak " +
-                         "{:d}{:d} is ".format(harV, harH) +
-                         "out of image frequency range.")
-
-def __error_harmonic_peak(imgFFT, harV, harH, periodVert, periodHor, searchRegion=10):
+class PlotRecorder():
     """
-    Error in pixels (in the reciprocal space) between the harmonic peak and
-    the provided theoretical value
+    Records the data of the plots pushed by a plotting hook (see get_plot_hook),
+    as parameters to be stored with the result of the analysis (i.e. in a
+    StageCache): when the result is taken from the store, push_recorded_plots
+    pushes the same plots again. The keyword arguments of the analysis in
+    excluded_names are not recorded, they are given again to push_recorded_plots.
     """
+    def __init__(self, excluded_names=[]):
+        self.__excluded_names = set(excluded_names)
+        self.__parameters     = {}
+        self.__n_plots        = 0
 
-    #  Estimate harmonic positions
-
-    idxPeak_ij     = get_idxPeak_ij(harV, harH, imgFFT.shape[0], imgFFT.shape[1], periodVert, periodHor)
-    idxPeak_ij_exp = get_idxPeak_ij_exp(imgFFT, harV, harH, periodVert, periodHor, searchRegion)
-
-    del_i = idxPeak_ij_exp[0] - idxPeak_ij[0]
-    del_j = idxPeak_ij_exp[1] - idxPeak_ij[1]
-
-    return del_i, del_j
-
-def __extract_harmonic(imgFFT, harmonicPeriod, harmonic_ij='00', searchRegion=10, context_key="extract_harmonic", image_name="Image", unique_id=None, logger=MockLogger(), plotter=MockPlotter(), **kwargs):
-    (nRows, nColumns) = imgFFT.shape
-
-    harV = int(harmonic_ij[0])
-    harH = int(harmonic_ij[1])
-
-    periodVert = harmonicPeriod[0]
-    periodHor = harmonicPeriod[1]
-
-    logger.print_message("Extracting harmonic " + harmonic_ij[0] + harmonic_ij[1])
-    logger.print_message("Harmonic period Horizontal: {:d} pixels".format(periodHor))
-    logger.print_message("Harmonic period Vertical: {:d} pixels".format(periodVert))
+    def record(self, plot_name, **kwargs):
+        prefix = _PLOT_PREFIX + str(self.__n_plots) + ":"
 
-    # adjusts for 1D grating
-    if periodVert <= 0 or periodVert is None:
-        periodVert = nRows
-        logger.print_message("Assuming Horizontal 1D Grating")
+        self.__parameters[prefix + _PLOT_NAME] = plot_name
 
-    if periodHor <= 0 or periodHor is None:
-        periodHor = nColumns
-        logger.print_message("Assuming Vertical 1D Grating")
+        for name, value in kwargs.items():
+            if name in self.__excluded_names: continue
+            elif isinstance(value, harmonic_analysis.SpectrumThumbnail): self.__parameters[prefix + _SPECTRUM_PREFIX + name] = value.to_arrays()
+            else: self.__parameters[prefix + name] = value
 
-    __check_harmonic_inside_image(harV, harH, nRows, nColumns, periodVert, periodHor, logger)
+        self.__n_plots += 1
 
-    intensity = (np.abs(imgFFT))
+    def get_parameters(self): return self.__parameters
 
-    #  Estimate harmonic positions
-    idxPeak_ij   = get_idxPeak_ij(harV, harH, nRows, nColumns, periodVert, periodHor)
-    del_i, del_j = __error_harmonic_peak(imgFFT, harV, harH, periodVert, periodHor, searchRegion)
-
-    logger.print_message("extract_harmonic: harmonic peak " + harmonic_ij[0] + harmonic_ij[1] + " is misplaced by:")
-    logger.print_message("{:d} pixels in vertical, {:d} pixels in hor".format(del_i, del_j))
-    logger.print_message("Theoretical peak index: {:d},{:d} [VxH]".format(idxPeak_ij[0], idxPeak_ij[1]))
-
-    if ((np.abs(del_i) > searchRegion // 2) or (np.abs(del_j) > searchRegion // 2)):
-        logger.print_warning("Harmonic Peak " + harmonic_ij[0] + harmonic_ij[1] + " is too far from theoretical value.")
-        logger.print_warning("{:d} pixels in vertical, {:d} pixels in hor".format(del_i, del_j))
-
-    plotter.push_plot_on_context(context_key, ExtractHarmonicPlot, unique_id,
-                                 intensity=intensity,
-                                 idxPeak_ij=idxPeak_ij,
-                                 harmonic_ij=harmonic_ij,
-                                 nColumns=nColumns,
-                                 nRows=nRows,
-                                 periodVert=periodVert,
-                                 periodHor=periodHor,
-                                 image_name=image_name, **kwargs)
-
-    return imgFFT[idxPeak_ij[0] - periodVert // 2:
-                  idxPeak_ij[0] + periodVert//2,
-                  idxPeak_ij[1] - periodHor//2:
-                  idxPeak_ij[1] + periodHor//2]
-
-def __single_grating_harmonic_images(img, harmonicPeriod, searchRegion=10, context_key="single_grating_harmonic", image_name="", unique_id=None, logger=MockLogger(), plotter=MockPlotter(), **kwargs):
+def push_recorded_plots(plotter, wavepy_data, context_key, unique_id=None, **kwargs):
     """
-    Auxiliary function to process the data of single 2D grating Talbot imaging.
-    It obtain the (real space) harmonic images  00, 01 and 10.
-
-    Parameters
-    ----------
-    img : 	ndarray – Data (data_exchange format)
-        Experimental image, whith proper blank image, crop and rotation already
-        applied.
-
-    harmonicPeriod : list of integers in the format [periodVert, periodHor]
-        ``periodVert`` and ``periodVert`` are the period of the harmonics in
-        the reciprocal space in pixels. For the checked board grating,
-        periodVert = sqrt(2) * pixel Size / grating Period * number of
-        rows in the image. For 1D grating, set one of the values to negative or
-        zero (it will set the period to number of rows or colunms).
-
-    searchRegion: int
-        search for the peak will be in a region of harmonicPeriod/searchRegion
-        around the theoretical peak position. See also
-        `:py:func:`wavepy.grating_interferometry.plot_harmonic_grid`
-
-    Returns
-    -------
-    three 2D ndarray data
-        Images obtained from the harmonics 00, 01 and 10.
-
+    Pushes on the plotter the plots recorded by a PlotRecorder, whose parameters
+    are in wavepy_data, with the keyword arguments of the current analysis.
     """
+    plot_hook = get_plot_hook(plotter)
+    plots     = {}
 
-    imgFFT = FourierTransform.fft2d(img)
-
-    plotter.push_plot_on_context(context_key, HarmonicGridPlot, unique_id, imgFFT=imgFFT, harmonicPeriod=harmonicPeriod, image_name=image_name, **kwargs)
-
-    imgFFT00 = __extract_harmonic(imgFFT,
-                                  harmonicPeriod=harmonicPeriod,
-                                  harmonic_ij='00',
-                                  searchRegion=searchRegion,
-                                  context_key=context_key,
-                                  image_name=image_name, unique_id=unique_id,
-                                  logger=logger, plotter=plotter,
-                                  **kwargs)
+    for name, value in wavepy_data.get_parameters().items():
+        if name.startswith(_PLOT_PREFIX):
+            i, name = name[len(_PLOT_PREFIX):].split(":", 1)
 
-    imgFFT01 = __extract_harmonic(imgFFT,
-                                  harmonicPeriod=harmonicPeriod,
-                                  harmonic_ij=['0', '1'],
-                                  searchRegion=searchRegion,
-                                  context_key=context_key,
-                                  image_name=image_name, unique_id=unique_id,
-                                  logger=logger, plotter=plotter,
-                                  **kwargs)
+            if name.startswith(_SPECTRUM_PREFIX): plots.setdefault(int(i), {})[name[len(_SPECTRUM_PREFIX):]] = harmonic_analysis.SpectrumThumbnail.from_arrays(value)
+            else:                                 plots.setdefault(int(i), {})[name] = value
 
-    imgFFT10 = __extract_harmonic(imgFFT,
-                                  harmonicPeriod=harmonicPeriod,
-                                  harmonic_ij=['1', '0'],
-                                  searchRegion=searchRegion,
-                                  context_key=context_key,
-                                  image_name=image_name, unique_id=unique_id,
-                                  logger=logger, plotter=plotter,
-                                  **kwargs)
+    for i in sorted(plots):
+        plot_data = plots[i]
+        plot_name = plot_data.pop(_PLOT_NAME)
+        plot_data.update(kwargs)
 
-    plotter.push_plot_on_context(context_key, SingleGratingHarmonicImages, unique_id,
-                                 imgFFT00=imgFFT00, imgFFT01=imgFFT01, imgFFT10=imgFFT10,
-                                 image_name=image_name, **kwargs)
+        plot_hook(plot_name, context_key, unique_id, **plot_data)
 
-    img00 = FourierTransform.ifft2d(imgFFT00)
-
-    # non existing harmonics will return NAN, so here we check NAN
-    if np.all(np.isfinite(imgFFT01)): img01 = FourierTransform.ifft2d(imgFFT01)
-    else: img01 = imgFFT01
-
-    if np.all(np.isfinite(imgFFT10)): img10 = FourierTransform.ifft2d(imgFFT10)
-    else: img10 = imgFFT10
+####################################
+# PRIVATE METHODS
 
-    return (img00, img01, img10)
+def __get_widget_class(plot_name):
+    if plot_name == HARMONIC_GRID_PLOT:
+        from aps.wavepy2.tools.common.widgets.harmonic_grid_plot_widget import HarmonicGridPlot
+        return HarmonicGridPlot
+    elif plot_name == EXTRACT_HARMONIC_PLOT:
+        from aps.wavepy2.tools.common.widgets.extract_harmonic_plot_widget import ExtractHarmonicPlot
+        return ExtractHarmonicPlot
+    elif plot_name == HARMONIC_IMAGES_PLOT:
+        from aps.wavepy2.tools.common.widgets.single_grating_harmonic_images_widget import SingleGratingHarmonicImages
+        return SingleGratingHarmonicImages
+    elif plot_name == HARMONIC_PROFILE_PLOT:
+        from aps.wavepy2.tools.common.widgets.harmonic_profile_plot_widget import HarmonicProfilePlot
+        return HarmonicProfilePlot
+    else:
+        raise ValueError("Plot not recognized: " + str(plot_name))
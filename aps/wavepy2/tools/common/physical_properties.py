@@ -43,8 +43,6 @@
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
 
-import xraylib
-
 MATERIALS = ['Diamond, 3.525g/cm^3', 'Beryllium, 1.848 g/cm^3']
 
 def get_delta(phenergy, material_idx=None, material=None, density=None):
@@ -91,6 +89,7 @@ def get_delta(phenergy, material_idx=None, material=None, density=None):
         returns the value of delta with default density.
 
     """
+    import xraylib # lazy: slow to import, and needed only here
 
     if not material_idx is None:
         if material_idx == 0:
@@ -0,0 +1,210 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+import json
+import hashlib
+import tempfile
+
+import numpy as np
+
+from aps.common.scripts.script_data import ScriptData
+
+from aps.wavepy2.tools.common.wavepy_data import WavePyData
+
+# part of every key: to be increased when the calculation of a cached stage (or the format of the files) changes, so
+# that a cache folder kept across versions does not return results of the previous implementation
+CACHE_VERSION = 1
+
+__PARAMETERS_ENTRY = "__parameters__"
+__ARRAY_PREFIX     = "array:"
+__LIST_PREFIX      = "list:"
+
+def save_wavepy_data(file_name, wavepy_data):
+    """
+    Saves a WavePyData in a npz file: its parameters can be numpy arrays, lists of numpy arrays or values that can be
+    written in JSON (numbers, strings, booleans, None and lists or dictionaries of them). The file is replaced
+    atomically, so an interrupted write never leaves a corrupted file.
+    """
+    arrays     = {}
+    parameters = {}
+
+    for name, value in wavepy_data.get_parameters().items():
+        if isinstance(value, np.ndarray): arrays[__ARRAY_PREFIX + name] = value
+        elif isinstance(value, (list, tuple)) and len(value) > 0 and all(isinstance(item, np.ndarray) for item in value):
+            for i, item in enumerate(value): arrays[__LIST_PREFIX + name + ":" + str(i)] = item
+        else: parameters[name] = value
+
+    arrays[__PARAMETERS_ENTRY] = np.array(json.dumps(parameters, default=__to_json))
+
+    # a unique temporary file: two runs can share the same folder
+    file_descriptor, temporary_file_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_name)), prefix=os.path.basename(file_name) + ".", suffix=".tmp")
+
+    try:
+        with os.fdopen(file_descriptor, "wb") as file: np.savez(file, **arrays)
+        os.replace(temporary_file_name, file_name)
+    except:
+        try: os.remove(temporary_file_name)
+        except OSError: pass
+        raise
+
+def load_wavepy_data(file_name):
+    """
+    Loads a WavePyData saved with save_wavepy_data.
+    """
+    wavepy_data = WavePyData()
+    lists       = {}
+
+    with np.load(file_name, allow_pickle=False) as npz_file:
+        for name, value in json.loads(str(npz_file[__PARAMETERS_ENTRY])).items(): wavepy_data.set_parameter(name, value)
+
+        for entry in npz_file.files:
+            if entry.startswith(__ARRAY_PREFIX): wavepy_data.set_parameter(entry[len(__ARRAY_PREFIX):], npz_file[entry])
+            elif entry.startswith(__LIST_PREFIX):
+                name, i = entry[len(__LIST_PREFIX):].rsplit(":", 1)
+                lists.setdefault(name, {})[int(i)] = npz_file[entry]
+
+    for name, items in lists.items(): wavepy_data.set_parameter(name, [items[i] for i in sorted(items)])
+
+    return wavepy_data
+
+class StageCache():
+    """
+    Persistent cache of the results of the stages of an analysis, stored in cache_folder as npz files, one for each
+    result (see save_wavepy_data).
+
+    Each result is keyed by a hash of CACHE_VERSION, of the name of the stage and of everything it depends on (arrays,
+    numbers, strings, lists, dictionaries and WavePyData): re-running the analysis with a change of one input
+    recalculates only the stages depending on it. Beyond max_size bytes, the least recently used results are deleted.
+    """
+    def __init__(self, cache_folder, max_size=2*1024**3):
+        self.__cache_folder = cache_folder
+        self.__max_size     = max_size
+
+        os.makedirs(self.__cache_folder, exist_ok=True)
+
+    @classmethod
+    def get_key(cls, stage_name, *inputs):
+        digest = hashlib.sha1(("v" + str(CACHE_VERSION) + ":" + stage_name).encode("utf-8"))
+
+        for value in inputs: _update_digest(digest, value)
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        file_name = self.__get_file_name(key)
+
+        try:
+            wavepy_data = load_wavepy_data(file_name)
+            os.utime(file_name) # the modification time marks the last use
+        except (OSError, ValueError, KeyError):
+            wavepy_data = None
+
+        return wavepy_data
+
+    def put(self, key, wavepy_data):
+        save_wavepy_data(self.__get_file_name(key), wavepy_data)
+
+        self.__evict()
+
+    def get_size(self):
+        return sum([size for _, size, _ in self.__get_entries()])
+
+    def clear(self):
+        for _, _, file_name in self.__get_entries(): os.remove(file_name)
+
+    def __get_file_name(self, key):
+        return os.path.join(self.__cache_folder, key + ".npz")
+
+    def __get_entries(self):
+        entries = []
+        for file_name in os.listdir(self.__cache_folder):
+            if file_name.endswith(".npz"):
+                file_name = os.path.join(self.__cache_folder, file_name)
+                try:
+                    file_stat = os.stat(file_name)
+                    entries.append((file_stat.st_mtime_ns, file_stat.st_size, file_name))
+                except OSError: pass # deleted meanwhile
+
+        return entries
+
+    def __evict(self):
+        entries    = sorted(self.__get_entries())
+        total_size = sum([size for _, size, _ in entries])
+
+        for _, size, file_name in entries:
+            if total_size <= self.__max_size: break
+
+            try: os.remove(file_name)
+            except OSError: pass
+
+            total_size -= size
+
+####################################
+# PRIVATE METHODS
+
+def __to_json(value):
+    if isinstance(value, np.generic): return value.item()
+    else: raise TypeError("Value can't be saved: " + str(type(value)))
+
+def _update_digest(digest, value):
+    if isinstance(value, np.generic): value = value.item()
+
+    if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+        digest.update(("array" + str(value.shape) + value.dtype.str).encode("utf-8"))
+        digest.update(np.ascontiguousarray(value))
+    elif isinstance(value, ScriptData):
+        _update_digest(digest, value.get_parameters())
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for name in sorted(value.keys()):
+            digest.update(repr(name).encode("utf-8"))
+            _update_digest(digest, value[name])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value: _update_digest(digest, item)
+        digest.update(b"]")
+    else:
+        digest.update(repr(value).encode("utf-8"))
@@ -0,0 +1,104 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+import json
+
+from aps.wavepy2.tools.common.stage_cache import save_wavepy_data, load_wavepy_data
+
+CHECKPOINTS_FOLDER = "checkpoints"
+MANIFEST_FILE      = "checkpoints.json"
+
+class StageCheckpoints():
+    """
+    Checkpoints of the results of the stages of an analysis, saved in the folder "checkpoints" of its output folder as
+    npz files (see save_wavepy_data), with a manifest of the completed stages in order of execution.
+
+    Each file is written atomically and the manifest is updated only after the result of the stage has been saved: after
+    a crash, the last stage in the manifest is the last one completed and its result can be loaded to resume the analysis.
+    """
+    def __init__(self, output_folder):
+        self.__checkpoints_folder = os.path.join(output_folder, CHECKPOINTS_FOLDER)
+
+        os.makedirs(self.__checkpoints_folder, exist_ok=True)
+
+    @classmethod
+    def exist(cls, output_folder):
+        return os.path.isfile(os.path.join(output_folder, CHECKPOINTS_FOLDER, MANIFEST_FILE))
+
+    def get_completed_stages(self):
+        try:
+            with open(self.__get_manifest_file_name(), "r") as file: return json.load(file)
+        except (OSError, ValueError):
+            return []
+
+    def save(self, stage_name, wavepy_data):
+        save_wavepy_data(self.__get_file_name(stage_name), wavepy_data)
+
+        completed_stages = self.get_completed_stages()
+        # a stage executed again (after a resume) invalidates the following ones
+        if stage_name in completed_stages: completed_stages = completed_stages[:completed_stages.index(stage_name)]
+        completed_stages.append(stage_name)
+
+        temporary_file_name = self.__get_manifest_file_name() + ".tmp"
+
+        with open(temporary_file_name, "w") as file: json.dump(completed_stages, file)
+        os.replace(temporary_file_name, self.__get_manifest_file_name())
+
+    def load(self, stage_name):
+        if not stage_name in self.get_completed_stages(): raise ValueError("Stage not completed: " + stage_name)
+
+        return load_wavepy_data(self.__get_file_name(stage_name))
+
+    def load_last(self):
+        completed_stages = self.get_completed_stages()
+
+        if len(completed_stages) == 0: return None, None
+        else: return completed_stages[-1], load_wavepy_data(self.__get_file_name(completed_stages[-1]))
+
+    def __get_file_name(self, stage_name):
+        return os.path.join(self.__checkpoints_folder, stage_name.replace(" ", "_") + ".npz")
+
+    def __get_manifest_file_name(self):
+        return os.path.join(self.__checkpoints_folder, MANIFEST_FILE)
@@ -42,7 +42,11 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
-from aps.wavepy2.util.plot.plotter import register_plotter_instance
+import sys
+
+from aps.wavepy2.util.plot.plotter import register_plotter_instance, get_registered_plotter_instance, get_deferred_plots_from_environment, DEFERRED_PLOTS_ENVIRONMENT_VARIABLE
+from aps.wavepy2.util.plot.background_rendering import get_rendering_workers_from_environment, RENDERING_WORKERS_ENVIRONMENT_VARIABLE
+from aps.wavepy2.util.common.profiling import profile_manager, get_profiling_mode_from_environment, PROFILING_MODES, PROFILING_ENVIRONMENT_VARIABLE
 
 from aps.common.scripts.generic_qt_script import GenericQTScript
 
@@ -50,4 +54,57 @@ class WavePyScript(GenericQTScript):
     def __init__(self, sys_argv=None, **kwargs): super(WavePyScript, self).__init__(sys_argv=sys_argv, **kwargs)
     def _get_script_package(self): return "aps.wavepy2.tools"
     def _register_plotter_instance(self, plotter_mode, application_name, **args):
-        register_plotter_instance(plotter_mode=plotter_mode, application_name=application_name)
+        register_plotter_instance(plotter_mode=plotter_mode, application_name=application_name, deferred_plots=args.get("DEFERRED_PLOTS", False), rendering_workers=args.get("RENDERING_WORKERS", 0))
+
+    def run_script(self):
+        # the scripts exit at the end of the run: the plots still rendering in the background are waited for
+        try:
+            result = super(WavePyScript, self).run_script()
+        except:
+            # the error of the script is raised, not the ones of the background rendering: these are printed
+            try:                   self.__flush_plots()
+            except Exception as e: print("Background rendering failed: " + str(e), file=sys.stderr)
+            raise
+
+        self.__flush_plots()
+
+        return result
+
+    def __flush_plots(self):
+        try:    plotter = get_registered_plotter_instance(application_name=self._get_application_name())
+        except: plotter = None
+        if not plotter is None: plotter.flush_plots()
+
+    def _parse_sys_arguments(self, sys_argv):
+        args = super(WavePyScript, self)._parse_sys_arguments(sys_argv)
+        args["PROFILING_MODE"] = get_profiling_mode_from_environment()
+        args["DEFERRED_PLOTS"] = get_deferred_plots_from_environment()
+        args["RENDERING_WORKERS"] = get_rendering_workers_from_environment()
+        if not sys_argv is None:
+            for sys_argument in sys_argv[2:]:
+                if   "-P" == sys_argument[:2]: args["PROFILING_MODE"] = int(sys_argument[2:])
+                elif "-D" == sys_argument[:2]: args["DEFERRED_PLOTS"] = int(sys_argument[2:]) == 1
+                elif "-R" == sys_argument[:2]: args["RENDERING_WORKERS"] = max(0, int(sys_argument[2:]))
+        self.__profiling_mode = args["PROFILING_MODE"]
+
+        return args
+
+    def _help_additional_parameters(self):
+        return "  -P<profiling mode> (or environment variable " + PROFILING_ENVIRONMENT_VARIABLE + ")\n\n" + \
+               "   profiling modes:\n" + \
+               "".join(["     " + str(mode) + " " + description + (" - Default value" if mode == 0 else "") + "\n" for mode, description in PROFILING_MODES.items()]) + "\n" + \
+               "  -D<deferred plots> (or environment variable " + DEFERRED_PLOTS_ENVIRONMENT_VARIABLE + ")\n\n" + \
+               "   plots built only on first display or when saved, from data reduced to the display resolution:\n" + \
+               "     0 No - Default value\n" + \
+               "     1 Yes\n\n" + \
+               "  -R<rendering workers> (or environment variable " + RENDERING_WORKERS_ENVIRONMENT_VARIABLE + ")\n\n" + \
+               "   with plotter mode 2 (Save Images Only), number of processes rendering and saving the heaviest figures\n" + \
+               "   while the calculation goes on, the run ends when all the figures are saved:\n" + \
+               "     0 No background rendering - Default value\n"
+
+    def _profile_manager(self, manager):
+        def get_save_file_prefix():
+            try:    return get_registered_plotter_instance(application_name=self._get_application_name()).get_save_file_prefix()
+            except: return None
+
+        return profile_manager(manager, mode=self.__profiling_mode, report_file_prefix=get_save_file_prefix)
@@ -76,29 +76,33 @@ class ErrorIntegration(WavePyWidget):
         midleX = xx.shape[0] // 2
         midleY = xx.shape[1] // 2
 
-        figure = Figure(figsize=(9, 6.4)) # 14, 10
-
-        ax1 = figure.add_subplot(221)
-        ax1.ticklabel_format(style='sci', axis='both', scilimits=(0, 1))
-        ax1.plot(xx[midleX, :], delx_f[midleX, :], '-kx', markersize=10, label='dx data')
-        ax1.plot(xx[midleX, :], grad_x[midleX, :], '-r+', markersize=10, label='dx reconstructed')
-        ax1.legend(loc=7)
+        # a 1D grating gives only one of the two components
+        n_columns = int(not delx_f is None) + int(not dely_f is None)
 
-        ax2 = figure.add_subplot(223, sharex=ax1)
-        ax2.plot(xx[midleX, :], error_x[midleX, :], '-g.', label='error x')
-        ax2.set_title(r'$\mu$ = {:.2g}'.format(np.mean(error_x[midleX, :])))
-        ax2.legend(loc=7)
+        figure = Figure(figsize=(9, 6.4)) # 14, 10
 
-        ax3 = figure.add_subplot(222, sharex=ax1, sharey=ax1)
-        ax3.plot(yy[:, midleY], dely_f[:, midleY], '-kx', markersize=10, label='dy data')
-        ax3.plot(yy[:, midleY], grad_y[:, midleY], '-r+', markersize=10, label='dy reconstructed')
-        ax3.legend(loc=7)
+        ax_data, ax_error = None, None
 
-        ax4 = figure.add_subplot(224, sharex=ax1, sharey=ax2)
-        ax4.plot(yy[:, midleY], error_y[:, midleY], '-g.', label='error y')
-        ax4.set_title(r'$\mu$ = {:.2g}'.format(np.mean(error_y[:, midleY])))
-        ax4.legend(loc=7)
+        if not delx_f is None:
+            ax_data, ax_error = self.__plot_component(figure, n_columns, 1, xx[midleX, :], delx_f[midleX, :], grad_x[midleX, :], error_x[midleX, :], "x")
+        if not dely_f is None:
+            self.__plot_component(figure, n_columns, n_columns, yy[:, midleY], dely_f[:, midleY], grad_y[:, midleY], error_y[:, midleY], "y", ax_data, ax_error)
 
         figure.suptitle('Error integration', fontsize=22)
 
         return figure
+
+    @classmethod
+    def __plot_component(cls, figure, n_columns, column, coord, del_f, grad, error, label, ax_data=None, ax_error=None):
+        ax1 = figure.add_subplot(2, n_columns, column, sharex=ax_data, sharey=ax_data)
+        if ax_data is None: ax1.ticklabel_format(style='sci', axis='both', scilimits=(0, 1))
+        ax1.plot(coord, del_f, '-kx', markersize=10, label='d' + label + ' data')
+        ax1.plot(coord, grad, '-r+', markersize=10, label='d' + label + ' reconstructed')
+        ax1.legend(loc=7)
+
+        ax2 = figure.add_subplot(2, n_columns, n_columns + column, sharex=ax1, sharey=ax_error)
+        ax2.plot(coord, error, '-g.', label='error ' + label)
+        ax2.set_title(r'$\mu$ = {:.2g}'.format(np.mean(error)))
+        ax2.legend(loc=7)
+
+        return ax1, ax2
@@ -42,10 +42,9 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
-import numpy as np
 from matplotlib.figure import Figure
 from matplotlib.patches import Rectangle
-from aps.wavepy2.util.common.common_tools import extent_func, is_empty_string
+from aps.wavepy2.util.common.common_tools import is_empty_string
 from aps.wavepy2.util.plot.plotter import WavePyWidget
 from aps.wavepy2.util.common import common_tools
 
@@ -55,6 +54,16 @@ class ExtractHarmonicPlot(WavePyWidget):
 
     def get_plot_tab_name(self): return self.__image_name + "Extract Harmonic " + self.__harmonic_name
 
+    @classmethod
+    def get_deferred_tab_name(cls, **kwargs):
+        harmonic_ij = kwargs["harmonic_ij"]
+        image_name  = kwargs["image_name"]
+
+        return ("" if is_empty_string(image_name) else image_name + ": ") + "Extract Harmonic " + harmonic_ij[0] + harmonic_ij[1]
+
+    @classmethod
+    def get_deferred_size(cls, **kwargs): return cls._get_figure_widget_size((8, 7), **kwargs)
+
     def build_widget(self, **kwargs):
         harmonic_ij = kwargs["harmonic_ij"]
         image_name  = kwargs["image_name"]
@@ -66,18 +75,16 @@ class ExtractHarmonicPlot(WavePyWidget):
         super(ExtractHarmonicPlot, self).build_widget(**kwargs)
 
     def build_mpl_figure(self, **kwargs):
-        intensity   = kwargs["intensity"]
+        spectrum    = kwargs["spectrum"]
         idxPeak_ij  = kwargs["idxPeak_ij"]
         nColumns    = kwargs["nColumns"]
         nRows       = kwargs["nRows"]
         periodHor   = kwargs["periodHor"]
         periodVert  = kwargs["periodVert"]
 
-
-
         figure = Figure(figsize=(8, 7))
         ax = figure.subplots(1, 1)
-        ax.imshow(np.log10(intensity), cmap='inferno', extent=extent_func(intensity))
+        ax.imshow(spectrum.get_log_magnitude(), cmap='inferno', extent=spectrum.get_extent())
 
         ax.set_xlabel('Pixels')
         ax.set_ylabel('Pixels')
@@ -42,9 +42,8 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
-import numpy as np
 from matplotlib.figure import Figure
-from aps.wavepy2.util.common.common_tools import extent_func, get_idxPeak_ij, is_empty_string
+from aps.wavepy2.util.common.common_tools import get_idxPeak_ij, is_empty_string
 from aps.wavepy2.util.plot.plotter import WavePyWidget
 from aps.wavepy2.util.common import common_tools
 
@@ -54,6 +53,15 @@ class HarmonicGridPlot(WavePyWidget):
 
     def get_plot_tab_name(self): return self.__image_name + "Harmonic Grid"
 
+    @classmethod
+    def get_deferred_tab_name(cls, **kwargs):
+        image_name = kwargs["image_name"]
+
+        return ("" if is_empty_string(image_name) else image_name + ": ") + "Harmonic Grid"
+
+    @classmethod
+    def get_deferred_size(cls, **kwargs): return cls._get_figure_widget_size((8, 7), **kwargs)
+
     def build_widget(self, **kwargs):
         image_name        = kwargs["image_name"]
         self.__image_name = "" if is_empty_string(image_name) else image_name + ": "
@@ -62,10 +70,10 @@ class HarmonicGridPlot(WavePyWidget):
         super(HarmonicGridPlot, self).build_widget(**kwargs)
 
     def build_mpl_figure(self, **kwargs):
-        imgFFT         = kwargs["imgFFT"]
+        spectrum       = kwargs["spectrum"]
         harmonicPeriod = kwargs["harmonicPeriod"]
 
-        (nRows, nColumns) = imgFFT.shape
+        (nRows, nColumns) = spectrum.get_shape()
 
         periodVert = harmonicPeriod[0]
         periodHor = harmonicPeriod[1]
@@ -76,8 +84,7 @@ class HarmonicGridPlot(WavePyWidget):
 
         figure = Figure(figsize=(8, 7))
         ax = figure.subplots(1, 1)
-        ax.imshow(np.log10(np.abs(imgFFT)), cmap='inferno',
-                   extent=extent_func(imgFFT))
+        ax.imshow(spectrum.get_log_magnitude(), cmap='inferno', extent=spectrum.get_extent())
 
         ax.set_xlabel('Pixels')
         ax.set_ylabel('Pixels')
@@ -42,9 +42,8 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
-import numpy as np
 from matplotlib.figure import Figure
-from aps.wavepy2.util.common.common_tools import get_idxPeak_ij, is_empty_string
+from aps.wavepy2.util.common.common_tools import is_empty_string
 from aps.wavepy2.util.plot.plotter import WavePyWidget
 from aps.wavepy2.util.common import common_tools
 
@@ -54,6 +53,15 @@ class HarmonicPeakPlot(WavePyWidget):
 
     def get_plot_tab_name(self): return self.__image_name + "Harmonic Peak"
 
+    @classmethod
+    def get_deferred_tab_name(cls, **kwargs):
+        image_name = kwargs["image_name"]
+
+        return ("" if is_empty_string(image_name) else image_name + ": ") + "Harmonic Peak"
+
+    @classmethod
+    def get_deferred_size(cls, **kwargs): return cls._get_figure_widget_size((8, 7), **kwargs)
+
     def build_widget(self, **kwargs):
         image_name        = kwargs["image_name"]
         self.__image_name = "" if is_empty_string(image_name) else image_name + ": "
@@ -62,31 +70,19 @@ class HarmonicPeakPlot(WavePyWidget):
         super(HarmonicPeakPlot, self).build_widget(**kwargs)
 
     def build_mpl_figure(self, **kwargs):
-        imgFFT         = kwargs["imgFFT"]
-        harmonicPeriod = kwargs["harmonicPeriod"]
-
-        (nRows, nColumns) = imgFFT.shape
+        spectrum = kwargs["spectrum"]
 
-        periodVert = harmonicPeriod[0]
-        periodHor = harmonicPeriod[1]
-
-        # adjusts for 1D grating
-        if periodVert <= 0 or periodVert is None: periodVert = nRows
-        if periodHor <= 0 or periodHor is None: periodHor = nColumns
+        profiles_01, profiles_10 = spectrum.get_peak_profiles()
 
         figure = Figure(figsize=(8, 7))
 
         ax1 = figure.add_subplot(121)
         ax2 = figure.add_subplot(122)
 
-        idxPeak_ij = get_idxPeak_ij(0, 1, nRows, nColumns, periodVert, periodHor)
-
-        for i in range(-5, 5): ax1.plot(np.abs(imgFFT[idxPeak_ij[0] - 100 : idxPeak_ij[0] + 100, idxPeak_ij[1]-i]), lw=2, label='01 Vert ' + str(i))
+        for i, profile in zip(range(-5, 5), profiles_01): ax1.plot(profile, lw=2, label='01 Vert ' + str(i))
         ax1.grid()
 
-        idxPeak_ij = get_idxPeak_ij(1, 0, nRows, nColumns, periodVert, periodHor)
-
-        for i in range(-5, 5): ax2.plot(np.abs(imgFFT[idxPeak_ij[0]-i, idxPeak_ij[1] - 100 : idxPeak_ij[1] + 100]), lw=2, label='10 Horz ' + str(i))
+        for i, profile in zip(range(-5, 5), profiles_10): ax2.plot(profile, lw=2, label='10 Horz ' + str(i))
         ax2.grid()
 
         ax1.set_xlabel('Pixels')
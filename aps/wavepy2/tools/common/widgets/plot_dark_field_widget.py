@@ -65,9 +65,12 @@ class PlotDarkField(WavePyWidget):
         darkField10 = kwargs["darkField10"]
         pixelsize   = kwargs["pixelsize"]
 
-        factor, unit_xy = common_tools.choose_unit(np.sqrt(darkField01.size) * pixelsize[0])
+        # 1D gratings: one of the two components is None
+        plots = [(img, title) for img, title in [(darkField01, "Horizontal"), (darkField10, "Vertical")] if not img is None]
 
-        figure = Figure(figsize=(14, 6))
+        factor, unit_xy = common_tools.choose_unit(np.sqrt(plots[0][0].size) * pixelsize[0])
+
+        figure = Figure(figsize=(7*len(plots), 6))
 
         def create_plot(ax, img, title):
             im = ax.imshow(img,
@@ -79,8 +82,7 @@ class PlotDarkField(WavePyWidget):
             figure.colorbar(im, shrink=0.5)
             ax.set_title(title, fontsize=18, weight='bold')
 
-        create_plot(figure.add_subplot(1, 2, 1), darkField01, "Horizontal")
-        create_plot(figure.add_subplot(1, 2, 2), darkField10, "Vertical")
+        for index, (img, title) in enumerate(plots): create_plot(figure.add_subplot(1, len(plots), index + 1), img, title)
 
         figure.suptitle('Dark Field', fontsize=18, weight='bold')
         figure.tight_layout(rect=[0, 0, 1, 1])
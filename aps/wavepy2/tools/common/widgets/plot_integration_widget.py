@@ -21,15 +21,30 @@ from aps.wavepy2.tools.common.widgets.plot_profile_widget import PlotProfileWidg
 from warnings import filterwarnings
 filterwarnings("ignore")
 
+DEFAULT_TITLE = "Frankot-Chellappa Integration Result"
+
 class PlotIntegration(WavePyWidget):
     def __init__(self, parent=None, application_name=None, **kwargs):
         WavePyWidget.__init__(self, parent=parent, application_name=application_name)
 
     def get_plot_tab_name(self): return self.__title
 
+    @classmethod
+    def get_background_render_data(cls, **kwargs):
+        # the numbered file names are taken now, in the order of the calculation, not when the figures are saved
+        kwargs["figure_file_names"] = cls.__get_figure_file_names(kwargs.get("title", DEFAULT_TITLE), kwargs.get("output_dir", ""), reserve=True)
+
+        return kwargs
+
+    @classmethod
+    def __get_figure_file_names(cls, title, output_dir, reserve=False):
+        file_name = common_tools.to_filename_format(title)
+
+        return [(common_tools.reserve_unique_filename if reserve else common_tools.get_unique_filename)(output_dir + f"{file_name}_{i}", extension="png") for i in range(1, 5)]
+
     def build_widget(self, **kwargs):
         try: self.__title = kwargs["title"]
-        except: self.__title = "Frankot-Chellappa Integration Result"
+        except: self.__title = DEFAULT_TITLE
 
         data              = kwargs["data"]
         pixelsize         = kwargs["pixelsize"]
@@ -88,12 +103,12 @@ class PlotIntegration(WavePyWidget):
 
         figure_1_widget = FigureCanvas(figure1)
 
-        file_name  = common_tools.to_filename_format(self.__title)
-        output_dir = kwargs.get("output_dir", "")
+        figure_file_names = kwargs.get("figure_file_names", None)
+        if figure_file_names is None: figure_file_names = self.__get_figure_file_names(self.__title, kwargs.get("output_dir", ""))
 
-        self.append_mpl_figure_to_save(figure1, figure_file_name=common_tools.get_unique_filename(output_dir + f"{file_name}_1", extension="png"))
-        self.append_mpl_figure_to_save(figure2, figure_file_name=common_tools.get_unique_filename(output_dir + f"{file_name}_2", extension="png"))
-        self.append_mpl_figure_to_save(figure3, figure_file_name=common_tools.get_unique_filename(output_dir + f"{file_name}_3", extension="png"))
+        self.append_mpl_figure_to_save(figure1, figure_file_name=figure_file_names[0])
+        self.append_mpl_figure_to_save(figure2, figure_file_name=figure_file_names[1])
+        self.append_mpl_figure_to_save(figure3, figure_file_name=figure_file_names[2])
 
         plot_profile_widget = PlotProfileWidget(self,
                                                 xmatrix=xxGrid * factor_x,
@@ -116,7 +131,7 @@ class PlotIntegration(WavePyWidget):
         cbar = figure4.colorbar(im)
         cbar.ax.set_title(ctitle, y=1.01)
 
-        self.append_mpl_figure_to_save(figure4, figure_file_name=common_tools.get_unique_filename(output_dir + f"{file_name}_4", extension="png"))
+        self.append_mpl_figure_to_save(figure4, figure_file_name=figure_file_names[3])
 
         figure_4_widget = FigureCanvas(figure4)
 
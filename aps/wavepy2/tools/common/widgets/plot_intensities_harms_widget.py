@@ -70,9 +70,12 @@ class PlotIntensitiesHarms(WavePyWidget):
         int10     = kwargs["int10"]
         pixelsize = kwargs["pixelsize"]
 
+        # 1D gratings: one of the harmonics 01, 10 is None
+        plots = [(img, title) for img, title in [(int00, "00"), (int01, "01"), (int10, "10")] if not img is None]
+
         factor, unit_xy = common_tools.choose_unit(np.sqrt(int00.size) * pixelsize[0])
 
-        figure = Figure(figsize=(14, 6))
+        figure = Figure(figsize=(14 if len(plots) == 3 else 10, 6))
 
         def create_plot(ax, img, title):
             im = ax.imshow(img, cmap='viridis',
@@ -83,9 +86,7 @@ class PlotIntensitiesHarms(WavePyWidget):
             figure.colorbar(im, shrink=0.5)
             ax.set_title(title, fontsize=18, weight='bold')
 
-        create_plot(figure.add_subplot(1, 3, 1), int00, "00")
-        create_plot(figure.add_subplot(1, 3, 2), int01, "01")
-        create_plot(figure.add_subplot(1, 3, 3), int10, "10")
+        for index, (img, title) in enumerate(plots): create_plot(figure.add_subplot(1, len(plots), index + 1), img, title)
 
         figure.suptitle('Absorption obtained from the Harmonics' + self.__title, fontsize=18, weight='bold')
         figure.tight_layout(rect=[0, 0, 1, 1])
@@ -54,6 +54,15 @@ class SingleGratingHarmonicImages(WavePyWidget):
 
     def get_plot_tab_name(self): return self.__image_name + "Intensity in Fourier Space"
 
+    @classmethod
+    def get_deferred_tab_name(cls, **kwargs):
+        image_name = kwargs["image_name"]
+
+        return ("" if is_empty_string(image_name) else image_name + ": ") + "Intensity in Fourier Space"
+
+    @classmethod
+    def get_deferred_size(cls, **kwargs): return cls._get_figure_widget_size((14, 5), **kwargs)
+
     def build_widget(self, **kwargs):
         image_name = kwargs["image_name"]
         self.__image_name = "" if is_empty_string(image_name) else image_name + ": "
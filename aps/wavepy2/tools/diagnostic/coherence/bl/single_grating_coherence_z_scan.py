@@ -43,18 +43,28 @@
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
 import numpy as np
+import time
+import os
+import glob
+from functools import partial
 
 from aps.wavepy2.util.common import common_tools
-from aps.wavepy2.util.common.common_tools import hc, FourierTransform
+from aps.wavepy2.util.common.common_tools import hc, FourierTransform, PATH_SEPARATOR
+from aps.wavepy2.util.common.executors import create_executor, SERIAL, PROCESS_POOL
+from aps.wavepy2.util.common.progress import ProgressMonitor
+from aps.wavepy2.util.plot.progress_bar import QtProgressBar
 from aps.common.logger import get_registered_logger_instance, get_registered_secondary_logger, register_secondary_logger, LoggerMode
 from aps.wavepy2.util.plot.plotter import get_registered_plotter_instance
 from aps.wavepy2.util.plot.plot_tools import PlottingProperties
 from aps.common.initializer import get_registered_ini_instance
-from aps.common.io.tiff_file import read_tiff
 
 from aps.wavepy2.tools.common.wavepy_data import WavePyData
 
-from aps.wavepy2.tools.common.bl import grating_interferometry
+from aps.wavepy2.core import harmonic_analysis
+from aps.wavepy2.core.coherence_z_scan import APPLICATION_NAME, NO_AVERAGE, REAL_SPACE_AVERAGE, FOURIER_MAGNITUDE_AVERAGE, get_exposure_groups, read_average_image, \
+    get_image_name, is_failed, run_calculation_with_retries, run_batch_calculation_with_retries
+from aps.wavepy2.tools.diagnostic.coherence.bl.visibility_result_store import VisibilityResultStore
+from aps.wavepy2.core import coherence_fit
 from aps.wavepy2.tools.common.bl import crop_image
 from aps.common.scripts.generic_process_manager import GenericProcessManager
 
@@ -65,14 +75,22 @@ from aps.wavepy2.tools.common.widgets.show_cropped_figure_widget import ShowCrop
 from aps.wavepy2.tools.diagnostic.coherence.widgets.sgz_input_parameters_widget import SGZInputParametersWidget, SGZInputParametersDialog, generate_initialization_parameters_sgz, PATTERNS, ZVEC_FROM
 from aps.wavepy2.tools.diagnostic.coherence.widgets.visibility_widget import VisibilityPlot
 from aps.wavepy2.tools.diagnostic.coherence.widgets.fit_period_vs_z_widget import FitPeriodVsZPlot
+from aps.wavepy2.tools.diagnostic.coherence.widgets.coherence_map_widget import CoherenceMapPlot
+
+# kept for compatibility with the previous threading modes
+SINGLE_THREAD = SERIAL
+MULTI_THREAD  = PROCESS_POOL
 
-SINGLE_THREAD = 0
-MULTI_THREAD = 1
+ABORT_ON_FAILURE   = 0
+SKIP_FAILED_FRAMES = 1
+
+DEFAULT_MAX_RETRIES = 1
 
 class SingleGratingCoherenceZScanFacade(GenericProcessManager):
     def draw_initialization_parameters_widget(self, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
     def get_initialization_parameters(self, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
-    def manager_initialization(self, initialization_parameters, script_logger_mode=LoggerMode.FULL, show_fourier=False): raise NotImplementedError()
+    def manager_initialization(self, initialization_parameters, script_logger_mode=LoggerMode.FULL, show_fourier=False, use_result_cache=True, averaging_mode=NO_AVERAGE, adaptive_stride=1, adaptive_threshold=0.25, tiles=None,
+                               max_retries=DEFAULT_MAX_RETRIES, failure_policy=SKIP_FAILED_FRAMES, exposure_std=False, n_starts=1): raise NotImplementedError()
 
     def draw_crop_initial_image(self, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
     def crop_initial_image(self, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
@@ -81,23 +99,30 @@ class SingleGratingCoherenceZScanFacade(GenericProcessManager):
 
     def calculate_harmonic_periods(self, initial_crop_parameters, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
     def run_calculation(self, harm_periods_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
+    def run_live_calculation(self, harm_periods_result, initialization_parameters, poll_interval=2.0, idle_timeout=60.0, fit_interval=10.0): raise NotImplementedError()
     def fit_period(self, run_calculation_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
     def fit_visibility(self, fit_period_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
+    def fit_coherence_maps(self, fit_period_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
 
-def create_single_grating_coherence_z_scan_manager(mode=MULTI_THREAD, n_cpus=None):
-    return _SingleGratingCoherenceZScanMultiThread(n_cpus) if mode == MULTI_THREAD else _SingleGratingCoherenceZScanSingleThread()
-
-APPLICATION_NAME = "Single Grating Z Scan"
+def create_single_grating_coherence_z_scan_manager(mode=PROCESS_POOL, n_cpus=None, batch_size=1):
+    return _SingleGratingCoherenceZScan(create_executor(mode, n_cpus), batch_size)
 
 INITIALIZATION_PARAMETERS_KEY          = APPLICATION_NAME + " Initialization"
 CALCULATE_HARMONIC_PERIODS_CONTEXT_KEY = "Calculate Harmonic Periods"
 RUN_CALCULATION_CONTEXT_KEY            = "Run Calculation"
 FIT_PERIOD_CONTEXT_KEY     = "Fit Period"
 FIT_VISIBILITY_CONTEXT_KEY    = "Fit Visibility"
+FIT_COHERENCE_MAPS_CONTEXT_KEY = "Fit Coherence Maps"
 
-class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
+RESULT_STORE_SUFFIX         = "_visibility_cache.sqlite"
+FAILED_FRAMES_REPORT_SUFFIX = "_failed_frames.csv"
+PROGRESS_SUFFIX             = "_progress.jsonl"
 
-    def __init__(self):
+class _SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
+
+    def __init__(self, executor, batch_size=1):
+        self.__executor   = executor
+        self.__batch_size = batch_size
         self.reload_utils()
 
     def reload_utils(self):
@@ -149,8 +174,18 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
 
         return initialization_parameters
 
-    def manager_initialization(self, initialization_parameters, script_logger_mode=LoggerMode.FULL, show_fourier=False):
+    def manager_initialization(self, initialization_parameters, script_logger_mode=LoggerMode.FULL, show_fourier=False, use_result_cache=True, averaging_mode=NO_AVERAGE, adaptive_stride=1, adaptive_threshold=0.25, tiles=None,
+                               max_retries=DEFAULT_MAX_RETRIES, failure_policy=SKIP_FAILED_FRAMES, exposure_std=False, n_starts=1):
         initialization_parameters.set_parameter("show_fourier", show_fourier)
+        initialization_parameters.set_parameter("use_result_cache", use_result_cache)
+        initialization_parameters.set_parameter("averaging_mode", averaging_mode)
+        initialization_parameters.set_parameter("adaptive_stride", adaptive_stride)
+        initialization_parameters.set_parameter("adaptive_threshold", adaptive_threshold)
+        initialization_parameters.set_parameter("tiles", tiles)
+        initialization_parameters.set_parameter("max_retries", max_retries)
+        initialization_parameters.set_parameter("failure_policy", failure_policy)
+        initialization_parameters.set_parameter("exposure_std", exposure_std)
+        initialization_parameters.set_parameter("n_starts", n_starts)
 
         self.__plotter.register_save_file_prefix(initialization_parameters.get_parameter("saveFileSuf"))
 
@@ -288,21 +323,21 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
 
         self._main_logger.print_message('MESSAGE: Obtain harmonic 10 experimentally')
 
-        (period_harm_Vert, _) = grating_interferometry.exp_harm_period(img,
-                                                                       [period_harm_Vert, period_harm_Horz],
-                                                                       harmonic_ij=['1', '0'],
-                                                                       searchRegion=40,
-                                                                       isFFT=False,
-                                                                       logger=self._main_logger)
+        (period_harm_Vert, _) = harmonic_analysis.exp_harm_period(img,
+                                                                  [period_harm_Vert, period_harm_Horz],
+                                                                  harmonic_ij=['1', '0'],
+                                                                  searchRegion=40,
+                                                                  isFFT=False,
+                                                                  logger=self._main_logger)
 
         self._main_logger.print_message('Obtain harmonic 01 experimentally')
 
-        (_, period_harm_Horz) = grating_interferometry.exp_harm_period(img,
-                                                                       [period_harm_Vert, period_harm_Horz],
-                                                                       harmonic_ij=['0', '1'],
-                                                                       searchRegion=40,
-                                                                       isFFT=False,
-                                                                       logger=self._main_logger)
+        (_, period_harm_Horz) = harmonic_analysis.exp_harm_period(img,
+                                                                  [period_harm_Vert, period_harm_Horz],
+                                                                  harmonic_ij=['0', '1'],
+                                                                  searchRegion=40,
+                                                                  isFFT=False,
+                                                                  logger=self._main_logger)
 
         dataFolder = initialization_parameters.get_parameter("dataFolder")
         startDist = initialization_parameters.get_parameter("startDist")
@@ -346,7 +381,10 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
         idx4crop         = harm_periods_result.get_parameter("idx4crop")
         darkMeanValue    = harm_periods_result.get_parameter("darkMeanValue")
 
-        show_fourier    = initialization_parameters.get_parameter("show_fourier", False)
+        show_fourier     = initialization_parameters.get_parameter("show_fourier", False)
+        averaging_mode   = initialization_parameters.get_parameter("averaging_mode", NO_AVERAGE)
+        exposure_std     = initialization_parameters.get_parameter("exposure_std", False) and averaging_mode != NO_AVERAGE
+        tiles            = initialization_parameters.get_parameter("tiles", None)
         listOfDataFiles = initialization_parameters.get_parameter("listOfDataFiles")
         zvec            = initialization_parameters.get_parameter("zvec")
         sourceDistanceV = initialization_parameters.get_parameter("sourceDistanceV")
@@ -363,56 +401,237 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
                                                            context_window=plotting_properties.get_context_widget(),
                                                            use_unique_id=use_unique_id)
 
-        result = self._get_calculation_result(period_harm_Vert,
-                                              period_harm_Horz,
-                                              idx4crop,
-                                              darkMeanValue,
-                                              listOfDataFiles,
-                                              zvec,
-                                              sourceDistanceV,
-                                              sourceDistanceH,
-                                              unFilterSize,
-                                              searchRegion,
-                                              np.min(zvec))
+        min_zvec = np.min(zvec)
+
+        # one calculation for each z position: the repeated exposures are averaged together, if requested
+        exposure_groups = get_exposure_groups(zvec, averaging_mode)
+        zvec_points     = np.array([zvec[group[0]] for group in exposure_groups])
+
+        if averaging_mode != NO_AVERAGE: self._main_logger.print_message("Averaging " + str(len(zvec)) + " exposures on " + str(len(zvec_points)) + " z positions")
+
+        parameters = []
+        for i in range(len(exposure_groups)):
+            harmonicPeriod = [int(period_harm_Vert / (sourceDistanceV + zvec_points[i]) * (sourceDistanceV + min_zvec)),
+                              int(period_harm_Horz / (sourceDistanceH + zvec_points[i]) * (sourceDistanceH + min_zvec))]
+
+            parameters.append([i,
+                               [listOfDataFiles[j] for j in exposure_groups[i]],
+                               zvec_points[i],
+                               darkMeanValue,
+                               idx4crop,
+                               harmonicPeriod,
+                               searchRegion,
+                               unFilterSize,
+                               averaging_mode,
+                               exposure_std,
+                               tiles,
+                               show_fourier])
+
+        if initialization_parameters.get_parameter("adaptive_stride", 1) > 1 and len(parameters) > 2:
+            calculated_indexes, result = self.__calculate_adaptive(parameters, initialization_parameters, sample_img)
+
+            parameters  = [parameters[i] for i in calculated_indexes]
+            zvec_points = zvec_points[calculated_indexes]
+        else:
+            result = self.__calculate(parameters, initialization_parameters)
+
+        calculated_indexes = self.__check_failed_frames(result, initialization_parameters)
+
+        parameters  = [parameters[i] for i in calculated_indexes]
+        result      = [result[i] for i in calculated_indexes]
+        zvec_points = zvec_points[calculated_indexes]
 
         if show_fourier:
             for i in range(len(result)):
-                imgFFT         = FourierTransform.fft2d(result[i]["img"])
                 harmonicPeriod = result[i]["harmonicPeriod"]
                 image_name     = result[i]["image_name"]
 
+                # the thumbnail is calculated by the workers, the frames from the result cache only are transformed here
+                if "spectrum" in result[i]: spectrum = result[i]["spectrum"]
+                else: spectrum = harmonic_analysis.SpectrumThumbnail(FourierTransform.fft2d(read_average_image(parameters[i][1], darkMeanValue, idx4crop)), harmonicPeriod)
+
                 self.__plotter.push_plot_on_context(RUN_CALCULATION_CONTEXT_KEY, HarmonicGridPlot, unique_id,
-                                                    imgFFT=imgFFT, harmonicPeriod=harmonicPeriod, image_name=image_name, allows_saving=False, **kwargs)
+                                                    spectrum=spectrum, harmonicPeriod=harmonicPeriod, image_name=image_name, allows_saving=False, **kwargs)
                 self.__plotter.push_plot_on_context(RUN_CALCULATION_CONTEXT_KEY, HarmonicPeakPlot, unique_id,
-                                                    imgFFT=imgFFT, harmonicPeriod=harmonicPeriod, image_name=image_name, allows_saving=False, **kwargs)
+                                                    spectrum=spectrum, harmonicPeriod=harmonicPeriod, image_name=image_name, allows_saving=False, **kwargs)
 
         self.__plotter.draw_context(RUN_CALCULATION_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
 
-        return WavePyData(res=[res_i["visib_1st_harmonics"] for res_i in result], img=sample_img)
+        return WavePyData(res=[res_i["visib_1st_harmonics"] for res_i in result],
+                          contrastV=np.asarray([res_i["visib_1st_harmonics"][0] for res_i in result]),
+                          contrastH=np.asarray([res_i["visib_1st_harmonics"][1] for res_i in result]),
+                          p0=np.asarray([res_i["visib_1st_harmonics"][2] for res_i in result]),
+                          pv=np.asarray([res_i["visib_1st_harmonics"][3] for res_i in result]),
+                          ph=np.asarray([res_i["visib_1st_harmonics"][4] for res_i in result]),
+                          res_std=[res_i["visibility_std"] for res_i in result] if exposure_std else None,
+                          visibilityV_tiles=None if tiles is None else np.asarray([res_i["visibility_tiles"][0] for res_i in result]),
+                          visibilityH_tiles=None if tiles is None else np.asarray([res_i["visibility_tiles"][1] for res_i in result]),
+                          zvec=zvec_points,
+                          img=sample_img)
+
+    # %% ==================================================================================================
+
+    def run_live_calculation(self, harm_periods_result, initialization_parameters, poll_interval=2.0, idle_timeout=60.0, fit_interval=10.0):
+        """
+        Watches the data folder and calculates each new frame as soon as it is completely written, while the scan is
+        still running. Period and visibility fits are updated every fit_interval seconds, warm-started from the previous
+        ones, and logged and appended to <prefix>_live_fit.csv. The watch ends when no new frames arrive for idle_timeout
+        seconds (or on Ctrl-C), and returns the same data of run_calculation.
+        """
+        period_harm_Vert = harm_periods_result.get_parameter("period_harm_Vert")
+        period_harm_Horz = harm_periods_result.get_parameter("period_harm_Horz")
+        sample_img       = harm_periods_result.get_parameter("img")
+        idx4crop         = harm_periods_result.get_parameter("idx4crop")
+        darkMeanValue    = harm_periods_result.get_parameter("darkMeanValue")
+
+        dataFolder       = initialization_parameters.get_parameter("dataFolder")
+        file_prefix      = initialization_parameters.get_parameter("file_prefix")
+        saveFileSuf      = initialization_parameters.get_parameter("saveFileSuf")
+        zvec_from        = initialization_parameters.get_parameter("zvec_from")
+        zvec_file        = initialization_parameters.get_parameter("zvec_file")
+        startDist        = initialization_parameters.get_parameter("startDist")
+        step_z_scan      = initialization_parameters.get_parameter("step_z_scan")
+        image_per_point  = initialization_parameters.get_parameter("image_per_point")
+        strideFile       = initialization_parameters.get_parameter("strideFile")
+        sourceDistanceV  = initialization_parameters.get_parameter("sourceDistanceV")
+        sourceDistanceH  = initialization_parameters.get_parameter("sourceDistanceH")
+        unFilterSize     = initialization_parameters.get_parameter("unFilterSize")
+        searchRegion     = initialization_parameters.get_parameter("searchRegion")
+
+        if zvec_from == ZVEC_FROM[0]: get_z = lambda k : startDist + step_z_scan*(k // image_per_point)
+        else:
+            zvec_table = np.loadtxt(zvec_file)*1e-3
+            get_z = lambda k : zvec_table[k] if k < len(zvec_table) else None
+
+        # the harmonic periods are scaled from the minimum z of the scan, as in run_calculation (of the frames available
+        # at the start, for a descending scan still running)
+        zvec_start  = initialization_parameters.get_parameter("zvec")
+        reference_z = np.min(zvec_start) if len(zvec_start) > 0 else get_z(0)
+
+        self._main_logger.print_message("Live mode: watching " + dataFolder + PATH_SEPARATOR + file_prefix + "*.tif (Ctrl-C to stop)")
+
+        processed_files = set()
+        file_sizes      = {}
+        results         = []
+        failed_results  = []
+        fit_state       = {"V" : None, "H" : None}
+        n_fitted        = 0
+        last_new_frame  = time.time()
+        last_fit        = 0.0
+
+        # workers and progress monitor are kept for the whole watch, the frames arrive a few at a time
+        progress_monitor = self.__create_progress_monitor(0, initialization_parameters, show_progress_bar=False)
+
+        try:
+            self.__executor.open()
+
+            while time.time() - last_new_frame < idle_timeout:
+                listOfDataFiles = sorted(glob.glob(dataFolder + PATH_SEPARATOR + file_prefix + "*.tif"))
+
+                parameters = []
+                for k, data_file in enumerate(listOfDataFiles):
+                    if data_file in processed_files: continue
+
+                    # a file is complete when its size did not change since the previous poll
+                    file_size = os.path.getsize(data_file)
+                    if file_size == 0 or file_sizes.get(data_file) != file_size:
+                        file_sizes[data_file] = file_size
+                        continue
+
+                    processed_files.add(data_file)
+
+                    zvec_k = get_z(k)
+                    if k % strideFile != 0 or zvec_k is None: continue
+
+                    parameters.append([k,
+                                       [data_file],
+                                       zvec_k,
+                                       darkMeanValue,
+                                       idx4crop,
+                                       [int(period_harm_Vert / (sourceDistanceV + zvec_k) * (sourceDistanceV + reference_z)),
+                                        int(period_harm_Horz / (sourceDistanceH + zvec_k) * (sourceDistanceH + reference_z))],
+                                       searchRegion,
+                                       unFilterSize,
+                                       NO_AVERAGE,
+                                       False,
+                                       None,
+                                       False])
+
+                if len(parameters) > 0:
+                    progress_monitor.add_tasks(len(parameters))
+
+                    for parameters_i, result_i in zip(parameters, self.__calculate(parameters, initialization_parameters, progress_monitor=progress_monitor)):
+                        if is_failed(result_i):
+                            self._main_logger.print_warning("Live mode: frame " + str(parameters_i[0]) + " skipped (" + result_i["error"] + ")")
+                            failed_results.append(result_i)
+                        else:
+                            results.append((parameters_i[2], result_i))
+
+                    last_new_frame = time.time()
+
+                if len(results) > n_fitted and time.time() - last_fit >= fit_interval:
+                    self.__live_fit(results, sample_img, initialization_parameters, fit_state, saveFileSuf + "_live_fit.csv")
+
+                    n_fitted = len(results)
+                    last_fit = time.time()
+
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self._main_logger.print_message("Live mode: stopped by user")
+        finally:
+            self.__executor.close()
+            progress_monitor.close()
+
+        self._main_logger.print_message("Live mode: " + str(len(results)) + " frames calculated")
+
+        self.__check_failed_frames(failed_results, initialization_parameters)
+
+        results.sort(key=lambda x: x[0])
+
+        zvec   = np.array([x[0] for x in results])
+        result = [x[1] for x in results]
+
+        return WavePyData(res=[res_i["visib_1st_harmonics"] for res_i in result],
+                          contrastV=np.asarray([res_i["visib_1st_harmonics"][0] for res_i in result]),
+                          contrastH=np.asarray([res_i["visib_1st_harmonics"][1] for res_i in result]),
+                          p0=np.asarray([res_i["visib_1st_harmonics"][2] for res_i in result]),
+                          pv=np.asarray([res_i["visib_1st_harmonics"][3] for res_i in result]),
+                          ph=np.asarray([res_i["visib_1st_harmonics"][4] for res_i in result]),
+                          res_std=None,
+                          zvec=zvec,
+                          img=sample_img)
 
     # %% ==================================================================================================
 
     def fit_period(self, run_calculation_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
         img       = run_calculation_result.get_parameter("img")
         res       = run_calculation_result.get_parameter("res")
+        res_std   = run_calculation_result.get_parameter("res_std", None)
+        zvec      = run_calculation_result.get_parameter("zvec", default_value=initialization_parameters.get_parameter("zvec"))
 
         pixelsize = initialization_parameters.get_parameter("pixelsize")
-        zvec      = initialization_parameters.get_parameter("zvec")
 
         kwargs["output_dir"] = initialization_parameters.get_parameter("outFolder")
 
-        contrastV = np.asarray([x[0] for x in res])
-        contrastH = np.asarray([x[1] for x in res])
+        contrastV = run_calculation_result.get_parameter("contrastV", default_value=np.asarray([x[0] for x in res]))
+        contrastH = run_calculation_result.get_parameter("contrastH", default_value=np.asarray([x[1] for x in res]))
 
-        p0 = np.asarray([x[2] for x in res])
-        pv = np.asarray([x[3] for x in res])
-        ph = np.asarray([x[4] for x in res])
+        p0 = run_calculation_result.get_parameter("p0", default_value=np.asarray([x[2] for x in res]))
+        pv = run_calculation_result.get_parameter("pv", default_value=np.asarray([x[3] for x in res]))
+        ph = run_calculation_result.get_parameter("ph", default_value=np.asarray([x[4] for x in res]))
 
         pattern_period_Vert_z = pixelsize/(pv[:, 0] - p0[:, 0])*img.shape[0]
         pattern_period_Horz_z = pixelsize/(ph[:, 1] - p0[:, 1])*img.shape[1]
 
-        self.__plotter.save_csv_file(np.c_[zvec.T, contrastV.T, contrastH.T, pattern_period_Vert_z.T, pattern_period_Horz_z.T],
-                                     headerList=['z [m]', 'Vert Contrast', 'Horz Contrast', 'Vert Period [m]', 'Horz Period [m]'])
+        if res_std is None:
+            self.__plotter.save_csv_file(np.c_[zvec.T, contrastV.T, contrastH.T, pattern_period_Vert_z.T, pattern_period_Horz_z.T],
+                                         headerList=['z [m]', 'Vert Contrast', 'Horz Contrast', 'Vert Period [m]', 'Horz Period [m]'])
+        else:
+            contrastV_std = np.asarray([x[0] for x in res_std])
+            contrastH_std = np.asarray([x[1] for x in res_std])
+
+            self.__plotter.save_csv_file(np.c_[zvec.T, contrastV.T, contrastH.T, pattern_period_Vert_z.T, pattern_period_Horz_z.T, contrastV_std.T, contrastH_std.T],
+                                         headerList=['z [m]', 'Vert Contrast', 'Horz Contrast', 'Vert Period [m]', 'Horz Period [m]', 'Vert Contrast Std', 'Horz Contrast Std'])
 
         add_context_label = plotting_properties.get_parameter("add_context_label", True)
         use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
@@ -441,8 +660,12 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
 
         self.__plotter.draw_context(FIT_PERIOD_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
 
-        return WavePyData(contrastV=contrastV,
+        return WavePyData(zvec=zvec,
+                          img=img,
+                          contrastV=contrastV,
                           contrastH=contrastH,
+                          visibilityV_tiles=run_calculation_result.get_parameter("visibilityV_tiles", None),
+                          visibilityH_tiles=run_calculation_result.get_parameter("visibilityH_tiles", None),
                           sourceDistance_from_fit_V=sourceDistance_from_fit_V,
                           patternPeriodFromData_V=patternPeriodFromData_V,
                           sourceDistance_from_fit_H=sourceDistance_from_fit_H,
@@ -458,7 +681,8 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
         sourceDistance_from_fit_H = fit_period_result.get_parameter("sourceDistance_from_fit_H")
         patternPeriodFromData_H   = fit_period_result.get_parameter("patternPeriodFromData_H")
 
-        zvec                   = initialization_parameters.get_parameter("zvec")
+        zvec                      = fit_period_result.get_parameter("zvec", default_value=initialization_parameters.get_parameter("zvec"))
+        n_starts                  = initialization_parameters.get_parameter("n_starts", 1)
 
         add_context_label = plotting_properties.get_parameter("add_context_label", True)
         use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
@@ -473,6 +697,7 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
                                                                      contrastV,
                                                                      patternPeriodFromData_V,
                                                                      sourceDistance_from_fit_V,
+                                                                     n_starts=n_starts,
                                                                      direction='Vertical',
                                                                      context_key=FIT_VISIBILITY_CONTEXT_KEY,
                                                                      unique_id=unique_id,
@@ -482,6 +707,7 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
                                                                      contrastH,
                                                                      patternPeriodFromData_H,
                                                                      sourceDistance_from_fit_H,
+                                                                     n_starts=n_starts,
                                                                      direction='Horizontal',
                                                                      context_key=FIT_VISIBILITY_CONTEXT_KEY,
                                                                      unique_id=unique_id,
@@ -489,208 +715,323 @@ class __SingleGratingCoherenceZScan(SingleGratingCoherenceZScanFacade):
 
         self.__plotter.draw_context(FIT_VISIBILITY_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
 
+        self._main_logger.print_message("Coherence length V: {:.4f} um, source size V: {:.4f} um".format(coherence_lenght_V*1e6, source_size_V*1e6))
+        self._main_logger.print_message("Coherence length H: {:.4f} um, source size H: {:.4f} um".format(coherence_lenght_H*1e6, source_size_H*1e6))
+
         return WavePyData(coherence_lenght_V=coherence_lenght_V, source_size_V=source_size_V,
                           coherence_lenght_H=coherence_lenght_H, source_size_H=source_size_H)
 
+    # %% ==================================================================================================
+
+    def fit_coherence_maps(self, fit_period_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        visibilityV_tiles = fit_period_result.get_parameter("visibilityV_tiles", None)
+        visibilityH_tiles = fit_period_result.get_parameter("visibilityH_tiles", None)
+
+        if visibilityV_tiles is None or visibilityH_tiles is None:
+            self._main_logger.print_warning("Coherence maps not calculated: run the calculation with tiles")
+
+            return WavePyData()
+
+        zvec      = fit_period_result.get_parameter("zvec", default_value=initialization_parameters.get_parameter("zvec"))
+        img       = fit_period_result.get_parameter("img")
+        tiles     = initialization_parameters.get_parameter("tiles")
+        pixelsize = initialization_parameters.get_parameter("pixelsize")
+        tile_size = [img.shape[0] // tiles[0] * pixelsize, img.shape[1] // tiles[1] * pixelsize]
+
+        add_context_label = plotting_properties.get_parameter("add_context_label", True)
+        use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
+
+        kwargs["output_dir"] = initialization_parameters.get_parameter("outFolder")
+
+        unique_id = self.__plotter.register_context_window(FIT_COHERENCE_MAPS_CONTEXT_KEY,
+                                                           context_window=plotting_properties.get_context_widget(),
+                                                           use_unique_id=use_unique_id)
+
+        tzero = time.time()
+
+        maps = {}
+        for direction, contrast, visibility_tiles in [("V", fit_period_result.get_parameter("contrastV"), visibilityV_tiles),
+                                                      ("H", fit_period_result.get_parameter("contrastH"), visibilityH_tiles)]:
+            # the fit of the whole image is the initial guess of all the sub-windows
+            popt, _, _ = coherence_fit.fit_visibility_vs_z(zvec,
+                                                           contrast,
+                                                           self.__wavelength,
+                                                           fit_period_result.get_parameter("patternPeriodFromData_" + direction),
+                                                           fit_period_result.get_parameter("sourceDistance_from_fit_" + direction))
+
+            _, maps["coherence_length_" + direction], maps["source_size_" + direction] = coherence_fit.fit_visibility_vs_z_maps(zvec, visibility_tiles, self.__wavelength, popt)
+
+            self.__plotter.save_sdf_file(maps["coherence_length_" + direction], tile_size, file_suffix="_coherence_length_" + direction, extraHeader={'Title': 'Coherence Length ' + direction, 'Zunit': 'meters'})
+            self.__plotter.save_sdf_file(maps["source_size_" + direction], tile_size, file_suffix="_source_size_" + direction, extraHeader={'Title': 'Source Size ' + direction, 'Zunit': 'meters'})
+
+        self._main_logger.print_message("Coherence maps (" + str(tiles[0]) + "x" + str(tiles[1]) + " sub-windows) fitted in " + str(round(time.time() - tzero, 3)) + " s")
+
+        self.__plotter.push_plot_on_context(FIT_COHERENCE_MAPS_CONTEXT_KEY, CoherenceMapPlot, unique_id, tile_size=tile_size, **maps, **kwargs)
+
+        self.__plotter.draw_context(FIT_COHERENCE_MAPS_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        return WavePyData(**maps)
+
     ###################################################################
     # PRIVATE METHODS
 
-    def _get_calculation_result(self,
-                                period_harm_Vert,
-                                period_harm_Horz,
-                                idx4crop,
-                                darkMeanValue,
-                                listOfDataFiles,
-                                zvec,
-                                sourceDistanceV,
-                                sourceDistanceH,
-                                unFilterSize,
-                                searchRegion,
-                                min_zvec): raise NotImplementedError()
+    def _get_calculation_result(self, parameters, max_retries=DEFAULT_MAX_RETRIES, progress_monitor=None):
+        tzero = time.time()
 
-    def __fit_period_vs_z(self, zvec, pattern_period_z, contrast, direction, threshold=0.005, context_key=FIT_PERIOD_CONTEXT_KEY, unique_id=None, **kwargs):
-        limit_up   = np.average(pattern_period_z) + 3*np.std(pattern_period_z)
-        limit_down = np.average(pattern_period_z) - 3*np.std(pattern_period_z)
+        self._main_logger.print_message("Execution mode: " + self.__executor.get_description())
 
-        args_for_NOfit = np.argwhere(np.logical_or(contrast < threshold, pattern_period_z > limit_up, pattern_period_z < limit_down)).flatten()
-        args_for_fit = np.argwhere(np.logical_and(contrast >= threshold, pattern_period_z <= limit_up, pattern_period_z >= limit_down)).flatten()
+        # batches of frames are calculated with the stacked kernel (single exposures only)
+        if self.__batch_size > 1 and len(parameters) > 0 and parameters[0][8] == NO_AVERAGE and parameters[0][10] is None:
+            self._main_logger.print_message("Batches of " + str(self.__batch_size) + " frames")
 
-        if 'Hor' in direction:
-            ls1 = '-ro'
-            lx = 'r'
-            lc2 = 'm'
-        else:
-            ls1 = '-ko'
-            lx = 'k'
-            lc2 = 'c'
-
-        output_data = WavePyData()
-
-        self.__plotter.push_plot_on_context(context_key, FitPeriodVsZPlot, unique_id,
-                                            zvec=zvec,
-                                            args_for_NOfit=args_for_NOfit,
-                                            args_for_fit=args_for_fit,
-                                            pattern_period_z=pattern_period_z,
-                                            lx=lx,
-                                            ls1=ls1,
-                                            lc2=lc2,
-                                            direction=direction,
-                                            output_data=output_data,
-                                            **kwargs)
-
-        return output_data.get_parameter("sourceDistance"), output_data.get_parameter("patternPeriodFromData")
-
-
-    def __fit_z_scan_talbot(self, zvec, contrast, patternPeriod, sourceDist, direction, context_key=FIT_VISIBILITY_CONTEXT_KEY, unique_id=None, **kwargs):
-        if 'Hor' in direction:
-            ls1 = ':ro'
-            lc2 = 'm'
+            batches = [parameters[i:i + self.__batch_size] for i in range(0, len(parameters), self.__batch_size)]
+
+            for batch_result in self.__executor.map(partial(run_batch_calculation_with_retries, max_retries=max_retries), batches):
+                for result_i in batch_result:
+                    if not progress_monitor is None: progress_monitor.update(result_i.get("timings", {}), result_i.get("worker"), is_failed(result_i))
+                    yield result_i
         else:
-            ls1 = ':ko'
-            lc2 = 'c'
+            for result_i in self.__executor.map(partial(run_calculation_with_retries, max_retries=max_retries), parameters):
+                if not progress_monitor is None: progress_monitor.update(result_i.get("timings", {}), result_i.get("worker"), is_failed(result_i))
+                yield result_i
 
-        output_data = WavePyData()
+        self._main_logger.print_message("Time spent: {0:.3f} s".format(time.time() - tzero))
 
-        self.__plotter.push_plot_on_context(context_key, VisibilityPlot, unique_id,
-                                            zvec=zvec,
-                                            pattern_period=patternPeriod,
-                                            source_distance=sourceDist,
-                                            contrast=contrast,
-                                            ls1=ls1,
-                                            lc2=lc2,
-                                            direction=direction,
-                                            output_data=output_data,
-                                            wavelength=self.__wavelength,
-                                            **kwargs)
+    def __live_fit(self, results, img, initialization_parameters, fit_state, csv_file_name):
+        results = sorted(results, key=lambda x: x[0])
+        zvec    = np.array([x[0] for x in results])
 
-        return output_data.get_parameter("coherence_length"), output_data.get_parameter("source_size")
+        # warm start: envelope parameters from the previous fit
+        fit_result = _fit_coherence(zvec,
+                                    [x[1]["visib_1st_harmonics"] for x in results],
+                                    img.shape,
+                                    initialization_parameters.get_parameter("pixelsize"),
+                                    self.__wavelength,
+                                    initial_guesses=fit_state)
 
-#=========================================================================================
-# MULTI-THREADING SECTION
-#=========================================================================================
+        line = [len(zvec)]
 
-def _run_calculation(parameters):
-        i, \
-        data_file_i, \
-        zvec_i, \
-        min_zvec, \
-        darkMeanValue, \
-        idx4crop, \
-        period_harm_Vert, \
-        sourceDistanceV, \
-        period_harm_Horz, \
-        sourceDistanceH, \
-        searchRegion, \
-        unFilterSize = parameters
-
-        # python3.8 do not share the same environment, so the Singleton is not active
-        try: get_registered_logger_instance(application_name=APPLICATION_NAME).print_message("loop " + str(i) + ": " + data_file_i)
-        except: print("loop " + str(i) + ": " + data_file_i)
-
-        img = read_tiff(data_file_i)
-
-        img = img - darkMeanValue  # calculate and remove dark
-        img = common_tools.crop_matrix_at_indexes(img, idx4crop)
-
-        pv = int(period_harm_Vert / (sourceDistanceV + zvec_i) * (sourceDistanceV + min_zvec))
-        ph = int(period_harm_Horz / (sourceDistanceH + zvec_i) * (sourceDistanceH + min_zvec))
-
-        result = {}
-        result["img"] = img
-        result["harmonicPeriod"]=[pv, ph]
-        result["image_name"] = 'FFT_{:.0f}mm'.format(zvec_i * 1e3)
-        result["visib_1st_harmonics"] =  grating_interferometry.visib_1st_harmonics(img, [pv, ph], searchRegion=searchRegion, unFilterSize=unFilterSize)
+        for direction in ["V", "H"]:
+            if isinstance(fit_result[direction], Exception):
+                self._main_logger.print_warning("Live fit " + direction + " (" + str(len(zvec)) + " frames) not possible: " + str(fit_result[direction]))
 
-        return result
+                line += [np.nan]*4
+            else:
+                sourceDistance, patternPeriodFromData, popt, coherence_length, source_size = fit_result[direction]
 
-#=========================================================================================
-# SINGLE THREAD
-#=========================================================================================
+                fit_state[direction] = popt
+
+                self._main_logger.print_message("Live fit {:s} ({:d} frames): source distance = {:.3f} m, coherence length = {:.4f} um, source size = {:.4f} um".format(
+                                                direction, len(zvec), sourceDistance, coherence_length*1e6, source_size*1e6))
+
+                line += [sourceDistance, patternPeriodFromData, coherence_length, source_size]
+
+        if not os.path.exists(csv_file_name):
+            with open(csv_file_name, "w") as file: file.write("# nr. frames, Vert Source Distance [m], Vert Pattern Period [m], Vert Coherence Length [m], Vert Source Size [m], " +
+                                                              "Horz Source Distance [m], Horz Pattern Period [m], Horz Coherence Length [m], Horz Source Size [m]\n")
+        with open(csv_file_name, "a") as file: file.write(", ".join([str(value) for value in line]) + "\n")
+
+    def __calculate_adaptive(self, parameters, initialization_parameters, img):
+        adaptive_stride    = initialization_parameters.get_parameter("adaptive_stride", 1)
+        adaptive_threshold = initialization_parameters.get_parameter("adaptive_threshold", 0.25)
+
+        zvec = np.array([parameters_i[2] for parameters_i in parameters])
+
+        # coarse pass: every adaptive_stride-th z position, always including the last one
+        coarse_indexes = list(range(0, len(parameters), adaptive_stride))
+        if coarse_indexes[-1] != len(parameters) - 1: coarse_indexes.append(len(parameters) - 1)
+
+        result = [None] * len(parameters)
+        for i, result_i in zip(coarse_indexes, self.__calculate([parameters[i] for i in coarse_indexes], initialization_parameters)): result[i] = result_i
+
+        # failed frames are not refined, they are reported with the others by run_calculation
+        fitted_indexes = [i for i in coarse_indexes if not is_failed(result[i])]
+
+        res        = [result[i]["visib_1st_harmonics"] for i in fitted_indexes]
+        fit_result = _fit_coherence(zvec[fitted_indexes], res, img.shape, initialization_parameters.get_parameter("pixelsize"), self.__wavelength)
+
+        # fine pass: only where the coarse fit is not reliable
+        refinement_indexes = set()
+        for direction, contrast in [("V", np.asarray([x[0] for x in res])), ("H", np.asarray([x[1] for x in res]))]:
+            if isinstance(fit_result[direction], Exception):
+                self._main_logger.print_warning("Adaptive sampling: coarse fit " + direction + " not possible (" + str(fit_result[direction]) + "), all the z positions will be calculated")
+
+                refinement_indexes.update(set(range(len(parameters))) - set(coarse_indexes))
+            else:
+                model = coherence_fit.visibility_model(zvec, self.__wavelength, *fit_result[direction][2])
+
+                refinement_indexes.update(coherence_fit.get_refinement_indexes(zvec, fitted_indexes, contrast, model, threshold=adaptive_threshold))
+
+        refinement_indexes = sorted(refinement_indexes - set(coarse_indexes))
+
+        for i, result_i in zip(refinement_indexes, self.__calculate([parameters[i] for i in refinement_indexes], initialization_parameters)): result[i] = result_i
+
+        calculated_indexes = sorted(coarse_indexes + refinement_indexes)
+
+        self._main_logger.print_message("Adaptive sampling: " + str(len(calculated_indexes)) + " of " + str(len(parameters)) + " z positions calculated (" +
+                                        str(len(coarse_indexes)) + " coarse, " + str(len(refinement_indexes)) + " refinement)")
+
+        return calculated_indexes, [result[i] for i in calculated_indexes]
+
+    def __check_failed_frames(self, result, initialization_parameters):
+        failed_indexes = [i for i, result_i in enumerate(result) if is_failed(result_i)]
 
-class _SingleGratingCoherenceZScanSingleThread(__SingleGratingCoherenceZScan):
-    def __init__(self):
-        super(_SingleGratingCoherenceZScanSingleThread, self).__init__()
-
-    def _get_calculation_result(self,
-                                period_harm_Vert,
-                                period_harm_Horz,
-                                idx4crop,
-                                darkMeanValue,
-                                listOfDataFiles,
-                                zvec,
-                                sourceDistanceV,
-                                sourceDistanceH,
-                                unFilterSize,
-                                searchRegion,
-                                min_zvec):
-        res = []
-        for i in range(len(listOfDataFiles)):
-            res.append(_run_calculation([i,
-                                         listOfDataFiles[i],
-                                         zvec[i],
-                                         min_zvec,
-                                         darkMeanValue,
-                                         idx4crop,
-                                         period_harm_Vert,
-                                         sourceDistanceV,
-                                         period_harm_Horz,
-                                         sourceDistanceH,
-                                         searchRegion,
-                                         unFilterSize]))
-        return res
+        if len(failed_indexes) > 0:
+            report_file_name = initialization_parameters.get_parameter("saveFileSuf") + FAILED_FRAMES_REPORT_SUFFIX
 
+            with open(report_file_name, "w") as file:
+                file.write("# frame, z [m], data files, error\n")
+                for i in failed_indexes:
+                    file.write(str(result[i]["frame"]) + ", " + str(result[i]["z"]) + ", " + " ".join(result[i]["data_files"]) + ", " + result[i]["error"].replace("\n", " ") + "\n")
+
+            for i in failed_indexes: self._main_logger.print_warning("Failed frame " + str(result[i]["frame"]) + " (" + ", ".join(result[i]["data_files"]) + "): " + result[i]["error"])
+
+            message = str(len(failed_indexes)) + " of " + str(len(result)) + " frames failed, report saved in " + report_file_name
+
+            if initialization_parameters.get_parameter("failure_policy", SKIP_FAILED_FRAMES) == ABORT_ON_FAILURE: raise RuntimeError(message)
+            else: self._main_logger.print_warning(message + ": failed frames skipped")
+
+        return [i for i in range(len(result)) if not i in failed_indexes]
+
+    def __create_progress_monitor(self, n_total, initialization_parameters, show_progress_bar=True):
+        return ProgressMonitor(n_total,
+                               n_workers=self.__executor.get_n_workers(),
+                               logger=self._main_logger,
+                               progress_bar=QtProgressBar("Run Calculation", n_total) if show_progress_bar and self.__plotter.is_active() else None,
+                               jsonl_file_name=initialization_parameters.get_parameter("saveFileSuf") + PROGRESS_SUFFIX)
+
+    def __calculate(self, parameters, initialization_parameters, show_progress_bar=True, progress_monitor=None):
+        # a progress monitor given by the caller is closed by the caller
+        close_monitor = progress_monitor is None
+        if close_monitor: progress_monitor = self.__create_progress_monitor(len(parameters), initialization_parameters, show_progress_bar)
+
+        try:
+            # the result cache stores the visibility of the whole frame only
+            if initialization_parameters.get_parameter("use_result_cache", True) and initialization_parameters.get_parameter("tiles", None) is None:
+                return self.__get_cached_calculation_result(parameters, initialization_parameters, progress_monitor)
+            else: return list(self._get_calculation_result(parameters, initialization_parameters.get_parameter("max_retries", DEFAULT_MAX_RETRIES), progress_monitor))
+        finally:
+            if close_monitor: progress_monitor.close()
+
+    def __get_cached_calculation_result(self, parameters, initialization_parameters, progress_monitor=None):
+        result_store = VisibilityResultStore(initialization_parameters.get_parameter("saveFileSuf") + RESULT_STORE_SUFFIX)
+
+        try:
+            result         = [None] * len(parameters)
+            frame_keys     = [None] * len(parameters)
+            missing_frames = []
+
+            for i, (_, data_files_i, zvec_i, darkMeanValue, idx4crop, harmonicPeriod, searchRegion, unFilterSize, averaging_mode, exposure_std, _, _) in enumerate(parameters):
+                # a missing or unreadable file is not cached: its frame is calculated and fails there, with the failure policy
+                try:    frame_keys[i] = VisibilityResultStore.get_frame_key(data_files_i, idx4crop, darkMeanValue, harmonicPeriod, searchRegion, unFilterSize, averaging_mode, exposure_std)
+                except OSError: frame_keys[i] = None
+
+                cached_result = None if frame_keys[i] is None else result_store.get_visibility(frame_keys[i])
+
+                if cached_result is None: missing_frames.append(i)
+                else: result[i] = {"harmonicPeriod" : harmonicPeriod,
+                                   "image_name" : get_image_name(zvec_i),
+                                   "visib_1st_harmonics" : cached_result[0],
+                                   "visibility_std" : cached_result[1]}
+
+            self._main_logger.print_message("Result cache: " + str(len(parameters) - len(missing_frames)) + " frames reused, " + str(len(missing_frames)) + " to calculate")
+
+            if not progress_monitor is None:
+                for _ in range(len(parameters) - len(missing_frames)): progress_monitor.update()
+
+            # results are persisted as soon as they are available, so an interrupted run restarts from the missing frames
+            for i, result_i in zip(missing_frames, self._get_calculation_result([parameters[i] for i in missing_frames], initialization_parameters.get_parameter("max_retries", DEFAULT_MAX_RETRIES), progress_monitor)):
+                if not is_failed(result_i) and not frame_keys[i] is None: result_store.put_visibility(frame_keys[i], parameters[i][1][0], result_i["visib_1st_harmonics"], result_i["visibility_std"])
+                result[i] = result_i
+        finally:
+            result_store.close()
+
+        return result
+
+    def __fit_period_vs_z(self, zvec, pattern_period_z, contrast, direction, threshold=0.005, context_key=FIT_PERIOD_CONTEXT_KEY, unique_id=None, **kwargs):
+        sourceDistance, patternPeriodFromData, args_for_fit, args_for_NOfit = coherence_fit.fit_period_vs_z(zvec, pattern_period_z, contrast, threshold=threshold)
+
+        if self.__plotter.is_active() or self.__plotter.is_saving():
+            if 'Hor' in direction:
+                ls1 = '-ro'
+                lx = 'r'
+                lc2 = 'm'
+            else:
+                ls1 = '-ko'
+                lx = 'k'
+                lc2 = 'c'
+
+            self.__plotter.push_plot_on_context(context_key, FitPeriodVsZPlot, unique_id,
+                                                zvec=zvec,
+                                                args_for_NOfit=args_for_NOfit,
+                                                args_for_fit=args_for_fit,
+                                                pattern_period_z=pattern_period_z,
+                                                source_distance=sourceDistance,
+                                                pattern_period=patternPeriodFromData,
+                                                lx=lx,
+                                                ls1=ls1,
+                                                lc2=lc2,
+                                                direction=direction,
+                                                **kwargs)
+
+        return sourceDistance, patternPeriodFromData
+
+
+    def __fit_z_scan_talbot(self, zvec, contrast, patternPeriod, sourceDist, direction, n_starts=1, context_key=FIT_VISIBILITY_CONTEXT_KEY, unique_id=None, **kwargs):
+        # the starts of a multi-start fit take a few milliseconds each: they run serially, starting the workers would take longer
+        popt, coherence_length, source_size = coherence_fit.fit_visibility_vs_z(zvec, contrast, self.__wavelength, patternPeriod, sourceDist, n_starts=max(1, n_starts))
+
+        if self.__plotter.is_active() or self.__plotter.is_saving():
+            if 'Hor' in direction:
+                ls1 = ':ro'
+                lc2 = 'm'
+            else:
+                ls1 = ':ko'
+                lc2 = 'c'
+
+            self.__plotter.push_plot_on_context(context_key, VisibilityPlot, unique_id,
+                                                zvec=zvec,
+                                                pattern_period=patternPeriod,
+                                                source_distance=sourceDist,
+                                                contrast=contrast,
+                                                popt=popt,
+                                                ls1=ls1,
+                                                lc2=lc2,
+                                                direction=direction,
+                                                wavelength=self.__wavelength,
+                                                **kwargs)
+
+        return coherence_length, source_size
 
 #=========================================================================================
-# MULTI THREAD
+# PARALLEL CALCULATION SECTION
 #=========================================================================================
 
-from multiprocessing import Pool, cpu_count
-import time
+def _fit_coherence(zvec, res, img_shape, pixelsize, wavelength, initial_guesses=None):
+    """
+    Headless period and visibility fits of both directions, with the default settings of the fit stages.
+    Returns, for each direction, (source distance, pattern period, fitted parameters, coherence length, source size)
+    or the exception raised by the fit.
+    """
+    p0 = np.asarray([x[2] for x in res])
+    pv = np.asarray([x[3] for x in res])
+    ph = np.asarray([x[4] for x in res])
 
-class _SingleGratingCoherenceZScanMultiThread(__SingleGratingCoherenceZScan):
-    def __init__(self, n_cpus=None):
-        super(_SingleGratingCoherenceZScanMultiThread, self).__init__()
-        available_cpus = cpu_count()
-        if not n_cpus is None and n_cpus > 0:
-            if n_cpus > available_cpus - 1: raise ValueError("Max number of CPUs available = " + str(available_cpus-1))
-            self.__n_cpus = n_cpus
-        else:
-            self.__n_cpus = available_cpus - 2
-            if self.__n_cpus < 2: raise ValueError("Auto Nr. CPUs available < 2: Multi-Thread mode not possible")
-
-    def _get_calculation_result(self,
-                                period_harm_Vert,
-                                period_harm_Horz,
-                                idx4crop,
-                                darkMeanValue,
-                                listOfDataFiles,
-                                zvec,
-                                sourceDistanceV,
-                                sourceDistanceH,
-                                unFilterSize,
-                                searchRegion,
-                                min_zvec):
-        tzero = time.time()
-        pool = Pool(self.__n_cpus)
+    fit_result = {}
 
-        self._main_logger.print_message("%d cpu used for this calculation" % self.__n_cpus)
+    for direction, contrast, pattern_period_z, threshold in [("V", np.asarray([x[0] for x in res]), pixelsize/(pv[:, 0] - p0[:, 0])*img_shape[0], 0.002),
+                                                             ("H", np.asarray([x[1] for x in res]), pixelsize/(ph[:, 1] - p0[:, 1])*img_shape[1], 0.0005)]:
+        try:
+            sourceDistance, patternPeriodFromData, _, _ = coherence_fit.fit_period_vs_z(zvec, pattern_period_z, contrast, threshold=threshold)
 
-        parameters = []
-        for i in range(len(listOfDataFiles)): parameters.append([i,
-                                                                 listOfDataFiles[i],
-                                                                 zvec[i],
-                                                                 min_zvec,
-                                                                 darkMeanValue,
-                                                                 idx4crop,
-                                                                 period_harm_Vert,
-                                                                 sourceDistanceV,
-                                                                 period_harm_Horz,
-                                                                 sourceDistanceH,
-                                                                 searchRegion,
-                                                                 unFilterSize])
-        res = pool.map(_run_calculation, parameters)
-        pool.close()
+            # envelope parameters from the initial guess, period and source distance from the period fit
+            initial_guess = None if initial_guesses is None else initial_guesses.get(direction, None)
+            if not initial_guess is None: initial_guess = [initial_guess[0], patternPeriodFromData, initial_guess[2], sourceDistance, initial_guess[4]]
 
-        self._main_logger.print_message("Time spent: {0:.3f} s".format(time.time() - tzero))
+            popt, coherence_length, source_size = coherence_fit.fit_visibility_vs_z(zvec, contrast, wavelength, patternPeriodFromData, sourceDistance, initial_guess=initial_guess)
+
+            fit_result[direction] = (sourceDistance, patternPeriodFromData, popt, coherence_length, source_size)
+        except Exception as e:
+            fit_result[direction] = e
 
-        return res
+    return fit_result
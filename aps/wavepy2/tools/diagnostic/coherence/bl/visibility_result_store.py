@@ -0,0 +1,114 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+import sqlite3
+import hashlib
+
+# version of the table (and of the frame keys): a file with another version is rebuilt, its records are just a cache
+SCHEMA_VERSION = 2
+
+class VisibilityResultStore():
+    """
+    Persistent cache of the visibility results of a z-scan, stored in a SQLite file.
+
+    Each record is the result of one z position, keyed by a hash of everything it depends on: path, modification time
+    and size of its data files, crop indexes, dark value, harmonic periods, search region, uniform filter size and
+    averaging mode (and the calculation of the spread of the exposures). Any change to one of them invalidates only the
+    records concerned.
+    """
+    def __init__(self, file_name):
+        self.__connection = sqlite3.connect(file_name)
+
+        if self.__connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.__connection.execute("DROP TABLE IF EXISTS visibility")
+            self.__connection.execute("PRAGMA user_version = " + str(SCHEMA_VERSION))
+
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS visibility (" +
+                                  "frame_key TEXT PRIMARY KEY, data_file TEXT, " +
+                                  "contrast_V REAL, contrast_H REAL, " +
+                                  "p00_i INTEGER, p00_j INTEGER, p10_i INTEGER, p10_j INTEGER, p01_i INTEGER, p01_j INTEGER, " +
+                                  "contrast_V_std REAL, contrast_H_std REAL)")
+        self.__connection.commit()
+
+    @classmethod
+    def get_frame_key(cls, data_files, idx4crop, darkMeanValue, harmonicPeriod, searchRegion, unFilterSize, averaging_mode=0, exposure_std=False):
+        files_signature = []
+        for data_file in data_files:
+            file_stat = os.stat(data_file)
+            files_signature.append((os.path.abspath(data_file), file_stat.st_mtime_ns, file_stat.st_size))
+
+        frame_signature = repr((files_signature,
+                                [int(idx) for idx in idx4crop],
+                                float(darkMeanValue),
+                                [int(period) for period in harmonicPeriod],
+                                int(searchRegion),
+                                int(unFilterSize),
+                                int(averaging_mode),
+                                bool(exposure_std)))
+
+        return hashlib.sha1(frame_signature.encode("utf-8")).hexdigest()
+
+    def get_visibility(self, frame_key):
+        row = self.__connection.execute("SELECT contrast_V, contrast_H, p00_i, p00_j, p10_i, p10_j, p01_i, p01_j, contrast_V_std, contrast_H_std " +
+                                        "FROM visibility WHERE frame_key = ?", (frame_key,)).fetchone()
+
+        if row is None: return None
+        else: return (row[0], row[1], [row[2], row[3]], [row[4], row[5]], [row[6], row[7]]), \
+                     (None if row[8] is None else [row[8], row[9]])
+
+    def put_visibility(self, frame_key, data_file, visib_1st_harmonics, visibility_std=None):
+        contrast_V, contrast_H, idx00, idx10, idx01 = visib_1st_harmonics
+
+        if visibility_std is None: contrast_V_std, contrast_H_std = None, None
+        else:                      contrast_V_std, contrast_H_std = float(visibility_std[0]), float(visibility_std[1])
+
+        self.__connection.execute("INSERT OR REPLACE INTO visibility VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  (frame_key, data_file, float(contrast_V), float(contrast_H),
+                                   int(idx00[0]), int(idx00[1]), int(idx10[0]), int(idx10[1]), int(idx01[0]), int(idx01[1]),
+                                   contrast_V_std, contrast_H_std))
+        self.__connection.commit()
+
+    def close(self):
+        self.__connection.close()
@@ -44,9 +44,9 @@
 # #########################################################################
 
 from aps.wavepy2.tools.diagnostic.coherence.bl.single_grating_coherence_z_scan import create_single_grating_coherence_z_scan_manager, APPLICATION_NAME, \
-    MULTI_THREAD
+    NO_AVERAGE, REAL_SPACE_AVERAGE, FOURIER_MAGNITUDE_AVERAGE, ABORT_ON_FAILURE, SKIP_FAILED_FRAMES, DEFAULT_MAX_RETRIES
 from aps.wavepy2.tools.diagnostic.coherence.bl.single_grating_coherence_z_scan import \
-    CALCULATE_HARMONIC_PERIODS_CONTEXT_KEY, RUN_CALCULATION_CONTEXT_KEY, FIT_PERIOD_CONTEXT_KEY, FIT_VISIBILITY_CONTEXT_KEY
+    CALCULATE_HARMONIC_PERIODS_CONTEXT_KEY, RUN_CALCULATION_CONTEXT_KEY, FIT_PERIOD_CONTEXT_KEY, FIT_VISIBILITY_CONTEXT_KEY, FIT_COHERENCE_MAPS_CONTEXT_KEY
 
 from aps.common.initializer import get_registered_ini_instance
 from aps.common.logger import LoggerMode
@@ -55,7 +55,7 @@ from aps.wavepy2.util.plot.plotter import get_registered_plotter_instance
 
 from aps.wavepy2.tools.common.wavepy_script import WavePyScript
 
-from multiprocessing import cpu_count
+from aps.wavepy2.util.common.executors import get_available_cpus, get_default_n_workers, EXECUTOR_MODES, SERIAL, PROCESS_POOL
 
 class MainSingleGratingCoherenceZScan(WavePyScript):
     SCRIPT_ID = "coh-sgz"
@@ -68,48 +68,143 @@ class MainSingleGratingCoherenceZScan(WavePyScript):
         if   "-f" == sys_argument[:2]: args["SHOW_FOURIER"] = int(sys_argument[2:]) > 0
         elif "-t" == sys_argument[:2]: args["THREADING"]    = int(sys_argument[2:])
         elif "-n" == sys_argument[:2]: args["N_CPUS"]       = int(sys_argument[2:])
+        elif "-r" == sys_argument[:2]: args["USE_RESULT_CACHE"] = int(sys_argument[2:]) > 0
+        elif "-a" == sys_argument[:2]: args["AVERAGING_MODE"]   = int(sys_argument[2:])
+        elif "-e" == sys_argument[:2]: args["EXPOSURE_STD"]     = int(sys_argument[2:]) > 0
+        elif "-b" == sys_argument[:2]: args["BATCH_SIZE"]       = int(sys_argument[2:])
+        elif "-w" == sys_argument[:2]: args["LIVE_MODE"]        = int(sys_argument[2:]) > 0
+        elif "-c" == sys_argument[:2]: args["ADAPTIVE_STRIDE"]  = int(sys_argument[2:])
+        elif "-m" == sys_argument[:2]: args["TILES"]            = int(sys_argument[2:])
+        elif "-v" == sys_argument[:2]: args["N_STARTS"]         = int(sys_argument[2:])
 
     def _help_additional_parameters(self):
-        available_cpus = cpu_count()
         return "  -f<show fourier images>\n\n" + \
                "   show fourier images:\n" + \
                "     0 False - Default value\n" +\
                "     1 True\n\n" + \
-               "  -t<threading mode>\n\n" + \
+               "  -r<use result cache>\n\n" + \
+               "   use result cache (reuse the visibility of frames already calculated):\n" + \
+               "     0 False\n" +\
+               "     1 True - Default value\n\n" + \
+               "  -w<live mode>\n\n" + \
+               "   watch the data folder and calculate the frames while the scan is running\n" + \
+               "   (poll interval, idle timeout and fit interval in the ini file, section Live):\n" + \
+               "     0 False - Default value\n" + \
+               "     1 True\n\n" + \
+               "  -c<adaptive stride>\n\n" + \
+               "   coarse-to-fine sampling: calculate every n-th z position, fit the visibility and calculate\n" + \
+               "   the remaining positions only where the fit is not reliable (threshold in the ini file, section Adaptive):\n" + \
+               "     - 1 for no adaptive sampling - Default value, or\n" + \
+               "     - a positive integer number\n\n" + \
+               "  -m<nr. of tiles>\n\n" + \
+               "   coherence maps: visibility and fit on a grid of <nr. of tiles> x <nr. of tiles> sub-windows:\n" + \
+               "     - 0 for no coherence maps - Default value, or\n" + \
+               "     - a positive integer number\n\n" + \
+               "  -a<averaging mode>\n\n" + \
+               "   averaging modes of the repeated exposures at each z:\n" + \
+               "     0 No Average - Default value\n" + \
+               "     1 Average in Real Space\n" + \
+               "     2 Average of the Fourier Magnitude\n\n" + \
+               "  -e<spread of the exposures>\n\n" + \
+               "   standard deviation of the visibility of the repeated exposures at each z (averaging modes only,\n" + \
+               "   one more visibility calculation for each exposure):\n" + \
+               "     0 False - Default value\n" + \
+               "     1 True\n\n" + \
+               "  -v<nr. of starts> (default from ini file, section Fit)\n\n" + \
+               "   nr. of starts of the fit of the visibility vs distance (the fit with the lowest residual is kept):\n" + \
+               "     - 1 for a single fit from the initial guess - Default value, or\n" + \
+               "     - a positive integer number\n\n" + \
+               "  -t<threading mode> (default from ini file, section Execution)\n\n" + \
                "   threading modes:\n" + \
-               "     0 Single-Thread\n" + \
-               "     1 Multi-Thread - Default Value\n\n" + \
-              ("   ** Warning: Multi-Thread not possible: not enough CPUs in this computer\n" if cpu_count() - 2 < 2 else \
-               "  -n<nr. of cpus> (Multi-Thread only)\n\n" + \
-               "   nr. of cpus:\n" + \
-               "     - an positive integer number <= " + str(available_cpus-1) + ", or \n" + \
-               "     - skip the option for default: "  + str(available_cpus-2) + "\n")
+               "     0 Serial (Single-Thread)\n" + \
+               "     1 Process Pool (Multi-Thread) - Default Value\n" + \
+               "     2 Thread Pool\n" + \
+               "     3 Dask Local Cluster (requires dask.distributed)\n" + \
+               "     4 MPI (requires mpi4py, launch with: mpiexec -n <N> python -m mpi4py.futures -m aps.wavepy2.tools ...)\n\n" + \
+               "  -n<nr. of workers> (parallel modes only)\n\n" + \
+               "   nr. of workers:\n" + \
+               "     - a positive integer number (CPUs available: " + str(get_available_cpus()) + "), or \n" + \
+               "     - skip the option for default: "  + str(get_default_n_workers()) + " (MPI: universe size)\n\n" + \
+               "  -b<batch size>\n\n" + \
+               "   nr. of frames calculated together with batched FFTs (no average only):\n" + \
+               "     - 1 for frame by frame calculation - Default value, or\n" + \
+               "     - a positive integer number (memory grows with the batch size)\n\n" + \
+               "  Frames failing to be calculated (e.g. unreadable files) are retried and then handled with\n" + \
+               "  the failure policy (ini file, section Execution, 'max retries' and 'failure policy'):\n" + \
+               "     0 Abort the scan (the calculated frames are kept in the result cache)\n" + \
+               "     1 Skip the failed frames and save a report - Default value\n\n" + \
+               super(MainSingleGratingCoherenceZScan, self)._help_additional_parameters()
 
     def __parse_args(self, **args):
         try: SHOW_FOURIER = args["SHOW_FOURIER"]
         except: SHOW_FOURIER = False
 
+        try: USE_RESULT_CACHE = args["USE_RESULT_CACHE"]
+        except: USE_RESULT_CACHE = True
+
+        try: LIVE_MODE = args["LIVE_MODE"]
+        except: LIVE_MODE = False
+
+        try: AVERAGING_MODE = args["AVERAGING_MODE"]
+        except: AVERAGING_MODE = NO_AVERAGE
+
+        try: EXPOSURE_STD = args["EXPOSURE_STD"]
+        except: EXPOSURE_STD = False
+
+        try: ADAPTIVE_STRIDE = args["ADAPTIVE_STRIDE"]
+        except: ADAPTIVE_STRIDE = 1
+
+        try: TILES = [args["TILES"], args["TILES"]] if args["TILES"] > 0 else None
+        except: TILES = None
+
+        ini = get_registered_ini_instance(self._get_application_name())
+
+        ADAPTIVE_THRESHOLD = ini.get_float_from_ini("Adaptive", "refinement threshold", default=0.25)
+        MAX_RETRIES        = ini.get_int_from_ini("Execution", "max retries", default=DEFAULT_MAX_RETRIES)
+        FAILURE_POLICY     = ini.get_int_from_ini("Execution", "failure policy", default=SKIP_FAILED_FRAMES)
+
+        try: N_STARTS = args["N_STARTS"]
+        except: N_STARTS = ini.get_int_from_ini("Fit", "nr. of starts", default=1)
+        N_STARTS = max(1, N_STARTS)
+
         try: THREADING = args["THREADING"]
-        except: THREADING = MULTI_THREAD
+        except: THREADING = ini.get_int_from_ini("Execution", "threading mode", default=PROCESS_POOL)
 
-        if THREADING == MULTI_THREAD:
+        if not THREADING in EXECUTOR_MODES: raise ValueError("Threading mode not recognized: " + str(THREADING) + " (" +
+                                                             ", ".join([str(mode) + " " + description for mode, description in EXECUTOR_MODES.items()]) + ")")
+
+        if THREADING != SERIAL:
             try: N_CPUS    = args["N_CPUS"]
-            except: N_CPUS = None
+            except: N_CPUS = ini.get_int_from_ini("Execution", "nr. of workers", default=0)
+            if N_CPUS <= 0: N_CPUS = None
         else: N_CPUS = None
 
         print("Show Fourier Images: " + str(SHOW_FOURIER))
-        print("Threading Mode: " + ("Multi-Thread" if THREADING == MULTI_THREAD else "Single-Thread"))
-        print("Nr. of CPUs: " + (str(N_CPUS) if not N_CPUS is None else "Automatic"))
-
-        return SHOW_FOURIER, THREADING, N_CPUS
+        print("Use Result Cache: " + str(USE_RESULT_CACHE))
+        print("Live Mode: " + str(LIVE_MODE))
+        print("Averaging Mode: " + {NO_AVERAGE : "No Average", REAL_SPACE_AVERAGE : "Real Space", FOURIER_MAGNITUDE_AVERAGE : "Fourier Magnitude"}[AVERAGING_MODE])
+        if AVERAGING_MODE != NO_AVERAGE: print("Spread of the Exposures: " + str(EXPOSURE_STD))
+        print("Adaptive Stride: " + str(ADAPTIVE_STRIDE) + ("" if ADAPTIVE_STRIDE <= 1 else " (refinement threshold: " + str(ADAPTIVE_THRESHOLD) + ")"))
+        try: BATCH_SIZE = args["BATCH_SIZE"]
+        except: BATCH_SIZE = 1
+
+        print("Nr. of Starts of the Visibility Fit: " + str(N_STARTS))
+        print("Coherence Maps: " + ("No" if TILES is None else str(TILES[0]) + "x" + str(TILES[1]) + " sub-windows"))
+        print("Threading Mode: " + EXECUTOR_MODES[THREADING])
+        print("Nr. of Workers: " + (str(N_CPUS) if not N_CPUS is None else "Automatic"))
+        print("Batch Size: " + str(BATCH_SIZE))
+        print("Max Retries: " + str(MAX_RETRIES))
+        print("Failure Policy: " + {ABORT_ON_FAILURE : "Abort", SKIP_FAILED_FRAMES : "Skip and Report"}[FAILURE_POLICY])
+
+        return SHOW_FOURIER, USE_RESULT_CACHE, LIVE_MODE, AVERAGING_MODE, EXPOSURE_STD, ADAPTIVE_STRIDE, ADAPTIVE_THRESHOLD, TILES, MAX_RETRIES, FAILURE_POLICY, N_STARTS, THREADING, N_CPUS, BATCH_SIZE
 
     def _run_script(self, SCRIPT_LOGGER_MODE=LoggerMode.FULL, **args):
-        SHOW_FOURIER, THREADING, N_CPUS = self.__parse_args(**args)
+        SHOW_FOURIER, USE_RESULT_CACHE, LIVE_MODE, AVERAGING_MODE, EXPOSURE_STD, ADAPTIVE_STRIDE, ADAPTIVE_THRESHOLD, TILES, MAX_RETRIES, FAILURE_POLICY, N_STARTS, THREADING, N_CPUS, BATCH_SIZE = self.__parse_args(**args)
 
         plotter = get_registered_plotter_instance(application_name=self._get_application_name())
 
         try:
-            single_grating_coherence_z_scan_manager = create_single_grating_coherence_z_scan_manager(THREADING, N_CPUS)
+            single_grating_coherence_z_scan_manager = self._profile_manager(create_single_grating_coherence_z_scan_manager(THREADING, N_CPUS, BATCH_SIZE))
 
             # ==========================================================================
             # %% Initialization parameters
@@ -117,7 +212,16 @@ class MainSingleGratingCoherenceZScan(WavePyScript):
 
             initialization_parameters = single_grating_coherence_z_scan_manager.manager_initialization(single_grating_coherence_z_scan_manager.get_initialization_parameters(),
                                                                                                        SCRIPT_LOGGER_MODE,
-                                                                                                       SHOW_FOURIER)
+                                                                                                       SHOW_FOURIER,
+                                                                                                       USE_RESULT_CACHE,
+                                                                                                       AVERAGING_MODE,
+                                                                                                       ADAPTIVE_STRIDE,
+                                                                                                       ADAPTIVE_THRESHOLD,
+                                                                                                       TILES,
+                                                                                                       MAX_RETRIES,
+                                                                                                       FAILURE_POLICY,
+                                                                                                       EXPOSURE_STD,
+                                                                                                       N_STARTS)
 
             # ==========================================================================
             # %% CROP Initial Image
@@ -133,7 +237,16 @@ class MainSingleGratingCoherenceZScan(WavePyScript):
 
             # ==========================================================================
 
-            run_calculation_result = single_grating_coherence_z_scan_manager.run_calculation(harm_periods_result, initialization_parameters)
+            if LIVE_MODE:
+                ini = get_registered_ini_instance(self._get_application_name())
+
+                run_calculation_result = single_grating_coherence_z_scan_manager.run_live_calculation(harm_periods_result,
+                                                                                                      initialization_parameters,
+                                                                                                      poll_interval=ini.get_float_from_ini("Live", "poll interval", default=2.0),
+                                                                                                      idle_timeout=ini.get_float_from_ini("Live", "idle timeout", default=60.0),
+                                                                                                      fit_interval=ini.get_float_from_ini("Live", "fit interval", default=10.0))
+            else:
+                run_calculation_result = single_grating_coherence_z_scan_manager.run_calculation(harm_periods_result, initialization_parameters)
             plotter.show_context_window(RUN_CALCULATION_CONTEXT_KEY)
 
             # ==========================================================================
@@ -146,6 +259,12 @@ class MainSingleGratingCoherenceZScan(WavePyScript):
             single_grating_coherence_z_scan_manager.fit_visibility(fit_period_result, initialization_parameters)
             plotter.show_context_window(FIT_VISIBILITY_CONTEXT_KEY)
 
+            # ==========================================================================
+
+            if not TILES is None:
+                single_grating_coherence_z_scan_manager.fit_coherence_maps(fit_period_result, initialization_parameters)
+                plotter.show_context_window(FIT_COHERENCE_MAPS_CONTEXT_KEY)
+
             # ==========================================================================
             # %% Final Operations
             # ==========================================================================
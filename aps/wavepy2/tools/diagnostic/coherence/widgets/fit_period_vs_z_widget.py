@@ -21,22 +21,22 @@ class FitPeriodVsZPlot(WavePyWidget):
     def get_plot_tab_name(self): return "Pattern Period vs Detector distance " + self.__direction
 
     def build_widget(self, **kwargs):
-        zvec             = kwargs["zvec"]
-        args_for_NOfit   = kwargs["args_for_NOfit"]
-        args_for_fit     = kwargs["args_for_fit"]
-        pattern_period_z = kwargs["pattern_period_z"]
-        lx               = kwargs["lx"]
-        ls1              = kwargs["ls1"]
-        lc2              = kwargs["lc2"]
-        direction        = kwargs["direction"]
+        zvec                  = kwargs["zvec"]
+        args_for_NOfit        = kwargs["args_for_NOfit"]
+        args_for_fit          = kwargs["args_for_fit"]
+        pattern_period_z      = kwargs["pattern_period_z"]
+        sourceDistance        = kwargs["source_distance"]
+        patternPeriodFromData = kwargs["pattern_period"]
+        lx                    = kwargs["lx"]
+        ls1                   = kwargs["ls1"]
+        lc2                   = kwargs["lc2"]
+        direction             = kwargs["direction"]
 
         try: figure_width = kwargs["figure_width"] * pixels_to_inches
         except: figure_width = 10
         try: figure_height = kwargs["figure_height"] * pixels_to_inches
         except: figure_height = 7
 
-        output_data       = kwargs["output_data"]
-
         self.__direction = direction
 
         layout = QHBoxLayout()
@@ -48,12 +48,8 @@ class FitPeriodVsZPlot(WavePyWidget):
         figure.gca().plot(zvec[args_for_NOfit]*1e3, pattern_period_z[args_for_NOfit]*1e6, 'o', mec=lx, mfc='none', ms=8, label='not used for fit')
         figure.gca().plot(zvec[args_for_fit]*1e3, pattern_period_z[args_for_fit]*1e6, ls1, label=direction)
 
-        fit1d                 = np.polyfit(zvec[args_for_fit], pattern_period_z[args_for_fit], 1)
-        sourceDistance        = fit1d[1]/fit1d[0]
-        patternPeriodFromData = fit1d[1]
-
-        figure.gca().plot(zvec[args_for_fit]*1e3, (fit1d[0]*zvec[args_for_fit] + fit1d[1])*1e6, '-', c=lc2, lw=2, label='Fit ' + direction)
-        figure.gca().text(np.min(zvec[args_for_fit])*1e3, np.min(pattern_period_z)*1e6, 'source dist = {:.2f}m, '.format(fit1d[1]/fit1d[0]) + r'$p_o$ = {:.3f}um'.format(fit1d[1]*1e6),
+        figure.gca().plot(zvec[args_for_fit]*1e3, patternPeriodFromData*(1 + zvec[args_for_fit]/sourceDistance)*1e6, '-', c=lc2, lw=2, label='Fit ' + direction)
+        figure.gca().text(np.min(zvec[args_for_fit])*1e3, np.min(pattern_period_z)*1e6, 'source dist = {:.2f}m, '.format(sourceDistance) + r'$p_o$ = {:.3f}um'.format(patternPeriodFromData*1e6),
                           bbox=dict(facecolor=lc2, alpha=0.85))
 
         figure.gca().set_xlabel(r'Distance $z$  [mm]', fontsize=14)
@@ -67,9 +63,6 @@ class FitPeriodVsZPlot(WavePyWidget):
                                        figure_file_name=common_tools.get_unique_filename(kwargs.get("output_dir", "") +
                                                                                          f"patter_period_vs_detector_distance_{direction}", "png"))
 
-        output_data.set_parameter("sourceDistance", sourceDistance)
-        output_data.set_parameter("patternPeriodFromData", patternPeriodFromData)
-
         layout.addWidget(FigureCanvas(figure))
 
         self.setFixedWidth(int(figure_width/pixels_to_inches))
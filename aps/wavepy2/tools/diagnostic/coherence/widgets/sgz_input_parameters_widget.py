@@ -122,6 +122,7 @@ def generate_initialization_parameters_sgz(dataFolder,
                       listOfDataFiles=listOfDataFiles,
                       nfiles=nfiles,
                       zvec_from=zvec_from,
+                      zvec_file=zvec_file,
                       zvec=zvec,
                       pixelsize=pixelsize,
                       gratingPeriod=gratingPeriod,
@@ -131,6 +132,7 @@ def generate_initialization_parameters_sgz(dataFolder,
                       sourceDistanceH=sourceDistanceH,
                       unFilterSize=unFilterSize,
                       searchRegion=searchRegion,
+                      file_prefix=file_prefix,
                       saveFileSuf=fname2save)
 
 class AbstractSGZInputParametersWidget():
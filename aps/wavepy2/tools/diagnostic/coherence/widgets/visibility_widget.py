@@ -1,7 +1,6 @@
 import time
 
 import numpy as np
-from scipy.optimize import curve_fit
 
 from PyQt5.QtWidgets import QWidget, QGridLayout, QMessageBox
 from PyQt5.QtCore import Qt
@@ -11,13 +10,13 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
 from aps.wavepy2.util.plot.plotter import WavePyWidget, pixels_to_inches, FigureToSave
 from aps.wavepy2.util.common import common_tools
+from aps.wavepy2.util.common.executors import create_executor, THREAD_POOL
+from aps.wavepy2.core import coherence_fit
 from aps.common.plot.gui import widgetBox, separator, button, checkBox, lineEdit
 
 from warnings import filterwarnings
 filterwarnings("ignore")
 
-epsilon = 1e-9
-
 class VisibilityPlot(WavePyWidget):
     zvec_min = 0.0
     zvec_max = 0.0
@@ -37,6 +36,8 @@ class VisibilityPlot(WavePyWidget):
     shift_limit_max = 0.0
     shift_limit_fixed = 1
 
+    n_starts = 1
+
     def __init__(self, parent=None, application_name=None, **kwargs):
         WavePyWidget.__init__(self, parent=parent, application_name=application_name)
 
@@ -54,6 +55,7 @@ class VisibilityPlot(WavePyWidget):
         self.__ls1              = kwargs["ls1"]
         self.__lc2              = kwargs["lc2"]
         self.__direction        = kwargs["direction"]
+        popt                    = kwargs["popt"]
         self.__output_dir       = kwargs.get("output_dir", "")
 
         try: figure_width = kwargs["figure_width"] * pixels_to_inches
@@ -61,8 +63,6 @@ class VisibilityPlot(WavePyWidget):
         try: figure_height = kwargs["figure_height"] * pixels_to_inches
         except: figure_height = 7
 
-        output_data       = kwargs["output_data"]
-
         layout = QGridLayout(self)
         layout.setAlignment(Qt.AlignCenter)
 
@@ -109,89 +109,70 @@ class VisibilityPlot(WavePyWidget):
 
         separator(fit_params_box)
 
+        lineEdit(fit_params_box, self, "n_starts", "Nr. of starts", labelWidth=120, orientation="horizontal", valueType=int)
+
+        separator(fit_params_box)
+
         button(fit_params_box, self, "Fit", callback=self.__do_fit, width=240, height=45)
 
         # contrast vs z
         self.__figure = Figure(figsize=(figure_width, figure_height))
         self.__figure_canvas = FigureCanvas(self.__figure)
 
-        self.__do_fit(True)
+        self.__plot_fit(self.__zvec, popt, is_init=True)
 
         self.append_mpl_figure_to_save(figure=self.__figure,
                                        figure_file_name=common_tools.get_unique_filename(self.__output_dir + f"visibility_vs_detector_distance_{self.__direction}", "png"))
 
-        output_data.set_parameter("coherence_length", self.__coherence_length)
-        output_data.set_parameter("source_size", self.__source_size)
-
         layout.addWidget(fit_params_container, 0, 0)
         layout.addWidget(self.__figure_canvas, 0, 1)
 
         self.setFixedWidth(int(fit_params_container.width() + figure_width/pixels_to_inches))
         self.setFixedHeight(int(figure_height/pixels_to_inches))
 
-    def __do_fit(self, is_init=False):
+    def __do_fit(self):
         cursor = np.where(np.logical_and(self.__zvec >= self.zvec_min*1e-3, self.__zvec <= self.zvec_max*1e-3))
         zvec            = self.__zvec[cursor]
         contrast        = self.__contrast[cursor]
-        source_distance = self.source_distance
-        shift_limit     = 0.05 * (zvec[-1] - zvec[0])
-
-        initial_guess = [1.0, self.pattern_period, 1e-5, self.source_distance, 1e-6]
 
         if self.pattern_period_fixed == 1:
-            pattern_period_low = self.pattern_period * (1-epsilon)
-            pattern_period_up  = self.pattern_period * (1+epsilon)
+            pattern_period_bounds = None
         else:
             if self.pattern_period_min >= self.pattern_period_max:
                 QMessageBox.critical(self, "Error", " Pattern period min >= pattern period max")
                 return
 
-            pattern_period_low = self.pattern_period_min
-            pattern_period_up  = self.pattern_period_max
+            pattern_period_bounds = [self.pattern_period_min, self.pattern_period_max]
 
         if self.source_distance_fixed == 1:
-            source_distance_low = source_distance * ((1-epsilon) if source_distance > 0 else (1+epsilon))
-            source_distance_up  = source_distance * ((1+epsilon) if source_distance > 0 else (1-epsilon))
+            source_distance_bounds = None
         else:
             if self.source_distance_min >= self.source_distance_max:
                 QMessageBox.critical(self, "Error", " Source distance min >= Source distance max")
                 return
 
-            source_distance_low = self.source_distance_min
-            source_distance_up = self.source_distance_max
-
-        bounds_low = [1e-3, pattern_period_low, 1e-7, source_distance_low, -shift_limit]
-        bounds_up  = [2.0,  pattern_period_up,  1e-3, source_distance_up,   shift_limit]
-
-        def _csi(source_sigma, source_distance):
-            return self.__wavelength * source_distance / (2 * np.pi * source_sigma)
-
-        def _pz(z, p0, source_distance, z0):
-            return p0 * (1 + (z - z0) / source_distance)
-
-        def _envelope(z, Amp, p0, source_sigma, source_distance, z0):
-            csi = _csi(source_sigma, source_distance)
-            pz = _pz(z, p0, source_distance, z0)
-
-            return Amp * np.exp(-((self.__wavelength * (z - z0)) ** 2) / (2*(csi * pz) ** 2))
-
-        def _fitting_function(z, Amp, p0, source_sigma, source_distance, z0):
-            pz = _pz(z, p0, source_distance, z0)
-
-            return _envelope(z, Amp, p0, source_sigma, source_distance, z0) * \
-                   np.abs(np.sin(np.pi * self.__wavelength * (z - z0) / (p0 * pz)))
+            source_distance_bounds = [self.source_distance_min, self.source_distance_max]
 
         try:
-            popt, pcov = curve_fit(_fitting_function, zvec, contrast, p0=initial_guess, bounds=(bounds_low, bounds_up))
+            popt, _, _ = coherence_fit.fit_visibility_vs_z(zvec, contrast, self.__wavelength,
+                                                           pattern_period=self.pattern_period,
+                                                           source_distance=self.source_distance,
+                                                           pattern_period_bounds=pattern_period_bounds,
+                                                           source_distance_bounds=source_distance_bounds,
+                                                           n_starts=max(1, self.n_starts),
+                                                           executor=None if self.n_starts <= 1 else create_executor(THREAD_POOL))
         except Exception as e:
             QMessageBox.critical(self, "Exception Occurred", str(e))
             return
 
+        self.__plot_fit(zvec, popt)
+
+    def __plot_fit(self, zvec, popt, is_init=False):
         self.__source_size      = popt[2]
-        self.__coherence_length = _csi(source_sigma=popt[2], source_distance=popt[3])
+        self.__coherence_length = coherence_fit.get_coherence_length(self.__wavelength, source_sigma=popt[2], source_distance=popt[3])
 
-        fitted_curve = _fitting_function(zvec, Amp=popt[0], p0=popt[1], source_sigma=popt[2], source_distance=popt[3], z0=popt[4])
-        envelope     = _envelope(        zvec, Amp=popt[0], p0=popt[1], source_sigma=popt[2], source_distance=popt[3], z0=popt[4])
+        fitted_curve = coherence_fit.visibility_model(zvec, self.__wavelength, *popt)
+        envelope     = coherence_fit.visibility_envelope(zvec, self.__wavelength, *popt)
 
         self.pattern_period  = np.round(popt[1], 10)
         self.source_distance = np.round(popt[3], 3)
@@ -44,6 +44,8 @@
 # #########################################################################
 import numpy as np
 import os
+
+from aps.wavepy2.util.common import common_tools
 from aps.wavepy2.util.common.common_tools import PATH_SEPARATOR
 
 from aps.common.logger import get_registered_logger_instance, get_registered_secondary_logger
@@ -51,6 +53,7 @@ from aps.wavepy2.util.plot.plotter import get_registered_plotter_instance
 from aps.wavepy2.util.plot.plot_tools import PlottingProperties
 
 from aps.wavepy2.tools.common.wavepy_data import WavePyData
+from aps.wavepy2.core import profile_analysis
 
 from aps.wavepy2.tools.imaging.single_grating.widgets.n_profiles_H_V_widget import NProfilesHV
 from aps.wavepy2.tools.imaging.single_grating.widgets.integrate_DPC_cumsum_widget import IntegrateDPCCumSum
@@ -65,6 +68,78 @@ APPLICATION_NAME = "DPC Profile Analysis"
 
 DPC_PROFILE_ANALYSYS_CONTEXT_KEY = "DPC Profile Analysis"
 
+# %% ==================================================================================================
+# %% PROFILES: every step processes all the profiles at once, the widgets only plot the results
+# %% ==================================================================================================
+
+def get_dpc_profiles(differential_phase, virtual_pixelsize, direction="Horizontal", nprofiles=1, filter_width=0, remove1stOrderDPC=False):
+    """
+    nprofiles profiles of a DPC map, along the rows (Horizontal) or the columns (Vertical), averaged over filter_width
+    pixels, with their linear fit (removed if remove1stOrderDPC).
+
+    Returns a WavePyData with: data (coordinates and profiles as columns), positions and labels (rows or columns of the
+    profiles), fit_coefficients (slope and offset of each profile, shape (2, nprofiles)) and fitted (the linear fits).
+    """
+    xxGrid, yyGrid = common_tools.grid_coord(differential_phase, virtual_pixelsize)
+
+    if direction == "Horizontal": coord, axis = xxGrid[0, :], 0
+    else:                         coord, axis = yyGrid[:, 0], 1
+
+    positions = np.linspace(filter_width // 2, differential_phase.shape[axis] - filter_width // 2 - 1, nprofiles + 2, dtype=int)[1:-1]
+
+    profiles = profile_analysis.band_profiles(differential_phase, positions, filter_width, axis)
+
+    fit_coefficients, fitted = profile_analysis.fit_profiles(coord, profiles, degree=1)
+
+    if remove1stOrderDPC: profiles -= fitted
+
+    return WavePyData(data=np.c_[coord, profiles],
+                      positions=positions,
+                      labels=[str(position) for position in positions],
+                      fit_coefficients=fit_coefficients,
+                      fitted=fitted)
+
+def integrate_dpc_profiles(dpc_profiles, wavelength, grazing_angle=0.0, projectionFromDiv=1.0, remove2ndOrder=False):
+    """
+    Height profiles from the DPC profiles of get_dpc_profiles, by cumulative sum, with their 2nd order fit (removed if
+    remove2ndOrder).
+
+    Returns a WavePyData with: data (projected coordinates and height profiles as columns), labels and fitted (the 2nd
+    order fits).
+    """
+    projection = get_projection(grazing_angle, projectionFromDiv)
+
+    data = dpc_profiles.get_parameter("data")
+    xvec = data[:, 0]*projection
+
+    integrated = profile_analysis.integrate_profiles_cumsum(xvec, data[:, 1:], wavelength, projection)
+
+    _, fitted = profile_analysis.fit_profiles(xvec, integrated, degree=2)
+
+    if remove2ndOrder: integrated -= fitted
+
+    return WavePyData(data=np.c_[xvec, integrated],
+                      labels=dpc_profiles.get_parameter("labels"),
+                      fitted=fitted)
+
+def get_curvature_profiles(height_profiles, virtual_pixelsize, grazing_angle=0.0, projectionFromDiv=1.0):
+    """
+    Curvature profiles from the height profiles of integrate_dpc_profiles.
+
+    Returns a WavePyData with: data (coordinates and curvature profiles as columns) and labels.
+    """
+    xvec, curvature = profile_analysis.curvature_from_height(height_profiles.get_parameter("data")[:, 1:],
+                                                             virtual_pixelsize*get_projection(grazing_angle, projectionFromDiv))
+
+    return WavePyData(data=np.c_[xvec, curvature],
+                      labels=height_profiles.get_parameter("labels"))
+
+def get_projection(grazing_angle=0.0, projectionFromDiv=1.0):
+    if grazing_angle//.00001 > 0: return 1/np.sin(grazing_angle)*projectionFromDiv
+    else: return projectionFromDiv
+
+# %% ==================================================================================================
+
 class __DPCProfileAnalysis2D(DPCProfileAnalysisFacade):
     def __init__(self, application_name):
         self.__main_logger   = get_registered_logger_instance(application_name=application_name)
@@ -106,121 +181,123 @@ class __DPCProfileAnalysis2D(DPCProfileAnalysisFacade):
 
         if self.__plotter.is_saving() and not os.path.exists(saveFileSuf.rsplit(PATH_SEPARATOR, 1)[0]): os.makedirs(saveFileSuf.rsplit(PATH_SEPARATOR, 1)[0])
 
-        n_profiles_H_V_result = WavePyData()
+        zlabel = 'DPC [rad/m]'
+
+        if np.all(np.isfinite(differential_phase_H)):
+            dpc_profiles_H = get_dpc_profiles(differential_phase_H, virtual_pixelsize, "Horizontal", nprofiles, filter_width, remove1stOrderDPC)
+
+            self.__save_csv_file(dpc_profiles_H, saveFileSuf, '_WF_profiles_H', 'x [m]', zlabel + ', Filter Width = {:d} pixels'.format(filter_width))
+        else:
+            dpc_profiles_H = None
+
+        if np.all(np.isfinite(differential_phase_V)):
+            dpc_profiles_V = get_dpc_profiles(differential_phase_V, virtual_pixelsize, "Vertical", nprofiles, filter_width, remove1stOrderDPC)
+
+            self.__save_csv_file(dpc_profiles_V, saveFileSuf, '_WF_profiles_V', 'y [m]', zlabel + ', Filter Width = {:d} pixels'.format(filter_width))
+        else:
+            dpc_profiles_V = None
 
         self.__plotter.push_plot_on_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, NProfilesHV, unique_id,
                                             arrayH=differential_phase_H,
                                             arrayV=differential_phase_V,
-                                            virtual_pixelsize=virtual_pixelsize,
-                                            zlabel='DPC [rad/m]',
+                                            dpc_profiles_H=dpc_profiles_H,
+                                            dpc_profiles_V=dpc_profiles_V,
+                                            zlabel=zlabel,
                                             titleH='WF DPC Horz',
                                             titleV='WF DPC Vert',
                                             saveFileSuf=saveFileSuf,
-                                            nprofiles=nprofiles,
                                             remove1stOrderDPC=remove1stOrderDPC,
                                             filter_width=filter_width,
-                                            output_data=n_profiles_H_V_result,
                                             **kwargs)
 
-        dataH     = n_profiles_H_V_result.get_parameter("dataH")
-        dataV     = n_profiles_H_V_result.get_parameter("dataV")
-        labels_H  = n_profiles_H_V_result.get_parameter("labels_H")
-        labels_V  = n_profiles_H_V_result.get_parameter("labels_V")
-        fit_coefs = n_profiles_H_V_result.get_parameter("fit_coefs")
-
-        fit_coefsH = np.array(fit_coefs[0])
-        fit_coefsV = np.array(fit_coefs[1])
-
-        if fnameH is not None:
-            radii_fit_H = (2*np.pi/wavelength/fit_coefsH[:][0])
+        if fnameH is not None and dpc_profiles_H is not None:
+            radii_fit_H = (2*np.pi/wavelength/dpc_profiles_H.get_parameter("fit_coefficients")[:, 0])
 
             self.__main_logger.print_message('Radius H from fit profiles: ')
             self.__script_logger.print('radius fit Hor = ' + str(radii_fit_H))
 
-            integrate_dpc_cum_sum_result = WavePyData()
-
-            self.__plotter.push_plot_on_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, IntegrateDPCCumSum, unique_id,
-                                                data_DPC=dataH,
-                                                wavelength=wavelength,
-                                                grazing_angle=0.0, #grazing_angle,
-                                                projectionFromDiv=1.0, #projectionFromDiv,
-                                                remove2ndOrder=remove2ndOrder,
-                                                xlabel='x',
-                                                ylabel='Height',
-                                                labels=labels_H,
-                                                titleStr='Horizontal, ',
-                                                saveFileSuf=saveFileSuf + '_X',
-                                                direction="Horizontal",
-                                                output_data=integrate_dpc_cum_sum_result,
-                                                **kwargs)
-
-            integratedH = integrate_dpc_cum_sum_result.get_parameter("integrated")
-
-            curv_from_height_result = WavePyData()
-
-            self.__plotter.push_plot_on_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, CurvFromHeight, unique_id,
-                                                height=integratedH,
-                                                virtual_pixelsize=virtual_pixelsize[0],
-                                                grazing_angle=0.0,  # grazing_angle,
-                                                projectionFromDiv=1.0,  # projectionFromDiv,
-                                                xlabel='x',
-                                                ylabel='Curvature',
-                                                labels=labels_H,
-                                                titleStr='Horizontal, ',
-                                                saveFileSuf=saveFileSuf + '_X',
-                                                direction="Horizontal",
-                                                output_data=curv_from_height_result,
-                                                **kwargs)
-
-        if fnameV is not None:
-            radii_fit_V = (2*np.pi/wavelength/fit_coefsV[:][0])
+            self.__integrate_dpc_profiles(dpc_profiles_H, wavelength, virtual_pixelsize[0], remove2ndOrder, saveFileSuf + '_X', 'x', "Horizontal", unique_id, **kwargs)
+
+        if fnameV is not None and dpc_profiles_V is not None:
+            radii_fit_V = (2*np.pi/wavelength/dpc_profiles_V.get_parameter("fit_coefficients")[:, 0])
 
             self.__main_logger.print_message('Radius V from fit profiles: ')
             self.__script_logger.print('radius fit Vert = ' + str(radii_fit_V))
 
-            integrate_dpc_cum_sum_result = WavePyData()
-
-            self.__plotter.push_plot_on_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, IntegrateDPCCumSum, unique_id,
-                                                data_DPC=dataV,
-                                                wavelength=wavelength,
-                                                grazing_angle=0.0, #grazing_angle,
-                                                projectionFromDiv=1.0, #projectionFromDiv,
-                                                remove2ndOrder=remove2ndOrder,
-                                                xlabel='y',
-                                                ylabel='Height',
-                                                labels=labels_V,
-                                                titleStr='Vertical, ',
-                                                saveFileSuf=saveFileSuf + '_Y',
-                                                direction="Vertical",
-                                                output_data=integrate_dpc_cum_sum_result,
-                                                **kwargs)
-
-            integratedV = integrate_dpc_cum_sum_result.get_parameter("integrated")
-
-            curv_from_height_result = WavePyData()
-
-            self.__plotter.push_plot_on_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, CurvFromHeight, unique_id,
-                                                height=integratedV,
-                                                virtual_pixelsize=virtual_pixelsize[1],
-                                                grazing_angle=0.0,  # grazing_angle,
-                                                projectionFromDiv=1.0,  # projectionFromDiv,
-                                                xlabel='y',
-                                                ylabel='Curvature',
-                                                labels=labels_V,
-                                                titleStr='Vertical, ',
-                                                saveFileSuf=saveFileSuf + '_Y',
-                                                direction="Vertical",
-                                                output_data=curv_from_height_result,
-                                                **kwargs)
+            self.__integrate_dpc_profiles(dpc_profiles_V, wavelength, virtual_pixelsize[1], remove2ndOrder, saveFileSuf + '_Y', 'y', "Vertical", unique_id, **kwargs)
 
         self.__plotter.draw_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
 
+    def __integrate_dpc_profiles(self, dpc_profiles, wavelength, virtual_pixelsize, remove2ndOrder, saveFileSuf, xlabel, direction, unique_id, **kwargs):
+        grazing_angle     = 0.0 # grazing_angle,
+        projectionFromDiv = 1.0 # projectionFromDiv,
+
+        height_profiles    = integrate_dpc_profiles(dpc_profiles, wavelength, grazing_angle, projectionFromDiv, remove2ndOrder)
+        curvature_profiles = get_curvature_profiles(height_profiles, virtual_pixelsize, grazing_angle, projectionFromDiv)
+
+        self.__save_csv_file(height_profiles, saveFileSuf, '_integrated_' + xlabel, xlabel + ' [m]', 'Height [m]', grazing_angle, projectionFromDiv)
+        self.__save_csv_file(curvature_profiles, saveFileSuf, '_curv_' + xlabel, xlabel + ' [m]', 'Curvature [1/m]', grazing_angle, projectionFromDiv)
+
+        self.__plotter.push_plot_on_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, IntegrateDPCCumSum, unique_id,
+                                            height_profiles=height_profiles,
+                                            grazing_angle=grazing_angle,
+                                            projectionFromDiv=projectionFromDiv,
+                                            remove2ndOrder=remove2ndOrder,
+                                            xlabel=xlabel,
+                                            ylabel='Height',
+                                            titleStr=direction + ', ',
+                                            saveFileSuf=saveFileSuf,
+                                            direction=direction,
+                                            **kwargs)
+
+        self.__plotter.push_plot_on_context(DPC_PROFILE_ANALYSYS_CONTEXT_KEY, CurvFromHeight, unique_id,
+                                            curvature_profiles=curvature_profiles,
+                                            grazing_angle=grazing_angle,
+                                            projectionFromDiv=projectionFromDiv,
+                                            xlabel=xlabel,
+                                            ylabel='Curvature',
+                                            titleStr=direction + ', ',
+                                            saveFileSuf=saveFileSuf,
+                                            direction=direction,
+                                            **kwargs)
+
+    def __save_csv_file(self, profiles, file_prefix, file_suffix, xlabel, zlabel, grazing_angle=0.0, projectionFromDiv=1.0):
+        header = [xlabel] + profiles.get_parameter("labels") + [zlabel]
+
+        if grazing_angle//.00001 > 0:   header.append('grazing_angle = {:.4g}'.format(grazing_angle))
+        if projectionFromDiv//1 != 1: header.append('projection due divergence = {:.2f}x'.format(projectionFromDiv))
+
+        self.__plotter.save_csv_file(profiles.get_parameter("data"), file_prefix=file_prefix, file_suffix=file_suffix, headerList=header)
+
 class __DPCProfileAnalysis1D(DPCProfileAnalysisFacade):
     def __init__(self, application_name):
         self.__main_logger   = get_registered_logger_instance(application_name=application_name)
         self.__script_logger = get_registered_secondary_logger(application_name=application_name)
         self.__plotter       = get_registered_plotter_instance(application_name=application_name)
 
+        # the profiles of a 1D DPC are analysed as the only available component of a 2D DPC
+        self.__dpc_profile_analysis_2D = create_dpc_profile_analsysis_manager_2D(application_name)
+
+    def dpc_profile_analysis(self, dpc_profile_analysis_data, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        differential_phase = dpc_profile_analysis_data.get_parameter("differential_phase")
+        fname              = dpc_profile_analysis_data.get_parameter("fname")
+        direction          = dpc_profile_analysis_data.get_parameter("direction", "Horizontal")
+
+        dpc_profile_analysis_data_2D = WavePyData(virtual_pixelsize=dpc_profile_analysis_data.get_parameter("virtual_pixelsize"),
+                                                  nprofiles=dpc_profile_analysis_data.get_parameter("nprofiles", 1),
+                                                  remove1stOrderDPC=dpc_profile_analysis_data.get_parameter("remove1stOrderDPC", False),
+                                                  remove2ndOrder=dpc_profile_analysis_data.get_parameter("remove2ndOrder", False))
+
+        if direction == "Horizontal":
+            dpc_profile_analysis_data_2D.set_parameter("differential_phase_H", differential_phase)
+            dpc_profile_analysis_data_2D.set_parameter("fnameH", fname)
+        elif direction == "Vertical":
+            dpc_profile_analysis_data_2D.set_parameter("differential_phase_V", differential_phase)
+            dpc_profile_analysis_data_2D.set_parameter("fnameV", fname)
+        else:
+            raise ValueError("Direction not recognized: " + str(direction))
+
+        self.__dpc_profile_analysis_2D.dpc_profile_analysis(dpc_profile_analysis_data_2D, initialization_parameters, plotting_properties, **kwargs)
 
 def create_dpc_profile_analsysis_manager_2D(application_name=None):
     return __DPCProfileAnalysis2D(APPLICATION_NAME if application_name is None else application_name)
@@ -43,6 +43,8 @@
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
 import numpy as np
+import hashlib
+from collections import OrderedDict
 
 from aps.wavepy2.util.common import common_tools
 from aps.wavepy2.util.common.common_tools import hc
@@ -55,8 +57,10 @@ from aps.common.initializer import get_registered_ini_instance
 from aps.common.scripts.generic_process_manager import GenericProcessManager
 
 from aps.wavepy2.tools.common.wavepy_data import WavePyData
+from aps.wavepy2.tools.common.stage_cache import StageCache
 
-from aps.wavepy2.tools.common.bl import grating_interferometry, surface_from_grad
+from aps.wavepy2.tools.common.bl import grating_interferometry
+from aps.wavepy2.core import harmonic_analysis, surface_from_grad
 from aps.wavepy2.tools.common.bl import crop_image
 from aps.wavepy2.tools.common.widgets.plot_intensities_harms_widget import PlotIntensitiesHarms
 from aps.wavepy2.tools.common.widgets.plot_dark_field_widget import PlotDarkField
@@ -67,7 +71,7 @@ from aps.wavepy2.tools.common.widgets.show_cropped_figure_widget import ShowCrop
 from aps.wavepy2.tools.common.widgets.error_integration_widget import ErrorIntegration
 
 from aps.wavepy2.tools.imaging.single_grating.widgets.plot_DPC_widget import PlotDPC
-from aps.wavepy2.tools.imaging.single_grating.widgets.sgt_input_parameters_widget import SGTInputParametersWidget, SGTInputParametersDialog, generate_initialization_parameters_sgt, MODES, PATTERNS, DIMENSIONS
+from aps.wavepy2.tools.imaging.single_grating.widgets.sgt_input_parameters_widget import SGTInputParametersWidget, SGTInputParametersDialog, generate_initialization_parameters_sgt, MODES, PATTERNS, DIMENSIONS, DIRECTIONS
 from aps.wavepy2.tools.imaging.single_grating.widgets.correct_DPC_widgets import CorrectDPC, CorrectDPCHistos, CorrectDPCCenter
 from aps.wavepy2.tools.imaging.single_grating.widgets.fit_radius_dpc_widget import FitRadiusDPC
 
@@ -86,6 +90,8 @@ CALCULATE_THICKNESS_CONTEXT_KEY            = "Calculate Thickness"
 CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE = "Calculate 2nd order component of the phase"
 REMOVE_2ND_ORDER                           = "Remove 2nd order"
 
+INTEGRATION_METHODS_1D = ["Frankot-Chellappa", "Cumulative Sum"]
+
 class SingleGratingTalbotFacade(GenericProcessManager):
     def draw_initialization_parameters_widget(self, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
     def get_initialization_parameters(self, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
@@ -125,12 +131,67 @@ class SingleGratingTalbotFacade(GenericProcessManager):
 
     def remove_2nd_order(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs): raise NotImplementedError()
 
-def create_single_grating_talbot_manager():
-    return _SingleGratingTalbot()
+def create_single_grating_talbot_manager(reference_cache=None, stage_cache=None):
+    return _SingleGratingTalbot(reference_cache, stage_cache)
+
+class ReferenceCache:
+    """
+    Cache of the analysis of the reference images (experimental harmonic periods and harmonic images), to process
+    many samples sharing the same reference without repeating it: beyond max_size references, the least recently
+    used is discarded. A reference is identified by the content of the cropped image and by the theoretical harmonic
+    periods, so a reference file cropped differently is a different reference.
+    """
+    def __init__(self, max_size=4):
+        self.__max_size = max_size
+        self.__entries  = OrderedDict()
+        self.__hits     = 0
+        self.__misses   = 0
+
+    @classmethod
+    def get_key(cls, imgRef, harmonicPeriod):
+        digest = hashlib.sha1(np.ascontiguousarray(imgRef))
+        digest.update(str((imgRef.shape, imgRef.dtype.str, [int(period) for period in harmonicPeriod])).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        if key in self.__entries:
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+
+            return self.__entries[key]
+        else:
+            self.__misses += 1
+
+            return None
+
+    def put(self, key, harmonic_period, harmonic_images):
+        self.__entries[key] = (harmonic_period, harmonic_images)
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.__max_size: self.__entries.popitem(last=False)
+
+    def get_statistics(self):
+        return self.__hits, self.__misses
 
+def _log_curvature_radius(logger, dpx, dpy, pixelsize, kwave):
+    # linear fit of the central profiles of the DPC, as in the Fit Radius plot (1D gratings: one of the two components is None)
+    if not dpx is None:
+        lin_fitx = np.polyfit(common_tools.realcoordvec(dpx.shape[1], pixelsize[1]), dpx[dpx.shape[0] // 2, :], 1)
+
+        logger.print_message('lin_fitx[0] x: {:.3g} m'.format(lin_fitx[0]))
+        logger.print_message('lin_fitx[1] x: {:.3g} m'.format(lin_fitx[1]))
+        logger.print_message('Curvature Radius of WF x: {:.3g} m'.format(kwave / lin_fitx[0]))
+
+    if not dpy is None:
+        lin_fity = np.polyfit(common_tools.realcoordvec(dpy.shape[0], pixelsize[0]), dpy[:, dpy.shape[1] // 2], 1)
+
+        logger.print_message('Curvature Radius of WF y: {:.3g} m'.format(kwave / lin_fity[0]))
 
 class _SingleGratingTalbot(SingleGratingTalbotFacade):
-    def __init__(self):
+    def __init__(self, reference_cache=None, stage_cache=None):
+        self.__reference_cache = reference_cache
+        self.__stage_cache     = stage_cache
         self.reload_utils()
 
     def reload_utils(self):
@@ -183,7 +244,8 @@ class _SingleGratingTalbot(SingleGratingTalbotFacade):
                                                                                do_integration     = self.__ini.get_boolean_from_ini("Runtime", "do integration", default=False),
                                                                                calc_thickness     = self.__ini.get_boolean_from_ini("Runtime", "calc thickness", default=False),
                                                                                remove_2nd_order   = self.__ini.get_boolean_from_ini("Runtime", "remove 2nd order", default=False),
-                                                                               material_idx       = self.__ini.get_int_from_ini("Runtime", "material idx", default=0))
+                                                                               material_idx       = self.__ini.get_int_from_ini("Runtime", "material idx", default=0),
+                                                                               ask_dark_value     = plotting_properties.get_parameter("ask_dark_value", True))
 
         return initialization_parameters
 
@@ -205,14 +267,18 @@ class _SingleGratingTalbot(SingleGratingTalbotFacade):
                                                                                script_logger=self.__script_logger,
                                                                                ini=self.__ini,
                                                                                dpc_profile_analysis_manager=create_dpc_profile_analsysis_manager_2D(application_name=APPLICATION_NAME),
-                                                                               phenergy=initialization_parameters.get_parameter("phenergy"))
+                                                                               phenergy=initialization_parameters.get_parameter("phenergy"),
+                                                                               reference_cache=self.__reference_cache,
+                                                                               stage_cache=self.__stage_cache)
         elif dimension == DIMENSIONS[0]: #1D
             self.__analysis_manager = _create_single_grating_talbot_manager_1D(plotter=self.__plotter,
                                                                                main_logger=self.__main_logger,
                                                                                script_logger=self.__script_logger,
                                                                                ini=self.__ini,
                                                                                dpc_profile_analysis_manager=create_dpc_profile_analsysis_manager_1D(application_name=APPLICATION_NAME),
-                                                                               phenergy=initialization_parameters.get_parameter("phenergy"))
+                                                                               phenergy=initialization_parameters.get_parameter("phenergy"),
+                                                                               reference_cache=self.__reference_cache,
+                                                                               stage_cache=self.__stage_cache)
 
 
         return initialization_parameters
@@ -329,12 +395,14 @@ class _SingleGratingTalbot(SingleGratingTalbotFacade):
         return self.__analysis_manager.remove_2nd_order(integration_result, initialization_parameters, plotting_properties, **kwargs)
 
 class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
-    def __init__(self, plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy):
+    def __init__(self, plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy, reference_cache=None, stage_cache=None):
         self.__plotter = plotter
         self.__main_logger = main_logger
         self.__script_logger = script_logger
         self.__ini = ini
         self.__dpc_profile_analysis_manager = dpc_profile_analysis_manager
+        self.__reference_cache = reference_cache
+        self.__stage_cache = stage_cache
 
         self.__wavelength = hc / phenergy
         self.__kwave = 2 * np.pi / self.__wavelength
@@ -371,42 +439,10 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
         period_harm_Vert_o = int(period_harm[0]*img.shape[0]/img_size_o[0]) + 1
         period_harm_Hor_o = int(period_harm[1]*img.shape[1]/img_size_o[1]) + 1
 
-        # Obtain harmonic periods from images
-
-        if imgRef is None:
-            harmPeriod = [period_harm_Vert_o, period_harm_Hor_o]
-        else:
-            self.__main_logger.print_message('Obtain harmonic 01 experimentally')
-
-            (_, period_harm_Hor) = grating_interferometry.exp_harm_period(imgRef, [period_harm_Vert_o, period_harm_Hor_o],
-                                                                          harmonic_ij=['0', '1'],
-                                                                          searchRegion=30,
-                                                                          isFFT=False,
-                                                                          logger=self.__main_logger)
-
-            self.__main_logger.print_message('MESSAGE: Obtain harmonic 10 experimentally')
-
-            (period_harm_Vert, _) = grating_interferometry.exp_harm_period(imgRef, [period_harm_Vert_o, period_harm_Hor_o],
-                                                                           harmonic_ij=['1', '0'],
-                                                                           searchRegion=30,
-                                                                           isFFT=False,
-                                                                           logger=self.__main_logger)
-
-            harmPeriod = [period_harm_Vert, period_harm_Hor]
-
-        # Calculate everything
-
         [int00, int01, int10,
          darkField01, darkField10,
          phaseFFT_01,
-         phaseFFT_10] = grating_interferometry.single_2Dgrating_analyses(img,
-                                                                         img_ref=imgRef,
-                                                                         harmonicPeriod=harmPeriod,
-                                                                         unwrapFlag=unwrapFlag,
-                                                                         context_key=CALCULATE_DPC_CONTEXT_KEY,
-                                                                         unique_id=unique_id,
-                                                                         logger=self.__main_logger, plotter=self.__plotter,
-                                                                         **kwargs)
+         phaseFFT_10] = self.__harmonic_analysis(img, imgRef, [period_harm_Vert_o, period_harm_Hor_o], unwrapFlag, unique_id, **kwargs)
 
         virtual_pixelsize = [0, 0]
         virtual_pixelsize[0] = pixelsize[0]*img.shape[0]/int00.shape[0]
@@ -753,6 +789,8 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
                                                           context_window=plotting_properties.get_context_widget(),
                                                           use_unique_id=use_unique_id)
 
+        _log_curvature_radius(self.__main_logger, differential_phase_01, differential_phase_10, virtual_pixelsize, self.__kwave)
+
         self.__plotter.push_plot_on_context(FIT_RADIUS_DPC_CONTEXT_KEY, FitRadiusDPC, unique_id,
                                            dpx=differential_phase_01, dpy=differential_phase_10, pixelsize=virtual_pixelsize, kwave=self.__kwave, str4title="", **kwargs)
 
@@ -917,7 +955,7 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
                           linear_fit_dpc_01=integration_result.get_parameter("linear_fit_dpc_01"),
                           linear_fit_dpc_10=integration_result.get_parameter("linear_fit_dpc_10"),
                           phase=phase,
-                          thickness=thickness if calc_thickness else None)
+                          thickness=thickness if (do_integration and calc_thickness) else None)
 
     # %% ==================================================================================================
 
@@ -1154,6 +1192,8 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
         calc_thickness   = initialization_parameters.get_parameter("calc_thickness")
         remove_2nd_order = initialization_parameters.get_parameter("remove_2nd_order")
 
+        curvature_radius = None
+
         if do_integration and remove_2nd_order:
             add_context_label = plotting_properties.get_parameter("add_context_label", True)
             use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
@@ -1190,6 +1230,8 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
             self.__main_logger.print_message('Curvature Radius of WF x: {:.3g} m'.format(popt[0]))
             self.__main_logger.print_message('Curvature Radius of WF y: {:.3g} m'.format(popt[1]))
 
+            curvature_radius = [popt[0], popt[1]]
+
             data = err / 2 / np.pi * self.__wavelength
 
             self.__plotter.push_plot_on_context(REMOVE_2ND_ORDER, PlotIntegration, unique_id,
@@ -1216,11 +1258,90 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
                           linear_fit_dpc_01=integration_result.get_parameter("linear_fit_dpc_01"),
                           linear_fit_dpc_10=integration_result.get_parameter("linear_fit_dpc_10"),
                           phase=phase,
-                          thickness=thickness if calc_thickness else None)
+                          thickness=integration_result.get_parameter("thickness"),
+                          curvature_radius=curvature_radius)
 
     ###################################################################
     # PRIVATE METHODS
 
+    def __harmonic_analysis(self, img, imgRef, harmonic_period_o, unwrapFlag, unique_id, **kwargs):
+        # the plots of the analysis are stored with the result, to be pushed again when it is taken from the cache
+        stage_key    = None if self.__stage_cache is None else StageCache.get_key(CALCULATE_DPC_CONTEXT_KEY, img, imgRef, harmonic_period_o, unwrapFlag,
+                                                                                  grating_interferometry.is_plotting(self.__plotter))
+        stage_result = None if stage_key is None else self.__stage_cache.get(stage_key)
+
+        if not stage_result is None:
+            self.__main_logger.print_message('Harmonic analysis from stage cache')
+
+            grating_interferometry.push_recorded_plots(self.__plotter, stage_result, CALCULATE_DPC_CONTEXT_KEY, unique_id, **kwargs)
+
+            return [stage_result.get_parameter(name) for name in ["int00", "int01", "int10", "darkField01", "darkField10", "phaseFFT_01", "phaseFFT_10"]]
+
+        # Obtain harmonic periods from images
+
+        plot_recorder    = None if stage_key is None else grating_interferometry.PlotRecorder(excluded_names=kwargs.keys())
+        h_img_ref        = None
+        reference_key    = None if (imgRef is None or self.__reference_cache is None) else ReferenceCache.get_key(imgRef, harmonic_period_o)
+        cached_reference = None if reference_key is None else self.__reference_cache.get(reference_key)
+
+        if imgRef is None:
+            harmPeriod = harmonic_period_o
+        elif not cached_reference is None:
+            self.__main_logger.print_message('Harmonic periods and harmonic images of the reference from cache')
+
+            harmPeriod, h_img_ref = cached_reference
+        else:
+            self.__main_logger.print_message('Obtain harmonic 01 experimentally')
+
+            (_, period_harm_Hor) = harmonic_analysis.exp_harm_period(imgRef, harmonic_period_o,
+                                                                     harmonic_ij=['0', '1'],
+                                                                     searchRegion=30,
+                                                                     isFFT=False,
+                                                                     logger=self.__main_logger)
+
+            self.__main_logger.print_message('MESSAGE: Obtain harmonic 10 experimentally')
+
+            (period_harm_Vert, _) = harmonic_analysis.exp_harm_period(imgRef, harmonic_period_o,
+                                                                      harmonic_ij=['1', '0'],
+                                                                      searchRegion=30,
+                                                                      isFFT=False,
+                                                                      logger=self.__main_logger)
+
+            harmPeriod = [period_harm_Vert, period_harm_Hor]
+
+            if not reference_key is None:
+                h_img_ref = harmonic_analysis.single_grating_harmonic_images(imgRef, harmPeriod,
+                                                                             context_key=CALCULATE_DPC_CONTEXT_KEY,
+                                                                             image_name="Ref",
+                                                                             unique_id=unique_id,
+                                                                             logger=self.__main_logger,
+                                                                             plot_hook=grating_interferometry.get_plot_hook(self.__plotter, plot_recorder),
+                                                                             **kwargs)
+                self.__reference_cache.put(reference_key, harmPeriod, h_img_ref)
+
+        # Calculate everything
+
+        [int00, int01, int10,
+         darkField01, darkField10,
+         phaseFFT_01,
+         phaseFFT_10] = grating_interferometry.single_2Dgrating_analyses(img,
+                                                                         img_ref=imgRef,
+                                                                         harmonicPeriod=harmPeriod,
+                                                                         unwrapFlag=unwrapFlag,
+                                                                         context_key=CALCULATE_DPC_CONTEXT_KEY,
+                                                                         unique_id=unique_id,
+                                                                         logger=self.__main_logger, plotter=self.__plotter,
+                                                                         h_img_ref=h_img_ref,
+                                                                         plot_recorder=plot_recorder,
+                                                                         **kwargs)
+
+        if not stage_key is None: self.__stage_cache.put(stage_key, WavePyData(int00=int00, int01=int01, int10=int10,
+                                                                               darkField01=darkField01, darkField10=darkField10,
+                                                                               phaseFFT_01=phaseFFT_01, phaseFFT_10=phaseFFT_10,
+                                                                               **plot_recorder.get_parameters()))
+
+        return [int00, int01, int10, darkField01, darkField10, phaseFFT_01, phaseFFT_10]
+
     @classmethod
     def __draw_crop_for_integration(cls, plotting_properties, differential_phase_01, differential_phase_10, message="New Crop for Integration?", **kwargs):
         img_to_crop = differential_phase_01 ** 2 + differential_phase_10 ** 2
@@ -1264,15 +1385,29 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
         return differential_phase_01_crop, differential_phase_10_crop
 
     def __doIntegration(self, differential_phase_01, differential_phase_10, pixelsize, context_key, unique_id, **kwargs):
-        phase = surface_from_grad.frankotchellappa(differential_phase_01 * pixelsize[1], differential_phase_10 * pixelsize[0], reflec_pad=True)
-
         delx_f = differential_phase_01 * pixelsize[1]
         dely_f = differential_phase_10 * pixelsize[0]
 
-        grad_x, grad_y, error_x, error_y = surface_from_grad.error_integration(delx_f=delx_f,
-                                                                               dely_f=dely_f,
-                                                                               func=phase,
-                                                                               shifthalfpixel=False)
+        stage_key    = None if self.__stage_cache is None else StageCache.get_key(INTEGRATION_CONTEXT_KEY, delx_f, dely_f)
+        stage_result = None if stage_key is None else self.__stage_cache.get(stage_key)
+
+        if stage_result is None:
+            phase = surface_from_grad.frankotchellappa(delx_f, dely_f, reflec_pad=True)
+
+            grad_x, grad_y, error_x, error_y = surface_from_grad.error_integration(delx_f=delx_f,
+                                                                                   dely_f=dely_f,
+                                                                                   func=phase,
+                                                                                   shifthalfpixel=False)
+
+            if not stage_key is None: self.__stage_cache.put(stage_key, WavePyData(phase=phase, grad_x=grad_x, grad_y=grad_y, error_x=error_x, error_y=error_y))
+        else:
+            self.__main_logger.print_message('Integration from stage cache')
+
+            phase, grad_x, grad_y, error_x, error_y = [stage_result.get_parameter(name) for name in ["phase", "grad_x", "grad_y", "error_x", "error_y"]]
+
+            # as error_integration does, for the plot
+            delx_f -= np.mean(delx_f)
+            dely_f -= np.mean(dely_f)
 
         self.__plotter.push_plot_on_context(context_key, ErrorIntegration, unique_id,
                                            delx_f=delx_f, dely_f=dely_f, func=phase, grad_x=grad_x, grad_y=grad_y, error_x=error_x, error_y=error_y, pixelsize=pixelsize, **kwargs)
@@ -1290,19 +1425,993 @@ class __SingleGratingTalbot2D(SingleGratingTalbotFacade):
 
         return err, popt
 
-def _create_single_grating_talbot_manager_2D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy):
-    return __SingleGratingTalbot2D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy)
+def _create_single_grating_talbot_manager_2D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy, reference_cache=None, stage_cache=None):
+    return __SingleGratingTalbot2D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy, reference_cache, stage_cache)
 
 class __SingleGratingTalbot1D(SingleGratingTalbotFacade):
-    def __init__(self, plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy):
+    """
+    Single grating Talbot imaging with a 1D (lines) grating: the image is modulated along one direction only, so the
+    harmonics 00 and 1 are extracted by 1D transforms of all the rows (horizontal DPC) or columns (vertical DPC) at
+    once, and the DPC is integrated line by line.
+
+    The results have the same parameters of the 2D analysis, with None for the missing direction (harmonic 01 for the
+    horizontal direction, harmonic 10 for the vertical one).
+    """
+    def __init__(self, plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy, reference_cache=None, stage_cache=None):
         self.__plotter = plotter
         self.__main_logger = main_logger
         self.__script_logger = script_logger
         self.__ini = ini
         self.__dpc_profile_analysis_manager = dpc_profile_analysis_manager
+        self.__reference_cache = reference_cache
+        self.__stage_cache = stage_cache
 
         self.__wavelength = hc / phenergy
         self.__kwave = 2 * np.pi / self.__wavelength
 
-def _create_single_grating_talbot_manager_1D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy):
-    return __SingleGratingTalbot1D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy)
+    # %% ==================================================================================================
+
+    def calculate_dpc(self, initial_crop_parameters, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        phenergy        = initialization_parameters.get_parameter("phenergy")
+        pixelsize       = initialization_parameters.get_parameter("pixelsize")
+        distDet2sample  = initialization_parameters.get_parameter("distDet2sample")
+        period_harm     = initialization_parameters.get_parameter("period_harm")
+        unwrapFlag      = True
+
+        direction, axis = self.__get_direction(initialization_parameters)
+
+        if initial_crop_parameters is None:
+            img             = initialization_parameters.get_parameter("img")
+            imgRef          = initialization_parameters.get_parameter("imgRef")
+            img_size_o      = np.shape(img)
+        else:
+            img             = initial_crop_parameters.get_parameter("img")
+            imgRef          = initial_crop_parameters.get_parameter("imgRef")
+            img_size_o      = initial_crop_parameters.get_parameter("img_size_o")
+
+        add_context_label = plotting_properties.get_parameter("add_context_label", True)
+        use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
+
+        unique_id = self.__plotter.register_context_window(CALCULATE_DPC_CONTEXT_KEY,
+                                                          context_window=plotting_properties.get_context_widget(),
+                                                          use_unique_id=use_unique_id)
+
+        # Plot Real Image AFTER crop
+        self.__plotter.push_plot_on_context(CALCULATE_DPC_CONTEXT_KEY, ShowCroppedFigure, unique_id, img=img, pixelsize=pixelsize, **kwargs)
+
+        harmonic_period_o = [0, 0]
+        harmonic_period_o[axis] = int(period_harm[axis]*img.shape[axis]/img_size_o[axis]) + 1
+
+        self.__main_logger.print_message('1D grating, direction: ' + direction)
+
+        int00, int1, darkField1, phaseFFT_1 = self.__harmonic_analysis(img, imgRef, harmonic_period_o, unwrapFlag, unique_id, **kwargs)
+
+        # the harmonic images keep the full resolution along the grating lines
+        virtual_pixelsize = [0, 0]
+        virtual_pixelsize[0] = pixelsize[0]*img.shape[0]/int00.shape[0]
+        virtual_pixelsize[1] = pixelsize[1]*img.shape[1]/int00.shape[1]
+
+        differential_phase = -phaseFFT_1*virtual_pixelsize[axis]/distDet2sample/hc*phenergy
+        # Note: same signal of the 2D case
+
+        self.__plotter.draw_context(CALCULATE_DPC_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        self.__main_logger.print_message('VALUES: virtual pixelsize i, j: {:.4f}um, {:.4f}um'.format(virtual_pixelsize[0] * 1e6, virtual_pixelsize[1] * 1e6))
+        self.__script_logger.print('\nvirtual_pixelsize = ' + str(virtual_pixelsize))
+
+        self.__main_logger.print_message('wavelength [m] = ' + str('{:.5g}'.format(self.__wavelength)))
+        self.__script_logger.print('wavelength [m] = ' + str('{:.5g}'.format(self.__wavelength)))
+
+        lengthSensitivy100 = virtual_pixelsize[axis]**2/distDet2sample/100
+
+        # the 100 means that I arbitrarylly assumed the angular error in
+        #  fringe displacement to be 2pi/100 = 3.6 deg
+
+        self.__main_logger.print_message('WF Length Sensitivy 100 [m] = ' + str('{:.5g}'.format(lengthSensitivy100)))
+        self.__main_logger.print_message('WF Length Sensitivy 100 [1/lambda] = ' + str('{:.5g}'.format(lengthSensitivy100 / self.__wavelength)) + '\n')
+
+        self.__script_logger.print('WF Length Sensitivy 100 [m] = ' + str('{:.5g}'.format(lengthSensitivy100)))
+        self.__script_logger.print('WF Length Sensitivy 100 [1/lambda] = ' + str('{:.5g}'.format(lengthSensitivy100/self.__wavelength)) + '\n')
+
+        int01, int10                                 = self.__to_components(int1, axis)
+        darkField01, darkField10                     = self.__to_components(darkField1, axis)
+        differential_phase_01, differential_phase_10 = self.__to_components(differential_phase, axis)
+
+        return WavePyData(int00=int00,
+                          int01=int01,
+                          int10=int10,
+                          darkField01=darkField01,
+                          darkField10=darkField10,
+                          differential_phase_01=differential_phase_01,
+                          differential_phase_10=differential_phase_10,
+                          virtual_pixelsize=virtual_pixelsize,
+                          idx2ndCrop=[0, -1, 0, -1])
+
+    # %% ==================================================================================================
+
+    def draw_crop_dpc(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        _, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase = self.__get_component(dpc_result, "differential_phase_", axis)
+
+        return crop_image.draw_crop_image(img=np.abs(differential_phase - differential_phase.mean()),
+                                          plotting_properties=plotting_properties,
+                                          application_name=APPLICATION_NAME,
+                                          **kwargs)
+
+    def crop_dpc(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        _, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase = self.__get_component(dpc_result, "differential_phase_", axis)
+
+        if self.__plotter.is_active():
+            _, idx2ndCrop, _ = crop_image.crop_image(img=np.abs(differential_phase - differential_phase.mean()),
+                                                     plotting_properties=plotting_properties,
+                                                     application_name=APPLICATION_NAME,
+                                                     **kwargs)
+        else:
+            idx2ndCrop = [0, -1, 0, -1]
+
+        dpc_result.set_parameter("idx2ndCrop", idx2ndCrop)
+
+        return dpc_result
+
+    def show_calculated_dpc(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        img             = initialization_parameters.get_parameter("img")
+        imgRef          = initialization_parameters.get_parameter("imgRef")
+        pixelsize       = initialization_parameters.get_parameter("pixelsize")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        int00              = dpc_result.get_parameter("int00")
+        int1               = self.__get_component(dpc_result, "int", axis)
+        darkField1         = self.__get_component(dpc_result, "darkField", axis)
+        differential_phase = self.__get_component(dpc_result, "differential_phase_", axis)
+        virtual_pixelsize  = dpc_result.get_parameter("virtual_pixelsize")
+
+        add_context_label = plotting_properties.get_parameter("add_context_label", True)
+        use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
+
+        unique_id = self.__plotter.register_context_window(RECROP_DPC_CONTEXT_KEY,
+                                                          context_window=plotting_properties.get_context_widget(),
+                                                          use_unique_id=use_unique_id)
+
+        idx2ndCrop = dpc_result.get_parameter("idx2ndCrop")
+
+        if idx2ndCrop != [0, -1, 0, -1]:
+            int00              = common_tools.crop_matrix_at_indexes(int00, idx2ndCrop)
+            int1               = common_tools.crop_matrix_at_indexes(int1, idx2ndCrop)
+            darkField1         = common_tools.crop_matrix_at_indexes(darkField1, idx2ndCrop)
+            differential_phase = common_tools.crop_matrix_at_indexes(differential_phase, idx2ndCrop)
+
+            factor_i = virtual_pixelsize[0]/pixelsize[0]
+            factor_j = virtual_pixelsize[1]/pixelsize[1]
+
+            idx1stCrop = self.__ini.get_list_from_ini("Parameters", "Crop", type=int)
+
+            idx4crop = [0, -1, 0, -1]
+            idx4crop[0] = int(np.rint(idx1stCrop[0] + idx2ndCrop[0]*factor_i))
+            idx4crop[1] = int(np.rint(idx1stCrop[0] + idx2ndCrop[1]*factor_i))
+            idx4crop[2] = int(np.rint(idx1stCrop[2] + idx2ndCrop[2]*factor_j))
+            idx4crop[3] = int(np.rint(idx1stCrop[2] + idx2ndCrop[3]*factor_j))
+
+            self.__main_logger.print('New Crop: {}, {}, {}, {}'.format(idx4crop[0], idx4crop[1], idx4crop[2], idx4crop[3]))
+
+            self.__ini.set_list_at_ini("Parameters", "Crop", idx4crop)
+
+            # Plot Real Image AFTER crop
+            self.__plotter.push_plot_on_context(RECROP_DPC_CONTEXT_KEY, ShowCroppedFigure, unique_id,
+                                                img=common_tools.crop_matrix_at_indexes(img, idx4crop), pixelsize=pixelsize, title="Raw Image with 2nd Crop", **kwargs)
+
+            self.__ini.push()
+
+        int01, int10                                 = self.__to_components(int1, axis)
+        darkField01, darkField10                     = self.__to_components(darkField1, axis)
+        differential_phase_01, differential_phase_10 = self.__to_components(differential_phase, axis)
+
+        if not imgRef is None:
+            self.__plotter.push_plot_on_context(RECROP_DPC_CONTEXT_KEY, PlotIntensitiesHarms, unique_id,
+                                               int00=int00, int01=int01, int10=int10, pixelsize=virtual_pixelsize, titleStr='Intensity', **kwargs)
+            self.__plotter.push_plot_on_context(RECROP_DPC_CONTEXT_KEY, PlotDarkField, unique_id,
+                                               darkField01=darkField01, darkField10=darkField10, pixelsize=virtual_pixelsize, **kwargs)
+            self.__plotter.save_sdf_file(int00, virtual_pixelsize, file_suffix="_intensity", extraHeader={'Title': 'Intensity', 'Zunit': 'au'})
+
+        self.__plotter.push_plot_on_context(RECROP_DPC_CONTEXT_KEY, PlotDPC, unique_id,
+                                           differential_phase_01=differential_phase_01, differential_phase_10=differential_phase_10, pixelsize=virtual_pixelsize, titleStr="", **kwargs)
+
+        self.__plotter.draw_context(RECROP_DPC_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        return WavePyData(int00=int00,
+                          int01=int01,
+                          int10=int10,
+                          darkField01=darkField01,
+                          darkField10=darkField10,
+                          differential_phase_01=differential_phase_01,
+                          differential_phase_10=differential_phase_10,
+                          virtual_pixelsize=virtual_pixelsize)
+
+    # %% ==================================================================================================
+
+    def correct_zero_dpc(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize  = dpc_result.get_parameter("virtual_pixelsize")
+
+        phenergy           = initialization_parameters.get_parameter("phenergy")
+        pixelsize          = initialization_parameters.get_parameter("pixelsize")
+        distDet2sample     = initialization_parameters.get_parameter("distDet2sample")
+        correct_pi_jump    = initialization_parameters.get_parameter("correct_pi_jump", False)
+        remove_mean        = initialization_parameters.get_parameter("remove_mean", False)
+        correct_dpc_center = initialization_parameters.get_parameter("correct_dpc_center", False)
+
+        direction, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase = self.__get_component(dpc_result, "differential_phase_", axis)
+
+        add_context_label = plotting_properties.get_parameter("add_context_label", True)
+        use_unique_id = plotting_properties.get_parameter("use_unique_id", False)
+
+        unique_id = self.__plotter.register_context_window(CORRECT_ZERO_DPC_CONTEXT_KEY,
+                                                          context_window=plotting_properties.get_context_widget(),
+                                                          use_unique_id=use_unique_id)
+
+        # the widgets show the two components of the 2D case, in the order 01 (horizontal), 10 (vertical)
+        index = 0 if axis == 1 else 1
+
+        factor = distDet2sample*hc/phenergy
+        angle = list(self.__to_components(differential_phase/pixelsize[axis]*factor, axis))
+        pi_jump = list(self.__to_components(int(np.round(np.mean(angle[index] / np.pi))), axis))
+
+        self.__script_logger.print('Initial ' + direction + ' Mean angle/pi : {:} pi'.format(np.mean(angle[index]/np.pi)))
+
+        self.__plotter.push_plot_on_context(CORRECT_ZERO_DPC_CONTEXT_KEY, CorrectDPC, unique_id,
+                                           angle=angle, pi_jump=pi_jump, ignores_figure_dimensions=True, **kwargs)
+
+        def __get_dpc(angle_i):
+            return angle_i * pixelsize[axis] / factor
+
+        if not pi_jump[index] == 0 and correct_pi_jump:
+            angle[index] -= pi_jump[index] * np.pi
+
+            differential_phase_01, differential_phase_10 = self.__to_components(__get_dpc(angle[index]), axis)
+
+            self.__plotter.push_plot_on_context(CORRECT_ZERO_DPC_CONTEXT_KEY, PlotDPC, unique_id,
+                                               differential_phase_01=differential_phase_01, differential_phase_10=differential_phase_10, pixelsize=virtual_pixelsize, titleStr="Correct \u03c0 jump", **kwargs)
+
+        mean_angle_over_pi = np.mean(angle[index]/np.pi)
+
+        self.__main_logger.print_message('mean angle/pi: {:} pi'.format(mean_angle_over_pi))
+        self.__script_logger.print(direction + ' Mean angle/pi : {:} pi'.format(mean_angle_over_pi))
+
+        if remove_mean:
+            angle[index] -= np.mean(angle[index])
+
+            differential_phase_01, differential_phase_10 = self.__to_components(__get_dpc(angle[index]), axis)
+
+            self.__plotter.push_plot_on_context(CORRECT_ZERO_DPC_CONTEXT_KEY, CorrectDPCHistos, unique_id,
+                                               angle=angle, title="Remove mean", ignores_figure_dimensions=True, **kwargs)
+            self.__plotter.push_plot_on_context(CORRECT_ZERO_DPC_CONTEXT_KEY, PlotDPC, unique_id,
+                                               differential_phase_01=differential_phase_01, differential_phase_10=differential_phase_10, pixelsize=virtual_pixelsize, titleStr="Remove Mean", **kwargs)
+
+        if correct_dpc_center and self.__plotter.is_active():
+            angle = self.__plotter.show_interactive_plot(CorrectDPCCenter, container_widget=None, angle=angle, ignores_figure_dimensions=True, **kwargs)
+
+            differential_phase_01, differential_phase_10 = self.__to_components(__get_dpc(angle[index]), axis)
+
+            self.__plotter.push_plot_on_context(CORRECT_ZERO_DPC_CONTEXT_KEY, CorrectDPCHistos, unique_id,
+                                               angle=angle, title="Correct DPC Center", ignores_figure_dimensions=True, **kwargs)
+            self.__plotter.push_plot_on_context(CORRECT_ZERO_DPC_CONTEXT_KEY, PlotDPC, unique_id,
+                                               differential_phase_01=differential_phase_01, differential_phase_10=differential_phase_10, pixelsize=virtual_pixelsize, titleStr="Correct DPC Center", **kwargs)
+
+        self.__plotter.draw_context(CORRECT_ZERO_DPC_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        differential_phase_01, differential_phase_10 = self.__to_components(__get_dpc(angle[index]), axis)
+
+        return WavePyData(differential_phase_01=differential_phase_01, differential_phase_10=differential_phase_10, virtual_pixelsize=virtual_pixelsize)
+
+    # %% ==================================================================================================
+
+    def remove_linear_fit(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize  = dpc_result.get_parameter("virtual_pixelsize")
+
+        remove_linear      = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase = self.__get_component(dpc_result, "differential_phase_", axis)
+
+        if not remove_linear:
+            differential_phase_2save = differential_phase
+            linear_fit_dpc = None
+        else:
+            add_context_label = plotting_properties.get_parameter("add_context_label", True)
+            use_unique_id = plotting_properties.get_parameter("use_unique_id", False)
+
+            unique_id = self.__plotter.register_context_window(REMOVE_LINEAR_FIT_CONTEXT_KEY,
+                                                              context_window=plotting_properties.get_context_widget(),
+                                                              use_unique_id=use_unique_id)
+
+            # the linear fit is along the direction of the DPC only
+            xx, yy = common_tools.grid_coord(differential_phase, virtual_pixelsize)
+            coord = xx if axis == 1 else yy
+            argNotNAN = np.isfinite(differential_phase)
+            f = differential_phase[argNotNAN].flatten()
+            x = coord[argNotNAN].flatten()
+            X_matrix = np.vstack([x, x * 0.0 + 1]).T
+            beta_matrix = np.linalg.lstsq(X_matrix, f, rcond=None)[0]
+            mask = differential_phase * 0.0 + 1.0
+            mask[~argNotNAN] = np.nan
+
+            linear_fit_dpc = (beta_matrix[0] * coord + beta_matrix[1]) * mask
+
+            self.__ini.set_list_at_ini('Parameters', 'lin fitting coef cH' if axis == 1 else 'lin fitting coef cV', beta_matrix)
+            self.__ini.push()
+
+            differential_phase_2save = differential_phase - linear_fit_dpc
+
+            linear_fit_dpc_01, linear_fit_dpc_10                     = self.__to_components(linear_fit_dpc, axis)
+            differential_phase_01_2save, differential_phase_10_2save = self.__to_components(differential_phase_2save, axis)
+
+            self.__plotter.push_plot_on_context(REMOVE_LINEAR_FIT_CONTEXT_KEY, PlotDPC, unique_id,
+                                               differential_phase_01=linear_fit_dpc_01, differential_phase_10=linear_fit_dpc_10, pixelsize=virtual_pixelsize, titleStr="Linear DPC Component", **kwargs)
+            self.__plotter.push_plot_on_context(REMOVE_LINEAR_FIT_CONTEXT_KEY, PlotDPC, unique_id,
+                                               differential_phase_01=differential_phase_01_2save, differential_phase_10=differential_phase_10_2save, pixelsize=virtual_pixelsize, titleStr="(removed linear DPC component)", **kwargs)
+
+            self.__plotter.draw_context(REMOVE_LINEAR_FIT_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        differential_phase_01_2save, differential_phase_10_2save = self.__to_components(differential_phase_2save, axis)
+        linear_fit_dpc_01, linear_fit_dpc_10                     = self.__to_components(linear_fit_dpc, axis)
+
+        return WavePyData(differential_phase_01=differential_phase_01_2save,
+                          differential_phase_10=differential_phase_10_2save,
+                          virtual_pixelsize=virtual_pixelsize,
+                          linear_fit_dpc_01=linear_fit_dpc_01,
+                          linear_fit_dpc_10=linear_fit_dpc_10)
+
+    # %% ==================================================================================================
+
+    def dpc_profile_analysis(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize  = dpc_result.get_parameter("virtual_pixelsize")
+
+        direction, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase = self.__get_component(dpc_result, "differential_phase_", axis)
+
+        if axis == 1: fname = self.__plotter.save_sdf_file(differential_phase, virtual_pixelsize, file_suffix="_dpc_X", extraHeader={'Title': 'DPC 01', 'Zunit': 'rad'})
+        else:         fname = self.__plotter.save_sdf_file(differential_phase, virtual_pixelsize, file_suffix="_dpc_Y", extraHeader={'Title': 'DPC 10', 'Zunit': 'rad'})
+
+        projectionFromDiv = 1.0
+
+        self.__script_logger.print('projectionFromDiv : {:.4f}'.format(projectionFromDiv))
+
+        self.__dpc_profile_analysis_manager.dpc_profile_analysis(WavePyData(differential_phase=differential_phase,
+                                                                            direction=direction,
+                                                                            virtual_pixelsize=virtual_pixelsize,
+                                                                            fname=fname,
+                                                                            grazing_angle=0,
+                                                                            projectionFromDiv=projectionFromDiv,
+                                                                            remove1stOrderDPC=False,
+                                                                            remove2ndOrder=False,
+                                                                            nprofiles=5,
+                                                                            filter_width=50),
+                                                                 initialization_parameters, plotting_properties, **kwargs)
+
+        return self.__copy_dpc_result(dpc_result)
+
+    # %% ==================================================================================================
+
+    def fit_radius_dpc(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        differential_phase_01       = dpc_result.get_parameter("differential_phase_01")
+        differential_phase_10       = dpc_result.get_parameter("differential_phase_10")
+        virtual_pixelsize = dpc_result.get_parameter("virtual_pixelsize")
+
+        add_context_label = plotting_properties.get_parameter("add_context_label", True)
+        use_unique_id = plotting_properties.get_parameter("use_unique_id", False)
+
+        unique_id = self.__plotter.register_context_window(FIT_RADIUS_DPC_CONTEXT_KEY,
+                                                          context_window=plotting_properties.get_context_widget(),
+                                                          use_unique_id=use_unique_id)
+
+        _log_curvature_radius(self.__main_logger, differential_phase_01, differential_phase_10, virtual_pixelsize, self.__kwave)
+
+        self.__plotter.push_plot_on_context(FIT_RADIUS_DPC_CONTEXT_KEY, FitRadiusDPC, unique_id,
+                                           dpx=differential_phase_01, dpy=differential_phase_10, pixelsize=virtual_pixelsize, kwave=self.__kwave, str4title="", **kwargs)
+
+        self.__plotter.draw_context(FIT_RADIUS_DPC_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        return self.__copy_dpc_result(dpc_result)
+
+    # %% ==================================================================================================
+
+    def draw_crop_for_integration(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        do_integration   = initialization_parameters.get_parameter("do_integration")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        if do_integration:
+            return self.__draw_crop_for_integration(plotting_properties,
+                                                    differential_phase=self.__get_component(dpc_result, "differential_phase_", axis),
+                                                    message="Crop Differential Phase for Integration", **kwargs)
+        else:
+            return None
+
+    def manage_crop_for_integration(self, dpc_result, initialization_parameters, idx4crop):
+        do_integration = initialization_parameters.get_parameter("do_integration")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        if do_integration:
+            differential_phase = common_tools.crop_matrix_at_indexes(self.__get_component(dpc_result, "differential_phase_", axis), idx4crop)
+
+            self.__set_component(dpc_result, "differential_phase_", axis, differential_phase)
+
+        return dpc_result
+
+    def crop_for_integration(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        do_integration   = initialization_parameters.get_parameter("do_integration")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        if do_integration:
+            differential_phase = self.__crop_for_integration(plotting_properties,
+                                                             differential_phase=self.__get_component(dpc_result, "differential_phase_", axis),
+                                                             message="Crop Differential Phase for Integration", **kwargs)
+
+            self.__set_component(dpc_result, "differential_phase_", axis, differential_phase)
+
+        return dpc_result
+
+    def do_integration(self, dpc_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize = dpc_result.get_parameter("virtual_pixelsize")
+
+        do_integration   = initialization_parameters.get_parameter("do_integration")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        if do_integration:
+            add_context_label = plotting_properties.get_parameter("add_context_label", True)
+            use_unique_id = plotting_properties.get_parameter("use_unique_id", False)
+
+            unique_id = self.__plotter.register_context_window(INTEGRATION_CONTEXT_KEY,
+                                                              context_window=plotting_properties.get_context_widget(),
+                                                              use_unique_id=use_unique_id)
+
+            integration_method = self.__get_integration_method()
+
+            self.__main_logger.print_message('Performing 1D ' + integration_method + ' Integration')
+
+            phase = self.__doIntegration(self.__get_component(dpc_result, "differential_phase_", axis), virtual_pixelsize, axis, INTEGRATION_CONTEXT_KEY, unique_id)
+
+            self.__main_logger.print_message('DONE')
+            self.__main_logger.print_message('Plotting Phase in meters')
+
+            integrated_data = -1 / 2 / np.pi * phase * self.__wavelength
+
+            self.__plotter.push_plot_on_context(INTEGRATION_CONTEXT_KEY, PlotIntegration, unique_id,
+                                                title="1D " + integration_method + " Integration",
+                                                data=integrated_data * 1e9,
+                                                pixelsize=virtual_pixelsize,
+                                                titleStr = r'-WF $[nm]$',
+                                                ctitle="",
+                                                max3d_grid_points=101,
+                                                kwarg4surf={},
+                                                **kwargs)
+
+            self.__plotter.save_sdf_file(integrated_data, virtual_pixelsize, file_suffix='_phase', extraHeader={'Title': 'WF Phase', 'Zunit': 'meters'})
+
+            self.__plotter.draw_context(INTEGRATION_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        self.__script_logger.print("\n\n" + self.__ini.dump())
+
+        integration_result = self.__copy_dpc_result(dpc_result)
+        integration_result.set_parameter("phase", phase if do_integration else None)
+
+        return integration_result
+
+    # %% ==================================================================================================
+
+    def calculate_thickness(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize = integration_result.get_parameter("virtual_pixelsize")
+        phase             = integration_result.get_parameter("phase")
+
+        do_integration   = initialization_parameters.get_parameter("do_integration")
+        calc_thickness   = initialization_parameters.get_parameter("calc_thickness")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        if do_integration and calc_thickness:
+            add_context_label = plotting_properties.get_parameter("add_context_label", True)
+            use_unique_id = plotting_properties.get_parameter("use_unique_id", False)
+
+            unique_id = self.__plotter.register_context_window(CALCULATE_THICKNESS_CONTEXT_KEY,
+                                                              context_window=plotting_properties.get_context_widget(),
+                                                              use_unique_id=use_unique_id)
+
+            self.__main_logger.print_message('Plotting Thickness')
+
+            material_idx   = initialization_parameters.get_parameter("material_idx")
+            phenergy       = initialization_parameters.get_parameter("phenergy")
+            distDet2sample = initialization_parameters.get_parameter("distDet2sample")
+
+            delta, material, density = get_delta(phenergy, material_idx=material_idx)
+
+            thickness = -(phase - np.min(phase)) / self.__kwave / delta
+
+            titleStr = r'Material: ' + material + ', Thickness $[\mu m]$'
+
+            self.__plotter.push_plot_on_context(CALCULATE_THICKNESS_CONTEXT_KEY, PlotIntegration, unique_id,
+                                               title="Thickness",
+                                               data=thickness * 1e6,
+                                               pixelsize=virtual_pixelsize,
+                                               titleStr=titleStr,
+                                               ctitle=r'$[\mu m]$',
+                                               max3d_grid_points=101,
+                                               kwarg4surf={},
+                                               **kwargs)
+
+            # Log thickness properties
+            self.__script_logger.print('Material = ' + material)
+            self.__script_logger.print('density = ' + str('{:.3g}'.format(density)) + ' g/cm^3')
+            self.__script_logger.print('delta = ' + str('{:.5g}'.format(delta)))
+
+            thickSensitivy100 = virtual_pixelsize[axis] ** 2 / distDet2sample / delta / 100
+            # the 100 means that I arbitrarylly assumed the angular error in
+            #  fringe displacement to be 2pi/100 = 3.6 deg
+            self.__script_logger.print('Thickness Sensitivy 100 [m] = ' + str('{:.5g}'.format(thickSensitivy100)))
+            self.__plotter.save_sdf_file(thickness, virtual_pixelsize, file_suffix='_thickness', extraHeader={'Title': 'Thickness', 'Zunit': 'meters'})
+
+            self.__plotter.draw_context(CALCULATE_THICKNESS_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        integration_result = self.__copy_dpc_result(integration_result)
+        integration_result.set_parameter("phase", phase)
+        integration_result.set_parameter("thickness", thickness if (do_integration and calc_thickness) else None)
+
+        return integration_result
+
+    # %% ==================================================================================================
+
+    def draw_crop_2nd_order_component_of_the_phase_1(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        if do_integration and remove_linear:
+            return self.__draw_crop_for_integration(plotting_properties,
+                                                    differential_phase=self.__get_component(integration_result, "linear_fit_dpc_", axis),
+                                                    message="New Crop for 2nd order component of the phase?", **kwargs)
+        else:
+            return None
+
+    def manage_crop_2nd_order_component_of_the_phase_1(self, integration_result, initialization_parameters, idx4crop):
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        if do_integration and remove_linear: differential_phase_crop_1 = common_tools.crop_matrix_at_indexes(self.__get_component(integration_result, "linear_fit_dpc_", axis), idx4crop)
+        else:                                differential_phase_crop_1 = self.__get_component(integration_result, "differential_phase_", axis)
+
+        self.__set_component(integration_result, "differential_phase_", axis, differential_phase_crop_1, suffix="_crop_1")
+
+        return integration_result
+
+    def crop_2nd_order_component_of_the_phase_1(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        # % 2nd order component of phase
+
+        if do_integration and remove_linear:
+            differential_phase_crop_1 = self.__crop_for_integration(plotting_properties,
+                                                                    differential_phase=self.__get_component(integration_result, "linear_fit_dpc_", axis),
+                                                                    message="New Crop for 2nd order component of the phase?", **kwargs)
+        else:
+            differential_phase_crop_1 = self.__get_component(integration_result, "differential_phase_", axis)
+
+        self.__set_component(integration_result, "differential_phase_", axis, differential_phase_crop_1, suffix="_crop_1")
+
+        return integration_result
+
+    def calc_2nd_order_component_of_the_phase_1(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize = integration_result.get_parameter("virtual_pixelsize")
+
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase_crop_1 = self.__get_component(integration_result, "differential_phase_", axis, suffix="_crop_1",
+                                                         default_value=self.__get_component(integration_result, "differential_phase_", axis))
+
+        # % 2nd order component of phase
+
+        if do_integration and remove_linear:
+            add_context_label = plotting_properties.get_parameter("add_context_label", True)
+            use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
+
+            unique_id = self.__plotter.register_context_window(CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE,
+                                                              context_window=plotting_properties.get_context_widget(),
+                                                              use_unique_id=use_unique_id)
+
+            data = 1 / 2 / np.pi * self.__doIntegration(differential_phase_crop_1, virtual_pixelsize, axis,
+                                                        CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE, unique_id, **kwargs) # phase_2nd_order
+
+            self.__plotter.push_plot_on_context(CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE, PlotIntegration, unique_id,
+                                               title="2nd order component of the phase",
+                                               data=data,
+                                               pixelsize=virtual_pixelsize,
+                                               titleStr=r'WF, 2nd order component' + r'$[\lambda$ units $]$',
+                                               ctitle='',
+                                               max3d_grid_points=101,
+                                               kwarg4surf={}, **kwargs)
+
+            if use_unique_id: self.__plotter.draw_context(CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        return self.__copy_integration_result(integration_result)
+
+    def draw_crop_2nd_order_component_of_the_phase_2(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        # % 2nd order component of phase
+
+        if do_integration and remove_linear:
+            return self.__draw_crop_for_integration(plotting_properties,
+                                                    differential_phase=self.__get_component(integration_result, "differential_phase_", axis) -
+                                                                       self.__get_component(integration_result, "linear_fit_dpc_", axis),
+                                                    message="New Crop for difference to 2nd order component of the phase?", **kwargs)
+        else:
+            return None
+
+    def manage_crop_2nd_order_component_of_the_phase_2(self, integration_result, initialization_parameters, idx4crop):
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase = self.__get_component(integration_result, "differential_phase_", axis)
+
+        if do_integration and remove_linear: differential_phase_crop_2 = common_tools.crop_matrix_at_indexes(differential_phase - self.__get_component(integration_result, "linear_fit_dpc_", axis), idx4crop)
+        else:                                differential_phase_crop_2 = differential_phase
+
+        self.__set_component(integration_result, "differential_phase_", axis, differential_phase_crop_2, suffix="_crop_2")
+
+        return integration_result
+
+    def crop_2nd_order_component_of_the_phase_2(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase = self.__get_component(integration_result, "differential_phase_", axis)
+
+        # % 2nd order component of phase
+
+        if do_integration and remove_linear:
+            differential_phase_crop_2 = self.__crop_for_integration(plotting_properties,
+                                                                    differential_phase=differential_phase - self.__get_component(integration_result, "linear_fit_dpc_", axis),
+                                                                    message="New Crop for 2nd order component of the phase?", **kwargs)
+        else:
+            differential_phase_crop_2 = differential_phase
+
+        self.__set_component(integration_result, "differential_phase_", axis, differential_phase_crop_2, suffix="_crop_2")
+
+        return integration_result
+
+    def calc_2nd_order_component_of_the_phase_2(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize = integration_result.get_parameter("virtual_pixelsize")
+
+        do_integration = initialization_parameters.get_parameter("do_integration")
+        remove_linear  = initialization_parameters.get_parameter("remove_linear")
+
+        _, axis = self.__get_direction(initialization_parameters)
+
+        differential_phase_crop_2 = self.__get_component(integration_result, "differential_phase_", axis, suffix="_crop_2",
+                                                         default_value=self.__get_component(integration_result, "differential_phase_", axis))
+
+        # % 2nd order component of phase
+
+        if do_integration and remove_linear:
+            add_context_label = plotting_properties.get_parameter("add_context_label", True)
+            use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
+
+            if use_unique_id: unique_id = self.__plotter.register_context_window(CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE,
+                                                                                context_window=plotting_properties.get_context_widget(),
+                                                                                use_unique_id=True)
+            else: unique_id = None
+
+            data = 1 / 2 / np.pi * self.__doIntegration(differential_phase_crop_2, virtual_pixelsize, axis,
+                                                        CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE, unique_id, **kwargs)
+
+            self.__plotter.push_plot_on_context(CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE, PlotIntegration, unique_id,
+                                               title="Difference to 2nd order of the phase",
+                                               data=data,
+                                               pixelsize=virtual_pixelsize,
+                                               titleStr=r'WF, difference to 2nd order component' + r'$[\lambda$ units $]$',
+                                               ctitle='',
+                                               max3d_grid_points=101,
+                                               kwarg4surf={},
+                                               **kwargs)
+
+            self.__plotter.save_sdf_file(data * self.__wavelength, virtual_pixelsize, file_suffix='_phase', extraHeader={'Title': 'WF Phase 2nd order removed', 'Zunit': 'meters'})
+
+            self.__plotter.draw_context(CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        return self.__copy_integration_result(integration_result)
+
+    # %% ==================================================================================================
+
+    def remove_2nd_order(self, integration_result, initialization_parameters, plotting_properties=PlottingProperties(), **kwargs):
+        virtual_pixelsize = integration_result.get_parameter("virtual_pixelsize")
+        phase             = integration_result.get_parameter("phase")
+
+        do_integration   = initialization_parameters.get_parameter("do_integration")
+        calc_thickness   = initialization_parameters.get_parameter("calc_thickness")
+        remove_2nd_order = initialization_parameters.get_parameter("remove_2nd_order")
+
+        direction, axis = self.__get_direction(initialization_parameters)
+
+        curvature_radius = None
+
+        if do_integration and remove_2nd_order:
+            add_context_label = plotting_properties.get_parameter("add_context_label", True)
+            use_unique_id     = plotting_properties.get_parameter("use_unique_id", False)
+
+            unique_id = self.__plotter.register_context_window(REMOVE_2ND_ORDER,
+                                                              context_window=plotting_properties.get_context_widget(),
+                                                              use_unique_id=use_unique_id)
+
+            radius_label = 'Rx' if axis == 1 else 'Ry'
+
+            if calc_thickness:
+                thickness = integration_result.get_parameter("thickness")
+
+                err, radius = self.__remove2ndOrder(thickness, virtual_pixelsize, axis)
+
+                self.__main_logger.print_message('Thickness Radius of WF ' + direction + ': {:.3g} m'.format(radius))
+
+                self.__plotter.push_plot_on_context(REMOVE_2ND_ORDER, PlotIntegration, unique_id,
+                                                   title="Thickness Residual",
+                                                   data=err * 1e6,
+                                                   pixelsize=virtual_pixelsize,
+                                                   titleStr=r'Thickness $[\mu m ]$' + '\n' +
+                                                             radius_label + r' = {:.3f} $\mu m$'.format(radius * 1e6),
+                                                   ctitle='',
+                                                   max3d_grid_points=101,
+                                                   kwarg4surf={},
+                                                   **kwargs)
+
+                self.__plotter.save_sdf_file(err, virtual_pixelsize, file_suffix='_thickness_residual', extraHeader={'Title': 'Thickness Residual', 'Zunit': 'meters'})
+
+            err, _ = self.__remove2ndOrder(phase, virtual_pixelsize, axis)
+            _, radius = self.__remove2ndOrder(1 / 2 / np.pi * phase * self.__wavelength, virtual_pixelsize, axis)
+
+            self.__main_logger.print_message('Curvature Radius of WF ' + direction + ': {:.3g} m'.format(radius))
+
+            curvature_radius = list(self.__to_components(radius, axis))
+
+            data = err / 2 / np.pi * self.__wavelength
+
+            self.__plotter.push_plot_on_context(REMOVE_2ND_ORDER, PlotIntegration, unique_id,
+                                               title="Phase Residual",
+                                               data=data * 1e9,
+                                               pixelsize=virtual_pixelsize,
+                                               titleStr=r'WF $[nm ]$' +
+                                                         '\n' + radius_label + ' = {:.3f} m'.format(radius),
+                                               ctitle='',
+                                               max3d_grid_points=101,
+                                               kwarg4surf={},
+                                               **kwargs)
+
+            self.__plotter.save_sdf_file(data, virtual_pixelsize, file_suffix='_phase_residual', extraHeader={'Title': 'WF Phase Residual', 'Zunit': 'meters'})
+
+            self.__main_logger.print_message('DONE')
+
+            self.__plotter.draw_context(REMOVE_2ND_ORDER, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
+
+        result = self.__copy_integration_result(integration_result)
+        result.set_parameter("curvature_radius", curvature_radius)
+
+        return result
+
+    ###################################################################
+    # PRIVATE METHODS
+
+    @classmethod
+    def __get_direction(cls, initialization_parameters):
+        direction = initialization_parameters.get_parameter("direction", None)
+        direction = DIRECTIONS[0] if direction is None else direction
+
+        if not direction in DIRECTIONS: raise ValueError("Direction not recognized: " + str(direction))
+
+        # the horizontal DPC (harmonic 01) is along the rows of the image, the vertical one (harmonic 10) along the columns
+        return direction, 1 if direction == DIRECTIONS[0] else 0
+
+    @classmethod
+    def __to_components(cls, value, axis):
+        return (value, None) if axis == 1 else (None, value)
+
+    @classmethod
+    def __get_component(cls, data, name, axis, suffix="", default_value=None):
+        return data.get_parameter(name + ("01" if axis == 1 else "10") + suffix, default_value)
+
+    @classmethod
+    def __set_component(cls, data, name, axis, value, suffix=""):
+        value_01, value_10 = cls.__to_components(value, axis)
+
+        data.set_parameter(name + "01" + suffix, value_01)
+        data.set_parameter(name + "10" + suffix, value_10)
+
+    @classmethod
+    def __copy_dpc_result(cls, dpc_result):
+        return WavePyData(differential_phase_01=dpc_result.get_parameter("differential_phase_01"),
+                          differential_phase_10=dpc_result.get_parameter("differential_phase_10"),
+                          virtual_pixelsize=dpc_result.get_parameter("virtual_pixelsize"),
+                          linear_fit_dpc_01=dpc_result.get_parameter("linear_fit_dpc_01"),
+                          linear_fit_dpc_10=dpc_result.get_parameter("linear_fit_dpc_10"))
+
+    @classmethod
+    def __copy_integration_result(cls, integration_result):
+        result = cls.__copy_dpc_result(integration_result)
+        result.set_parameter("phase", integration_result.get_parameter("phase"))
+        result.set_parameter("thickness", integration_result.get_parameter("thickness", None))
+
+        return result
+
+    def __get_integration_method(self):
+        integration_method = self.__ini.get_string_from_ini("Parameters", "integration method 1D", default=INTEGRATION_METHODS_1D[0])
+
+        if not integration_method in INTEGRATION_METHODS_1D: raise ValueError("Integration method not recognized: " + str(integration_method))
+
+        return integration_method
+
+    def __harmonic_analysis(self, img, imgRef, harmonic_period_o, unwrapFlag, unique_id, **kwargs):
+        # the plots of the analysis are stored with the result, to be pushed again when it is taken from the cache
+        stage_key    = None if self.__stage_cache is None else StageCache.get_key(CALCULATE_DPC_CONTEXT_KEY, img, imgRef, harmonic_period_o, unwrapFlag,
+                                                                                  grating_interferometry.is_plotting(self.__plotter))
+        stage_result = None if stage_key is None else self.__stage_cache.get(stage_key)
+
+        if not stage_result is None:
+            self.__main_logger.print_message('Harmonic analysis from stage cache')
+
+            grating_interferometry.push_recorded_plots(self.__plotter, stage_result, CALCULATE_DPC_CONTEXT_KEY, unique_id, **kwargs)
+
+            return [stage_result.get_parameter(name) for name in ["int00", "int1", "darkField1", "phaseFFT_1"]]
+
+        # Obtain harmonic period from images
+
+        plot_recorder    = None if stage_key is None else grating_interferometry.PlotRecorder(excluded_names=kwargs.keys())
+        h_img_ref        = None
+        reference_key    = None if (imgRef is None or self.__reference_cache is None) else ReferenceCache.get_key(imgRef, harmonic_period_o)
+        cached_reference = None if reference_key is None else self.__reference_cache.get(reference_key)
+
+        if imgRef is None:
+            harmPeriod = harmonic_period_o
+        elif not cached_reference is None:
+            self.__main_logger.print_message('Harmonic period and harmonic images of the reference from cache')
+
+            harmPeriod, h_img_ref = cached_reference
+        else:
+            self.__main_logger.print_message('Obtain harmonic 1 experimentally')
+
+            harmPeriod = harmonic_analysis.exp_harm_period_1d(imgRef, harmonic_period_o, searchRegion=30, logger=self.__main_logger)
+
+            if not reference_key is None:
+                h_img_ref = harmonic_analysis.single_1Dgrating_harmonic_images(imgRef, harmPeriod,
+                                                                               context_key=CALCULATE_DPC_CONTEXT_KEY,
+                                                                               image_name="Ref",
+                                                                               unique_id=unique_id,
+                                                                               logger=self.__main_logger,
+                                                                               plot_hook=grating_interferometry.get_plot_hook(self.__plotter, plot_recorder),
+                                                                               **kwargs)
+                self.__reference_cache.put(reference_key, harmPeriod, h_img_ref)
+
+        # Calculate everything
+
+        [int00, int1,
+         darkField1,
+         phaseFFT_1] = grating_interferometry.single_1Dgrating_analyses(img,
+                                                                         img_ref=imgRef,
+                                                                         harmonicPeriod=harmPeriod,
+                                                                         unwrapFlag=unwrapFlag,
+                                                                         context_key=CALCULATE_DPC_CONTEXT_KEY,
+                                                                         unique_id=unique_id,
+                                                                         logger=self.__main_logger, plotter=self.__plotter,
+                                                                         h_img_ref=h_img_ref,
+                                                                         plot_recorder=plot_recorder,
+                                                                         **kwargs)
+
+        if not stage_key is None: self.__stage_cache.put(stage_key, WavePyData(int00=int00, int1=int1, darkField1=darkField1, phaseFFT_1=phaseFFT_1, **plot_recorder.get_parameters()))
+
+        return [int00, int1, darkField1, phaseFFT_1]
+
+    @classmethod
+    def __draw_crop_for_integration(cls, plotting_properties, differential_phase, message="New Crop for Integration?", **kwargs):
+        img_to_crop = differential_phase ** 2
+
+        vmin = common_tools.mean_plus_n_sigma(img_to_crop, -3)
+        vmax = common_tools.mean_plus_n_sigma(img_to_crop, 3)
+
+        return crop_image.draw_crop_image(img=img_to_crop,
+                                          message=message,
+                                          kwargs4graph={'cmap': 'viridis', 'vmin': vmin, 'vmax': vmax},
+                                          plotting_properties=plotting_properties,
+                                          application_name=APPLICATION_NAME,
+                                          **kwargs)
+
+    @classmethod
+    def __crop_for_integration(cls, plotting_properties, differential_phase, message="New Crop for Integration?", **kwargs):
+        image_to_crop = differential_phase ** 2
+
+        plotter = get_registered_plotter_instance(application_name=APPLICATION_NAME)
+
+        if plotter.is_active():
+            vmin = common_tools.mean_plus_n_sigma(image_to_crop, -3)
+            vmax = common_tools.mean_plus_n_sigma(image_to_crop, 3)
+
+            _, idx4crop, _ = crop_image.crop_image(img=image_to_crop,
+                                                   message=message,
+                                                   kwargs4graph={'cmap': 'viridis', 'vmin': vmin, 'vmax': vmax},
+                                                   plotting_properties=plotting_properties,
+                                                   application_name=APPLICATION_NAME,
+                                                   **kwargs)
+        else:
+            idx4crop = [0, -1, 0, -1]
+
+        return common_tools.crop_matrix_at_indexes(differential_phase, idx4crop)
+
+    def __doIntegration(self, differential_phase, pixelsize, axis, context_key, unique_id, **kwargs):
+        del_f = differential_phase * pixelsize[axis]
+
+        integration_method = self.__get_integration_method()
+
+        stage_key    = None if self.__stage_cache is None else StageCache.get_key(INTEGRATION_CONTEXT_KEY, del_f, axis, integration_method)
+        stage_result = None if stage_key is None else self.__stage_cache.get(stage_key)
+
+        if stage_result is None:
+            # the lines are integrated independently, with one batched transform (or cumulative sum) along the axis
+            if integration_method == INTEGRATION_METHODS_1D[1]: phase = surface_from_grad.cumsum_integration_1d(del_f, axis=axis)
+            else:                                               phase = surface_from_grad.frankotchellappa_1d(del_f, axis=axis, reflec_pad=True)
+
+            grad, error = surface_from_grad.error_integration_1d(del_f=del_f, func=phase, axis=axis)
+
+            if not stage_key is None: self.__stage_cache.put(stage_key, WavePyData(phase=phase, grad=grad, error=error))
+        else:
+            self.__main_logger.print_message('Integration from stage cache')
+
+            phase, grad, error = [stage_result.get_parameter(name) for name in ["phase", "grad", "error"]]
+
+        delx_f, dely_f   = self.__to_components(del_f, axis)
+        grad_x, grad_y   = self.__to_components(grad, axis)
+        error_x, error_y = self.__to_components(error, axis)
+
+        self.__plotter.push_plot_on_context(context_key, ErrorIntegration, unique_id,
+                                           delx_f=delx_f, dely_f=dely_f, func=phase, grad_x=grad_x, grad_y=grad_y, error_x=error_x, error_y=error_y, pixelsize=pixelsize, **kwargs)
+
+        phase = np.real(phase)
+        phase -= np.min(phase)
+
+        return phase
+
+    @classmethod
+    def __remove2ndOrder(cls, data, virtual_pixelsize, axis):
+        # the lines are integrated independently, so their offsets are arbitrary: they are removed before the fit of the
+        # parabola along the axis
+        data = data - np.mean(data, axis=axis, keepdims=True)
+
+        xx, yy = common_tools.grid_coord(data, virtual_pixelsize)
+        coord = xx if axis == 1 else yy
+
+        beta_matrix = np.polyfit(coord.flatten(), data.flatten(), 2)
+
+        err = -(data - np.polyval(beta_matrix, coord))
+        err -= np.min(err)
+
+        return err, 1/2/beta_matrix[0]
+
+def _create_single_grating_talbot_manager_1D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy, reference_cache=None, stage_cache=None):
+    return __SingleGratingTalbot1D(plotter, main_logger, script_logger, ini, dpc_profile_analysis_manager, phenergy, reference_cache, stage_cache)
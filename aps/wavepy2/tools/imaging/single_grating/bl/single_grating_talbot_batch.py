@@ -0,0 +1,378 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+import csv
+import math
+import glob
+import time
+import threading
+from configparser import ConfigParser
+from functools import partial
+
+import numpy as np
+
+from aps.wavepy2.util.common import common_tools
+from aps.wavepy2.util.common.common_tools import hc
+from aps.wavepy2.util.common.executors import create_executor, PROCESS_POOL, THREAD_POOL
+from aps.wavepy2.util.common.progress import ProgressMonitor, add_timing
+from aps.wavepy2.util.plot import plot_tools
+from aps.wavepy2.util.plot.plotter import register_plotter_instance, get_registered_plotter_instance, PlotterMode
+from aps.wavepy2.util.plot.plot_tools import PlottingProperties
+
+from aps.common.initializer import register_ini_instance, IniMode
+from aps.common.logger import register_logger_single_instance, get_registered_logger_instance, LoggerMode
+from aps.common.scripts.generic_process_manager import GenericProcessManager
+
+from aps.wavepy2.tools.imaging.single_grating.bl.single_grating_talbot import create_single_grating_talbot_manager, ReferenceCache, APPLICATION_NAME
+
+BATCH_APPLICATION_NAME = "Single Grating Talbot Batch"
+
+# manifest columns of the files: the other columns are ini keys ("section/key", or just "key" if unique in the template ini)
+SAMPLE_COLUMN    = "sample"
+REFERENCE_COLUMN = "reference"
+DARK_COLUMN      = "dark"
+
+FILE_COLUMNS = {SAMPLE_COLUMN : "sample", REFERENCE_COLUMN : "reference", DARK_COLUMN : "blank"}
+
+SUMMARY_HEADER = ["sample", "reference", "dark", "status", "elapsed [s]", "reference cached", "output",
+                  "dpc x rms [rad]", "dpc y rms [rad]", "wf pv [nm]", "wf rms [nm]", "thickness pv [um]",
+                  "curvature radius x [m]", "curvature radius y [m]", "error"]
+
+INI_FOLDER_SUFFIX = "_ini"
+PROGRESS_SUFFIX   = "_progress.jsonl"
+
+def read_batch_manifest(manifest_file_name):
+    """
+    Samples of a batch from a CSV (with header) or YAML (list of mappings) manifest: each sample has the sample
+    image (column "sample", mandatory), the reference and dark images (columns "reference" and "dark", optional) and
+    any ini parameter to change with respect to the template ini (e.g. "photon energy" or "Parameters/crop").
+    Relative file names are relative to the folder of the manifest.
+    """
+    if os.path.splitext(manifest_file_name)[1].lower() in [".yaml", ".yml"]:
+        import yaml
+
+        with open(manifest_file_name, "r") as file: rows = yaml.safe_load(file)
+    else:
+        with open(manifest_file_name, "r", newline="") as file: rows = list(csv.DictReader(row for row in file if not row.lstrip().startswith("#")))
+
+    manifest_folder = os.path.dirname(os.path.abspath(manifest_file_name))
+
+    samples = []
+    for row in rows:
+        row = {str(key).strip() : ("" if value is None else str(value).strip()) for key, value in row.items() if not key is None}
+
+        if common_tools.is_empty_string(row.get(SAMPLE_COLUMN, "")): raise ValueError("Sample missing in manifest " + manifest_file_name + ": " + str(row))
+
+        samples.append(__get_sample({column : (None if common_tools.is_empty_string(row.get(column, "")) else os.path.join(manifest_folder, row[column])) for column in FILE_COLUMNS},
+                                    {key : value for key, value in row.items() if not key in FILE_COLUMNS and not common_tools.is_empty_string(value)}))
+
+    return samples
+
+def get_batch_samples_from_glob(pattern, reference=None, dark=None):
+    """
+    Samples of a batch from a glob pattern of sample images, sharing the same reference and dark images.
+    """
+    return [__get_sample({SAMPLE_COLUMN : file_name, REFERENCE_COLUMN : reference, DARK_COLUMN : dark}, {})
+            for file_name in sorted(glob.glob(pattern))]
+
+class SingleGratingTalbotBatchFacade(GenericProcessManager):
+    def run_batch(self, samples, template_ini_file_name, summary_file_name, plotter_mode=PlotterMode.NONE, logger_mode=LoggerMode.FULL,
+                  script_logger_mode=LoggerMode.FULL, reference_cache_size=4): raise NotImplementedError()
+
+def create_single_grating_talbot_batch_manager(mode=PROCESS_POOL, n_cpus=None):
+    return _SingleGratingTalbotBatch(create_executor(mode, n_cpus))
+
+class _SingleGratingTalbotBatch(SingleGratingTalbotBatchFacade):
+    """
+    Runs the whole Single Grating Talbot analysis (DPC, integration, thickness, 2nd order component) of many samples,
+    without interaction: each sample is analysed with the template ini plus the parameters of its manifest row (the
+    crop of the images included), in parallel on the executor. Each worker process keeps the analysis of the references
+    in its own cache: the samples sharing a reference are given to the workers together, as one task, so that the
+    reference is analysed once for each task. A group larger than its share of the workers (nr. of samples / nr. of
+    workers) is split in tasks of that size, to keep all the workers busy (the summary keeps the order of the samples).
+
+    Each sample has its own outputs (ini, log, sdf files and, with the save-only plotter, the figures), in the output
+    folder of the sample image; the summary of the batch is a CSV file with one row for each sample.
+    """
+    def __init__(self, executor):
+        self.__executor    = executor
+        self.__main_logger = get_registered_logger_instance(application_name=BATCH_APPLICATION_NAME)
+
+    def run_batch(self, samples, template_ini_file_name, summary_file_name, plotter_mode=PlotterMode.NONE, logger_mode=LoggerMode.FULL,
+                  script_logger_mode=LoggerMode.FULL, reference_cache_size=4):
+        if plotter_mode in [PlotterMode.FULL, PlotterMode.DISPLAY_ONLY]: raise ValueError("Batch mode can't display plots: use Save Only or None plotter mode")
+        # plotter, logger and ini are registered once for each process
+        if self.__executor.get_mode() == THREAD_POOL: raise ValueError("Batch mode can't run on a Thread Pool: use a parallel mode with processes")
+
+        summary_prefix = os.path.splitext(summary_file_name)[0]
+        ini_folder     = summary_prefix + INI_FOLDER_SUFFIX
+
+        os.makedirs(ini_folder, exist_ok=True)
+
+        parameters = [(i, sample, _write_sample_ini(template_ini_file_name, sample, os.path.join(ini_folder, "{:04d}_".format(i) + os.path.splitext(os.path.basename(sample[SAMPLE_COLUMN]))[0] + ".ini")))
+                      for i, sample in enumerate(samples)]
+
+        tasks = _get_reference_tasks(parameters, self.__executor.get_n_workers())
+
+        self.__main_logger.print_message("Batch of " + str(len(samples)) + " samples (" + str(len(tasks)) + " tasks), execution mode: " + self.__executor.get_description())
+
+        progress_monitor = ProgressMonitor(len(parameters),
+                                           n_workers=self.__executor.get_n_workers(),
+                                           label="samples",
+                                           logger=self.__main_logger,
+                                           jsonl_file_name=summary_prefix + PROGRESS_SUFFIX)
+
+        summary = []
+        try:
+            for task, task_result in zip(tasks, self.__executor.map(partial(_run_samples,
+                                                                            plotter_mode=plotter_mode,
+                                                                            logger_mode=logger_mode,
+                                                                            script_logger_mode=script_logger_mode,
+                                                                            reference_cache_size=reference_cache_size), tasks)):
+                for (i, _, _), (summary_row, timings, worker) in zip(task, task_result):
+                    if summary_row["status"] != "done": self.__main_logger.print_warning("Failed sample " + summary_row["sample"] + ": " + summary_row["error"])
+
+                    progress_monitor.update(timings, worker, failed=summary_row["status"] != "done")
+                    summary.append((i, summary_row))
+        finally:
+            progress_monitor.close()
+
+        summary = [summary_row for _, summary_row in sorted(summary, key=lambda item: item[0])]
+
+        with open(summary_file_name, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=SUMMARY_HEADER)
+            writer.writeheader()
+            writer.writerows(summary)
+
+        n_failed = len([summary_row for summary_row in summary if summary_row["status"] != "done"])
+
+        self.__main_logger.print_message(str(len(summary) - n_failed) + " of " + str(len(summary)) + " samples done, " +
+                                         str(len([summary_row for summary_row in summary if summary_row.get("reference cached", False)])) + " with the reference from cache, " +
+                                         "summary saved in " + summary_file_name)
+
+        return summary
+
+####################################
+# PRIVATE METHODS
+
+def __get_sample(files, ini_parameters):
+    sample = dict(files)
+    sample["ini_parameters"] = ini_parameters
+
+    return sample
+
+def _get_reference_tasks(parameters, n_workers=None):
+    # samples grouped by reference, in order of first appearance, and the groups split in tasks of at most
+    # nr. of samples / nr. of workers samples (unknown nr. of workers: one task for each group)
+    groups = {}
+    for parameter in parameters: groups.setdefault(parameter[1][REFERENCE_COLUMN], []).append(parameter)
+
+    task_size = len(parameters) if n_workers is None else max(1, math.ceil(len(parameters) / n_workers))
+
+    tasks = []
+    for group in groups.values():
+        n_tasks = math.ceil(len(group) / task_size)
+        tasks  += [group[j::n_tasks] for j in range(n_tasks)] if n_tasks > 1 else [group]
+
+    return tasks
+
+def _write_sample_ini(template_ini_file_name, sample, ini_file_name):
+    config_parser = ConfigParser()
+    if not template_ini_file_name is None: config_parser.read(template_ini_file_name)
+
+    if not config_parser.has_section("Files"): config_parser.add_section("Files")
+
+    for column, key in FILE_COLUMNS.items(): config_parser.set("Files", key, "None" if sample[column] is None else sample[column])
+
+    for key, value in sample["ini_parameters"].items():
+        if "/" in key: section, key = key.split("/", 1)
+        else:
+            sections = [section for section in config_parser.sections() if config_parser.has_option(section, key)]
+
+            if len(sections) == 1: section = sections[0]
+            elif len(sections) == 0: raise ValueError("Parameter " + key + " not in the template ini: use the column name <section>/<key>")
+            else: raise ValueError("Parameter " + key + " in sections " + ", ".join(sections) + " of the template ini: use the column name <section>/<key>")
+
+        if not config_parser.has_section(section): config_parser.add_section(section)
+        config_parser.set(section, key, value)
+
+    with open(ini_file_name, "w") as file: config_parser.write(file)
+
+    return ini_file_name
+
+__reference_cache = None
+
+def _get_reference_cache(max_size):
+    # one cache for each process: the workers of a pool analyse many samples each
+    global __reference_cache
+
+    if max_size <= 0: return None
+    if __reference_cache is None: __reference_cache = ReferenceCache(max_size)
+
+    return __reference_cache
+
+def _initialize_worker(plotter_mode, logger_mode):
+    # only the save-only plotter builds widgets (hidden), to save the figures
+    if plotter_mode == PlotterMode.SAVE_ONLY:
+        from aps.common.plot.qt_application import register_qt_application_instance, get_registered_qt_application_instance, QtApplicationMode
+
+        if get_registered_qt_application_instance() is None:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            register_qt_application_instance(QtApplicationMode.HIDE)
+
+    register_logger_single_instance(logger_mode=logger_mode, application_name=APPLICATION_NAME, replace=True)
+    register_plotter_instance(plotter_mode=plotter_mode, application_name=APPLICATION_NAME, replace=True)
+
+def _get_worker_id():
+    return str(os.getpid()) + ":" + str(threading.get_ident())
+
+def _run_samples(task, plotter_mode=PlotterMode.NONE, logger_mode=LoggerMode.FULL, script_logger_mode=LoggerMode.FULL, reference_cache_size=4):
+    return [_run_sample(parameters, plotter_mode, logger_mode, script_logger_mode, reference_cache_size) for parameters in task]
+
+def _run_sample(parameters, plotter_mode=PlotterMode.NONE, logger_mode=LoggerMode.FULL, script_logger_mode=LoggerMode.FULL, reference_cache_size=4):
+    i, sample, ini_file_name = parameters
+
+    summary_row = {"sample"    : sample[SAMPLE_COLUMN],
+                   "reference" : sample[REFERENCE_COLUMN],
+                   "dark"      : sample[DARK_COLUMN]}
+    timings     = {}
+
+    tzero = time.perf_counter()
+    try:
+        _initialize_worker(plotter_mode, logger_mode)
+        register_ini_instance(IniMode.LOCAL_FILE, reset=True, ini_file_name=ini_file_name, application_name=APPLICATION_NAME, verbose=False)
+
+        reference_cache = _get_reference_cache(reference_cache_size)
+        cache_hits      = 0 if reference_cache is None else reference_cache.get_statistics()[0]
+
+        result, initialization_parameters = _run_single_grating_talbot(create_single_grating_talbot_manager(reference_cache), script_logger_mode, timings)
+
+        summary_row.update(status="done",
+                           output=os.path.dirname(initialization_parameters.get_parameter("saveFileSuf")),
+                           **{"reference cached" : False if reference_cache is None else reference_cache.get_statistics()[0] > cache_hits},
+                           **__get_summary_values(result, initialization_parameters))
+    except Exception as e:
+        summary_row.update(status="failed", error=type(e).__name__ + ": " + str(e).replace("\n", " "))
+
+    summary_row["elapsed [s]"] = "{:.2f}".format(time.perf_counter() - tzero)
+
+    return summary_row, timings, _get_worker_id()
+
+def _run_single_grating_talbot(single_grating_talbot_manager, script_logger_mode, timings=None):
+    # the same sequence of the interactive script: with an inactive plotter the manager takes the crops from the ini
+    tzero = time.perf_counter()
+
+    initialization_parameters = single_grating_talbot_manager.manager_initialization(single_grating_talbot_manager.get_initialization_parameters(PlottingProperties(ask_dark_value=False)),
+                                                                                     script_logger_mode)
+
+    crop_result = single_grating_talbot_manager.crop_reference_image(single_grating_talbot_manager.crop_initial_image(initialization_parameters),
+                                                                     initialization_parameters)
+    tzero = add_timing(timings, "read", tzero)
+
+    dpc_result = single_grating_talbot_manager.calculate_dpc(crop_result, initialization_parameters)
+    tzero = add_timing(timings, "dpc", tzero)
+
+    dpc_result = single_grating_talbot_manager.show_calculated_dpc(single_grating_talbot_manager.crop_dpc(dpc_result, initialization_parameters), initialization_parameters)
+    dpc_result = single_grating_talbot_manager.correct_zero_dpc(dpc_result, initialization_parameters)
+    dpc_result = single_grating_talbot_manager.remove_linear_fit(dpc_result, initialization_parameters)
+    dpc_result = single_grating_talbot_manager.dpc_profile_analysis(dpc_result, initialization_parameters)
+    dpc_result = single_grating_talbot_manager.fit_radius_dpc(dpc_result, initialization_parameters)
+    tzero = add_timing(timings, "dpc_analysis", tzero)
+
+    integration_result = single_grating_talbot_manager.do_integration(single_grating_talbot_manager.crop_for_integration(dpc_result, initialization_parameters), initialization_parameters)
+    integration_result = single_grating_talbot_manager.calculate_thickness(integration_result, initialization_parameters)
+    tzero = add_timing(timings, "integration", tzero)
+
+    integration_result = single_grating_talbot_manager.calc_2nd_order_component_of_the_phase_1(single_grating_talbot_manager.crop_2nd_order_component_of_the_phase_1(integration_result, initialization_parameters),
+                                                                                               initialization_parameters)
+    integration_result = single_grating_talbot_manager.calc_2nd_order_component_of_the_phase_2(single_grating_talbot_manager.crop_2nd_order_component_of_the_phase_2(integration_result, initialization_parameters),
+                                                                                               initialization_parameters)
+    result = single_grating_talbot_manager.remove_2nd_order(integration_result, initialization_parameters)
+    tzero = add_timing(timings, "2nd_order", tzero)
+
+    # without the save-only plotter, the main results are saved anyway
+    if not get_registered_plotter_instance(application_name=APPLICATION_NAME).is_saving(): __save_results(result, initialization_parameters)
+    add_timing(timings, "save", tzero)
+
+    return result, initialization_parameters
+
+def __save_results(result, initialization_parameters):
+    save_file_prefix  = initialization_parameters.get_parameter("saveFileSuf")
+    virtual_pixelsize = result.get_parameter("virtual_pixelsize")
+    wavelength        = hc / initialization_parameters.get_parameter("phenergy")
+
+    def save_sdf_file(array, file_suffix, extraHeader):
+        plot_tools.save_sdf_file(array, virtual_pixelsize, common_tools.get_unique_filename(save_file_prefix + file_suffix, "sdf"), extraHeader, APPLICATION_NAME)
+
+    # a 1D grating gives only one of the two components
+    if not result.get_parameter("differential_phase_01") is None: save_sdf_file(result.get_parameter("differential_phase_01"), "_dpc_X", {'Title': 'DPC 01', 'Zunit': 'rad'})
+    if not result.get_parameter("differential_phase_10") is None: save_sdf_file(result.get_parameter("differential_phase_10"), "_dpc_Y", {'Title': 'DPC 10', 'Zunit': 'rad'})
+
+    if not result.get_parameter("phase") is None:     save_sdf_file(-1 / 2 / np.pi * result.get_parameter("phase") * wavelength, "_phase", {'Title': 'WF Phase', 'Zunit': 'meters'})
+    if not result.get_parameter("thickness") is None: save_sdf_file(result.get_parameter("thickness"), "_thickness", {'Title': 'Thickness', 'Zunit': 'meters'})
+
+def __get_summary_values(result, initialization_parameters):
+    phase            = result.get_parameter("phase")
+    thickness        = result.get_parameter("thickness")
+    curvature_radius = result.get_parameter("curvature_radius")
+
+    def get_rms(array): return np.nan if array is None else np.nanstd(array) # a 1D grating gives only one of the two components
+
+    summary_values = {"dpc x rms [rad]" : "{:.6g}".format(get_rms(result.get_parameter("differential_phase_01"))),
+                      "dpc y rms [rad]" : "{:.6g}".format(get_rms(result.get_parameter("differential_phase_10")))}
+
+    if not phase is None:
+        wavefront = -1 / 2 / np.pi * phase * hc / initialization_parameters.get_parameter("phenergy")
+
+        summary_values["wf pv [nm]"]  = "{:.6g}".format((np.nanmax(wavefront) - np.nanmin(wavefront)) * 1e9)
+        summary_values["wf rms [nm]"] = "{:.6g}".format(np.nanstd(wavefront) * 1e9)
+
+    if not thickness is None: summary_values["thickness pv [um]"] = "{:.6g}".format((np.nanmax(thickness) - np.nanmin(thickness)) * 1e6)
+
+    if not curvature_radius is None:
+        summary_values["curvature radius x [m]"] = "{:.6g}".format(np.nan if curvature_radius[0] is None else curvature_radius[0])
+        summary_values["curvature radius y [m]"] = "{:.6g}".format(np.nan if curvature_radius[1] is None else curvature_radius[1])
+
+    return summary_values
@@ -55,6 +55,10 @@ from aps.common.plot.qt_application import get_registered_qt_application_instanc
 from aps.wavepy2.util.plot.plotter import get_registered_plotter_instance
 
 from aps.wavepy2.tools.common.wavepy_script import WavePyScript
+from aps.wavepy2.tools.common.stage_cache import StageCache
+from aps.wavepy2.tools.common.stage_checkpoints import StageCheckpoints, CHECKPOINTS_FOLDER
+
+INITIALIZATION_STAGE = "initialization"
 
 class MainSingleGratingTalbot(WavePyScript):
     SCRIPT_ID = "img-sgt"
@@ -63,83 +67,110 @@ class MainSingleGratingTalbot(WavePyScript):
     def _get_ini_file_name(self): return ".single_grating_talbot.ini"
     def _get_application_name(self): return APPLICATION_NAME
 
-    def _run_script(self, SCRIPT_LOGGER_MODE=LoggerMode.FULL, **args):
-        plotter = get_registered_plotter_instance(application_name=self._get_application_name())
-
-        single_grating_talbot_manager = create_single_grating_talbot_manager()
+    def _parse_additional_sys_argument(self, sys_argument, args):
+        if   "-c" == sys_argument[:2]: args["STAGE_CACHE"]   = int(sys_argument[2:])
+        elif "-k" == sys_argument[:2]: args["CHECKPOINTS"]   = int(sys_argument[2:])
+        elif "-r" == sys_argument[:2]: args["RESUME_FOLDER"] = sys_argument[2:]
+
+    def _help_additional_parameters(self):
+        return "  -c<use stage cache>\n\n" + \
+               "   stage cache (results of the harmonic analysis and of the integration, reused with the same inputs):\n" + \
+               "     0 No - Default Value\n" + \
+               "     1 Yes\n" + \
+               "   folder and size from the ini file, section Stage Cache: folder, max size [MB]\n\n" + \
+               "  -k<save checkpoints>\n\n" + \
+               "   checkpoints of the result of each stage, in the folder " + CHECKPOINTS_FOLDER + " of the output folder:\n" + \
+               "     0 No - Default Value\n" + \
+               "     1 Yes\n\n" + \
+               "  -r<output folder to resume>\n\n" + \
+               "   resumes a run saved with checkpoints from its last completed stage (checkpoints are saved too)\n\n" + \
+               super(MainSingleGratingTalbot, self)._help_additional_parameters()
+
+    def __parse_args(self, **args):
+        try: STAGE_CACHE = args["STAGE_CACHE"] == 1
+        except: STAGE_CACHE = False
+
+        try: CHECKPOINTS = args["CHECKPOINTS"] == 1
+        except: CHECKPOINTS = False
+
+        try: RESUME_FOLDER = args["RESUME_FOLDER"]
+        except: RESUME_FOLDER = None
+
+        return STAGE_CACHE, CHECKPOINTS, RESUME_FOLDER
 
-        # ==========================================================================
-        # %% Initialization parameters
-        # ==========================================================================
-
-        initialization_parameters = single_grating_talbot_manager.manager_initialization(single_grating_talbot_manager.get_initialization_parameters(),
-                                                                                         SCRIPT_LOGGER_MODE)
-
-        # ==========================================================================
-        # %% CROP Initial Image
-        # ==========================================================================
+    def _run_script(self, SCRIPT_LOGGER_MODE=LoggerMode.FULL, **args):
+        STAGE_CACHE, CHECKPOINTS, RESUME_FOLDER = self.__parse_args(**args)
 
-        crop_result = single_grating_talbot_manager.crop_reference_image(single_grating_talbot_manager.crop_initial_image(initialization_parameters),
-                                                                         initialization_parameters)
+        plotter = get_registered_plotter_instance(application_name=self._get_application_name())
 
-        # ==========================================================================
-        # %% DPC Analysis
-        # ==========================================================================
+        if STAGE_CACHE:
+            ini = get_registered_ini_instance(self._get_application_name())
+            stage_cache = StageCache(cache_folder=ini.get_string_from_ini("Stage Cache", "folder", default=".single_grating_talbot_cache"),
+                                     max_size=int(ini.get_float_from_ini("Stage Cache", "max size [MB]", default=2048) * 1024**2))
+        else:
+            stage_cache = None
 
-        dpc_result = single_grating_talbot_manager.calculate_dpc(crop_result, initialization_parameters)
-        plotter.show_context_window(CALCULATE_DPC_CONTEXT_KEY)
+        single_grating_talbot_manager = self._profile_manager(create_single_grating_talbot_manager(stage_cache=stage_cache))
 
         # ==========================================================================
-
-        recrop_dpc_result = single_grating_talbot_manager.show_calculated_dpc(single_grating_talbot_manager.crop_dpc(dpc_result, initialization_parameters),
-                                                                              initialization_parameters)
-        plotter.show_context_window(RECROP_DPC_CONTEXT_KEY)
-
+        # %% Initialization parameters
         # ==========================================================================
 
-        correct_zero_dpc_result = single_grating_talbot_manager.correct_zero_dpc(recrop_dpc_result, initialization_parameters)
-        plotter.show_context_window(CORRECT_ZERO_DPC_CONTEXT_KEY)
+        if RESUME_FOLDER is None:
+            initialization_parameters = single_grating_talbot_manager.get_initialization_parameters()
 
-        # ==========================================================================
+            if CHECKPOINTS:
+                checkpoints = StageCheckpoints(os.path.dirname(initialization_parameters.get_parameter("saveFileSuf")))
+                checkpoints.save(INITIALIZATION_STAGE, initialization_parameters)
+            else:
+                checkpoints = None
 
-        remove_linear_fit_result = single_grating_talbot_manager.remove_linear_fit(correct_zero_dpc_result, initialization_parameters)
-        plotter.show_context_window(REMOVE_LINEAR_FIT_CONTEXT_KEY)
+            last_stage, result = INITIALIZATION_STAGE, initialization_parameters
+        else:
+            if not StageCheckpoints.exist(RESUME_FOLDER): raise ValueError("No checkpoints to resume in: " + RESUME_FOLDER)
 
-        # ==========================================================================
+            checkpoints               = StageCheckpoints(RESUME_FOLDER)
+            initialization_parameters = checkpoints.load(INITIALIZATION_STAGE)
+            last_stage, result        = checkpoints.load_last()
 
-        dpc_profile_analysis_result = single_grating_talbot_manager.dpc_profile_analysis(remove_linear_fit_result, initialization_parameters)
-        plotter.show_context_window(DPC_PROFILE_ANALYSYS_CONTEXT_KEY)
+        initialization_parameters = single_grating_talbot_manager.manager_initialization(initialization_parameters, SCRIPT_LOGGER_MODE)
 
-        # ==========================================================================
-
-        fit_radius_dpc_result = single_grating_talbot_manager.fit_radius_dpc(dpc_profile_analysis_result, initialization_parameters)
-        plotter.show_context_window(FIT_RADIUS_DPC_CONTEXT_KEY)
+        if last_stage == INITIALIZATION_STAGE: result = initialization_parameters
 
         # ==========================================================================
-        # %% Integration
+        # %% Analysis: stage name, operations (chained), context window to show
         # ==========================================================================
 
-        integration_result = single_grating_talbot_manager.do_integration(single_grating_talbot_manager.crop_for_integration(fit_radius_dpc_result, initialization_parameters),
-                                                                          initialization_parameters)
-        plotter.show_context_window(INTEGRATION_CONTEXT_KEY)
-
-        # ==========================================================================
+        # every operation is called as operation(previous result, initialization parameters): the first crop has no previous result
+        def crop_initial_image(initialization_parameters, _): return single_grating_talbot_manager.crop_initial_image(initialization_parameters)
 
-        integration_result = single_grating_talbot_manager.calculate_thickness(integration_result, initialization_parameters)
-        plotter.show_context_window(CALCULATE_THICKNESS_CONTEXT_KEY)
+        stages = [("crop",                          [crop_initial_image,
+                                                     single_grating_talbot_manager.crop_reference_image],                              None),
+                  ("dpc",                           [single_grating_talbot_manager.calculate_dpc],                                     CALCULATE_DPC_CONTEXT_KEY),
+                  ("recrop dpc",                    [single_grating_talbot_manager.crop_dpc,
+                                                     single_grating_talbot_manager.show_calculated_dpc],                               RECROP_DPC_CONTEXT_KEY),
+                  ("correct zero dpc",              [single_grating_talbot_manager.correct_zero_dpc],                                  CORRECT_ZERO_DPC_CONTEXT_KEY),
+                  ("remove linear fit",             [single_grating_talbot_manager.remove_linear_fit],                                 REMOVE_LINEAR_FIT_CONTEXT_KEY),
+                  ("dpc profile analysis",          [single_grating_talbot_manager.dpc_profile_analysis],                              DPC_PROFILE_ANALYSYS_CONTEXT_KEY),
+                  ("fit radius dpc",                [single_grating_talbot_manager.fit_radius_dpc],                                    FIT_RADIUS_DPC_CONTEXT_KEY),
+                  ("integration",                   [single_grating_talbot_manager.crop_for_integration,
+                                                     single_grating_talbot_manager.do_integration],                                    INTEGRATION_CONTEXT_KEY),
+                  ("thickness",                     [single_grating_talbot_manager.calculate_thickness],                               CALCULATE_THICKNESS_CONTEXT_KEY),
+                  ("2nd order component of phase",  [single_grating_talbot_manager.crop_2nd_order_component_of_the_phase_1,
+                                                     single_grating_talbot_manager.calc_2nd_order_component_of_the_phase_1,
+                                                     single_grating_talbot_manager.crop_2nd_order_component_of_the_phase_2,
+                                                     single_grating_talbot_manager.calc_2nd_order_component_of_the_phase_2],          CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE),
+                  ("remove 2nd order",              [single_grating_talbot_manager.remove_2nd_order],                                  REMOVE_2ND_ORDER)]
 
-        # ==========================================================================
+        stage_names = [INITIALIZATION_STAGE] + [stage_name for stage_name, _, _ in stages]
 
-        integration_result = single_grating_talbot_manager.calc_2nd_order_component_of_the_phase_1(single_grating_talbot_manager.crop_2nd_order_component_of_the_phase_1(integration_result, initialization_parameters),
-                                                                                                   initialization_parameters)
-        integration_result = single_grating_talbot_manager.calc_2nd_order_component_of_the_phase_2(single_grating_talbot_manager.crop_2nd_order_component_of_the_phase_2(integration_result, initialization_parameters),
-                                                                                                   initialization_parameters)
-        plotter.show_context_window(CALCULATE_2ND_ORDER_COMPONENT_OF_THE_PHASE)
+        if not last_stage in stage_names: raise ValueError("Unknown stage in the checkpoints: " + str(last_stage))
 
-        # ==========================================================================
+        for stage_name, operations, context_key in stages[stage_names.index(last_stage):]:
+            for operation in operations: result = operation(result, initialization_parameters)
 
-        single_grating_talbot_manager.remove_2nd_order(integration_result, initialization_parameters)
-        plotter.show_context_window(REMOVE_2ND_ORDER)
+            if not context_key is None: plotter.show_context_window(context_key)
+            if not checkpoints is None: checkpoints.save(stage_name, result)
 
         # ==========================================================================
         # %% Final Operations
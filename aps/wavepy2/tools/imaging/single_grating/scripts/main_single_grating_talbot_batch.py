@@ -0,0 +1,157 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+
+from aps.wavepy2.tools.imaging.single_grating.bl.single_grating_talbot_batch import create_single_grating_talbot_batch_manager, read_batch_manifest, get_batch_samples_from_glob, BATCH_APPLICATION_NAME
+
+from aps.common.logger import LoggerMode
+from aps.wavepy2.util.plot.plotter import PlotterMode
+
+from aps.wavepy2.tools.common.wavepy_script import WavePyScript
+
+from aps.wavepy2.util.common.executors import get_available_cpus, get_default_n_workers, PROCESS_POOL
+
+class MainSingleGratingTalbotBatch(WavePyScript):
+    SCRIPT_ID = "img-sgt-batch"
+
+    def _get_script_id(self): return MainSingleGratingTalbotBatch.SCRIPT_ID
+    def _get_ini_file_name(self): return ".single_grating_talbot.ini"
+    def _get_application_name(self): return BATCH_APPLICATION_NAME
+
+    def _parse_sys_arguments(self, sys_argv):
+        args = super(MainSingleGratingTalbotBatch, self)._parse_sys_arguments(sys_argv)
+        # no Qt application in the main process: the workers create their own (hidden)
+        args["STANDALONE"] = False
+        if sys_argv is None or len([sys_argument for sys_argument in sys_argv[2:] if "-p" == sys_argument[:2]]) == 0: args["PLOTTER_MODE"] = PlotterMode.NONE
+
+        return args
+
+    def _parse_additional_sys_argument(self, sys_argument, args):
+        if   "-f" == sys_argument[:2]: args["MANIFEST_FILE"]        = sys_argument[2:]
+        elif "-g" == sys_argument[:2]: args["SAMPLES_GLOB"]         = sys_argument[2:]
+        elif "-r" == sys_argument[:2]: args["REFERENCE_FILE"]       = sys_argument[2:]
+        elif "-d" == sys_argument[:2]: args["DARK_FILE"]            = sys_argument[2:]
+        elif "-o" == sys_argument[:2]: args["SUMMARY_FILE"]         = sys_argument[2:]
+        elif "-c" == sys_argument[:2]: args["REFERENCE_CACHE_SIZE"] = int(sys_argument[2:])
+        elif "-t" == sys_argument[:2]: args["THREADING"]            = int(sys_argument[2:])
+        elif "-n" == sys_argument[:2]: args["N_CPUS"]               = int(sys_argument[2:])
+
+    def _help_additional_parameters(self):
+        return "  Batch mode: plotter modes 2 (the figures are saved too) or 3 (default), parameters and crops from the\n" + \
+               "  ini file (" + self._get_ini_file_name() + ", as in img-sgt) with the changes of the manifest.\n\n" + \
+               "  -f<manifest file>\n\n" + \
+               "   CSV file with header (or YAML file, list of mappings, requires pyyaml), one row for each sample:\n" + \
+               "     - columns sample, reference, dark: the image files (relative to the folder of the manifest)\n" + \
+               "     - other columns: ini parameters of the sample, as <section>/<key> or <key> (e.g.: photon energy)\n\n" + \
+               "  -g<glob of the sample files> (alternative to the manifest)\n\n" + \
+               "  -r<reference file> and -d<dark file> (with the glob)\n\n" + \
+               "  -o<summary file>\n\n" + \
+               "   CSV file with the results of each sample (default: single_grating_talbot_batch_summary.csv)\n\n" + \
+               "  -c<reference cache size>\n\n" + \
+               "   nr. of references kept in memory by each worker (0 for no cache, default: 4): the caches are not shared,\n" + \
+               "   the samples sharing a reference are given to one worker together (split among the workers if they are more\n" + \
+               "   than nr. of samples / nr. of workers), so that the reference is analysed once for each group\n\n" + \
+               "  -t<threading mode>\n\n" + \
+               "   threading modes:\n" + \
+               "     0 Serial (Single-Thread)\n" + \
+               "     1 Process Pool (Multi-Thread) - Default Value\n" + \
+               "     3 Dask Local Cluster (requires dask.distributed)\n" + \
+               "     4 MPI (requires mpi4py, launch with: mpiexec -n <N> python -m mpi4py.futures -m aps.wavepy2.tools ...)\n\n" + \
+               "  -n<nr. of workers> (parallel modes only)\n\n" + \
+               "   nr. of workers:\n" + \
+               "     - a positive integer number (CPUs available: " + str(get_available_cpus()) + "), or \n" + \
+               "     - skip the option for default: "  + str(get_default_n_workers()) + " (MPI: universe size)\n\n" + \
+               super(MainSingleGratingTalbotBatch, self)._help_additional_parameters()
+
+    def __parse_args(self, **args):
+        try: MANIFEST_FILE = args["MANIFEST_FILE"]
+        except: MANIFEST_FILE = None
+
+        try: SAMPLES_GLOB = args["SAMPLES_GLOB"]
+        except: SAMPLES_GLOB = None
+
+        try: REFERENCE_FILE = args["REFERENCE_FILE"]
+        except: REFERENCE_FILE = None
+
+        try: DARK_FILE = args["DARK_FILE"]
+        except: DARK_FILE = None
+
+        try: SUMMARY_FILE = args["SUMMARY_FILE"]
+        except: SUMMARY_FILE = "single_grating_talbot_batch_summary.csv"
+
+        try: REFERENCE_CACHE_SIZE = args["REFERENCE_CACHE_SIZE"]
+        except: REFERENCE_CACHE_SIZE = 4
+
+        try: THREADING = args["THREADING"]
+        except: THREADING = PROCESS_POOL
+
+        try: N_CPUS = args["N_CPUS"]
+        except: N_CPUS = None
+
+        return MANIFEST_FILE, SAMPLES_GLOB, REFERENCE_FILE, DARK_FILE, SUMMARY_FILE, REFERENCE_CACHE_SIZE, THREADING, N_CPUS
+
+    def _run_script(self, SCRIPT_LOGGER_MODE=LoggerMode.FULL, **args):
+        MANIFEST_FILE, SAMPLES_GLOB, REFERENCE_FILE, DARK_FILE, SUMMARY_FILE, REFERENCE_CACHE_SIZE, THREADING, N_CPUS = self.__parse_args(**args)
+
+        if not MANIFEST_FILE is None:  samples = read_batch_manifest(MANIFEST_FILE)
+        elif not SAMPLES_GLOB is None: samples = get_batch_samples_from_glob(SAMPLES_GLOB, REFERENCE_FILE, DARK_FILE)
+        else: raise ValueError("Specify the samples with a manifest (-f) or a glob (-g)")
+
+        if len(samples) == 0: raise ValueError("No samples to analyse")
+
+        single_grating_talbot_batch_manager = self._profile_manager(create_single_grating_talbot_batch_manager(THREADING, N_CPUS))
+
+        single_grating_talbot_batch_manager.run_batch(samples,
+                                                      template_ini_file_name=self._get_ini_file_name() if os.path.isfile(self._get_ini_file_name()) else None,
+                                                      summary_file_name=SUMMARY_FILE,
+                                                      plotter_mode=args.get("PLOTTER_MODE", PlotterMode.NONE),
+                                                      logger_mode=args.get("LOGGER_MODE", LoggerMode.FULL),
+                                                      script_logger_mode=SCRIPT_LOGGER_MODE,
+                                                      reference_cache_size=REFERENCE_CACHE_SIZE)
+
+
+import os, sys
+if __name__=="__main__":
+    if os.getenv('WAVEPY_DEBUG', "0") == "1": MainSingleGratingTalbotBatch(sys_argv=sys.argv).run_script()
+    else: MainSingleGratingTalbotBatch().show_help()
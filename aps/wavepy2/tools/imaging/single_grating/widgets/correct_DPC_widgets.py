@@ -59,19 +59,22 @@ class CorrectDPC(WavePyWidget):
         angle   = kwargs["angle"]
         pi_jump   = kwargs["pi_jump"]
 
+        # 1D gratings: one of the two components is None
+        indexes = [index for index in [0, 1] if not angle[index] is None]
+
         figure = Figure()
-        h1 = figure.gca().hist(angle[0].flatten()/np.pi, 201, histtype='step', linewidth=2)
-        h2 = figure.gca().hist(angle[1].flatten()/np.pi, 201, histtype='step', linewidth=2)
+        histograms = [figure.gca().hist(angle[index].flatten()/np.pi, 201, histtype='step', linewidth=2) for index in indexes]
 
         figure.gca().set_xlabel(r'Angle [$\pi$rad]')
-        if pi_jump == [0, 0]:
-            lim = np.ceil(np.abs((h1[1][0], h1[1][-1], h2[1][0], h2[1][-1])).max())
+        if all([pi_jump[index] == 0 for index in indexes]):
+            lim = np.ceil(np.abs([bins[i] for _, bins, _ in histograms for i in [0, -1]]).max())
             figure.gca().set_xlim([-lim, lim])
 
         figure.gca().set_title('Correct DPC\n' + 'Angle displacement of fringes [\u03c0 rad]\n' +
-                               'Calculated jumps x and y : {:d}, {:d} \u03c0'.format(pi_jump[0], pi_jump[1]))
+                               'Calculated jumps ' + ' and '.join([["x", "y"][index] for index in indexes]) + ' : ' +
+                               ', '.join(['{:d}'.format(pi_jump[index]) for index in indexes]) + ' \u03c0')
 
-        figure.gca().legend(('DPC x', 'DPC y'))
+        figure.gca().legend([['DPC x', 'DPC y'][index] for index in indexes])
         figure.tight_layout()
 
         return figure
@@ -88,13 +91,15 @@ class CorrectDPCHistos(WavePyWidget):
     def build_mpl_figure(self, **kwargs):
         angle   = kwargs["angle"]
 
+        # 1D gratings: one of the two components is None
+        indexes = [index for index in [0, 1] if not angle[index] is None]
+
         figure = Figure()
 
-        figure.gca().hist(angle[0].flatten()/np.pi, 201, histtype='step', linewidth=2)
-        figure.gca().hist(angle[1].flatten()/np.pi, 201, histtype='step', linewidth=2)
+        for index in indexes: figure.gca().hist(angle[index].flatten()/np.pi, 201, histtype='step', linewidth=2)
         figure.gca().set_xlabel(r'Angle [$\pi$rad]')
         figure.gca().set_title('Correct DPC\nAngle displacement of fringes [\u03c0 rad]')
-        figure.gca().legend(('DPC x', 'DPC y'))
+        figure.gca().legend([['DPC x', 'DPC y'][index] for index in indexes])
         figure.tight_layout()
 
         return figure
@@ -114,16 +119,19 @@ class CorrectDPCCenter(WavePyInteractiveWidget):
     def build_widget(self, **kwargs):
         self.__initialize(kwargs["angle"])
 
-        main_box = gui.widgetBox(self.get_central_widget(), "", width=WIDGET_FIXED_WIDTH * 2, orientation="horizontal")
+        # 1D gratings: one of the two components is None
+        indexes = [index for index in [0, 1] if not self.__angle[index] is None]
+
+        main_box = gui.widgetBox(self.get_central_widget(), "", width=WIDGET_FIXED_WIDTH * len(indexes), orientation="horizontal")
 
-        harm_box = [gui.widgetBox(main_box, "Harmonic 01"), gui.widgetBox(main_box, "Harmonic 10")]
+        harm_box = [gui.widgetBox(main_box, "Harmonic " + self.__harmonic[index]) if index in indexes else None for index in [0, 1]]
 
-        self.__tab_widget = [gui.tabWidget(harm_box[0]), gui.tabWidget(harm_box[1])]
+        self.__tab_widget = [None if harm_box[index] is None else gui.tabWidget(harm_box[index]) for index in [0, 1]]
 
         self.__result_canvas_histo = [FigureCanvas(Figure()), FigureCanvas(Figure())]
         self.__result_canvas       = [FigureCanvas(Figure()), FigureCanvas(Figure())]
 
-        for index in [0, 1]:
+        for index in indexes:
             self.__update_result_figures(index)
 
             gui.createTabPage(self.__tab_widget[index], "Correct Zero", GraphicalSelectPointIdx(self,
@@ -135,7 +143,7 @@ class CorrectDPCCenter(WavePyInteractiveWidget):
 
             harm_box[index].setFixedHeight(int(max(self.__result_canvas_histo[index].get_width_height()[1], self.__result_canvas[index].get_width_height()[1])+220))
 
-        self.setFixedWidth(int(WIDGET_FIXED_WIDTH*2.1))
+        self.setFixedWidth(int(WIDGET_FIXED_WIDTH*(len(indexes) + 0.1)))
 
         self.update()
 
@@ -162,7 +170,7 @@ class CorrectDPCCenter(WavePyInteractiveWidget):
 
     def __initialize(self, angle):
         self.__angle     = angle
-        self.__pi_jump   = [np.round(self.__angle[0] / np.pi), np.round(self.__angle[1] / np.pi)]
+        self.__pi_jump   = [None if angle_i is None else np.round(angle_i / np.pi) for angle_i in self.__angle]
         self.__pi_jump_i = [None, None]
 
         self.__angle_initial = angle
@@ -52,7 +52,7 @@ from PyQt5.QtCore import Qt
 
 from aps.wavepy2.util.common import common_tools
 from aps.wavepy2.util.plot import plot_tools
-from aps.wavepy2.util.plot.plotter import WavePyWidget, get_registered_plotter_instance
+from aps.wavepy2.util.plot.plotter import WavePyWidget
 
 from warnings import filterwarnings
 filterwarnings("ignore")
@@ -61,25 +61,19 @@ class IntegrateDPCCumSum(WavePyWidget):
     def __init__(self, parent=None, application_name=None, **kwargs):
         super(IntegrateDPCCumSum, self).__init__(parent=parent, application_name=application_name)
 
-        self.__plotter = get_registered_plotter_instance(application_name=application_name)
-
     def get_plot_tab_name(self): return "Integrate Cumulative Sum " + self.__title
 
     def build_widget(self, **kwargs):
-        data_DPC          = kwargs["data_DPC"]
-        wavelength        = kwargs["wavelength"]
+        height_profiles   = kwargs["height_profiles"]
         grazing_angle     = kwargs["grazing_angle"]
         projectionFromDiv = kwargs["projectionFromDiv"]
         remove2ndOrder    = kwargs["remove2ndOrder"]
-        labels            = kwargs["labels"]
         xlabel            = kwargs["xlabel"]
         ylabel            = kwargs["ylabel"]
         titleStr          = kwargs["titleStr"]
         saveFileSuf       = kwargs["saveFileSuf"]
         direction         = kwargs["direction"]
 
-        output_data       = kwargs["output_data"]
-
         self.__title = direction
 
         layout = QHBoxLayout()
@@ -89,37 +83,23 @@ class IntegrateDPCCumSum(WavePyWidget):
 
         figure1 = Figure(figsize=(12, 12*9/16))
 
-        ls_cycle, lc_cycle = plot_tools.line_style_cycle(['-'], ['o', 's', 'd', '^'], ncurves=data_DPC.shape[1] - 1, cmap_str='gist_rainbow_r')
-
-        if grazing_angle//.00001 > 0: projection = 1/np.sin(grazing_angle)*projectionFromDiv
-        else: projection = projectionFromDiv
-
-        xvec = data_DPC[:, 0]*projection
-        list_integrated = [xvec]
-        header = [xlabel + ' [m]']
-
-        for j_line in range(1, data_DPC.shape[1]):
-            integrated = (np.cumsum(data_DPC[:, j_line] - np.mean(data_DPC[:, j_line])) * (xvec[1]-xvec[0])) # TODO: removed mean 20181020
-            integrated *= -1/2/np.pi*wavelength*np.abs(projection)
+        data   = height_profiles.get_parameter("data")
+        fitted = height_profiles.get_parameter("fitted")
+        labels = height_profiles.get_parameter("labels")
 
-            p02 = np.polyfit(xvec, integrated, 2)
-            fitted_pol2 = p02[0]*xvec**2 + p02[1]*xvec + p02[2]
+        ls_cycle, lc_cycle = plot_tools.line_style_cycle(['-'], ['o', 's', 'd', '^'], ncurves=data.shape[1] - 1, cmap_str='gist_rainbow_r')
 
-            if remove2ndOrder:
-                integrated -= fitted_pol2
-                titleStr += 'Removed 2nd order, '
+        if remove2ndOrder: titleStr += 'Removed 2nd order, '
 
-            # TODO: check here!!
-            if j_line == 1:
-                factor_x, unit_x = common_tools.choose_unit(xvec)
-                factor_y, unit_y = common_tools.choose_unit(integrated)
+        xvec = data[:, 0]
+        factor_x, unit_x = common_tools.choose_unit(xvec)
+        factor_y, unit_y = common_tools.choose_unit(data[:, 1])
 
-            list_integrated.append(integrated)
-            header.append(labels[j_line - 1])
+        for j_line in range(1, data.shape[1]):
             lc = next(lc_cycle)
 
-            figure1.gca().plot(xvec*factor_x, integrated*factor_y, next(ls_cycle), c=lc, label=labels[j_line - 1])
-            if not remove2ndOrder: figure1.gca().plot(xvec*1e6, (fitted_pol2)*factor_y, '--', color=lc, lw=3)
+            figure1.gca().plot(xvec*factor_x, data[:, j_line]*factor_y, next(ls_cycle), c=lc, label=labels[j_line - 1])
+            if not remove2ndOrder: figure1.gca().plot(xvec*1e6, fitted[:, j_line - 1]*factor_y, '--', color=lc, lw=3)
 
         marginx = 0.1*np.ptp(xvec*factor_x)
         figure1.gca().set_xlim([np.min(xvec*factor_x)-marginx, np.max(xvec*factor_x)+marginx])
@@ -139,16 +119,6 @@ class IntegrateDPCCumSum(WavePyWidget):
 
         self.append_mpl_figure_to_save(figure=figure1, figure_file_name=common_tools.get_unique_filename(saveFileSuf, "png"))
 
-        data2saveV = np.asarray(list_integrated).T
-
-        header.append(ylabel + ' [m]')
-        if grazing_angle//.00001 > 0:  header.append('grazing_angle = {:.4g}'.format(grazing_angle))
-        if projectionFromDiv//1 != 1: header.append('projection due divergence = {:.2f}x'.format(projectionFromDiv))
-
-        self.__plotter.save_csv_file(data2saveV, file_prefix=saveFileSuf, file_suffix='_integrated_' + xlabel, headerList=header)
-
-        output_data.set_parameter("integrated", np.asarray(list_integrated).T)
-
         layout.addWidget(FigureCanvas(figure1))
 
         self.setFixedWidth(int(plot_tools.WIDGET_FIXED_WIDTH * 1.4))
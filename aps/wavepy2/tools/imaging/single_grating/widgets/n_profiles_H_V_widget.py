@@ -52,12 +52,10 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5.QtWidgets import QHBoxLayout
 from PyQt5.QtCore import Qt
 
-from scipy.ndimage.filters import uniform_filter1d
-
 from aps.wavepy2.util.common import common_tools
 from aps.wavepy2.util.plot import plot_tools
 from aps.common.plot import gui
-from aps.wavepy2.util.plot.plotter import WavePyWidget, get_registered_plotter_instance, pixels_to_inches
+from aps.wavepy2.util.plot.plotter import WavePyWidget, pixels_to_inches
 
 
 from warnings import filterwarnings
@@ -67,22 +65,19 @@ class NProfilesHV(WavePyWidget):
     def __init__(self, parent=None, application_name=None, **kwargs):
         super(NProfilesHV, self).__init__(parent=parent, application_name=application_name)
 
-        self.__plotter = get_registered_plotter_instance(application_name=application_name)
-
     def get_plot_tab_name(self): return "N Profiles H/V"
 
     def build_widget(self, **kwargs):
         arrayH            = kwargs["arrayH"]
         arrayV            = kwargs["arrayV"]
-        virtual_pixelsize = kwargs["virtual_pixelsize"]
+        dpc_profiles_H    = kwargs["dpc_profiles_H"]
+        dpc_profiles_V    = kwargs["dpc_profiles_V"]
         zlabel            = kwargs["zlabel"]
         titleH            = kwargs["titleH"]
         titleV            = kwargs["titleV"]
         saveFileSuf       = kwargs["saveFileSuf"]
-        nprofiles         = kwargs["nprofiles"]
         remove1stOrderDPC = kwargs["remove1stOrderDPC"]
         filter_width      = kwargs["filter_width"]
-        output_data       = kwargs["output_data"]
 
         try:    figure_width = kwargs["figure_width"]*pixels_to_inches
         except: figure_width = 11
@@ -92,30 +87,19 @@ class NProfilesHV(WavePyWidget):
 
         self.setLayout(layout)
 
-        xxGrid, yyGrid = common_tools.grid_coord(arrayH, virtual_pixelsize)
-
-        fit_coefs = [[], []]
-        data2saveH = None
-        data2saveV = None
-        labels_H = None
-        labels_V = None
-
         rcParams['lines.markersize'] = 4
         rcParams['lines.linewidth'] = 2
 
         # Horizontal
-        if np.all(np.isfinite(arrayH)):
-            figure1_h, figure2_h, data2saveH, labels_H = self.__create_H_plot(arrayH,
-                                                                              arrayV,
-                                                                              zlabel,
-                                                                              titleH,
-                                                                              saveFileSuf,
-                                                                              nprofiles,
-                                                                              remove1stOrderDPC,
-                                                                              filter_width,
-                                                                              fit_coefs,
-                                                                              xxGrid,
-                                                                              fig_width=figure_width)
+        if not dpc_profiles_H is None:
+            figure1_h, figure2_h = self.__create_H_plot(arrayH,
+                                                        dpc_profiles_H,
+                                                        zlabel,
+                                                        titleH,
+                                                        saveFileSuf,
+                                                        remove1stOrderDPC,
+                                                        filter_width,
+                                                        fig_width=figure_width)
             tab_index = 0
         else:
             figure1_h = self.__get_empty_figure()
@@ -123,18 +107,15 @@ class NProfilesHV(WavePyWidget):
             tab_index = 1
 
         # Vertical
-        if np.all(np.isfinite(arrayV)):
-            figure1_v, figure2_v, data2saveV, labels_V = self.__create_V_plot(arrayH,
-                                                                              arrayV,
-                                                                              zlabel,
-                                                                              titleV,
-                                                                              saveFileSuf,
-                                                                              nprofiles,
-                                                                              remove1stOrderDPC,
-                                                                              filter_width,
-                                                                              fit_coefs,
-                                                                              yyGrid,
-                                                                              fig_width=figure_width)
+        if not dpc_profiles_V is None:
+            figure1_v, figure2_v = self.__create_V_plot(arrayV,
+                                                        dpc_profiles_V,
+                                                        zlabel,
+                                                        titleV,
+                                                        saveFileSuf,
+                                                        remove1stOrderDPC,
+                                                        filter_width,
+                                                        fig_width=figure_width)
         else:
             figure1_v = self.__get_empty_figure()
             figure2_v = self.__get_empty_figure()
@@ -156,12 +137,6 @@ class NProfilesHV(WavePyWidget):
 
         tabs.setCurrentIndex(tab_index)
 
-        output_data.set_parameter("dataH", data2saveH)
-        output_data.set_parameter("dataV", data2saveV)
-        output_data.set_parameter("labels_H", labels_H)
-        output_data.set_parameter("labels_V", labels_V)
-        output_data.set_parameter("fit_coefs", fit_coefs)
-
         self.setFixedWidth(tabs.width()+10)
         self.setFixedHeight(700)
 
@@ -171,36 +146,28 @@ class NProfilesHV(WavePyWidget):
 
         return figure
 
-    def __create_H_plot(self, arrayH, arrayV, zlabel, titleH, saveFileSuf, nprofiles, remove1stOrderDPC, filter_width, fit_coefs, xxGrid, fig_width=12):
-        figure1 = Figure(figsize=(fig_width, fig_width * 9 / 16))
-
-        xvec       = xxGrid[0, :]
-        data2saveH = np.c_[xvec]
-        header     = ['x [m]']
+    def __plot_profiles(self, figure, dpc_profiles, remove1stOrderDPC):
+        data   = dpc_profiles.get_parameter("data")
+        fitted = dpc_profiles.get_parameter("fitted")
+        labels = dpc_profiles.get_parameter("labels")
 
-        if filter_width != 0: arrayH_filtered = uniform_filter1d(arrayH, filter_width, 0)
-        else: arrayH_filtered = arrayH
+        ls_cycle, lc_jet = plot_tools.line_style_cycle(['-'], ['o', 's', 'd', '^'], ncurves=len(labels), cmap_str='gist_rainbow_r')
 
-        ls_cycle, lc_jet = plot_tools.line_style_cycle(['-'], ['o', 's', 'd', '^'], ncurves=nprofiles, cmap_str='gist_rainbow_r')
+        xvec = data[:, 0]
+        lc   = []
 
-        lc = []
-        labels_H = []
-        for i, row in enumerate(np.linspace(filter_width // 2, np.shape(arrayV)[0] - filter_width // 2 - 1, nprofiles + 2, dtype=int)):
-            if i == 0 or i == nprofiles + 1: continue
-
-            yvec = arrayH_filtered[row, :]
+        for j_line in range(1, data.shape[1]):
             lc.append(next(lc_jet))
-            p01 = np.polyfit(xvec, yvec, 1)
-            fit_coefs[0].append(p01)
 
-            if remove1stOrderDPC: yvec -= p01[0] * xvec + p01[1]
+            figure.gca().plot(xvec * 1e6, data[:, j_line], next(ls_cycle), color=lc[-1], label=labels[j_line - 1])
+            if not remove1stOrderDPC: figure.gca().plot(xvec * 1e6, fitted[:, j_line - 1], '--', color=lc[-1], lw=3)
+
+        return lc
 
-            figure1.gca().plot(xvec * 1e6, yvec, next(ls_cycle), color=lc[i - 1], label=str(row))
-            if not remove1stOrderDPC: figure1.gca().plot(xvec * 1e6, p01[0] * xvec + p01[1], '--', color=lc[i - 1], lw=3)
+    def __create_H_plot(self, arrayH, dpc_profiles_H, zlabel, titleH, saveFileSuf, remove1stOrderDPC, filter_width, fig_width=12):
+        figure1 = Figure(figsize=(fig_width, fig_width * 9 / 16))
 
-            data2saveH = np.c_[data2saveH, yvec]
-            header.append(str(row))
-            labels_H.append(str(row))
+        lc = self.__plot_profiles(figure1, dpc_profiles_H, remove1stOrderDPC)
 
         if remove1stOrderDPC: titleH = titleH + ', 2nd order removed'
 
@@ -211,10 +178,6 @@ class NProfilesHV(WavePyWidget):
 
         self.append_mpl_figure_to_save(figure=figure1, figure_file_name=common_tools.get_unique_filename(saveFileSuf + "_H", "png"))
 
-        header.append(zlabel + ', Filter Width = {:d} pixels'.format(filter_width))
-
-        self.__plotter.save_csv_file(data2saveH, file_prefix=saveFileSuf, file_suffix='_WF_profiles_H', headerList=header)
-
         figure2 = Figure(figsize=(12, 12 * 9 / 16))
         figure2.gca().imshow(arrayH, cmap='RdGy', vmin=common_tools.mean_plus_n_sigma(arrayH, -3), vmax=common_tools.mean_plus_n_sigma(arrayH, 3))
         figure2.gca().set_xlabel('Pixel')
@@ -223,49 +186,18 @@ class NProfilesHV(WavePyWidget):
 
         currentAxis = figure2.gca()
 
-        _, lc_jet = plot_tools.line_style_cycle(['-'], ['o', 's', 'd', '^'], ncurves=nprofiles, cmap_str='gist_rainbow_r')
-
-        for i, row in enumerate(np.linspace(filter_width // 2, np.shape(arrayV)[0] - filter_width // 2 - 1, nprofiles + 2, dtype=int)):
-            if i == 0 or i == nprofiles + 1: continue
-
-            currentAxis.add_patch(Rectangle((-.5, row - filter_width // 2 - .5), np.shape(arrayH)[1], filter_width, facecolor=lc[i - 1], alpha=.5))
-            figure2.gca().axhline(row, color=lc[i - 1])
+        for i, row in enumerate(dpc_profiles_H.get_parameter("positions")):
+            currentAxis.add_patch(Rectangle((-.5, row - filter_width // 2 - .5), np.shape(arrayH)[1], filter_width, facecolor=lc[i], alpha=.5))
+            figure2.gca().axhline(row, color=lc[i])
 
         self.append_mpl_figure_to_save(figure=figure2, figure_file_name=common_tools.get_unique_filename(saveFileSuf + "_H", "png"))
 
-        return figure1, figure2, data2saveH, labels_H
-
+        return figure1, figure2
 
-    def __create_V_plot(self, arrayH, arrayV, zlabel, titleV, saveFileSuf, nprofiles, remove1stOrderDPC, filter_width, fit_coefs, yyGrid, fig_width=12):
+    def __create_V_plot(self, arrayV, dpc_profiles_V, zlabel, titleV, saveFileSuf, remove1stOrderDPC, filter_width, fig_width=12):
         figure1 = Figure(figsize=(fig_width, fig_width * 9 / 16))
 
-        xvec = yyGrid[:, 0]
-        data2saveV = np.c_[xvec]
-        header = ['y [m]']
-
-        if filter_width != 0: arrayV_filtered = uniform_filter1d(arrayV, filter_width, 1)
-        else: arrayV_filtered = arrayV
-
-        ls_cycle, lc_jet = plot_tools.line_style_cycle(['-'], ['o', 's', 'd', '^'], ncurves=nprofiles, cmap_str='gist_rainbow_r')
-
-        lc = []
-        labels_V = []
-        for i, col in enumerate(np.linspace(filter_width // 2, np.shape(arrayH)[1] - filter_width // 2 - 1, nprofiles + 2, dtype=int)):
-            if i == 0 or i == nprofiles + 1: continue
-
-            yvec = arrayV_filtered[:, col]
-            lc.append(next(lc_jet))
-            p10 = np.polyfit(xvec, yvec, 1)
-            fit_coefs[1].append(p10)
-
-            if remove1stOrderDPC: yvec -= p10[0] * xvec + p10[1]
-
-            figure1.gca().plot(xvec * 1e6, yvec, next(ls_cycle), color=lc[i - 1], label=str(col))
-            if not remove1stOrderDPC: figure1.gca().plot(xvec * 1e6, p10[0] * xvec + p10[1], '--', color=lc[i - 1], lw=3)
-
-            data2saveV = np.c_[data2saveV, yvec]
-            header.append(str(col))
-            labels_V.append(str(col))
+        lc = self.__plot_profiles(figure1, dpc_profiles_V, remove1stOrderDPC)
 
         if remove1stOrderDPC: titleV = titleV + ', 2nd order removed'
 
@@ -277,10 +209,6 @@ class NProfilesHV(WavePyWidget):
 
         self.append_mpl_figure_to_save(figure=figure1, figure_file_name=common_tools.get_unique_filename(saveFileSuf + "_V", "png"))
 
-        header.append(zlabel + ', Filter Width = {:d} pixels'.format(filter_width))
-
-        self.__plotter.save_csv_file(data2saveV, file_prefix=saveFileSuf, file_suffix='_WF_profiles_V', headerList=header)
-
         figure2 = Figure(figsize=(12, 12 * 9 / 16))
         figure2.gca().imshow(arrayV, cmap='RdGy', vmin=common_tools.mean_plus_n_sigma(arrayV, -3), vmax=common_tools.mean_plus_n_sigma(arrayV, 3))
         figure2.gca().set_xlabel('Pixel')
@@ -289,12 +217,10 @@ class NProfilesHV(WavePyWidget):
 
         currentAxis = figure2.gca()
 
-        for i, col in enumerate(np.linspace(filter_width // 2, np.shape(arrayH)[1] - filter_width // 2 - 1, nprofiles + 2, dtype=int)):
-            if i == 0 or i == nprofiles + 1: continue
-
-            currentAxis.add_patch(Rectangle((col - filter_width // 2 - .5, -.5), filter_width, np.shape(arrayV)[0], facecolor=lc[i - 1], alpha=.5))
-            figure2.gca().axvline(col, color=lc[i - 1])
+        for i, col in enumerate(dpc_profiles_V.get_parameter("positions")):
+            currentAxis.add_patch(Rectangle((col - filter_width // 2 - .5, -.5), filter_width, np.shape(arrayV)[0], facecolor=lc[i], alpha=.5))
+            figure2.gca().axvline(col, color=lc[i])
 
         self.append_mpl_figure_to_save(figure=figure2, figure_file_name=common_tools.get_unique_filename(saveFileSuf + "_V", "png"))
 
-        return figure1, figure2, data2saveV, labels_V
+        return figure1, figure2
@@ -67,17 +67,13 @@ class PlotDPC(WavePyWidget):
         differential_phase_10 = kwargs["differential_phase_10"]
         pixelsize = kwargs["pixelsize"]
 
-        factor, unit_xy = common_tools.choose_unit(np.sqrt(differential_phase_01.size) * pixelsize[0])
+        # 1D gratings: one of the two components is None
+        plots = [(differential_phase*pixelsize[axis]/np.pi, title) for differential_phase, axis, title in [(differential_phase_01, 1, 'DPC - Horizontal'),
+                                                                                                            (differential_phase_10, 0, 'DPC - Vertical')] if not differential_phase is None]
 
-        differential_phase_01_plot = differential_phase_01*pixelsize[1]/np.pi
-        differential_phase_10_plot = differential_phase_10*pixelsize[0]/np.pi
+        factor, unit_xy = common_tools.choose_unit(np.sqrt(plots[0][0].size) * pixelsize[0])
 
-        vlim01 = np.max((np.abs(common_tools.mean_plus_n_sigma(differential_phase_01_plot, -5)),
-                         np.abs(common_tools.mean_plus_n_sigma(differential_phase_01_plot, 5))))
-        vlim10 = np.max((np.abs(common_tools.mean_plus_n_sigma(differential_phase_10_plot, -5)),
-                         np.abs(common_tools.mean_plus_n_sigma(differential_phase_10_plot, 5))))
-
-        figure = Figure(figsize=(12, 6))
+        figure = Figure(figsize=(6*len(plots), 6))
 
         def create_plot(ax, img, vlim, title):
             im = ax.imshow(img, cmap='RdGy_r',
@@ -88,8 +84,11 @@ class PlotDPC(WavePyWidget):
             figure.colorbar(im, shrink=0.5)
             ax.set_title(title, fontsize=18, weight='bold')
 
-        create_plot(figure.add_subplot(1, 2, 1), differential_phase_01_plot, vlim01, 'DPC - Horizontal')
-        create_plot(figure.add_subplot(1, 2, 2), differential_phase_10_plot, vlim10, 'DPC - Vertical')
+        for index, (differential_phase_plot, title) in enumerate(plots):
+            vlim = np.max((np.abs(common_tools.mean_plus_n_sigma(differential_phase_plot, -5)),
+                           np.abs(common_tools.mean_plus_n_sigma(differential_phase_plot, 5))))
+
+            create_plot(figure.add_subplot(1, len(plots), index + 1), differential_phase_plot, vlim, title)
 
         figure.suptitle('Differential Phase ' + r'[$\pi$ rad]' + self.__title, fontsize=18, weight='bold')
         figure.tight_layout(rect=[0, 0, 1, 1])
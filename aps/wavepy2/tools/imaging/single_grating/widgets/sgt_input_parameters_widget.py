@@ -84,7 +84,8 @@ def generate_initialization_parameters_sgt(img_file_name,
                                            calc_thickness,
                                            remove_2nd_order,
                                            material_idx,
-                                           widget=None):
+                                           widget=None,
+                                           ask_dark_value=True):
     img = read_tiff(img_file_name)
     imgRef = None if (mode == MODES[1] or common_tools.is_empty_file_name(imgRef_file_name)) else read_tiff(imgRef_file_name)
     imgBlank = None if common_tools.is_empty_file_name(imgBlank_file_name) else read_tiff(imgBlank_file_name)
@@ -96,10 +97,10 @@ def generate_initialization_parameters_sgt(img_file_name,
 
     if imgBlank is None:
         defaultBlankV = int(np.mean(img[0:100, 0:100]))
-        defaultBlankV = gui.ValueDialog.get_value(widget,
-                                                  message="No Dark File. Value of Dark [counts]\n(Default is the mean value of the 100x100 pixels top-left corner)",
-                                                  title='Experimental Values',
-                                                  default=defaultBlankV)
+        if ask_dark_value: defaultBlankV = gui.ValueDialog.get_value(widget,
+                                                                     message="No Dark File. Value of Dark [counts]\n(Default is the mean value of the 100x100 pixels top-left corner)",
+                                                                     title='Experimental Values',
+                                                                     default=defaultBlankV)
         imgBlank = img * 0.0 + defaultBlankV
 
     img = img - imgBlank
@@ -120,7 +121,8 @@ def generate_initialization_parameters_sgt(img_file_name,
         saveFileSuf += 'TalbotImaging_'
 
     if pattern == PATTERNS[0]:  # 'Diagonal half pi':
-        gratingPeriod *= 1.0 / np.sqrt(2.0)
+        # the period of the checkerboard is along its diagonal, a 1D (lines) grating has none
+        if dimension == DIMENSIONS[1]: gratingPeriod *= 1.0 / np.sqrt(2.0)
         phaseShift = 'halfPi'
     elif pattern == PATTERNS[1]:  # 'Edge pi':
         gratingPeriod *= 1.0 / 2.0
@@ -44,7 +44,6 @@
 # #########################################################################
 import numpy as np
 import itertools
-from scipy.optimize import curve_fit
 
 from aps.wavepy2.util.common import common_tools
 from aps.wavepy2.util.common.common_tools import hc
@@ -60,6 +59,7 @@ from aps.wavepy2.util.plot.plot_tools import PlottingProperties
 from aps.wavepy2.tools.common.wavepy_data import WavePyData
 from aps.wavepy2.tools.common import physical_properties
 from aps.wavepy2.tools.common.bl import crop_image
+from aps.wavepy2.core import lens_fit
 
 from aps.wavepy2.tools.common.widgets.plot_profile_widget import PlotProfile
 from aps.wavepy2.tools.common.widgets.simple_plot_widget import SimplePlot
@@ -249,7 +249,7 @@ class __FitResidualLenses(FitResidualLensesFacade):
 
         # %% Center image
         radius4centering = np.min(thickness.shape) * np.min(pixelsize) * .75
-        thickness = self.__center_lens_array_max_fit(thickness, pixelsize, radius4centering)
+        thickness = lens_fit.center_lens_array_max_fit(thickness, pixelsize, radius4centering, logger=self.__main_logger)
 
         self.__plotter.push_plot_on_context(CENTER_IMAGE_CONTEXT_KEY, SimplePlot, unique_id,
                                             img=thickness * 1e6,
@@ -329,13 +329,13 @@ class __FitResidualLenses(FitResidualLensesFacade):
         else: opt = [1]
 
         for diameter4fit, i in itertools.product(diameter4fit_list, opt):
-            radius4fit = self.__biggest_radius(thickness, pixelsize, diameter4fit / 2)
+            radius4fit = lens_fit.biggest_radius(thickness, pixelsize, diameter4fit / 2, logger=self.__main_logger)
 
             self.__script_logger.print("Radius of the area for fit = {:.2f} um".format(radius4fit * 1e6))
 
             if i == 1:
                 str4graphs = str4title
-                (thickness_cropped, fitted, fitParameters) = self.__fit_parabolic_lens_2d(thickness, pixelsize, radius4fit=radius4fit, mode=lensGeometry)
+                (thickness_cropped, fitted, fitParameters) = lens_fit.fit_parabolic_lens_2d(thickness, pixelsize, radius4fit=radius4fit, mode=lensGeometry, logger=self.__main_logger)
             elif i == 2:
                 # this overwrite the previous fit, but I need that fit because it
                 # is fast (least square fit) and it provides initial values for the
@@ -344,12 +344,13 @@ class __FitResidualLenses(FitResidualLensesFacade):
                 p0 = [nominalRadius, fitParameters[1], fitParameters[2], fitParameters[3]]
                 bounds = ([p0[0] * .999999, -200.05e-6, -200.05e-6, -120.05e-6], [p0[0] * 1.00001, 200.05e-6, 200.05e-6, 120.05e-6])
 
-                (thickness_cropped, fitted, fitParameters) = self.__fit_nominal_lens_2d(thickness,
-                                                                                        pixelsize,
-                                                                                        radius4fit=radius4fit,
-                                                                                        p0=p0,
-                                                                                        bounds=bounds,
-                                                                                        kwargs4fit={"verbose": 2, "ftol": 1e-12, "gtol": 1e-12})
+                (thickness_cropped, fitted, fitParameters) = lens_fit.fit_nominal_lens_2d(thickness,
+                                                                                          pixelsize,
+                                                                                          radius4fit=radius4fit,
+                                                                                          p0=p0,
+                                                                                          bounds=bounds,
+                                                                                          kwargs4fit={"verbose": 2, "ftol": 1e-12, "gtol": 1e-12},
+                                                                                          logger=self.__main_logger)
 
             xmatrix, ymatrix = common_tools.grid_coord(thickness_cropped, pixelsize)
 
@@ -420,204 +421,3 @@ class __FitResidualLenses(FitResidualLensesFacade):
         self.__plotter.draw_context(DO_FIT_CONTEXT_KEY, add_context_label=add_context_label, unique_id=unique_id, **kwargs)
 
         return WavePyData()
-
-    ###################################################################
-    # PRIVATE METHODS
-
-    # =============================================================================
-    # %% 2D Fit
-    # =============================================================================
-
-    def __center_lens_array_max_fit(self, thickness, pixelsize, radius4fit=100e-6):
-        """
-        crop the array in order to have the max at the center of the array. It uses
-        a fitting procedure of a 2D parabolic function to determine the center
-
-        """
-
-        radius4fit = self.__biggest_radius(thickness, pixelsize, radius4fit * 0.8)
-
-        thickness = np.copy(thickness)
-
-        xx, yy = common_tools.grid_coord(thickness, pixelsize)
-
-        (_, _, fitParameters) = self.__fit_parabolic_lens_2d(thickness, pixelsize, radius4fit=radius4fit)
-
-        center_i = np.argmin(np.abs(yy[:, 0]-fitParameters[2]))
-        center_j = np.argmin(np.abs(xx[0, :]-fitParameters[1]))
-
-        if 2*center_i > thickness.shape[0]: thickness = thickness[2 * center_i - thickness.shape[0]:, :]
-        else: thickness = thickness[0:2 * center_i, :]
-
-        if 2*center_j > thickness.shape[1]: thickness = thickness[:, 2 * center_j - thickness.shape[1]:]
-        else: thickness = thickness[:, 0:2 * center_j]
-
-        return thickness
-
-    # =============================================================================
-
-    def __biggest_radius(self, thickness, pixelsize, radius4fit):
-        bool_x = (thickness.shape[0] // 2 < radius4fit // pixelsize[0])
-        bool_y = (thickness.shape[1] // 2 < radius4fit // pixelsize[1])
-
-        if bool_x or bool_y:
-            radius4fit = 0.9*np.min((thickness.shape[0] * pixelsize[0] / 2, thickness.shape[1] * pixelsize[1] / 2))
-
-            self.__main_logger.print_warning("WARNING: Image size smaller than the region for fit")
-            self.__main_logger.print_warning("New Radius: {:.3f}um".format(radius4fit*1e6))
-
-        return radius4fit
-
-
-    # =============================================================================
-
-    def __fit_parabolic_lens_2d(self, thickness, pixelsize, radius4fit, mode="2D"):
-
-        # FIT
-        xx, yy = common_tools.grid_coord(thickness, pixelsize)
-        mask = xx*np.nan
-
-        lim_x = np.argwhere(xx[0, :] <= -radius4fit*1.01)[-1, 0]
-        lim_y = np.argwhere(yy[:, 0] <= -radius4fit*1.01)[-1, 0]
-
-        if "2D" in mode:
-
-            r2 = np.sqrt(xx**2 + yy**2)
-            mask[np.where(r2 < radius4fit)] = 1.0
-
-        elif "1Dx" in mode:
-            mask[np.where(xx**2 < radius4fit)] = 1.0
-            lim_y = 2
-
-        elif "1Dy" in mode:
-            mask[np.where(yy**2 < radius4fit)] = 1.0
-            lim_x = 2
-
-        fitted, popt = self.__lsq_fit_parabola(thickness*mask, pixelsize, mode=mode)
-
-        self.__main_logger.print_message("Parabolic 2D Fit")
-        self.__main_logger.print_message("Curv Radius, xo, yo, offset")
-        self.__main_logger.print_message(popt)
-
-        self.__main_logger.print_message("Parabolic 2D Fit: Radius of 1 face  / nfaces, x direction: {:.4g} um".format(popt[0]*1e6))
-
-        if (lim_x <= 1 or lim_y <= 1):
-            thickness_cropped = thickness*mask
-            fitted_cropped = fitted*mask
-        else:
-            thickness_cropped = (thickness[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
-            fitted_cropped = (fitted[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
-
-        return (thickness_cropped, fitted_cropped, popt)
-
-    # =============================================================================
-
-    def __lsq_fit_parabola(self, zz, pixelsize, mode="2D"):
-        xx, yy = common_tools.grid_coord(zz, pixelsize)
-
-        if np.all(np.isfinite(zz)):  # if there is no nan
-            f = zz.flatten()
-            x = xx.flatten()
-            y = yy.flatten()
-        else:
-            argNotNAN = np.isfinite(zz)
-            f = zz[argNotNAN].flatten()
-            x = xx[argNotNAN].flatten()
-            y = yy[argNotNAN].flatten()
-
-        if "2D" in mode:
-            X_matrix = np.vstack([x**2 + y**2, x, y, x*0.0 + 1]).T
-
-            beta_matrix = np.linalg.lstsq(X_matrix, f)[0]
-
-            fit = (beta_matrix[0]*(xx**2 + yy**2) +
-                   beta_matrix[1]*xx +
-                   beta_matrix[2]*yy +
-                   beta_matrix[3])
-
-        elif "1Dx" in mode:
-            X_matrix = np.vstack([x**2, x, y, x*0.0 + 1]).T
-
-            beta_matrix = np.linalg.lstsq(X_matrix, f)[0]
-
-            fit = (beta_matrix[0]*(xx**2) +
-                   beta_matrix[1]*xx +
-                   beta_matrix[2]*yy +
-                   beta_matrix[3])
-
-        elif "1Dy" in mode:
-            X_matrix = np.vstack([y**2, x, y, x*0.0 + 1]).T
-
-            beta_matrix = np.linalg.lstsq(X_matrix, f)[0]
-
-            fit = (beta_matrix[0]*(yy**2) +
-                   beta_matrix[1]*xx +
-                   beta_matrix[2]*yy +
-                   beta_matrix[3])
-
-        if np.all(np.isfinite(zz)):
-            mask = zz*0.0 + 1.0
-        else:
-            mask = zz*0.0 + 1.0
-            mask[~argNotNAN] = np.nan
-
-        R_o = 1/2/beta_matrix[0]
-        x_o = -beta_matrix[1]/beta_matrix[0]/2
-        y_o = -beta_matrix[2]/beta_matrix[0]/2
-        offset = beta_matrix[3]
-
-        popt = [R_o, x_o, y_o, offset]
-
-        return fit*mask, popt
-
-    # =============================================================================
-
-    def __fit_nominal_lens_2d(self, thickness, pixelsize, radius4fit,
-                              p0=[20e-6, 1.005e-6, -.005e-6, -.005e-6],
-                              bounds=([10e-6, -2.05e-6, -2.05e-6, -2.05e-6],
-                                      [50e-6, 2.05e-6, 2.05e-6, 2.05e-6]),
-                              kwargs4fit={}):
-
-        xmatrix, ymatrix = common_tools.grid_coord(thickness, pixelsize)
-        r2 = np.sqrt(xmatrix**2 + ymatrix**2)
-        args4fit = np.where(r2.flatten() < radius4fit)
-
-        mask = xmatrix*np.nan
-        mask[np.where(r2 < radius4fit)] = 1.0
-
-        data2fit = thickness.flatten()[args4fit]
-
-        xxfit = xmatrix.flatten()[args4fit]
-        yyfit = ymatrix.flatten()[args4fit]
-
-        xyfit = [xxfit, yyfit]
-
-        # FIT
-
-        def _2Dparabol_4_fit(xy, Radius, xo, yo, offset):
-            x, y = xy
-            return (x - xo) ** 2 / 2 / Radius + (y - yo) ** 2 / 2 / Radius + offset
-
-        popt, pcov = curve_fit(_2Dparabol_4_fit, xyfit, data2fit,
-                               p0=p0, bounds=bounds, method="trf",
-                               **kwargs4fit)
-
-        self.__main_logger.print_message("Nominal Parabolic 2D Fit")
-        self.__main_logger.print_message("Curv Radius, xo, yo, offset")
-        self.__main_logger.print_message(popt)
-
-        self.__main_logger.print_message("Nominal Parabolic 2D Fit: Radius of 1 face  / nfaces, x direction: {:.4g} um".format(popt[0]*1e6))
-
-        lim_x = np.argwhere(xmatrix[0, :] <= -radius4fit*1.01)[-1, 0]
-        lim_y = np.argwhere(ymatrix[:, 0] <= -radius4fit*1.01)[-1, 0]
-
-        fitted = _2Dparabol_4_fit([xmatrix, ymatrix], popt[0], popt[1], popt[2], popt[3])
-
-        if (lim_x <= 1 or lim_y <= 1):
-            thickness_cropped = thickness*mask
-            fitted_cropped = fitted*mask
-        else:
-            thickness_cropped = (thickness[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
-            fitted_cropped = (fitted[lim_y:-lim_y+1, lim_x:-lim_x+1] * mask[lim_y:-lim_y+1, lim_x:-lim_x+1])
-
-        return (thickness_cropped, fitted_cropped, popt)
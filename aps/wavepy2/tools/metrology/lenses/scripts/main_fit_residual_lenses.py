@@ -64,7 +64,7 @@ class MainFitResidualLenses(WavePyScript):
     def _run_script(self, SCRIPT_LOGGER_MODE=LoggerMode.FULL, **args):
         plotter = get_registered_plotter_instance(application_name=self._get_application_name())
 
-        fit_residual_lenses_manager = create_fit_residual_lenses_manager()
+        fit_residual_lenses_manager = self._profile_manager(create_fit_residual_lenses_manager())
 
         # ==========================================================================
         # %% Initialization parameters
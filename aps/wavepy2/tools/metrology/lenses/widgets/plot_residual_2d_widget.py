@@ -191,6 +191,9 @@ class CountourPlot(WavePyWidget):
 
     def get_plot_tab_name(self): return "Residual 2D - Countour"
 
+    @classmethod
+    def get_background_render_data(cls, **kwargs): return kwargs
+
     def build_mpl_figure(self, **kwargs):
         xmatrix    = kwargs["xmatrix"]
         ymatrix    = kwargs["ymatrix"]
@@ -238,6 +241,9 @@ class Plot3D(WavePyWidget):
 
     def get_plot_tab_name(self): return "Residual 2D - Plot 3D"
 
+    @classmethod
+    def get_background_render_data(cls, **kwargs): return kwargs
+
     def build_mpl_figure(self, **kwargs):
         xmatrix    = kwargs["xmatrix"]
         ymatrix    = kwargs["ymatrix"]
@@ -0,0 +1,136 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+
+import numpy as np
+import pytest
+
+from aps.wavepy2.tools.common.wavepy_data import WavePyData
+from aps.wavepy2.tools.common import stage_cache
+from aps.wavepy2.tools.common.stage_cache import StageCache, save_wavepy_data, load_wavepy_data
+
+def test_round_trip(tmp_path):
+    file_name = str(tmp_path / "data.npz")
+
+    image    = np.arange(12, dtype=float).reshape(3, 4)
+    profiles = [np.ones(5), np.zeros((2, 2), dtype=np.int32), np.array([1+2j])]
+
+    save_wavepy_data(file_name, WavePyData(image=image, profiles=profiles, period=np.float64(4.8e-6), n_files=3,
+                                           pattern="Edge", limits=[0, -1, 0, -1], options={"show": True}, dark=None))
+
+    wavepy_data = load_wavepy_data(file_name)
+
+    assert np.array_equal(wavepy_data.get_parameter("image"), image)
+    assert len(wavepy_data.get_parameter("profiles")) == len(profiles)
+    for loaded, saved in zip(wavepy_data.get_parameter("profiles"), profiles):
+        assert loaded.dtype == saved.dtype and np.array_equal(loaded, saved)
+    assert wavepy_data.get_parameter("period") == 4.8e-6
+    assert wavepy_data.get_parameter("n_files") == 3
+    assert wavepy_data.get_parameter("pattern") == "Edge"
+    assert wavepy_data.get_parameter("limits") == [0, -1, 0, -1]
+    assert wavepy_data.get_parameter("options") == {"show": True}
+    assert wavepy_data.get_parameter("dark") is None
+    assert os.listdir(str(tmp_path)) == ["data.npz"]
+
+def test_unsupported_value(tmp_path):
+    with pytest.raises(TypeError): save_wavepy_data(str(tmp_path / "data.npz"), WavePyData(value=object()))
+
+    assert os.listdir(str(tmp_path)) == []
+
+def test_key():
+    image = np.ones((4, 4))
+
+    assert StageCache.get_key("stage", image, 1.0) == StageCache.get_key("stage", image.copy(), 1.0)
+    assert StageCache.get_key("stage", image, 1.0) != StageCache.get_key("other stage", image, 1.0)
+    assert StageCache.get_key("stage", image, 1.0) != StageCache.get_key("stage", image, 2.0)
+    assert StageCache.get_key("stage", image) != StageCache.get_key("stage", image.astype(np.float32))
+    assert StageCache.get_key("stage", WavePyData(a=1)) == StageCache.get_key("stage", {"a": 1})
+
+def test_key_version(monkeypatch):
+    key = StageCache.get_key("stage", 1.0)
+
+    monkeypatch.setattr(stage_cache, "CACHE_VERSION", stage_cache.CACHE_VERSION + 1)
+
+    assert StageCache.get_key("stage", 1.0) != key
+
+def test_get_put(tmp_path):
+    cache = StageCache(str(tmp_path))
+    key   = StageCache.get_key("stage", 1)
+
+    assert cache.get(key) is None
+
+    cache.put(key, WavePyData(image=np.ones(3)))
+
+    assert np.array_equal(cache.get(key).get_parameter("image"), np.ones(3))
+
+    cache.clear()
+
+    assert cache.get(key) is None and cache.get_size() == 0
+
+def test_lru_eviction(tmp_path):
+    def put(cache, name):
+        key = StageCache.get_key(name)
+        cache.put(key, WavePyData(image=np.zeros(1000)))
+        return key
+
+    cache = StageCache(str(tmp_path))
+    key_a = put(cache, "a")
+    size  = cache.get_size()
+    key_b = put(cache, "b")
+
+    # explicit modification times: a is older than b
+    os.utime(os.path.join(str(tmp_path), key_a + ".npz"), ns=(1000000000, 1000000000))
+    os.utime(os.path.join(str(tmp_path), key_b + ".npz"), ns=(2000000000, 2000000000))
+
+    cache = StageCache(str(tmp_path), max_size=int(2.5*size))
+
+    assert not cache.get(key_a) is None # a becomes the most recently used
+
+    key_c = put(cache, "c")
+
+    assert cache.get_size() <= int(2.5*size)
+    assert cache.get(key_b) is None
+    assert not cache.get(key_a) is None
+    assert not cache.get(key_c) is None
@@ -0,0 +1,93 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import numpy as np
+import pytest
+
+from aps.wavepy2.tools.common.wavepy_data import WavePyData
+from aps.wavepy2.tools.common.stage_checkpoints import StageCheckpoints
+
+def test_save_load(tmp_path):
+    output_folder = str(tmp_path)
+
+    assert not StageCheckpoints.exist(output_folder)
+
+    checkpoints = StageCheckpoints(output_folder)
+
+    assert checkpoints.get_completed_stages() == []
+    assert checkpoints.load_last() == (None, None)
+
+    checkpoints.save("crop image", WavePyData(img=np.ones((2, 2))))
+    checkpoints.save("harmonic analysis", WavePyData(harmonics=[np.zeros(3), np.ones(3)]))
+
+    assert StageCheckpoints.exist(output_folder)
+
+    checkpoints = StageCheckpoints(output_folder)
+
+    assert checkpoints.get_completed_stages() == ["crop image", "harmonic analysis"]
+    assert np.array_equal(checkpoints.load("crop image").get_parameter("img"), np.ones((2, 2)))
+
+    stage_name, wavepy_data = checkpoints.load_last()
+
+    assert stage_name == "harmonic analysis"
+    assert np.array_equal(wavepy_data.get_parameter("harmonics")[1], np.ones(3))
+
+    with pytest.raises(ValueError): checkpoints.load("integration")
+
+def test_stage_executed_again(tmp_path):
+    checkpoints = StageCheckpoints(str(tmp_path))
+
+    for i, stage_name in enumerate(["crop image", "harmonic analysis", "integration"]): checkpoints.save(stage_name, WavePyData(i=i))
+
+    # after a resume, a stage executed again invalidates the following ones
+    checkpoints.save("harmonic analysis", WavePyData(i=10))
+
+    assert checkpoints.get_completed_stages() == ["crop image", "harmonic analysis"]
+    assert checkpoints.load_last()[1].get_parameter("i") == 10
+
+    with pytest.raises(ValueError): checkpoints.load("integration")
+
+    checkpoints.save("integration", WavePyData(i=11))
+
+    assert checkpoints.get_completed_stages() == ["crop image", "harmonic analysis", "integration"]
@@ -43,7 +43,8 @@
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
 import numpy as np
-from scipy.interpolate import UnivariateSpline
+
+DISPLAY_SIZE = 1024 # pixels, display resolution budget of the images of the deferred plots and of the spectrum thumbnails
 
 # ---------------------------------------------------------------------------
 # Fourier Transform
@@ -78,6 +79,21 @@ class FourierTransform:
     def ifft2d(cls, imgFFT):
         return ifft2(np.fft.ifftshift(imgFFT), norm='ortho')
 
+    @classmethod
+    def fft2d_stack(cls, imgs):
+        """
+        fft2d of each image of a (K, H, W) stack, computed as a single batched transform.
+        """
+        return np.fft.fftshift(fft2(imgs, axes=(-2, -1), norm='ortho'), axes=(-2, -1))
+
+    @classmethod
+    def dft_matrix(cls, n, indexes):
+        """
+        Rows of the DFT matrix of size n corresponding to the given indexes of the
+        fftshift-ed spectrum (matrix DFT).
+        """
+        return np.exp(-2j*np.pi*np.outer(np.asarray(indexes) - n//2, np.arange(n))/n)
+
 # ---------------------------------------------------------------------------
 # MISCELLANEA (FROM WAVEPY)
 
@@ -134,6 +150,18 @@ def get_unique_filename(patternforname, extension='txt', width=2, isFolder=False
 
     return fname
 
+def reserve_unique_filename(patternforname, extension='txt', width=2):
+    '''
+    As get_unique_filename, but an empty file is created: the name is taken
+    also if the file is written later (e.g. by another process).
+    '''
+    while True:
+        fname = get_unique_filename(patternforname, extension, width)
+
+        try:
+            with open(fname, 'x'): return fname
+        except FileExistsError: pass
+
 
 def choose_unit(array):
     """
@@ -236,6 +264,8 @@ def crop_matrix_at_indexes(input_matrix, list_of_indexes):
                                 list_of_indexes[2]:list_of_indexes[3]])
 
 def fwhm_xy(xvalues, yvalues):
+    from scipy.interpolate import UnivariateSpline # lazy: scipy.interpolate is slow to import
+
     spline = UnivariateSpline(xvalues,
                               yvalues-np.min(yvalues)/2-np.max(yvalues)/2,
                               s=0)
@@ -275,6 +305,21 @@ def lsq_fit_parabola(zz, pixelsize):
 def mean_plus_n_sigma(array, n_sigma=5):
     return np.nanmean(array) + n_sigma*np.nanstd(array)
 
+def downsample_image(img, display_size=DISPLAY_SIZE):
+    """
+    Image reduced to at most display_size pixels per side, by the mean of
+    square blocks of pixels (complex images are decimated): the trailing
+    rows/columns not filling a block are dropped.
+    """
+    factor = int(np.ceil(max(img.shape)/display_size))
+
+    if factor <= 1: return img
+    elif np.iscomplexobj(img): return img[::factor, ::factor]
+    else:
+        rows, columns = img.shape[0]//factor, img.shape[1]//factor
+
+        return img[:rows*factor, :columns*factor].reshape(rows, factor, columns, factor).mean(axis=(1, 3))
+
 def extent_func(img, pixelsize=[1, 1]):
     if isinstance(pixelsize, float): pixelsize = [pixelsize, pixelsize]
 
@@ -0,0 +1,254 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+import math
+
+SERIAL             = 0
+PROCESS_POOL       = 1
+THREAD_POOL        = 2
+DASK_LOCAL_CLUSTER = 3
+MPI                = 4
+
+EXECUTOR_MODES = {SERIAL             : "Serial",
+                  PROCESS_POOL       : "Process Pool",
+                  THREAD_POOL        : "Thread Pool",
+                  DASK_LOCAL_CLUSTER : "Dask Local Cluster",
+                  MPI                : "MPI"}
+
+def get_available_cpus():
+    """
+    Number of CPUs this process can actually use: the affinity mask and the CPU quota of the
+    container (cgroup v1 or v2) are taken into account, not only the CPUs of the computer.
+    """
+    try:    available_cpus = len(os.sched_getaffinity(0))
+    except: available_cpus = os.cpu_count() or 1
+
+    cpu_quota = __get_cgroup_cpu_quota()
+
+    if not cpu_quota is None: available_cpus = min(available_cpus, max(1, math.ceil(cpu_quota)))
+
+    return available_cpus
+
+def get_default_n_workers():
+    available_cpus = get_available_cpus()
+
+    return available_cpus - 1 if available_cpus > 2 else available_cpus
+
+class ExecutorFacade:
+    def get_mode(self): raise NotImplementedError()
+    def get_n_workers(self): raise NotImplementedError()
+    def map(self, function, iterable): raise NotImplementedError()
+
+    def open(self): return self
+    def close(self): pass
+
+    def __enter__(self): return self.open()
+    def __exit__(self, exc_type, exc_value, traceback): self.close()
+
+    def get_description(self):
+        n_workers = self.get_n_workers()
+
+        return EXECUTOR_MODES[self.get_mode()] + ("" if n_workers is None else ", " + str(n_workers) + " workers")
+
+def create_executor(mode=PROCESS_POOL, n_workers=None):
+    """
+    Executors return the results of map in the same order of the iterable, as soon as they are available.
+    Parallel resources are created at each call of map and released when all the results are returned, unless the
+    executor is open (open/close, or a with statement): then they are created once and reused by all the calls of
+    map, until the executor is closed (e.g. the frames of a live scan, calculated a few at a time).
+    """
+    if not n_workers is None and n_workers <= 0: n_workers = None
+
+    if   mode == SERIAL:             return __SerialExecutor()
+    elif mode == PROCESS_POOL:       return __ProcessPoolExecutor(n_workers)
+    elif mode == THREAD_POOL:        return __ThreadPoolExecutor(n_workers)
+    elif mode == DASK_LOCAL_CLUSTER: return __DaskLocalClusterExecutor(n_workers)
+    elif mode == MPI:                return __MPIExecutor(n_workers)
+    else: raise ValueError("Executor mode not recognized: " + str(mode))
+
+####################################
+# PRIVATE METHODS
+
+def __get_cgroup_cpu_quota():
+    try: # cgroup v2
+        with open("/sys/fs/cgroup/cpu.max", "r") as file: quota, period = file.read().split()[:2]
+        if quota != "max": return int(quota) / int(period)
+    except: pass
+
+    try: # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r") as file:  quota  = int(file.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r") as file: period = int(file.read())
+        if quota > 0: return quota / period
+    except: pass
+
+    return None
+
+class __SerialExecutor(ExecutorFacade):
+    def get_mode(self): return SERIAL
+    def get_n_workers(self): return None
+
+    def map(self, function, iterable):
+        for item in iterable: yield function(item)
+
+class __ProcessPoolExecutor(ExecutorFacade):
+    def __init__(self, n_workers=None):
+        self.__n_workers = get_default_n_workers() if n_workers is None else n_workers
+        self.__pool      = None
+
+    def get_mode(self): return PROCESS_POOL
+    def get_n_workers(self): return self.__n_workers
+
+    def open(self):
+        from multiprocessing import Pool
+
+        if self.__pool is None: self.__pool = Pool(self.__n_workers)
+
+        return self
+
+    def close(self):
+        if not self.__pool is None:
+            self.__pool.terminate() # as the with statement of Pool: the results have been returned
+            self.__pool.join()
+            self.__pool = None
+
+    def map(self, function, iterable):
+        from multiprocessing import Pool
+
+        if self.__pool is None:
+            with Pool(self.__n_workers) as pool:
+                for result in pool.imap(function, iterable): yield result
+        else:
+            for result in self.__pool.imap(function, iterable): yield result
+
+class __ThreadPoolExecutor(ExecutorFacade):
+    def __init__(self, n_workers=None):
+        self.__n_workers = get_default_n_workers() if n_workers is None else n_workers
+        self.__executor  = None
+
+    def get_mode(self): return THREAD_POOL
+    def get_n_workers(self): return self.__n_workers
+
+    def open(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self.__executor is None: self.__executor = ThreadPoolExecutor(max_workers=self.__n_workers)
+
+        return self
+
+    def close(self):
+        if not self.__executor is None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def map(self, function, iterable):
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self.__executor is None:
+            with ThreadPoolExecutor(max_workers=self.__n_workers) as executor:
+                for result in executor.map(function, iterable): yield result
+        else:
+            for result in self.__executor.map(function, iterable): yield result
+
+class __DaskLocalClusterExecutor(ExecutorFacade):
+    def __init__(self, n_workers=None):
+        self.__n_workers = get_default_n_workers() if n_workers is None else n_workers
+        self.__cluster   = None
+        self.__client    = None
+
+    def get_mode(self): return DASK_LOCAL_CLUSTER
+    def get_n_workers(self): return self.__n_workers
+
+    def open(self):
+        from dask.distributed import LocalCluster, Client
+
+        if self.__client is None:
+            self.__cluster = LocalCluster(n_workers=self.__n_workers, threads_per_worker=1, processes=True)
+            self.__client  = Client(self.__cluster)
+
+        return self
+
+    def close(self):
+        if not self.__client is None:
+            self.__client.close()
+            self.__cluster.close()
+            self.__client, self.__cluster = None, None
+
+    def map(self, function, iterable):
+        from dask.distributed import LocalCluster, Client
+
+        if self.__client is None:
+            with LocalCluster(n_workers=self.__n_workers, threads_per_worker=1, processes=True) as cluster, Client(cluster) as client:
+                for future in client.map(function, list(iterable), pure=False): yield future.result()
+        else:
+            for future in self.__client.map(function, list(iterable), pure=False): yield future.result()
+
+class __MPIExecutor(ExecutorFacade):
+    def __init__(self, n_workers=None):
+        self.__n_workers = n_workers # None: the MPI universe size
+        self.__executor  = None
+
+    def get_mode(self): return MPI
+    def get_n_workers(self): return self.__n_workers
+
+    def open(self):
+        from mpi4py.futures import MPIPoolExecutor
+
+        if self.__executor is None: self.__executor = MPIPoolExecutor(max_workers=self.__n_workers)
+
+        return self
+
+    def close(self):
+        if not self.__executor is None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def map(self, function, iterable):
+        from mpi4py.futures import MPIPoolExecutor
+
+        if self.__executor is None:
+            with MPIPoolExecutor(max_workers=self.__n_workers) as executor:
+                for result in executor.map(function, iterable): yield result
+        else:
+            for result in self.__executor.map(function, iterable): yield result
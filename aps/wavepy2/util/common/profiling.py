@@ -0,0 +1,211 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+import io
+import sys
+import time
+import atexit
+import inspect
+import tracemalloc
+import cProfile
+import pstats
+from functools import wraps
+
+from aps.wavepy2.util.common import common_tools
+
+NO_PROFILING = 0
+TIMERS       = 1
+CPROFILE     = 2
+PYINSTRUMENT = 3
+MEMORY       = 4
+
+PROFILING_MODES = {NO_PROFILING : "None",
+                   TIMERS       : "Timers (wall, CPU)",
+                   CPROFILE     : "Timers + cProfile",
+                   PYINSTRUMENT : "Timers + pyinstrument (requires pyinstrument)",
+                   MEMORY       : "Timers + peak memory (tracemalloc, slows down the allocations)"}
+
+PROFILING_ENVIRONMENT_VARIABLE = "WAVEPY_PROFILE"
+PROFILE_REPORT_SUFFIX          = "_profile"
+
+def get_profiling_mode_from_environment():
+    try:    return int(os.getenv(PROFILING_ENVIRONMENT_VARIABLE, str(NO_PROFILING)))
+    except: return NO_PROFILING
+
+class StageProfiler():
+    """
+    Opt-in instrumentation of the stages of a process manager: every public method of the manager is wrapped with
+    wall and CPU timers and, depending on the mode, with a cProfile or pyinstrument capture (outermost stages only,
+    the profilers cannot be nested) or with the tracemalloc peak memory. Memory tracing has its own mode, since it
+    slows down the allocations and so inflates the times: it is started by the outermost stage and stopped at its end.
+    """
+    def __init__(self, mode=TIMERS, n_top_functions=25):
+        self.__mode            = mode
+        self.__n_top_functions = n_top_functions
+        self.__records         = []
+        self.__captures        = {}
+        self.__depth           = 0
+        self.__peaks           = []
+        self.__stop_tracing    = False
+
+        if self.__mode == PYINSTRUMENT:
+            try:
+                import pyinstrument
+            except ImportError:
+                print("pyinstrument not installed: profiling with cProfile")
+                self.__mode = CPROFILE
+
+    def get_mode(self): return self.__mode
+
+    def wrap(self, manager):
+        for name, method in inspect.getmembers(manager, predicate=inspect.ismethod):
+            if not name.startswith("_"): setattr(manager, name, self.__wrap_stage(method, type(manager).__name__.strip("_") + "." + name))
+
+        return manager
+
+    def __wrap_stage(self, method, stage_name):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            trace_memory = self.__mode == MEMORY
+
+            if trace_memory:
+                if self.__depth == 0 and not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self.__stop_tracing = True
+
+                # the peak of the calling stage is saved before resetting it for this one
+                if len(self.__peaks) > 0: self.__peaks[-1] = max(self.__peaks[-1], tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+                self.__peaks.append(0)
+
+            capture = self.__start_capture() if self.__depth == 0 else None
+
+            self.__depth += 1
+            wall_zero, cpu_zero = time.perf_counter(), time.process_time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                wall_time, cpu_time = time.perf_counter() - wall_zero, time.process_time() - cpu_zero
+                self.__depth -= 1
+
+                if not capture is None: self.__stop_capture(capture, stage_name)
+
+                if trace_memory:
+                    peak_memory = max(self.__peaks.pop(), tracemalloc.get_traced_memory()[1])
+                    if len(self.__peaks) > 0: self.__peaks[-1] = max(self.__peaks[-1], peak_memory)
+
+                    if self.__depth == 0 and self.__stop_tracing:
+                        tracemalloc.stop()
+                        self.__stop_tracing = False
+                else:
+                    peak_memory = None
+
+                self.__records.append((stage_name, self.__depth, wall_time, cpu_time, peak_memory))
+
+        return wrapper
+
+    def __start_capture(self):
+        if self.__mode == CPROFILE:
+            capture = cProfile.Profile()
+            capture.enable()
+        elif self.__mode == PYINSTRUMENT:
+            from pyinstrument import Profiler
+            capture = Profiler()
+            capture.start()
+        else:
+            capture = None
+
+        return capture
+
+    def __stop_capture(self, capture, stage_name):
+        if self.__mode == CPROFILE:
+            capture.disable()
+
+            stream = io.StringIO()
+            pstats.Stats(capture, stream=stream).sort_stats("cumulative").print_stats(self.__n_top_functions)
+            self.__captures.setdefault(stage_name, []).append(stream.getvalue())
+        elif self.__mode == PYINSTRUMENT:
+            capture.stop()
+            self.__captures.setdefault(stage_name, []).append(capture.output_text())
+
+    def get_report(self):
+        report = "Stage profile - mode: " + PROFILING_MODES[self.__mode] + "\n\n"
+        report += "{:<70s} {:>10s} {:>10s} {:>8s} {:>14s}\n".format("Stage (in order of completion)", "Wall [s]", "CPU [s]", "CPU/Wall", "Peak Mem [MB]")
+
+        for stage_name, depth, wall_time, cpu_time, peak_memory in self.__records:
+            report += "{:<70s} {:>10.3f} {:>10.3f} {:>8.2f} {:>14s}\n".format("  "*depth + stage_name, wall_time, cpu_time,
+                                                                                  cpu_time/wall_time if wall_time > 0 else 0.0,
+                                                                                  "-" if peak_memory is None else "{:.1f}".format(peak_memory/1024**2))
+
+        for stage_name, captures in self.__captures.items():
+            for capture in captures: report += "\n" + "="*80 + "\n" + stage_name + "\n" + "="*80 + "\n" + capture
+
+        return report
+
+    def write_report(self, file_name):
+        with open(file_name, "w") as file: file.write(self.get_report())
+
+        return file_name
+
+def profile_manager(manager, mode=None, report_file_prefix=None):
+    """
+    Wraps the stages of the manager with a StageProfiler, if mode (default: from the environment variable
+    WAVEPY_PROFILE) is not NO_PROFILING. The report is written at exit in <prefix>_profile_XX.txt, where the prefix is
+    given by report_file_prefix (a callable, evaluated at exit, when the output folder is known).
+    """
+    if mode is None: mode = get_profiling_mode_from_environment()
+    if mode == NO_PROFILING: return manager
+
+    stage_profiler = StageProfiler(mode)
+
+    def write_report():
+        prefix = None if report_file_prefix is None else report_file_prefix()
+
+        print("Stage profile saved in: " + stage_profiler.write_report(common_tools.get_unique_filename(("wavepy" if prefix is None else str(prefix)) + PROFILE_REPORT_SUFFIX, "txt")), file=sys.stderr)
+
+    # scripts often terminate with sys.exit, from the Qt application
+    atexit.register(write_report)
+
+    return stage_profiler.wrap(manager)
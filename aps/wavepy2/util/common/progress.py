@@ -0,0 +1,173 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import time
+import json
+
+STAGES = ["read", "dark_crop", "fft", "peak_search"]
+
+def add_timing(timings, stage, tzero):
+    """
+    Accumulates the time elapsed from tzero in timings[stage], if timings is not None.
+    Returns the current time, to be used as tzero of the following stage.
+    """
+    now = time.perf_counter()
+
+    if not timings is None: timings[stage] = timings.get(stage, 0.0) + now - tzero
+
+    return now
+
+class ProgressBarFacade:
+    def set_progress(self, done, total, text): raise NotImplementedError()
+    def close(self): raise NotImplementedError()
+
+class ProgressMonitor:
+    """
+    Progress, throughput and ETA of a long calculation made of many tasks (e.g. the frames of a scan), with the
+    split of the time spent by the workers in the stages of the calculation and the worker utilization, to see
+    whether the calculation is I/O- or CPU-bound. Throughput and ETA count the calculated tasks only, not the
+    reused ones.
+
+    The metrics are printed on the logger every log_interval seconds, shown on the progress bar (if any) at every
+    update, and appended to a JSON lines file (if any), one line for each update and a final summary.
+    """
+    def __init__(self, n_total, n_workers=1, label="frames", logger=None, progress_bar=None, jsonl_file_name=None, log_interval=5.0):
+        self.__n_total         = n_total
+        self.__n_workers       = max(1, n_workers or 1)
+        self.__label           = label
+        self.__logger          = logger
+        self.__progress_bar    = progress_bar
+        self.__jsonl_file_name = jsonl_file_name
+        self.__log_interval    = log_interval
+
+        self.__n_done          = 0
+        self.__n_reused        = 0
+        self.__n_failed        = 0
+        self.__busy_time       = 0.0
+        self.__stage_times     = {}
+        self.__workers         = set()
+        self.__tzero           = time.time()
+        self.__last_log        = self.__tzero
+
+    def add_tasks(self, n_tasks):
+        """
+        To be called when new tasks are added to the calculation (e.g. the frames of a live scan, as they arrive).
+        """
+        self.__n_total += n_tasks
+
+    def update(self, timings=None, worker=None, failed=False):
+        """
+        To be called when a task is completed: timings are the times spent in each stage by the task, worker the
+        id of the worker that calculated it. A task without timings is considered reused (e.g. from a cache).
+        """
+        self.__n_done += 1
+
+        if failed: self.__n_failed += 1
+
+        if timings is None: self.__n_reused += 1
+        else:
+            for stage, stage_time in timings.items():
+                self.__stage_times[stage] = self.__stage_times.get(stage, 0.0) + stage_time
+                self.__busy_time         += stage_time
+
+        if not worker is None: self.__workers.add(worker)
+
+        metrics = self.get_metrics()
+
+        if not self.__progress_bar is None:
+            self.__progress_bar.set_progress(self.__n_done, self.__n_total, self.__get_progress_text(metrics))
+
+        self.__write_jsonl("progress", metrics)
+
+        if not self.__logger is None and (time.time() - self.__last_log >= self.__log_interval):
+            self.__logger.print_message(self.__get_progress_text(metrics))
+            self.__last_log = time.time()
+
+    def get_metrics(self):
+        elapsed        = time.time() - self.__tzero
+        n_calculated   = self.__n_done - self.__n_reused
+        # the reused tasks are done at once: they would overstate the throughput and shorten the ETA
+        frames_per_sec = n_calculated / elapsed if elapsed > 0 else 0.0
+        total_stages   = sum(self.__stage_times.values())
+
+        return {"done"           : self.__n_done,
+                "total"          : self.__n_total,
+                "reused"         : self.__n_reused,
+                "failed"         : self.__n_failed,
+                "elapsed"        : elapsed,
+                "frames_per_sec" : frames_per_sec,
+                "eta"            : (self.__n_total - self.__n_done) / frames_per_sec if frames_per_sec > 0 else None,
+                "stage_times"    : {stage : stage_time / n_calculated for stage, stage_time in self.__stage_times.items()} if n_calculated > 0 else {},
+                "stage_fraction" : {stage : stage_time / total_stages for stage, stage_time in self.__stage_times.items()} if total_stages > 0 else {},
+                "n_workers"      : self.__n_workers,
+                "active_workers" : len(self.__workers),
+                "utilization"    : min(1.0, self.__busy_time / (self.__n_workers * elapsed)) if elapsed > 0 else 0.0}
+
+    def close(self):
+        metrics = self.get_metrics()
+
+        self.__write_jsonl("summary", metrics)
+
+        if not self.__logger is None:
+            self.__logger.print_message(self.__get_progress_text(metrics))
+            if len(metrics["stage_fraction"]) > 0:
+                self.__logger.print_message("Time split: " + ", ".join([stage + " {:.1f}% ({:.1f} ms)".format(metrics["stage_fraction"][stage]*100, metrics["stage_times"][stage]*1e3)
+                                                                        for stage in self.__get_stages(metrics)]) +
+                                            ", worker utilization {:.0f}%".format(metrics["utilization"]*100))
+
+        if not self.__progress_bar is None: self.__progress_bar.close()
+
+    def __get_progress_text(self, metrics):
+        return "{:d}/{:d} {:s}, {:.2f} {:s}/s, ETA: {:s}".format(metrics["done"], metrics["total"], self.__label,
+                                                                 metrics["frames_per_sec"], self.__label,
+                                                                 "-" if metrics["eta"] is None else "{:.0f} s".format(metrics["eta"]))
+
+    @classmethod
+    def __get_stages(cls, metrics):
+        return [stage for stage in STAGES if stage in metrics["stage_fraction"]] + \
+               [stage for stage in metrics["stage_fraction"] if not stage in STAGES]
+
+    def __write_jsonl(self, event, metrics):
+        if not self.__jsonl_file_name is None:
+            with open(self.__jsonl_file_name, "a") as file: file.write(json.dumps(dict(event=event, time=time.time(), **metrics)) + "\n")
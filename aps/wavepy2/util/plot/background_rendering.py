@@ -0,0 +1,148 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+RENDERING_WORKERS_ENVIRONMENT_VARIABLE = "WAVEPY_RENDERING_WORKERS"
+
+def get_rendering_workers_from_environment():
+    try:    return max(0, int(os.getenv(RENDERING_WORKERS_ENVIRONMENT_VARIABLE, "0")))
+    except: return 0
+
+class BackgroundRenderer():
+    """
+    Pool of worker processes building the plot widgets and saving their figures (Agg backend, offscreen Qt), while
+    the main process goes on with the calculation. A plot is specified by its widget class and plot data: the
+    widget must not return data to the caller, nor push other plots. The pool is started with the first plot.
+    """
+    def __init__(self, application_name=None, n_workers=1):
+        self.__application_name = application_name
+        self.__n_workers        = n_workers
+        self.__executor         = None
+        self.__futures          = []
+
+    def get_n_workers(self): return self.__n_workers
+
+    def submit(self, widget_class, save_file_prefix=None, **kwargs):
+        """
+        Returns False if the plot specification can't be sent to the workers (the plot is to be built in the main process).
+        """
+        try:    plot_specification = pickle.dumps((widget_class, save_file_prefix, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        except: return False
+
+        if self.__executor is None:
+            # spawned, not forked: the workers do not inherit the Qt application of the main process
+            self.__executor = ProcessPoolExecutor(max_workers=self.__n_workers, mp_context=get_context("spawn"),
+                                                  initializer=_initialize_worker, initargs=(self.__application_name,))
+
+        try:    self.__futures.append(self.__executor.submit(_render_plot, plot_specification))
+        except: return False # broken pool: a worker died
+
+        return True
+
+    def flush(self):
+        """
+        Waits for all the submitted plots to be saved, returns the errors of the failed ones.
+        """
+        errors = []
+
+        futures, self.__futures = self.__futures, []
+
+        for future in futures:
+            try:    future.result()
+            except Exception as e: errors.append(type(e).__name__ + ": " + str(e))
+
+        return errors
+
+    def close(self):
+        errors = self.flush()
+
+        if not self.__executor is None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+        return errors
+
+####################################
+# PRIVATE METHODS
+
+_qt_application   = None
+_application_name = None
+
+def _initialize_worker(application_name):
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    os.environ["MPLBACKEND"]      = "Agg"
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    import sys
+    from PyQt5.QtWidgets import QApplication
+    from aps.common.logger import register_logger_single_instance, LoggerMode
+    from aps.wavepy2.util.plot.plotter import register_plotter_instance, PlotterMode
+
+    global _qt_application, _application_name
+    _qt_application   = QApplication(sys.argv[:1]) # the widgets are QWidgets, never shown
+    _application_name = application_name
+
+    # the messages of the widgets go nowhere, the errors are returned to the main process
+    register_logger_single_instance(logger_mode=LoggerMode.NONE, application_name=application_name)
+    register_plotter_instance(plotter_mode=PlotterMode.NONE, application_name=application_name)
+
+def _render_plot(plot_specification):
+    from aps.wavepy2.util.plot.plotter import get_registered_plotter_instance
+
+    widget_class, save_file_prefix, kwargs = pickle.loads(plot_specification)
+
+    if not save_file_prefix is None: get_registered_plotter_instance(application_name=_application_name).register_save_file_prefix(save_file_prefix)
+
+    plot_widget_instance = widget_class(parent=None, application_name=_application_name, **kwargs)
+    plot_widget_instance.build_widget(**kwargs)
+
+    figures_to_save = plot_widget_instance.get_figures_to_save()
+    if not figures_to_save is None:
+        for figure_to_save in figures_to_save: figure_to_save.save_figure(**kwargs)
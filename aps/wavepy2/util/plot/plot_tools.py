@@ -47,120 +47,13 @@ import numpy as np
 ##########################################################################
 # UTILITY FROM WAVEPY
 
-from aps.common.logger import get_registered_logger_instance
 from aps.common.widgets.context_widget import PlottingProperties as PlottingProperties, WIDGET_FIXED_WIDTH # to ensure
-from aps.wavepy2.util.common import common_tools
-
-
-def save_sdf_file(array, pixelsize=[1, 1], fname='output.sdf', extraHeader={}, application_name=None):
-    logger = get_registered_logger_instance(application_name=application_name)
-
-    if len(array.shape) != 2:
-        logger.print_error('Function save_sdf: array must be 2-dimensional')
-        raise ValueError('Function save_sdf: array must be 2-dimensional')
-
-    header = 'aBCR-0.0\n' + \
-             'ManufacID\t=\tWavePy2\n' + \
-             'CreateDate\t=\t' + \
-             common_tools.datetime_now_str()[:-2].replace('_', '') + '\n' + \
-             'ModDate\t=\t' + \
-             common_tools.datetime_now_str()[:-2].replace('_', '') + '\n' + \
-             'NumPoints\t=\t' + str(array.shape[1]) + '\n' + \
-             'NumProfiles\t=\t' + str(array.shape[0]) + '\n' + \
-             'Xscale\t=\t' + str(pixelsize[1]) + '\n' + \
-             'Yscale\t=\t' + str(pixelsize[0]) + '\n' + \
-             'Zscale\t=\t1\n' + \
-             'Zresolution\t=\t0\n' + \
-             'Compression\t=\t0\n' + \
-             'DataType\t=\t7 \n' + \
-             'CheckType\t=\t0\n' + \
-             'NumDataSet\t=\t1\n' + \
-             'NanPresent\t=\t0\n'
-
-    for key in extraHeader.keys():
-        header += key + '\t=\t' + extraHeader[key] + '\n'
-    header += '*'
-
-    if array.dtype == 'float64': fmt = '%1.8g'
-    elif array.dtype == 'int64': fmt = '%d'
-    else: fmt = '%f'
-
-    np.savetxt(fname, array.flatten(), fmt=fmt, header=header, comments='')
-    logger.print_message(fname + ' saved!')
-
-
-def save_csv_file(arrayList, fname='output.csv', headerList=[], comments='', application_name=None):
-    logger = get_registered_logger_instance(application_name=application_name)
-
-    header = ''
-    if headerList != []:
-        for item in headerList:
-            header += item + ', '
-
-        header = header[:-2]  # remove last comma
-
-    if comments != '': header = comments + '\n' + header
-
-    if isinstance(arrayList, list):
-        data2save = np.c_[arrayList[0], arrayList[1]]
-        for array in arrayList[2:]: data2save = np.c_[data2save, array]
-    elif isinstance(arrayList, np.ndarray): data2save = arrayList
-    else: raise TypeError
-
-    if data2save.dtype == 'float64': fmt = '%1.8g'
-    elif data2save.dtype == 'int64': fmt = '%d'
-    else: fmt = '%f'
-
-    np.savetxt(fname, data2save, fmt=fmt, header=header, delimiter=', ')
-    logger.print_message(fname + ' saved!')
-
-
-def load_sdf_file(fname, printHeader=False):
-    with open(fname) as input_file:
-        nline = 0
-        header = ''
-        if printHeader: print('########## HEADER from ' + fname)
-
-        for line in input_file:
-            nline += 1
-            if printHeader: print(line, end='')
-            if 'NumPoints' in line: xpoints = int(line.split('=')[-1])
-            if 'NumProfiles' in line: ypoints = int(line.split('=')[-1])
-            if 'Xscale' in line: xscale = float(line.split('=')[-1])
-            if 'Yscale' in line: yscale = float(line.split('=')[-1])
-            if 'Zscale' in line: zscale = float(line.split('=')[-1])
-            if '*' in line: break
-            else: header += line
-
-    if printHeader: print('########## END HEADER from ' + fname)
-
-    data = np.loadtxt(fname, skiprows=nline)
-    data = data.reshape(ypoints, xpoints)*zscale
-    headerdic = {}
-    header = header.replace('\t', '')
-    for item in header.split('\n'):
-        items = item.split('=')
-        if len(items) > 1: headerdic[items[0]] = items[1]
-
-    return data, [yscale, xscale], headerdic
-
-def load_csv_file(fname):
-    with open(fname) as input_file:
-        comments = []
-        for line in input_file:
-            if '#' in line:
-                comments.append(line[2:-1])
-                header = line[2:-1]  # remove # and \n
-            else: break
-
-    data = np.loadtxt(fname, delimiter=',')
-
-    headerlist = []
-    for item in header.split(', '): headerlist.append(item)
-
-    return data, headerlist, comments
+from aps.wavepy2.core.io import save_sdf_file, save_csv_file, load_sdf_file, load_csv_file # moved to the compute core
 
 import pickle
+
+from aps.wavepy2.util.common.common_tools import DISPLAY_SIZE, downsample_image # moved to the Qt-free tools, used by the analysis
+
 # %%
 def load_pickle_surf(fname):
 
@@ -204,9 +97,9 @@ def line_style_cycle(ls=['-', '--'], ms=['s', 'o', '^', 'd'], ncurves=2, cmap_st
 
     return ls_cycle, lc_cycle
 
-from scipy.interpolate import UnivariateSpline
-
 def fwhm_xy(xvalues, yvalues):
+    from scipy.interpolate import UnivariateSpline # lazy: scipy.interpolate is slow to import
+
     spline = UnivariateSpline(xvalues, yvalues-np.min(yvalues)/2-np.max(yvalues)/2, s=0)
 
     xvalues = spline.roots().tolist()
@@ -42,11 +42,22 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
 # POSSIBILITY OF SUCH DAMAGE.                                             #
 # #########################################################################
+import os
+
 from aps.common.widgets.generic_widget import GenericWidget, GenericInteractiveWidget, FigureToSave, pixels_to_inches
 from aps.common.plotter import FullPlotter, DisplayOnlyPlotter, SaveOnlyPlotter, NullPlotter, PlotterRegistry, PlotterMode, PlotterFacade
 
+from PyQt5.QtWidgets import QHBoxLayout
+
 from aps.wavepy2.util.common import common_tools
 from aps.wavepy2.util.plot import plot_tools
+from aps.wavepy2.util.plot.background_rendering import BackgroundRenderer
+
+DEFERRED_PLOTS_ENVIRONMENT_VARIABLE = "WAVEPY_DEFERRED_PLOTS"
+
+def get_deferred_plots_from_environment():
+    try:    return int(os.getenv(DEFERRED_PLOTS_ENVIRONMENT_VARIABLE, "0")) == 1
+    except: return False
 
 class WavePyWidget(GenericWidget):
     def __init__(self, parent=None, application_name=None, **kwargs):
@@ -56,6 +67,80 @@ class WavePyWidget(GenericWidget):
         return figure_file_name if not common_tools.is_empty_string(figure_file_name) else \
                common_tools.get_unique_filename(get_registered_plotter_instance(application_name=self._application_name).get_save_file_prefix(), "png")
 
+    # -----------------------------------------------------
+    # Deferred plots: a widget class that knows its tab name before being built can be built on first display
+
+    @classmethod
+    def get_deferred_tab_name(cls, **kwargs): return None # None: the widget is always built immediately
+
+    @classmethod
+    def get_deferred_size(cls, **kwargs): return int(plot_tools.WIDGET_FIXED_WIDTH*1.4), 700
+
+    @classmethod
+    def get_display_data(cls, display_size, **kwargs): return kwargs # the plot data, reduced to the display size
+
+    # -----------------------------------------------------
+    # Background rendering: in save only mode, a widget class that only saves figures can be built by worker processes
+
+    @classmethod
+    def get_background_render_data(cls, **kwargs): return None # None: the widget is always built in the main process
+
+    @classmethod
+    def _get_figure_widget_size(cls, figsize, **kwargs):
+        # as in GenericWidget.build_widget
+        figure_width  = kwargs.get("figure_width",  figsize[0]/pixels_to_inches)
+        figure_height = kwargs.get("figure_height", figsize[1]/pixels_to_inches)
+
+        return int(kwargs.get("widget_width", figure_width*1.1)), int(kwargs.get("widget_height", figure_height*1.1))
+
+class DeferredPlotWidget(WavePyWidget):
+    """
+    Placeholder of a plot in a context: it holds only the plot specification (widget class and plot data reduced to
+    the display size) and builds the plot widget on first display, or when its figures are saved.
+    """
+    def __init__(self, widget_class, parent=None, application_name=None, **kwargs):
+        super(DeferredPlotWidget, self).__init__(parent=parent, application_name=application_name)
+
+        self.__widget_class = widget_class
+        self.__kwargs       = kwargs
+        self.__tab_name     = widget_class.get_deferred_tab_name(**kwargs)
+        self.__widget       = None
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        width, height = widget_class.get_deferred_size(**kwargs)
+        self.setFixedWidth(width)
+        self.setFixedHeight(height)
+
+    def get_plot_tab_name(self): return self.__tab_name
+
+    def is_built(self): return not self.__widget is None
+
+    def get_widget(self):
+        if self.__widget is None:
+            self.__widget = self.__widget_class(parent=None, application_name=self._application_name, **self.__kwargs)
+            self.__widget.build_widget(**self.__kwargs)
+            self.__widget.set_main_window(self.get_main_window())
+            self.__kwargs = None # the plot data are released
+
+            self.layout().addWidget(self.__widget)
+            self.setFixedWidth(self.__widget.width())
+            self.setFixedHeight(self.__widget.height())
+
+        return self.__widget
+
+    def set_main_window(self, main_window):
+        super(DeferredPlotWidget, self).set_main_window(main_window)
+        if not self.__widget is None: self.__widget.set_main_window(main_window)
+
+    def get_figures_to_save(self): return self.get_widget().get_figures_to_save()
+
+    def showEvent(self, event):
+        self.get_widget()
+        super(DeferredPlotWidget, self).showEvent(event)
+
 class WavePyInteractiveWidget(GenericInteractiveWidget):
     def __init__(self, parent, message, title, application_name=None, **kwargs):
         super(WavePyInteractiveWidget, self).__init__(parent, message, title, application_name, **kwargs)
@@ -63,6 +148,9 @@ class WavePyInteractiveWidget(GenericInteractiveWidget):
 class WavePyPlotterFacade:
     def save_sdf_file(self, array, pixelsize, file_prefix, file_suffix, extraHeader): raise NotImplementedError()
     def save_csv_file(self, array_list, file_prefix, file_suffix, headerList, comments): raise NotImplementedError()
+    def set_deferred_plots(self, deferred_plots=True, display_size=plot_tools.DISPLAY_SIZE): raise NotImplementedError()
+    def is_deferring_plots(self): raise NotImplementedError()
+    def flush_plots(self): raise NotImplementedError()
 
 class PlotterMode:
     FULL         = 0
@@ -78,6 +166,9 @@ class PlotterMode:
         if plotter_mode==cls.NONE: return "None" 
 
 class WavePyPlotter(WavePyPlotterFacade):
+    def __init__(self, deferred_plots=False, display_size=plot_tools.DISPLAY_SIZE):
+        self.set_deferred_plots(deferred_plots, display_size)
+
     def _get_file_name(self, file_prefix=None, file_suffix="", extension=""):
         return common_tools.get_unique_filename(str(self.get_save_file_prefix() if file_prefix is None else file_prefix) + file_suffix, extension)
 
@@ -93,32 +184,105 @@ class WavePyPlotter(WavePyPlotterFacade):
 
         return file_name
 
-class __FullPlotter(FullPlotter, WavePyPlotter):
-    def __init__(self, application_name=None): FullPlotter.__init__(self, application_name=application_name)
+    def set_deferred_plots(self, deferred_plots=True, display_size=plot_tools.DISPLAY_SIZE):
+        self.__deferred_plots = deferred_plots
+        self.__display_size   = display_size
+
+    def is_deferring_plots(self): return self.__deferred_plots
+
+    def flush_plots(self): pass # all the plots are built when pushed
+
+    def push_plot_on_context(self, context_key, widget_class, unique_id=None, **kwargs):
+        # widgets returning data (output_data) are always built immediately
+        if self.__deferred_plots and issubclass(widget_class, WavePyWidget) and not "output_data" in kwargs and \
+                not widget_class.get_deferred_tab_name(**kwargs) is None:
+            return self._push_deferred_plot(context_key, widget_class, unique_id, **kwargs)
+        else:
+            return super(WavePyPlotter, self).push_plot_on_context(context_key, widget_class, unique_id, **kwargs)
+
+    def _push_deferred_plot(self, context_key, widget_class, unique_id=None, **kwargs): raise NotImplementedError()
+
+    def _build_deferred_plot(self, widget_class, **kwargs):
+        return DeferredPlotWidget(widget_class, application_name=self._application_name, **widget_class.get_display_data(self.__display_size, **kwargs))
+
+class __FullPlotter(WavePyPlotter, FullPlotter):
+    def __init__(self, application_name=None, **kwargs):
+        FullPlotter.__init__(self, application_name=application_name)
+        WavePyPlotter.__init__(self, **kwargs)
 
-class __DisplayOnlyPlotter(DisplayOnlyPlotter, WavePyPlotter):
-    def __init__(self, application_name=None): DisplayOnlyPlotter.__init__(self, application_name=application_name)
+    # figures are saved right away: the deferred plot is built now, from the reduced data
+    def _push_deferred_plot(self, context_key, widget_class, unique_id=None, **kwargs):
+        plot_widget_instance = self._build_deferred_plot(widget_class, **kwargs)
+        self._register_plot(context_key, plot_widget_instance, unique_id)
+        self._save_images(plot_widget_instance, **kwargs)
+        return plot_widget_instance
+
+class __DisplayOnlyPlotter(WavePyPlotter, DisplayOnlyPlotter):
+    def __init__(self, application_name=None, **kwargs):
+        DisplayOnlyPlotter.__init__(self, application_name=application_name)
+        WavePyPlotter.__init__(self, **kwargs)
     def save_sdf_file(self, array, pixelsize=[1, 1], file_prefix=None, file_suffix="", extraHeader={}): return self._get_file_name(file_prefix, file_suffix, "sdf")
     def save_csv_file(self, array_list, file_prefix=None, file_suffix="", headerList=[], comments=""): return self._get_file_name(file_prefix, file_suffix, "csv")
 
-class __SaveOnlyPlotter(SaveOnlyPlotter, WavePyPlotter):
-    def __init__(self, application_name=None): SaveOnlyPlotter.__init__(self, application_name=application_name)
+    # the deferred plot is built on first display
+    def _push_deferred_plot(self, context_key, widget_class, unique_id=None, **kwargs):
+        plot_widget_instance = self._build_deferred_plot(widget_class, **kwargs)
+        self._register_plot(context_key, plot_widget_instance, unique_id)
+        return plot_widget_instance
+
+class __SaveOnlyPlotter(WavePyPlotter, SaveOnlyPlotter):
+    def __init__(self, application_name=None, rendering_workers=0, **kwargs):
+        SaveOnlyPlotter.__init__(self, application_name=application_name)
+        WavePyPlotter.__init__(self, **kwargs)
+
+        self.__background_renderer = BackgroundRenderer(application_name, rendering_workers) if rendering_workers > 0 else None
+
+    # the figures are rendered and saved by the workers while the calculation goes on, until flush_plots
+    def push_plot_on_context(self, context_key, widget_class, unique_id=None, **kwargs):
+        if not self.__background_renderer is None and issubclass(widget_class, WavePyWidget) and not "output_data" in kwargs:
+            render_data = widget_class.get_background_render_data(**kwargs)
+
+            if not render_data is None:
+                if self.__background_renderer.submit(widget_class, self.get_save_file_prefix(), **render_data): return None
+                else: kwargs = render_data # not sent to the workers: built here, with the same data (e.g. the file names already taken)
+
+        return WavePyPlotter.push_plot_on_context(self, context_key, widget_class, unique_id, **kwargs)
 
-class __NullPlotter(NullPlotter, WavePyPlotter):
-    def __init__(self, application_name=None): NullPlotter.__init__(self, application_name=application_name)
+    def flush_plots(self):
+        if not self.__background_renderer is None:
+            errors = self.__background_renderer.flush()
+
+            if len(errors) > 0: raise ValueError("Plots not saved by the rendering workers:\n" + "\n".join(errors))
+
+    def _push_deferred_plot(self, context_key, widget_class, unique_id=None, **kwargs):
+        plot_widget_instance = self._build_deferred_plot(widget_class, **kwargs)
+        self._save_images(plot_widget_instance, **kwargs)
+        return plot_widget_instance
+
+class __NullPlotter(WavePyPlotter, NullPlotter):
+    def __init__(self, application_name=None, **kwargs):
+        NullPlotter.__init__(self, application_name=application_name)
+        WavePyPlotter.__init__(self, **kwargs)
     def save_sdf_file(self, array, pixelsize=[1, 1], file_prefix=None, file_suffix="", extraHeader={}): return self._get_file_name(file_prefix, file_suffix, "sdf")
     def save_csv_file(self, array_list, file_prefix=None, file_suffix="", headerList=[], comments=""): return self._get_file_name(file_prefix, file_suffix, "csv")
 
+    # never displayed nor saved: only the widgets returning data (output_data) are built
+    def push_plot_on_context(self, context_key, widget_class, unique_id=None, **kwargs):
+        if "output_data" in kwargs: return WavePyPlotter.push_plot_on_context(self, context_key, widget_class, unique_id, **kwargs)
+        else:                       return None
+
 # -----------------------------------------------------
 # Factory Methods
 
-def register_plotter_instance(plotter_mode=PlotterMode.FULL, reset=False, application_name=None, replace=False):
+def register_plotter_instance(plotter_mode=PlotterMode.FULL, reset=False, application_name=None, replace=False, deferred_plots=False, display_size=plot_tools.DISPLAY_SIZE, rendering_workers=0):
     if reset: PlotterRegistry.Instance().reset()
 
-    if plotter_mode   == PlotterMode.FULL:         PlotterRegistry.Instance().register_plotter(__FullPlotter(application_name), application_name, replace)
-    elif plotter_mode == PlotterMode.DISPLAY_ONLY: PlotterRegistry.Instance().register_plotter(__DisplayOnlyPlotter(application_name), application_name, replace)
-    elif plotter_mode == PlotterMode.SAVE_ONLY:    PlotterRegistry.Instance().register_plotter(__SaveOnlyPlotter(application_name), application_name, replace)
-    elif plotter_mode == PlotterMode.NONE:         PlotterRegistry.Instance().register_plotter(__NullPlotter(application_name), application_name, replace)
+    kwargs = {"deferred_plots" : deferred_plots, "display_size" : display_size}
+
+    if plotter_mode   == PlotterMode.FULL:         PlotterRegistry.Instance().register_plotter(__FullPlotter(application_name, **kwargs), application_name, replace)
+    elif plotter_mode == PlotterMode.DISPLAY_ONLY: PlotterRegistry.Instance().register_plotter(__DisplayOnlyPlotter(application_name, **kwargs), application_name, replace)
+    elif plotter_mode == PlotterMode.SAVE_ONLY:    PlotterRegistry.Instance().register_plotter(__SaveOnlyPlotter(application_name, rendering_workers=rendering_workers, **kwargs), application_name, replace)
+    elif plotter_mode == PlotterMode.NONE:         PlotterRegistry.Instance().register_plotter(__NullPlotter(application_name, **kwargs), application_name, replace)
 
 def get_registered_plotter_instance(application_name=None):
     return PlotterRegistry.Instance().get_plotter_instance(application_name)
@@ -0,0 +1,90 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import numpy as np
+
+from aps.wavepy2.core import synthetic_data
+from aps.wavepy2.core.harmonic_analysis import visib_1st_harmonics_stack
+from aps.wavepy2.core import coherence_fit
+
+WAVELENGTH      = 1e-10
+PATTERN_PERIOD  = 4.8e-6
+SOURCE_SIGMA    = 30e-6
+SOURCE_DISTANCE = 30.0
+PERIOD          = 8 # pixels
+
+class ZScanCoherence:
+    """
+    z-scan with known coherence: the visibility of the frames follows the model of the source size SOURCE_SIGMA.
+    """
+    params      = [[256, 512, 1024], [40]]
+    param_names = ["size", "n_frames"]
+    timeout     = 300
+
+    def setup(self, n, n_frames):
+        self.zvec         = np.linspace(0.05, 1.0, n_frames)
+        self.visibilities = coherence_fit.visibility_model(self.zvec, WAVELENGTH, 0.5, PATTERN_PERIOD, SOURCE_SIGMA, SOURCE_DISTANCE, 0.0)
+
+        self.imgs = synthetic_data.talbot_z_scan((n, n), self.zvec, PERIOD, self.visibilities, seed=0)
+        self.harmonicPeriods = [synthetic_data.get_harmonic_period((n, n), PERIOD)] * n_frames
+
+    def _fit_source_size(self):
+        visibility_V, visibility_H = visib_1st_harmonics_stack(self.imgs, self.harmonicPeriods)[:2]
+
+        _, _, source_size = coherence_fit.fit_visibility_vs_z(self.zvec, visibility_H, WAVELENGTH, PATTERN_PERIOD, SOURCE_DISTANCE, n_starts=4)
+
+        return source_size
+
+    def time_visib_1st_harmonics_stack(self, n, n_frames):
+        visib_1st_harmonics_stack(self.imgs, self.harmonicPeriods)
+
+    def peakmem_visib_1st_harmonics_stack(self, n, n_frames):
+        visib_1st_harmonics_stack(self.imgs, self.harmonicPeriods)
+
+    def time_fit_visibility_vs_z(self, n, n_frames):
+        coherence_fit.fit_visibility_vs_z(self.zvec, self.visibilities, WAVELENGTH, PATTERN_PERIOD, SOURCE_DISTANCE)
+
+    def track_source_size_error(self, n, n_frames):
+        return float(np.abs(self._fit_source_size() - SOURCE_SIGMA) / SOURCE_SIGMA)
+    track_source_size_error.unit = "relative"
@@ -0,0 +1,111 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import numpy as np
+
+from aps.wavepy2.util.common.common_tools import FourierTransform
+from aps.wavepy2.core.harmonic_analysis import single_2Dgrating_analyses, visib_1st_harmonics
+
+from .common import SIZES, get_talbot_images, block_average, relative_rms_error
+
+class FFT2D:
+    params      = SIZES
+    param_names = ["size"]
+
+    def setup(self, n):
+        self.img, _, _, _ = get_talbot_images(n)
+
+    def time_fft2d(self, n):
+        FourierTransform.fft2d(self.img)
+
+    def peakmem_fft2d(self, n):
+        FourierTransform.fft2d(self.img)
+
+class Single2DGratingAnalyses:
+    params      = SIZES
+    param_names = ["size"]
+    timeout     = 300
+
+    def setup(self, n):
+        self.img, self.img_ref, self.harmonicPeriod, self.ground_truth = get_talbot_images(n)
+
+    def time_single_2Dgrating_analyses(self, n):
+        single_2Dgrating_analyses(self.img, img_ref=self.img_ref, harmonicPeriod=self.harmonicPeriod)
+
+    def peakmem_single_2Dgrating_analyses(self, n):
+        single_2Dgrating_analyses(self.img, img_ref=self.img_ref, harmonicPeriod=self.harmonicPeriod)
+
+    def track_dpc_error(self, n):
+        result = single_2Dgrating_analyses(self.img, img_ref=self.img_ref, harmonicPeriod=self.harmonicPeriod)
+        arg01, arg10 = result[5], result[6]
+
+        return max(relative_rms_error(arg01, block_average(self.ground_truth["dpc_H"], arg01.shape)),
+                   relative_rms_error(arg10, block_average(self.ground_truth["dpc_V"], arg10.shape)))
+    track_dpc_error.unit = "relative rms"
+
+    def track_dark_field_error(self, n):
+        result = single_2Dgrating_analyses(self.img, img_ref=self.img_ref, harmonicPeriod=self.harmonicPeriod)
+
+        return max(float(np.abs(np.median(result[3]) - self.ground_truth["dark_field_H"])),
+                   float(np.abs(np.median(result[4]) - self.ground_truth["dark_field_V"])))
+    track_dark_field_error.unit = "absolute"
+
+class Visibility1stHarmonics:
+    params      = [SIZES, [True, False]]
+    param_names = ["size", "local_dft"]
+
+    def setup(self, n, local_dft):
+        _, self.img_ref, self.harmonicPeriod, _ = get_talbot_images(n)
+
+    def time_visib_1st_harmonics(self, n, local_dft):
+        visib_1st_harmonics(self.img_ref, self.harmonicPeriod, local_dft=local_dft)
+
+    def peakmem_visib_1st_harmonics(self, n, local_dft):
+        visib_1st_harmonics(self.img_ref, self.harmonicPeriod, local_dft=local_dft)
+
+    def track_visibility_error(self, n, local_dft):
+        visibility_V, visibility_H = visib_1st_harmonics(self.img_ref, self.harmonicPeriod, local_dft=local_dft)[:2]
+
+        return float(max(np.abs(visibility_V - 0.5), np.abs(visibility_H - 0.5))) # generated with visibility 0.5
+    track_visibility_error.unit = "absolute"
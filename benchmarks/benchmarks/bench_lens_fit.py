@@ -0,0 +1,95 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import numpy as np
+
+from aps.wavepy2.util.common.common_tools import lsq_fit_parabola
+from aps.wavepy2.core import synthetic_data, lens_fit
+
+from .common import SIZES
+
+PIXEL_SIZE = 0.65e-6
+RADIUS     = 50e-6
+
+class LsqFitParabola:
+    params      = SIZES
+    param_names = ["size"]
+
+    def setup(self, n):
+        # the aperture is larger than the image: all the pixels are on the parabola
+        self.thickness = synthetic_data.parabolic_lens_thickness((n, n), PIXEL_SIZE, RADIUS, aperture=2 * n * PIXEL_SIZE,
+                                                                 center=(3e-6, -2e-6), noise=1e-8, seed=0)
+
+    def time_lsq_fit_parabola(self, n):
+        lsq_fit_parabola(self.thickness, PIXEL_SIZE)
+
+    def peakmem_lsq_fit_parabola(self, n):
+        lsq_fit_parabola(self.thickness, PIXEL_SIZE)
+
+    def track_radius_error(self, n):
+        _, popt = lsq_fit_parabola(self.thickness, PIXEL_SIZE)
+
+        return float(max(np.abs(popt[0] - RADIUS), np.abs(popt[1] - RADIUS)) / RADIUS)
+    track_radius_error.unit = "relative"
+
+class FitParabolicLens2D:
+    params      = SIZES
+    param_names = ["size"]
+
+    def setup(self, n):
+        self.radius4fit = 0.4 * n * PIXEL_SIZE
+        self.thickness  = synthetic_data.parabolic_lens_thickness((n, n), PIXEL_SIZE, RADIUS, aperture=2 * self.radius4fit * 1.1,
+                                                                  center=(3e-6, -2e-6), noise=1e-8, seed=0)
+
+    def time_fit_parabolic_lens_2d(self, n):
+        lens_fit.fit_parabolic_lens_2d(self.thickness, [PIXEL_SIZE, PIXEL_SIZE], self.radius4fit)
+
+    def peakmem_fit_parabolic_lens_2d(self, n):
+        lens_fit.fit_parabolic_lens_2d(self.thickness, [PIXEL_SIZE, PIXEL_SIZE], self.radius4fit)
+
+    def track_radius_error(self, n):
+        _, _, popt = lens_fit.fit_parabolic_lens_2d(self.thickness, [PIXEL_SIZE, PIXEL_SIZE], self.radius4fit)
+
+        return float(np.abs(popt[0] - RADIUS) / RADIUS)
+    track_radius_error.unit = "relative"
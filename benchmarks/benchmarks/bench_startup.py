@@ -0,0 +1,98 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import sys
+import subprocess
+
+HEAVY_MODULES = ["PyQt5", "matplotlib", "scipy", "skimage", "xraylib", "pandas"]
+
+RUN_HELP = "import runpy, sys\n" + \
+           "sys.argv = ['wavepy2', '--h']\n" + \
+           "runpy.run_module('aps.wavepy2.tools', run_name='__main__')\n"
+
+IMPORT_CORE = "import sys\n" + \
+              "from aps.wavepy2.core import harmonic_analysis, surface_from_grad, coherence_fit, lens_fit, io, synthetic_data\n"
+
+class Startup:
+    """
+    Startup time of the command line, measured in a fresh interpreter: the help must not import any script, and
+    the target is to stay below 0.5 s (no heavy modules imported).
+    """
+    timeout = 120
+
+    def timeraw_main_help(self):
+        return RUN_HELP
+
+    def track_main_help_heavy_modules(self):
+        code = RUN_HELP + "print(len([m for m in sys.modules if m.split('.')[0] in " + repr(HEAVY_MODULES) + "]), file=sys.stderr)\n"
+
+        return int(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stderr.strip().splitlines()[-1])
+    track_main_help_heavy_modules.unit = "modules"
+
+class CoreStartup:
+    """
+    The compute core must be importable without Qt and matplotlib.
+    """
+    timeout = 120
+
+    def timeraw_import_core(self):
+        return IMPORT_CORE
+
+    def track_core_qt_modules(self):
+        code = IMPORT_CORE + "print(len([m for m in sys.modules if m.split('.')[0] in ['PyQt5', 'matplotlib']]), file=sys.stderr)\n"
+
+        return int(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stderr.strip().splitlines()[-1])
+    track_core_qt_modules.unit = "modules"
+
+class ScriptStartup:
+    """
+    Import time of a single script, as dispatched by the command line.
+    """
+    params      = ["img-sgt", "coh-sgz", "met-frl"]
+    param_names = ["script_id"]
+    timeout     = 120
+
+    def timeraw_import_script(self, script_id):
+        return "from aps.wavepy2.tools.__main__ import get_script_class\n" + \
+               "get_script_class(" + repr(script_id) + ")\n"
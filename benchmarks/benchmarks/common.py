@@ -0,0 +1,87 @@
+# #########################################################################
+# Copyright (c) 2020, UChicago Argonne, LLC. All rights reserved.         #
+#                                                                         #
+# Copyright 2020. UChicago Argonne, LLC. This software was produced       #
+# under U.S. Government contract DE-AC02-06CH11357 for Argonne National   #
+# Laboratory (ANL), which is operated by UChicago Argonne, LLC for the    #
+# U.S. Department of Energy. The U.S. Government has rights to use,       #
+# reproduce, and distribute this software.  NEITHER THE GOVERNMENT NOR    #
+# UChicago Argonne, LLC MAKES ANY WARRANTY, EXPRESS OR IMPLIED, OR        #
+# ASSUMES ANY LIABILITY FOR THE USE OF THIS SOFTWARE.  If software is     #
+# modified to produce derivative works, such modified software should     #
+# be clearly marked, so as not to confuse it with the version available   #
+# from ANL.                                                               #
+#                                                                         #
+# Additionally, redistribution and use in source and binary forms, with   #
+# or without modification, are permitted provided that the following      #
+# conditions are met:                                                     #
+#                                                                         #
+#     * Redistributions of source code must retain the above copyright    #
+#       notice, this list of conditions and the following disclaimer.     #
+#                                                                         #
+#     * Redistributions in binary form must reproduce the above copyright #
+#       notice, this list of conditions and the following disclaimer in   #
+#       the documentation and/or other materials provided with the        #
+#       distribution.                                                     #
+#                                                                         #
+#     * Neither the name of UChicago Argonne, LLC, Argonne National       #
+#       Laboratory, ANL, the U.S. Government, nor the names of its        #
+#       contributors may be used to endorse or promote products derived   #
+#       from this software without specific prior written permission.     #
+#                                                                         #
+# THIS SOFTWARE IS PROVIDED BY UChicago Argonne, LLC AND CONTRIBUTORS     #
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT       #
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS       #
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL UChicago     #
+# Argonne, LLC OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,        #
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,    #
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;        #
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER        #
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT      #
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN       #
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE         #
+# POSSIBILITY OF SUCH DAMAGE.                                             #
+# #########################################################################
+import numpy as np
+
+from aps.wavepy2.core import synthetic_data
+
+# image sizes (nxn pixels) of the benchmarks
+SIZES = [512, 1024, 2048, 4096]
+
+PERIOD = 8 # pixels, the sizes are multiple of it
+
+def get_talbot_images(n, seed=0):
+    """
+    Reference and sample images with known differential phases (a parabolic wavefront), dark field and
+    transmission, and the ground truth.
+    """
+    shape = (n, n)
+
+    # differential phases up to +-pi at the borders, i.e. a shift of one pixel of the harmonics
+    _, dpc_H, dpc_V = synthetic_data.parabolic_surface(shape, curvature=np.pi / n)
+
+    ground_truth = {"dpc_H" : dpc_H,
+                    "dpc_V" : dpc_V,
+                    "dark_field_H" : 0.8,
+                    "dark_field_V" : 0.9,
+                    "transmission" : 0.7}
+
+    img_ref = synthetic_data.talbot_image(shape, PERIOD, seed=seed)
+    img     = synthetic_data.talbot_image(shape, PERIOD, seed=seed + 1, **ground_truth)
+
+    return img, img_ref, synthetic_data.get_harmonic_period(shape, PERIOD), ground_truth
+
+def block_average(array, shape):
+    """
+    Average of array on blocks, to compare the ground truth with the (smaller) harmonic images.
+    """
+    array = np.broadcast_to(array, (array.shape[0] // shape[0] * shape[0], array.shape[1] // shape[1] * shape[1]))
+
+    return array.reshape(shape[0], array.shape[0] // shape[0], shape[1], array.shape[1] // shape[1]).mean(axis=(1, 3))
+
+def relative_rms_error(result, ground_truth):
+    result       = result - np.mean(result)
+    ground_truth = ground_truth - np.mean(ground_truth)
+
+    return float(np.sqrt(np.mean((result - ground_truth) ** 2) / np.mean(ground_truth ** 2)))